@@ -1,170 +1,177 @@
 """
 Backtesting Engine for Alpha-Orion
 Simulates arbitrage strategies using historical data
+
+Market data is columnar (one NumPy array per venue, pair and field), so
+vectorized strategies evaluate a whole period in a few array passes and
+event-loop strategies only visit candidate bars. Results are persisted to
+SQLite keyed by config hash; identical runs are served from the store.
+With source="replay" the bars are blocks replayed from recorded pool
+reserves in the local replay store instead of synthetic data.
 """
 
 import asyncio
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
 import logging
-import uuid
+import os
+import tempfile
+from typing import Dict, Iterable
+
+from market_data import MarketData
+from parameter_search import grid, random_samples, run_search, trades_to_results
+from pool_replay import replay_market_data
+from replay_store import ReplayStore
+from results_store import ResultsStore, config_hash
+from strategies import run_strategy, strategy_params, summarize
 
 logger = logging.getLogger(__name__)
 
-class BacktestingEngine:
-    def __init__(self):
-        self.results_store = {}  # Store backtest results by ID
-        self.historical_data = {}  # Cache for historical data
+DEFAULT_STORE_PATH = os.getenv(
+    "BACKTEST_RESULTS_DB",
+    os.path.join(tempfile.gettempdir(), "alpha-orion", "backtests.sqlite")
+)
+DEFAULT_REPLAY_DIR = os.getenv(
+    "REPLAY_DATA_DIR",
+    os.path.join(tempfile.gettempdir(), "alpha-orion", "replay")
+)
+
 
-    async def run_backtest(self, start_date: str, end_date: str, strategy: str = "arbitrage") -> Dict:
+class BacktestingEngine:
+    def __init__(self, store_path: str = None, max_workers: int = None, replay_dir: str = None):
+        store_path = store_path or DEFAULT_STORE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+        self.results_store = ResultsStore(store_path)  # Backtest results by config hash
+        self.replay_store = ReplayStore(replay_dir or DEFAULT_REPLAY_DIR)  # Recorded swaps, reserves and gas
+        self.historical_data: Dict[tuple, MarketData] = {}  # Cache for historical data
+        self.max_workers = max_workers
+
+    async def run_backtest(
+        self,
+        start_date: str,
+        end_date: str,
+        strategy: str = "arbitrage",
+        params: Dict = None,
+        market: MarketData = None,
+        freq: str = '1h',
+        seed: int = 0,
+        source: str = 'synthetic'
+    ) -> Dict:
         """
         Run a backtest for the specified period and strategy
-        """
-        backtest_id = str(uuid.uuid4())
 
+        Args:
+            params: Strategy parameters overriding its defaults
+            market: Bars to replay; otherwise loaded from source
+            source: "synthetic" or "replay" (per-block pool state from the replay store)
+        """
         try:
-            # Load historical data
-            data = await self._load_historical_data(start_date, end_date)
-
-            # Run simulation based on strategy
-            if strategy == "arbitrage":
-                results = await self._simulate_arbitrage_backtest(data, start_date, end_date)
+            full_params = strategy_params(strategy, params)
+            data = await self._load_historical_data(start_date, end_date, market, freq, seed, source)
+            period = f"{start_date} to {end_date}"
+
+            fingerprint = data.fingerprint()
+            config = config_hash(strategy, full_params, fingerprint)
+            stored = self.results_store.get(config)
+            if stored is None:
+                trades = await asyncio.to_thread(run_strategy, strategy, data, full_params)
+                summary = summarize(trades)
+                results = trades_to_results(data, trades, summary)
+                results.update(start_date=start_date, end_date=end_date)
+                backtest_id = self.results_store.put(
+                    config, strategy, full_params, fingerprint, summary, results, period
+                )
             else:
-                raise ValueError(f"Unsupported strategy: {strategy}")
-
-            # Store results
-            self.results_store[backtest_id] = results
+                backtest_id, summary = stored['backtest_id'], stored['summary']
 
             return {
                 "backtest_id": backtest_id,
                 "strategy": strategy,
-                "period": f"{start_date} to {end_date}",
-                "summary": self._calculate_summary(results)
+                "params": full_params,
+                "period": period,
+                "cached": stored is not None,
+                "summary": summary
             }
 
         except Exception as e:
             logger.error(f"Backtest failed: {e}")
             raise
 
-    async def _load_historical_data(self, start_date: str, end_date: str) -> pd.DataFrame:
-        """
-        Load historical price data from The Graph or other sources
-        For now, generate synthetic data
-        """
-        # TODO: Implement real data loading from The Graph API
-        # For demonstration, create synthetic data
-
-        start = pd.to_datetime(start_date)
-        end = pd.to_datetime(end_date)
-        dates = pd.date_range(start, end, freq='1H')
-
-        # Generate synthetic price data for popular token pairs
-        pairs = ['WETH/USDC', 'WBTC/USDC', 'LINK/USDC']
-        data = []
-
-        for pair in pairs:
-            base_prices = np.random.uniform(1000, 5000, len(dates)) if 'WETH' in pair else \
-                          np.random.uniform(20000, 60000, len(dates)) if 'WBTC' in pair else \
-                          np.random.uniform(5, 20, len(dates))
-
-            # Add some volatility
-            prices = base_prices * (1 + np.random.normal(0, 0.02, len(dates)))
-
-            for i, date in enumerate(dates):
-                data.append({
-                    'timestamp': date,
-                    'pair': pair,
-                    'price': prices[i],
-                    'liquidity': np.random.uniform(100000, 1000000),
-                    'gas_price': np.random.uniform(20, 100)
-                })
-
-        df = pd.DataFrame(data)
-        return df
-
-    async def _simulate_arbitrage_backtest(self, data: pd.DataFrame, start_date: str, end_date: str) -> Dict:
+    async def run_sweep(
+        self,
+        start_date: str,
+        end_date: str,
+        strategy: str = "arbitrage",
+        param_grid: Dict[str, Iterable] = None,
+        param_space: Dict = None,
+        n_iter: int = 20,
+        objective: str = 'net_profit',
+        market: MarketData = None,
+        freq: str = '1h',
+        seed: int = 0,
+        source: str = 'synthetic',
+        top: int = 10
+    ) -> Dict:
         """
-        Simulate arbitrage opportunities in historical data
+        Grid search (param_grid) or random search (param_space, n_iter) on a process pool.
         """
-        trades = []
-        total_profit = 0
-        total_fees = 0
-
-        # Group by timestamp
-        for timestamp, group in data.groupby('timestamp'):
-            # Find arbitrage opportunities (simplified)
-            prices = group.set_index('pair')['price']
-
-            # Simple arbitrage: if price difference > threshold
-            if len(prices) >= 2:
-                max_price = prices.max()
-                min_price = prices.min()
-                spread = (max_price - min_price) / min_price
-
-                if spread > 0.005:  # 0.5% arbitrage opportunity
-                    # Simulate trade
-                    trade_size = 1000  # USD
-                    profit = trade_size * spread * 0.9  # 90% efficiency
-                    fee = trade_size * 0.003  # 0.3% fee
-
-                    trades.append({
-                        'timestamp': timestamp,
-                        'profit': profit,
-                        'fee': fee,
-                        'spread': spread
-                    })
-
-                    total_profit += profit
-                    total_fees += fee
-
+        if (param_grid is None) == (param_space is None):
+            raise ValueError("Provide exactly one of param_grid or param_space")
+        candidates = grid(param_grid) if param_grid is not None else random_samples(param_space, n_iter, seed)
+        data = await self._load_historical_data(start_date, end_date, market, freq, seed, source)
+        period = f"{start_date} to {end_date}"
+
+        ranked = await asyncio.to_thread(
+            run_search, data, strategy, candidates, self.results_store, self.max_workers, objective, period
+        )
         return {
-            'trades': trades,
-            'total_profit': total_profit,
-            'total_fees': total_fees,
-            'net_profit': total_profit - total_fees,
-            'num_trades': len(trades),
-            'start_date': start_date,
-            'end_date': end_date
+            "strategy": strategy,
+            "period": period,
+            "objective": objective,
+            "evaluated": len(ranked),
+            "best": ranked[0] if ranked else None,
+            "results": ranked[:top]
         }
 
-    def _calculate_summary(self, results: Dict) -> Dict:
+    async def _load_historical_data(
+        self,
+        start_date: str,
+        end_date: str,
+        market: MarketData = None,
+        freq: str = '1h',
+        seed: int = 0,
+        source: str = 'synthetic'
+    ) -> MarketData:
         """
-        Calculate summary statistics
+        Load historical price data from The Graph or other sources
+        Recorded data comes from the replay store; otherwise generate synthetic data
         """
-        if not results['trades']:
-            return {
-                'total_return': 0,
-                'sharpe_ratio': 0,
-                'max_drawdown': 0,
-                'win_rate': 0
-            }
+        if market is not None:
+            return market.slice(start_date, end_date)
+        if source == 'replay':
+            # Not cached: imports can add data to the store at any time
+            data = await asyncio.to_thread(replay_market_data, self.replay_store, start_date, end_date)
+            if not len(data):
+                raise ValueError(f"No replay data between {start_date} and {end_date}")
+            return data
+        if source != 'synthetic':
+            raise ValueError(f"Unsupported data source: {source}")
 
-        profits = [t['profit'] for t in results['trades']]
-        returns = pd.Series(profits)
-
-        total_return = results['net_profit']
-        sharpe_ratio = returns.mean() / returns.std() if returns.std() > 0 else 0
-
-        # Simple max drawdown calculation
-        cumulative = returns.cumsum()
-        max_drawdown = (cumulative - cumulative.expanding().max()).min()
-
-        win_rate = len([p for p in profits if p > 0]) / len(profits)
-
-        return {
-            'total_return': total_return,
-            'sharpe_ratio': sharpe_ratio,
-            'max_drawdown': max_drawdown,
-            'win_rate': win_rate
-        }
+        # TODO: Implement real data loading from The Graph API
+        key = (start_date, end_date, freq, seed)
+        if key not in self.historical_data:
+            self.historical_data[key] = await asyncio.to_thread(
+                MarketData.synthetic, start_date, end_date, freq=freq, seed=seed
+            )
+        return self.historical_data[key]
 
     def get_results(self, backtest_id: str) -> Dict:
         """
         Retrieve stored backtest results
         """
-        if backtest_id not in self.results_store:
+        results = self.results_store.load_results(backtest_id)
+        if results is None:
             raise ValueError(f"Backtest ID {backtest_id} not found")
 
-        return self.results_store[backtest_id]
+        return results
+
+    def close(self):
+        self.results_store.close()
@@ -0,0 +1,90 @@
+"""
+Alpha-Orion Backtest Benchmark
+
+Runs the arbitrage strategy over synthetic minute bars with the columnar
+engine and with the row-grouping loop the engine used before, and reports
+the speedup. Exits non-zero when the speedup is below --min-speedup.
+
+Usage:
+    python benchmark_backtest.py --days 365
+    python benchmark_backtest.py --days 30 --skip-legacy
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+import pandas as pd
+
+from market_data import MarketData
+from strategies import run_strategy, summarize
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+
+
+def legacy_arbitrage(data: pd.DataFrame) -> int:
+    """Per-group loop of the pre-columnar engine, grouped per pair"""
+    trades = 0
+    for _, group in data.groupby(['timestamp', 'pair']):
+        prices = group['price']
+        if len(prices) >= 2:
+            spread = (prices.max() - prices.min()) / prices.min()
+            if spread > 0.005:
+                trades += 1
+    return trades
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtesting engine benchmark")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--freq', default='1min')
+    parser.add_argument('--legacy-days', type=float, default=7,
+                        help="Days replayed through the legacy loop; its time is scaled to --days")
+    parser.add_argument('--skip-legacy', action='store_true')
+    parser.add_argument('--min-speedup', type=float, default=20,
+                        help="Fail when the columnar engine is less than this many times faster")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    end = pd.Timestamp('2024-01-01') + pd.Timedelta(days=args.days)
+    market = MarketData.synthetic('2024-01-01', str(end), freq=args.freq, seed=args.seed)
+    logging.info(f"{len(market):,} bars x {len(market.keys)} series")
+
+    start = time.perf_counter()
+    summary = summarize(run_strategy('arbitrage', market))
+    columnar = time.perf_counter() - start
+    logging.info(f"Columnar: {columnar:.2f}s, {summary['num_trades']:,} trades")
+
+    start = time.perf_counter()
+    summarize(run_strategy('inventory_arbitrage', market))
+    logging.info(f"Event loop (inventory_arbitrage): {time.perf_counter() - start:.2f}s")
+
+    if args.skip_legacy:
+        return
+
+    legacy_end = pd.Timestamp('2024-01-01') + pd.Timedelta(days=min(args.legacy_days, args.days))
+    sample = market.slice('2024-01-01', str(legacy_end))
+    frame = sample.to_frame()
+    start = time.perf_counter()
+    legacy_trades = legacy_arbitrage(frame)
+    legacy = (time.perf_counter() - start) * len(market) / len(sample)
+    logging.info(f"Legacy (scaled from {len(sample):,} bars): {legacy:.1f}s, "
+                 f"{legacy_trades:,} trades in sample")
+    speedup = legacy / columnar
+    logging.info(f"Speedup: {speedup:,.0f}x")
+    if speedup < args.min_speedup:
+        logging.error(f"Speedup {speedup:,.1f}x is below the {args.min_speedup:g}x minimum")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+eth_getLogs importer for the Alpha-Orion replay store
+
+Decodes Uniswap V2-style Swap and Sync logs from JSON, JSON-lines or CSV
+dumps of eth_getLogs results and writes them to a ReplayStore as swaps and
+pool reserves. Block dumps (eth_getBlockByNumber results or CSV) supply block
+timestamps and base fees; logs that carry blockTimestamp themselves do not
+need them.
+
+Usage:
+    python log_importer.py --store ./replay --pools pools.json --logs logs.json --blocks blocks.json
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from replay_store import ReplayStore
+
+logger = logging.getLogger(__name__)
+
+SWAP_TOPIC = '0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d130840159d822'  # Swap(address,uint256,uint256,uint256,uint256,address)
+SYNC_TOPIC = '0x1c411e9a96e071241c2f21f7726b17ae89e3cab4c78be50e062b03a9fffbbad1'  # Sync(uint112,uint112)
+
+CHUNK_SIZE = 100000
+
+
+@dataclass(frozen=True)
+class PoolInfo:
+    """Pool metadata needed to turn raw log amounts into prices"""
+    address: str
+    venue: str
+    pair: str  # BASE/QUOTE
+    decimals0: int = 18
+    decimals1: int = 18
+    invert: bool = False  # True when token0 is the quote token
+
+
+@dataclass
+class ImportStats:
+    swaps: int = 0
+    syncs: int = 0
+    blocks: int = 0
+    unknown_pool: int = 0
+    unknown_topic: int = 0
+    missing_timestamp: int = 0
+    removed: int = 0
+
+
+def load_pools(path: str) -> Dict[str, PoolInfo]:
+    """Pool registry from JSON: a list of pool objects or a mapping keyed by address"""
+    with open(path) as f:
+        raw = json.load(f)
+    entries = [dict(v, address=k) for k, v in raw.items()] if isinstance(raw, dict) else raw
+    pools = {}
+    for entry in entries:
+        pool = PoolInfo(**{**entry, 'address': entry['address'].lower()})
+        pools[pool.address] = pool
+    return pools
+
+
+def _int(value) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        return int(value, 16) if value.startswith('0x') else int(value)
+    return int(value)
+
+
+def _words(data: str) -> List[int]:
+    data = data[2:] if data.startswith('0x') else data
+    return [int(data[i:i + 64], 16) for i in range(0, len(data), 64)]
+
+
+def _normalize(row: Dict) -> Dict:
+    """Map CSV column spellings (block_number, blockNumber, ...) onto eth_getLogs keys"""
+    aliases = {
+        'blocknumber': 'blockNumber',
+        'logindex': 'logIndex',
+        'transactionhash': 'transactionHash',
+        'txhash': 'transactionHash',
+        'blocktimestamp': 'blockTimestamp',
+        'timestamp': 'blockTimestamp',
+        'basefeepergas': 'baseFeePerGas',
+    }
+    normalized = {}
+    for key, value in row.items():
+        compact = key.replace('_', '').lower()
+        normalized[aliases.get(compact, key)] = value
+    if 'topics' not in normalized:
+        normalized['topics'] = [normalized.pop(f'topic{i}') for i in range(4) if normalized.get(f'topic{i}')]
+    elif isinstance(normalized['topics'], str):
+        text = normalized['topics'].strip()
+        normalized['topics'] = json.loads(text) if text.startswith('[') else \
+            [t for t in text.replace(';', ' ').replace('|', ' ').replace(',', ' ').split() if t]
+    return normalized
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Rows from a JSON array, a JSON-RPC response ({"result": [...]}), JSON lines or CSV"""
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                yield _normalize(row)
+        return
+
+    with open(path) as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[' or (first == '{' and not path.endswith(('.jsonl', '.ndjson'))):
+            raw = json.load(f)
+            rows = raw.get('result', []) if isinstance(raw, dict) else raw
+            for row in rows:
+                yield _normalize(row)
+        else:
+            for line in f:
+                if line.strip():
+                    yield _normalize(json.loads(line))
+
+
+def decode_log(log: Dict, pool: PoolInfo, timestamp: int) -> Optional[tuple]:
+    """(kind, row) for a Swap or Sync log; None for other topics"""
+    topic = log['topics'][0].lower() if log['topics'] else None
+    base = {
+        'block_number': _int(log['blockNumber']),
+        'log_index': _int(log['logIndex']),
+        'timestamp': timestamp,
+        'tx_hash': log.get('transactionHash'),
+        'pool': pool.address,
+        'venue': pool.venue,
+        'pair': pool.pair,
+    }
+    scale0, scale1 = 10 ** pool.decimals0, 10 ** pool.decimals1
+    if topic == SYNC_TOPIC:
+        raw0, raw1 = _words(log['data'])[:2]
+        reserve0, reserve1 = raw0 / scale0, raw1 / scale1
+        if pool.invert:
+            price = reserve0 / reserve1 if reserve1 else float('nan')
+            quote_reserve = reserve0
+        else:
+            price = reserve1 / reserve0 if reserve0 else float('nan')
+            quote_reserve = reserve1
+        return 'reserves', dict(base, reserve0=reserve0, reserve1=reserve1,
+                                price=price, liquidity=2 * quote_reserve)
+    if topic == SWAP_TOPIC:
+        amount0_in, amount1_in, amount0_out, amount1_out = _words(log['data'])[:4]
+        return 'swaps', dict(base, amount0_in=amount0_in / scale0, amount1_in=amount1_in / scale1,
+                             amount0_out=amount0_out / scale0, amount1_out=amount1_out / scale1)
+    return None
+
+
+def import_blocks(store: ReplayStore, path: str) -> Dict[int, int]:
+    """Write block timestamps and base fees; returns block number -> timestamp"""
+    blocks, gas = [], []
+    for block in read_records(path):
+        number = _int(block.get('number', block.get('blockNumber')))
+        timestamp = _int(block.get('blockTimestamp', block.get('timestamp')))
+        blocks.append({'block_number': number, 'timestamp': timestamp})
+        base_fee = _int(block.get('baseFeePerGas'))
+        if base_fee is not None:
+            gas.append({'block_number': number, 'timestamp': timestamp, 'base_fee_gwei': base_fee / 1e9})
+    store.write('blocks', blocks)
+    store.write('gas', gas)
+    return {b['block_number']: b['timestamp'] for b in blocks}
+
+
+def import_logs(
+    store: ReplayStore,
+    log_paths: Iterable[str],
+    pools: Dict[str, PoolInfo],
+    block_paths: Iterable[str] = (),
+    chunk_size: int = CHUNK_SIZE
+) -> ImportStats:
+    """
+    Decode and store Swap and Sync logs, chunk by chunk.
+
+    Logs from unknown pools, with other topics, flagged removed (reorged out)
+    or without a known block timestamp are counted and skipped.
+    """
+    stats = ImportStats()
+    block_times: Dict[int, int] = {}
+    for path in block_paths:
+        block_times.update(import_blocks(store, path))
+    stats.blocks = len(block_times)
+
+    pending = {'swaps': [], 'reserves': []}
+
+    def flush():
+        for kind, rows in pending.items():
+            store.write(kind, rows)
+            rows.clear()
+
+    for path in log_paths:
+        for log in read_records(path):
+            if str(log.get('removed', '')).lower() == 'true':
+                stats.removed += 1
+                continue
+            pool = pools.get(str(log.get('address', '')).lower())
+            if pool is None:
+                stats.unknown_pool += 1
+                continue
+            timestamp = _int(log.get('blockTimestamp'))
+            if timestamp is None:
+                timestamp = block_times.get(_int(log['blockNumber']))
+            if timestamp is None:
+                stats.missing_timestamp += 1
+                continue
+
+            decoded = decode_log(log, pool, timestamp)
+            if decoded is None:
+                stats.unknown_topic += 1
+                continue
+            kind, row = decoded
+            pending[kind].append(row)
+            if kind == 'swaps':
+                stats.swaps += 1
+            else:
+                stats.syncs += 1
+            if len(pending[kind]) >= chunk_size:
+                flush()
+    flush()
+
+    logger.info(f"Imported {stats.swaps} swaps, {stats.syncs} syncs, {stats.blocks} blocks "
+                f"(skipped {stats.unknown_pool} unknown pool, {stats.unknown_topic} other topic, "
+                f"{stats.missing_timestamp} without timestamp, {stats.removed} removed)")
+    return stats
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ],
+        force=True
+    )
+    parser = argparse.ArgumentParser(description="Import eth_getLogs dumps into the replay store")
+    parser.add_argument('--store', default=os.getenv('REPLAY_DATA_DIR', './replay'))
+    parser.add_argument('--pools', required=True, help="Pool registry JSON")
+    parser.add_argument('--logs', nargs='+', required=True, help="eth_getLogs dumps (JSON, JSONL or CSV)")
+    parser.add_argument('--blocks', nargs='*', default=[], help="Block dumps with number, timestamp, baseFeePerGas")
+    args = parser.parse_args()
+
+    stats = import_logs(ReplayStore(args.store), args.logs, load_pools(args.pools), args.blocks)
+    print(json.dumps(asdict(stats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ Main entry point for Alpha-Orion Backtesting Service
 import asyncio
 import uvicorn
 from fastapi import FastAPI, Request
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
 from backtesting_engine import BacktestingEngine
 import logging
 
@@ -18,6 +20,17 @@ app = FastAPI(title="Alpha-Orion Backtesting Service", version="1.0.0")
 # Global backtesting engine instance
 backtesting_engine = None
 
+class SweepRequest(BaseModel):
+    start_date: str
+    end_date: str
+    strategy: str = "arbitrage"
+    param_grid: Optional[Dict[str, List[Any]]] = None
+    param_space: Optional[Dict[str, Any]] = None  # [low, high] ranges or lists of choices
+    n_iter: int = 20
+    objective: str = "net_profit"
+    source: str = "synthetic"
+    top: int = 10
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize the backtesting engine on startup"""
@@ -37,15 +50,39 @@ async def metrics():
     pass
 
 @app.post("/backtest/run")
-async def run_backtest(start_date: str, end_date: str, strategy: str = "arbitrage"):
+async def run_backtest(start_date: str, end_date: str, strategy: str = "arbitrage", freq: str = "1h",
+                       source: str = "synthetic"):
     """Run a backtest for the specified period and strategy"""
     try:
-        results = await backtesting_engine.run_backtest(start_date, end_date, strategy)
+        results = await backtesting_engine.run_backtest(start_date, end_date, strategy, freq=freq, source=source)
         return {"status": "success", "results": results}
     except Exception as e:
         logger.error(f"Backtest failed: {e}")
         return {"status": "error", "message": str(e)}
 
+@app.post("/backtest/sweep")
+async def run_sweep(request: SweepRequest):
+    """Grid or random search over strategy parameters"""
+    try:
+        param_space = None
+        if request.param_space is not None:
+            # JSON has no tuples: two-element numeric lists are ranges, anything else is a choice list
+            param_space = {
+                name: tuple(space) if isinstance(space, list) and len(space) == 2
+                and all(isinstance(v, (int, float)) for v in space) else space
+                for name, space in request.param_space.items()
+            }
+        results = await backtesting_engine.run_sweep(
+            request.start_date, request.end_date, request.strategy,
+            param_grid=request.param_grid, param_space=param_space,
+            n_iter=request.n_iter, objective=request.objective,
+            source=request.source, top=request.top
+        )
+        return {"status": "success", "results": results}
+    except Exception as e:
+        logger.error(f"Sweep failed: {e}")
+        return {"status": "error", "message": str(e)}
+
 @app.get("/backtest/results/{backtest_id}")
 async def get_backtest_results(backtest_id: str):
     """Get results for a specific backtest"""
@@ -0,0 +1,125 @@
+"""
+Parallel parameter sweeps for Alpha-Orion backtests
+
+Grid and random search over strategy parameters on a process pool. The
+market data is sent to each worker once through the pool initializer, so
+tasks carry only their parameter sets. Configs already in the results store
+are not re-run.
+"""
+
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from market_data import MarketData
+from results_store import ResultsStore, config_hash
+from strategies import run_strategy, strategy_params, summarize
+
+logger = logging.getLogger(__name__)
+
+_worker_market: Optional[MarketData] = None
+
+
+def _init_worker(market: MarketData):
+    global _worker_market
+    _worker_market = market
+
+
+def _evaluate(task: Tuple[str, Dict]) -> Tuple[Dict, Dict]:
+    strategy, params = task
+    trades = run_strategy(strategy, _worker_market, params)
+    return summarize(trades), trades
+
+
+def grid(param_grid: Dict[str, Sequence]) -> List[Dict]:
+    """Cartesian product of per-parameter value lists"""
+    names = sorted(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+
+
+def random_samples(param_space: Dict[str, Union[Tuple[float, float], Sequence]],
+                   n_iter: int, seed: int = 0) -> List[Dict]:
+    """
+    Draw parameter sets: (low, high) tuples are sampled uniformly, lists are sampled as choices.
+    """
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(n_iter):
+        params = {}
+        for name in sorted(param_space):
+            space = param_space[name]
+            if isinstance(space, tuple) and len(space) == 2:
+                low, high = space
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = int(rng.integers(low, high + 1))
+                else:
+                    params[name] = float(rng.uniform(low, high))
+            else:
+                params[name] = space[int(rng.integers(len(space)))]
+        samples.append(params)
+    return samples
+
+
+def run_search(
+    market: MarketData,
+    strategy: str,
+    candidates: Iterable[Dict],
+    store: ResultsStore = None,
+    max_workers: int = None,
+    objective: str = 'net_profit',
+    period: str = None
+) -> List[Dict]:
+    """
+    Evaluate parameter sets in parallel and rank them by the objective.
+
+    Returns:
+        One entry per parameter set: params, config_hash, backtest_id and summary
+    """
+    fingerprint = market.fingerprint()
+    runs = {}
+    for params in candidates:
+        full = strategy_params(strategy, params)
+        runs.setdefault(config_hash(strategy, full, fingerprint), full)
+
+    cached = store.get_many(list(runs)) if store is not None else {}
+    pending = [h for h in runs if h not in cached]
+    logger.info(f"Parameter search: {len(runs)} configs, {len(cached)} cached, {len(pending)} to run")
+
+    entries = {
+        h: {'params': row['params'], 'config_hash': h, 'backtest_id': row['backtest_id'], 'summary': row['summary']}
+        for h, row in cached.items()
+    }
+    if pending:
+        workers = max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(market,)) as pool:
+            tasks = [(strategy, runs[h]) for h in pending]
+            for h, (summary, trades) in zip(pending, pool.map(_evaluate, tasks, chunksize=max(1, len(tasks) // (4 * workers)))):
+                backtest_id = None
+                if store is not None:
+                    results = trades_to_results(market, trades, summary)
+                    backtest_id = store.put(h, strategy, runs[h], fingerprint, summary, results, period)
+                entries[h] = {'params': runs[h], 'config_hash': h, 'backtest_id': backtest_id, 'summary': summary}
+
+    return sorted(entries.values(), key=lambda e: e['summary'].get(objective, 0), reverse=True)
+
+
+def trades_to_results(market: MarketData, trades: Dict[str, np.ndarray], summary: Dict) -> Dict:
+    """JSON-ready results with trades as columns"""
+    timestamps = np.datetime_as_string(market.timestamps[trades['bar']], unit='s')
+    return {
+        'trades': {
+            'timestamp': timestamps.tolist(),
+            'pair': trades['pair'].tolist(),
+            'profit': trades['profit'].tolist(),
+            'fee': trades['fee'].tolist(),
+            'spread': trades['spread'].tolist(),
+        },
+        'total_profit': summary['total_profit'],
+        'total_fees': summary['total_fees'],
+        'net_profit': summary['net_profit'],
+        'num_trades': summary['num_trades'],
+    }
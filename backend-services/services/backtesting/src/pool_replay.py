@@ -0,0 +1,134 @@
+"""
+Block-by-block pool state replay for Alpha-Orion backtests
+
+Walks the merged event stream of a ReplayStore and applies each Sync to the
+pool it belongs to, so consumers see every pool's reserves and price as of
+the end of each block, together with that block's swaps and base fee.
+replay_market_data() builds the same per-block state in columnar form for
+the BacktestingEngine: one bar per block in which any pool changed, with
+prices and liquidity carried forward between updates.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from market_data import FIELDS, MarketData
+from replay_store import ReplayStore
+
+
+@dataclass(frozen=True)
+class PoolState:
+    pool: str
+    venue: str
+    pair: str
+    reserve0: float
+    reserve1: float
+    price: float
+    liquidity: float
+    block_number: int  # Block of the last update
+
+
+@dataclass
+class BlockState:
+    """State after one block: every pool seen so far, plus the block's own swaps"""
+    block_number: int
+    timestamp: int
+    pools: Dict[str, PoolState]
+    swaps: List[Dict] = field(default_factory=list)
+    base_fee_gwei: Optional[float] = None
+
+
+def replay_blocks(
+    store: ReplayStore,
+    start=None,
+    end=None,
+    pairs: Iterable[str] = None,
+    venues: Sequence[str] = None
+) -> Iterator[BlockState]:
+    """Yield a BlockState for every block with a pool update, swap or base fee"""
+    pools: Dict[str, PoolState] = {}
+    base_fee = None
+    current: Optional[BlockState] = None
+
+    for event in store.events(start, end, pairs, venues, kinds=('gas', 'reserves', 'swaps')):
+        if current is not None and event.block_number != current.block_number:
+            current.pools = dict(pools)
+            yield current
+            current = None
+        if current is None:
+            current = BlockState(event.block_number, event.timestamp, {}, base_fee_gwei=base_fee)
+
+        data = event.data
+        if event.kind == 'reserves':
+            pools[data['pool']] = PoolState(
+                data['pool'], data['venue'], data['pair'], data['reserve0'], data['reserve1'],
+                data['price'], data['liquidity'], event.block_number
+            )
+        elif event.kind == 'swaps':
+            current.swaps.append(data)
+        else:
+            base_fee = current.base_fee_gwei = data['base_fee_gwei']
+
+    if current is not None:
+        current.pools = dict(pools)
+        yield current
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carry the last value forward over NaN gaps; leading NaN stays NaN"""
+    index = np.where(~np.isnan(values), np.arange(len(values)), 0)
+    np.maximum.accumulate(index, out=index)
+    return values[index]
+
+
+def replay_market_data(
+    store: ReplayStore,
+    start=None,
+    end=None,
+    pairs: Iterable[str] = None,
+    venues: Sequence[str] = None
+) -> MarketData:
+    """
+    Per-block MarketData from recorded reserves.
+
+    Series are keyed by (venue, pair); when one venue has several pools for a
+    pair, the last update in a block wins. gas_price is the block base fee.
+    """
+    frames = [
+        store.read('reserves', start, end, pair=pair, venues=venues)
+        for pair in (pairs if pairs is not None else store.pairs())
+    ]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return MarketData(timestamps=np.empty(0, dtype='datetime64[ns]'), series={})
+    reserves = pd.concat(frames, ignore_index=True)
+    reserves = reserves.sort_values(['block_number', 'log_index'], kind='stable') \
+        .drop_duplicates(['block_number', 'venue', 'pair'], keep='last')
+
+    blocks = reserves.drop_duplicates('block_number')[['block_number', 'timestamp']]
+    block_numbers = blocks['block_number'].to_numpy()
+    timestamps = pd.to_datetime(blocks['timestamp'].to_numpy(), unit='s').values.astype('datetime64[ns]')
+    n = len(block_numbers)
+
+    gas = store.read('gas', start, end)
+    gas_price = np.full(n, np.nan)
+    if not gas.empty:
+        gas = gas.sort_values('block_number')
+        position = np.searchsorted(gas['block_number'].to_numpy(), block_numbers, 'right') - 1
+        known = position >= 0
+        gas_price[known] = gas['base_fee_gwei'].to_numpy()[position[known]]
+
+    series = {}
+    for (venue, pair), group in reserves.groupby(['venue', 'pair'], sort=True):
+        index = np.searchsorted(block_numbers, group['block_number'].to_numpy())
+        fields = {}
+        for name in ('price', 'liquidity'):
+            column = np.full(n, np.nan)
+            column[index] = group[name].to_numpy(dtype=float)
+            fields[name] = _forward_fill(column)
+        fields['gas_price'] = gas_price.copy()
+        series[(venue, pair)] = {name: fields[name] for name in FIELDS}
+    return MarketData(timestamps=timestamps, series=series)
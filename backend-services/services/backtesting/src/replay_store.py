@@ -0,0 +1,251 @@
+"""
+Historical replay store for Alpha-Orion backtests
+
+Recorded chain data lives in a local Parquet dataset partitioned by date and
+pair:
+
+    <root>/<kind>/date=YYYY-MM-DD/pair=WETH_USDC/part.parquet   (swaps, reserves)
+    <root>/<kind>/date=YYYY-MM-DD/part.parquet                  (gas, blocks)
+
+Each partition holds one file sorted by (block_number, log_index); writes
+merge into the existing partition and drop duplicates, so re-importing a
+dump is idempotent. Reads stream record batches partition by partition, and
+events() merges every (kind, pair) stream into one block-ordered iterator
+while holding at most one batch per stream in memory.
+"""
+
+import heapq
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+SCHEMAS = {
+    'swaps': pa.schema([
+        ('block_number', pa.int64()),
+        ('log_index', pa.int32()),
+        ('timestamp', pa.int64()),  # unix seconds
+        ('tx_hash', pa.string()),
+        ('pool', pa.string()),
+        ('venue', pa.string()),
+        ('pair', pa.string()),
+        ('amount0_in', pa.float64()),
+        ('amount1_in', pa.float64()),
+        ('amount0_out', pa.float64()),
+        ('amount1_out', pa.float64()),
+    ]),
+    'reserves': pa.schema([
+        ('block_number', pa.int64()),
+        ('log_index', pa.int32()),
+        ('timestamp', pa.int64()),
+        ('tx_hash', pa.string()),
+        ('pool', pa.string()),
+        ('venue', pa.string()),
+        ('pair', pa.string()),
+        ('reserve0', pa.float64()),
+        ('reserve1', pa.float64()),
+        ('price', pa.float64()),  # quote per base
+        ('liquidity', pa.float64()),  # pool value in quote units
+    ]),
+    'gas': pa.schema([
+        ('block_number', pa.int64()),
+        ('timestamp', pa.int64()),
+        ('base_fee_gwei', pa.float64()),
+    ]),
+    'blocks': pa.schema([
+        ('block_number', pa.int64()),
+        ('timestamp', pa.int64()),
+    ]),
+}
+
+PAIR_PARTITIONED = ('swaps', 'reserves')
+EVENT_KINDS = ('reserves', 'swaps')
+
+
+class ReplayEvent(NamedTuple):
+    block_number: int
+    log_index: int
+    timestamp: int
+    kind: str
+    data: Dict
+
+
+def _sort_keys(kind: str) -> List[str]:
+    return ['block_number', 'log_index'] if 'log_index' in SCHEMAS[kind].names else ['block_number']
+
+
+def _pair_dir(pair: str) -> str:
+    return 'pair=' + pair.replace('/', '_')
+
+
+def _to_seconds(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return int(timestamp.timestamp())
+
+
+class ReplayStore:
+    """Parquet dataset of swaps, reserves, gas and block timestamps"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def write(self, kind: str, rows) -> int:
+        """
+        Merge rows (DataFrame or list of dicts) into their partitions.
+
+        Returns:
+            Number of rows written after de-duplication
+        """
+        schema = SCHEMAS[kind]
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows), columns=schema.names)
+        if frame.empty:
+            return 0
+        frame = frame[list(schema.names)]
+        frame = frame.assign(_date=pd.to_datetime(frame['timestamp'], unit='s', utc=True).dt.strftime('%Y-%m-%d'))
+        group_keys = ['_date', 'pair'] if kind in PAIR_PARTITIONED else ['_date']
+
+        written = 0
+        for key, group in frame.groupby(group_keys, sort=True):
+            key = key if isinstance(key, tuple) else (key,)
+            directory = os.path.join(self.root, kind, f"date={key[0]}")
+            if kind in PAIR_PARTITIONED:
+                directory = os.path.join(directory, _pair_dir(key[1]))
+            table = pa.Table.from_pandas(group.drop(columns='_date'), schema=schema, preserve_index=False)
+            written += self._merge_partition(kind, directory, table)
+        return written
+
+    def _merge_partition(self, kind: str, directory: str, table: pa.Table) -> int:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'part.parquet')
+        existing = 0
+        if os.path.exists(path):
+            current = pq.read_table(path, schema=SCHEMAS[kind])
+            existing = current.num_rows
+            table = pa.concat_tables([current, table])
+
+        keys = _sort_keys(kind)
+        frame = table.to_pandas().drop_duplicates(subset=keys, keep='last').sort_values(keys, kind='stable')
+        table = pa.Table.from_pandas(frame, schema=SCHEMAS[kind], preserve_index=False)
+
+        tmp = os.path.join(directory, f".part-{uuid.uuid4().hex}.tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+        return table.num_rows - existing
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def dates(self, kind: str) -> List[str]:
+        directory = os.path.join(self.root, kind)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[5:] for name in os.listdir(directory) if name.startswith('date='))
+
+    def pairs(self, kind: str = 'reserves') -> List[str]:
+        """Pairs with data; partition names replace '/' so the names are read back from the files"""
+        names = {}
+        for date in self.dates(kind):
+            day = os.path.join(self.root, kind, f"date={date}")
+            for name in os.listdir(day):
+                path = os.path.join(day, name, 'part.parquet')
+                if name.startswith('pair=') and name not in names and os.path.exists(path):
+                    names[name] = pq.read_table(path, columns=['pair']).column('pair')[0].as_py()
+        return sorted(names.values())
+
+    def scan(
+        self,
+        kind: str,
+        start=None,
+        end=None,
+        pair: str = None,
+        venues: Sequence[str] = None,
+        batch_size: int = 65536
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Record batches of one kind (and pair) in block order, with timestamps in [start, end).
+        """
+        start_s, end_s = _to_seconds(start), _to_seconds(end)
+        start_day = datetime.fromtimestamp(start_s, timezone.utc).strftime('%Y-%m-%d') if start_s is not None else None
+        end_day = datetime.fromtimestamp(end_s, timezone.utc).strftime('%Y-%m-%d') if end_s is not None else None
+
+        for date in self.dates(kind):
+            if (start_day and date < start_day) or (end_day and date > end_day):
+                continue
+            path = os.path.join(self.root, kind, f"date={date}")
+            if kind in PAIR_PARTITIONED:
+                if pair is None:
+                    raise ValueError(f"{kind} scans need a pair")
+                path = os.path.join(path, _pair_dir(pair))
+            path = os.path.join(path, 'part.parquet')
+            if not os.path.exists(path):
+                continue
+
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+                mask = None
+                if start_s is not None:
+                    mask = pc.greater_equal(batch.column('timestamp'), start_s)
+                if end_s is not None:
+                    upper = pc.less(batch.column('timestamp'), end_s)
+                    mask = upper if mask is None else pc.and_(mask, upper)
+                if venues is not None and 'venue' in batch.schema.names:
+                    in_venues = pc.is_in(batch.column('venue'), value_set=pa.array(list(venues)))
+                    mask = in_venues if mask is None else pc.and_(mask, in_venues)
+                if mask is not None:
+                    batch = batch.filter(mask)
+                if batch.num_rows:
+                    yield batch
+
+    def read(self, kind: str, start=None, end=None, pair: str = None, venues: Sequence[str] = None) -> pd.DataFrame:
+        batches = list(self.scan(kind, start, end, pair, venues))
+        if not batches:
+            return SCHEMAS[kind].empty_table().to_pandas()
+        return pa.Table.from_batches(batches).to_pandas()
+
+    def _rows(self, kind: str, **scan_args) -> Iterator[ReplayEvent]:
+        has_log_index = 'log_index' in SCHEMAS[kind].names
+        for batch in self.scan(kind, **scan_args):
+            for row in batch.to_pylist():
+                yield ReplayEvent(row['block_number'], row['log_index'] if has_log_index else -1,
+                                  row['timestamp'], kind, row)
+
+    def events(
+        self,
+        start=None,
+        end=None,
+        pairs: Iterable[str] = None,
+        venues: Sequence[str] = None,
+        kinds: Sequence[str] = EVENT_KINDS,
+        batch_size: int = 4096
+    ) -> Iterator[ReplayEvent]:
+        """
+        All events of the given kinds across pairs and venues, merged in (block, log index) order.
+
+        gas and blocks rows sort before the logs of their block.
+        """
+        pairs = list(pairs) if pairs is not None else self.pairs()
+        streams = []
+        for kind in kinds:
+            if kind in PAIR_PARTITIONED:
+                for pair in pairs:
+                    streams.append(self._rows(kind, start=start, end=end, pair=pair,
+                                              venues=venues, batch_size=batch_size))
+            else:
+                streams.append(self._rows(kind, start=start, end=end, batch_size=batch_size))
+        return heapq.merge(*streams, key=lambda e: (e.block_number, e.log_index))
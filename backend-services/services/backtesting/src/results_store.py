@@ -0,0 +1,119 @@
+"""
+Persistent backtest results for Alpha-Orion
+
+Results live in a local SQLite database keyed by a hash of the strategy,
+its full parameter set and the market data fingerprint, so identical runs
+are served from disk and survive restarts.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional
+
+
+def config_hash(strategy: str, params: Dict, data_fingerprint: str) -> str:
+    payload = json.dumps(
+        {'strategy': strategy, 'params': params, 'data': data_fingerprint},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultsStore:
+    """SQLite table of backtest runs; full results are stored as compressed JSON"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS backtests (
+        config_hash TEXT PRIMARY KEY,
+        backtest_id TEXT UNIQUE NOT NULL,
+        strategy TEXT NOT NULL,
+        params TEXT NOT NULL,
+        data_fingerprint TEXT NOT NULL,
+        period TEXT,
+        summary TEXT NOT NULL,
+        results BLOB NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS backtests_strategy ON backtests (strategy, created_at);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def _row(self, row) -> Optional[Dict]:
+        if row is None:
+            return None
+        config, backtest_id, strategy, params, fingerprint, period, summary, created_at = row
+        return {
+            'config_hash': config,
+            'backtest_id': backtest_id,
+            'strategy': strategy,
+            'params': json.loads(params),
+            'data_fingerprint': fingerprint,
+            'period': period,
+            'summary': json.loads(summary),
+            'created_at': created_at,
+        }
+
+    _COLUMNS = "config_hash, backtest_id, strategy, params, data_fingerprint, period, summary, created_at"
+
+    def get(self, config: str) -> Optional[Dict]:
+        """Run metadata and summary by config hash"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM backtests WHERE config_hash = ?", (config,)
+            ).fetchone()
+        return self._row(row)
+
+    def get_many(self, configs: List[str]) -> Dict[str, Dict]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(configs), 500):
+                chunk = configs[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT {self._COLUMNS} FROM backtests WHERE config_hash IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for row in rows:
+                    found[row[0]] = self._row(row)
+        return found
+
+    def put(self, config: str, strategy: str, params: Dict, data_fingerprint: str,
+            summary: Dict, results: Dict, period: str = None) -> str:
+        """Store a run; returns its backtest_id (the existing one if the config is already stored)"""
+        backtest_id = str(uuid.uuid4())
+        blob = zlib.compress(json.dumps(results, default=str).encode())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO backtests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (config, backtest_id, strategy, json.dumps(params, sort_keys=True), data_fingerprint,
+                 period, json.dumps(summary, default=str), blob, time.time())
+            )
+            row = self._conn.execute(
+                "SELECT backtest_id FROM backtests WHERE config_hash = ?", (config,)
+            ).fetchone()
+        return row[0]
+
+    def load_results(self, backtest_id: str) -> Optional[Dict]:
+        """Full results by backtest_id, or by config hash"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results FROM backtests WHERE backtest_id = ? OR config_hash = ?",
+                (backtest_id, backtest_id)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,237 @@
+"""
+Backtest strategies for Alpha-Orion
+
+Strategies come in two forms:
+- vectorized signal functions that turn whole (time x series) matrices into
+  trades in a few NumPy passes
+- event-loop strategies for path-dependent logic (capital, cooldowns), which
+  precompute their signals vectorized and then step only through candidate bars
+
+Both return trades as columns: bar index, pair, profit, fee and spread.
+"""
+
+from collections import deque
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from market_data import MarketData
+
+TRADE_COLUMNS = ('bar', 'pair', 'profit', 'fee', 'spread')
+
+
+def empty_trades() -> Dict[str, np.ndarray]:
+    return {
+        'bar': np.empty(0, dtype=np.int64),
+        'pair': np.empty(0, dtype=object),
+        'profit': np.empty(0),
+        'fee': np.empty(0),
+        'spread': np.empty(0),
+    }
+
+
+def concat_trades(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Merge per-pair trade columns and order them by bar"""
+    parts = [p for p in parts if len(p['bar'])]
+    if not parts:
+        return empty_trades()
+    trades = {c: np.concatenate([p[c] for p in parts]) for c in TRADE_COLUMNS}
+    order = np.argsort(trades['bar'], kind='stable')
+    return {c: v[order] for c, v in trades.items()}
+
+
+def cross_venue_spread(market: MarketData, keys) -> np.ndarray:
+    """
+    (max - min) / min across the given series at each bar; NaN where fewer than two quote.
+    """
+    prices = market.matrix('price', keys)
+    quoted = (~np.isnan(prices)).sum(axis=1)
+    spread = np.full(len(market), np.nan)
+    rows = quoted >= 2
+    if rows.any():
+        quoted_prices = prices[rows]
+        high = np.fmax.reduce(quoted_prices, axis=1)
+        low = np.fmin.reduce(quoted_prices, axis=1)
+        spread[rows] = (high - low) / low
+    return spread
+
+
+# ---------------------------------------------------------------------------
+# Vectorized strategies
+# ---------------------------------------------------------------------------
+
+ARBITRAGE_DEFAULTS = {
+    'min_spread': 0.005,  # 0.5% arbitrage opportunity
+    'trade_size': 1000.0,  # USD
+    'efficiency': 0.9,  # Share of the spread captured
+    'fee_rate': 0.003,  # 0.3% fee
+}
+
+
+def arbitrage_signals(market: MarketData, params: Dict) -> Dict[str, np.ndarray]:
+    """Trade every bar where a pair's cross-venue spread exceeds min_spread"""
+    parts = []
+    for pair, keys in market.groups_by_pair().items():
+        spread = cross_venue_spread(market, keys)
+        bars = np.flatnonzero(spread > params['min_spread'])
+        spread = spread[bars]
+        parts.append({
+            'bar': bars,
+            'pair': np.full(len(bars), pair, dtype=object),
+            'profit': params['trade_size'] * spread * params['efficiency'],
+            'fee': np.full(len(bars), params['trade_size'] * params['fee_rate']),
+            'spread': spread,
+        })
+    return concat_trades(parts)
+
+
+# ---------------------------------------------------------------------------
+# Event-loop strategies
+# ---------------------------------------------------------------------------
+
+class EventStrategy:
+    """
+    Path-dependent strategy driven bar by bar.
+
+    prepare() runs once with the full market and returns the bars worth
+    visiting; on_bar() is then called for each of them in time order.
+    """
+
+    defaults: Dict = {}
+
+    def __init__(self, params: Dict):
+        self.params = params
+        self.trades: List[tuple] = []
+
+    def prepare(self, market: MarketData) -> np.ndarray:
+        return np.arange(len(market))
+
+    def on_bar(self, bar: int):
+        raise NotImplementedError
+
+    def record(self, bar: int, pair: str, profit: float, fee: float, spread: float):
+        self.trades.append((bar, pair, profit, fee, spread))
+
+    def result(self) -> Dict[str, np.ndarray]:
+        if not self.trades:
+            return empty_trades()
+        bars, pairs, profits, fees, spreads = zip(*self.trades)
+        return {
+            'bar': np.array(bars, dtype=np.int64),
+            'pair': np.array(pairs, dtype=object),
+            'profit': np.array(profits, dtype=float),
+            'fee': np.array(fees, dtype=float),
+            'spread': np.array(spreads, dtype=float),
+        }
+
+
+class InventoryArbitrage(EventStrategy):
+    """
+    Cross-venue arbitrage with finite capital.
+
+    Each trade locks its size for settlement_bars bars and a pair cannot trade
+    again within cooldown_bars, so whether a signal is taken depends on the
+    trades before it.
+    """
+
+    defaults = dict(ARBITRAGE_DEFAULTS, capital=5000.0, settlement_bars=3, cooldown_bars=1)
+
+    def prepare(self, market: MarketData) -> np.ndarray:
+        self.spreads = {
+            pair: cross_venue_spread(market, keys)
+            for pair, keys in market.groups_by_pair().items()
+        }
+        self.available = float(self.params['capital'])
+        self.locked: deque = deque()  # (release_bar, amount), in release order
+        self.last_trade: Dict[str, int] = {}
+
+        candidates = np.zeros(len(market), dtype=bool)
+        for spread in self.spreads.values():
+            candidates |= spread > self.params['min_spread']
+        return np.flatnonzero(candidates)
+
+    def on_bar(self, bar: int):
+        params = self.params
+        while self.locked and self.locked[0][0] <= bar:
+            self.available += self.locked.popleft()[1]
+
+        for pair, spread in self.spreads.items():
+            s = spread[bar]
+            if not s > params['min_spread']:
+                continue
+            if bar - self.last_trade.get(pair, -params['cooldown_bars'] - 1) <= params['cooldown_bars']:
+                continue
+            size = min(params['trade_size'], self.available)
+            if size <= 0:
+                return
+            self.available -= size
+            self.locked.append((bar + params['settlement_bars'], size))
+            self.last_trade[pair] = bar
+            self.record(bar, pair, size * s * params['efficiency'], size * params['fee_rate'], s)
+
+
+def run_event_loop(market: MarketData, strategy: EventStrategy) -> Dict[str, np.ndarray]:
+    for bar in strategy.prepare(market).tolist():
+        strategy.on_bar(bar)
+    return strategy.result()
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+VECTORIZED_STRATEGIES: Dict[str, tuple] = {
+    'arbitrage': (arbitrage_signals, ARBITRAGE_DEFAULTS),
+}
+
+EVENT_STRATEGIES = {
+    'inventory_arbitrage': InventoryArbitrage,
+}
+
+
+def strategy_params(strategy: str, params: Dict = None) -> Dict:
+    """Defaults overlaid with the given params; raises ValueError for unknown strategies or params"""
+    if strategy in VECTORIZED_STRATEGIES:
+        defaults = VECTORIZED_STRATEGIES[strategy][1]
+    elif strategy in EVENT_STRATEGIES:
+        defaults = EVENT_STRATEGIES[strategy].defaults
+    else:
+        raise ValueError(f"Unsupported strategy: {strategy}")
+    unknown = set(params or {}) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {strategy}: {sorted(unknown)}")
+    return {**defaults, **(params or {})}
+
+
+def run_strategy(strategy: str, market: MarketData, params: Dict = None) -> Dict[str, np.ndarray]:
+    params = strategy_params(strategy, params)
+    if strategy in VECTORIZED_STRATEGIES:
+        signal_fn: Callable = VECTORIZED_STRATEGIES[strategy][0]
+        return signal_fn(market, params)
+    return run_event_loop(market, EVENT_STRATEGIES[strategy](params))
+
+
+def summarize(trades: Dict[str, np.ndarray]) -> Dict:
+    """Totals plus return, Sharpe, drawdown and win rate over per-trade profit"""
+    profit, fee = trades['profit'], trades['fee']
+    total_profit = float(profit.sum())
+    total_fees = float(fee.sum())
+    summary = {
+        'total_profit': total_profit,
+        'total_fees': total_fees,
+        'net_profit': total_profit - total_fees,
+        'num_trades': int(len(profit)),
+    }
+    if not len(profit):
+        summary.update(total_return=0, sharpe_ratio=0, max_drawdown=0, win_rate=0)
+        return summary
+
+    std = float(profit.std(ddof=1)) if len(profit) > 1 else 0.0
+    cumulative = np.cumsum(profit)
+    summary.update(
+        total_return=total_profit - total_fees,
+        sharpe_ratio=float(profit.mean()) / std if std > 0 else 0,
+        max_drawdown=float((cumulative - np.maximum.accumulate(cumulative)).min()),
+        win_rate=float((profit > 0).mean()),
+    )
+    return summary
@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path to import the backtesting engine
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backtesting_engine import BacktestingEngine
+from market_data import MarketData
+from parameter_search import grid, random_samples, run_search
+from strategies import InventoryArbitrage, run_event_loop, run_strategy, summarize
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture():
+    frame = pd.read_csv(os.path.join(FIXTURES, 'weth_usdc_hourly.csv'))
+    with open(os.path.join(FIXTURES, 'weth_usdc_hourly_expected.json')) as f:
+        expected = json.load(f)
+    return MarketData.from_frame(frame), expected
+
+
+def legacy_arbitrage(data: pd.DataFrame) -> list:
+    """The groupby loop BacktestingEngine ran before the columnar rewrite, grouped per pair"""
+    trades = []
+    for (timestamp, _), group in data.groupby(['timestamp', 'pair']):
+        prices = group['price']
+        if len(prices) >= 2:
+            spread = (prices.max() - prices.min()) / prices.min()
+            if spread > 0.005:
+                trades.append({'timestamp': timestamp, 'profit': 1000 * spread * 0.9, 'fee': 3.0})
+    return trades
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = BacktestingEngine(store_path=str(tmp_path / 'backtests.sqlite'), max_workers=2)
+    yield engine
+    engine.close()
+
+
+@pytest.mark.asyncio
+async def test_regression_fixture_matches_legacy_engine(engine):
+    market, expected = load_fixture()
+    result = await engine.run_backtest('2024-03-01', '2024-03-15', market=market)
+
+    summary = result['summary']
+    assert summary['num_trades'] == expected['num_trades']
+    assert summary['total_profit'] == pytest.approx(expected['total_profit'], rel=1e-12)
+    assert summary['total_fees'] == pytest.approx(expected['total_fees'])
+    for name in ('total_return', 'sharpe_ratio', 'max_drawdown', 'win_rate'):
+        assert summary[name] == pytest.approx(expected['summary'][name], rel=1e-9, abs=1e-12)
+
+    trades = engine.get_results(result['backtest_id'])['trades']
+    assert trades['timestamp'] == [t['timestamp'] for t in expected['trades']]
+    assert trades['spread'] == pytest.approx([t['spread'] for t in expected['trades']], rel=1e-12)
+
+
+def test_columnar_engine_matches_legacy_loop():
+    # The speedup is checked by benchmark_backtest.py, not here
+    market = MarketData.synthetic('2024-01-01', '2024-01-15', freq='1h', seed=1)
+    legacy = legacy_arbitrage(market.to_frame())
+    trades = run_strategy('arbitrage', market)
+
+    assert len(trades['bar']) == len(legacy)
+    assert trades['profit'].sum() == pytest.approx(sum(t['profit'] for t in legacy))
+
+
+def test_event_strategy_is_path_dependent():
+    market = MarketData.synthetic('2024-01-01', '2024-01-08', freq='1h', venue_noise=0.004, seed=2)
+    unconstrained = run_strategy('arbitrage', market)
+    constrained = run_strategy('inventory_arbitrage', market, {'capital': 2000.0, 'settlement_bars': 4})
+
+    assert 0 < len(constrained['bar']) < len(unconstrained['bar'])
+    # Never more than capital / trade_size trades settling at once
+    bars = constrained['bar']
+    for bar in np.unique(bars):
+        in_flight = ((bars <= bar) & (bars > bar - 4)).sum()
+        assert in_flight <= 2
+
+    # With no constraints the event loop reproduces the vectorized strategy
+    free = run_event_loop(market, InventoryArbitrage(dict(
+        InventoryArbitrage.defaults, capital=1e12, settlement_bars=0, cooldown_bars=-1
+    )))
+    assert np.array_equal(free['bar'], unconstrained['bar'])
+    assert free['profit'] == pytest.approx(unconstrained['profit'])
+
+
+@pytest.mark.asyncio
+async def test_results_persist_across_engines(tmp_path):
+    path = str(tmp_path / 'backtests.sqlite')
+    first = BacktestingEngine(store_path=path)
+    run = await first.run_backtest('2024-01-01', '2024-01-03', params={'min_spread': 0.004})
+    first.close()
+
+    second = BacktestingEngine(store_path=path)
+    again = await second.run_backtest('2024-01-01', '2024-01-03', params={'min_spread': 0.004})
+    assert again['cached'] and not run['cached']
+    assert again['backtest_id'] == run['backtest_id']
+    assert second.get_results(run['backtest_id'])['num_trades'] == run['summary']['num_trades']
+
+    other = await second.run_backtest('2024-01-01', '2024-01-03', params={'min_spread': 0.006})
+    assert other['backtest_id'] != run['backtest_id']
+    with pytest.raises(ValueError):
+        second.get_results('missing')
+    with pytest.raises(ValueError):
+        await second.run_backtest('2024-01-01', '2024-01-03', strategy='unknown')
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_grid_and_random_search(engine):
+    market = MarketData.synthetic('2024-01-01', '2024-01-08', freq='1h', seed=3)
+    param_grid = {'min_spread': [0.003, 0.005, 0.008], 'efficiency': [0.8, 0.9]}
+
+    sweep = await engine.run_sweep('2024-01-01', '2024-01-08', param_grid=param_grid, market=market)
+    assert sweep['evaluated'] == 6
+    expected = max(
+        summarize(run_strategy('arbitrage', market, params))['net_profit'] for params in grid(param_grid)
+    )
+    assert sweep['best']['summary']['net_profit'] == pytest.approx(expected)
+    assert all(r['backtest_id'] for r in sweep['results'])
+
+    # Stored configs are served without re-running
+    store = engine.results_store
+    ranked = run_search(market, 'arbitrage', grid(param_grid), store=store, max_workers=1)
+    assert [r['backtest_id'] for r in ranked] == [r['backtest_id'] for r in sweep['results']]
+
+    samples = random_samples({'min_spread': (0.002, 0.01), 'settlement_bars': (1, 5)}, n_iter=4, seed=7)
+    assert samples == random_samples({'min_spread': (0.002, 0.01), 'settlement_bars': (1, 5)}, n_iter=4, seed=7)
+    assert all(isinstance(s['settlement_bars'], int) for s in samples)
+    sweep = await engine.run_sweep(
+        '2024-01-01', '2024-01-08', strategy='inventory_arbitrage',
+        param_space={'min_spread': (0.002, 0.01), 'settlement_bars': (1, 5)}, n_iter=4, market=market
+    )
+    assert 1 <= sweep['evaluated'] <= 4
+    with pytest.raises(ValueError):
+        await engine.run_sweep('2024-01-01', '2024-01-08', market=market)
@@ -0,0 +1,126 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add src to path to import the replay layer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backtesting_engine import BacktestingEngine
+from log_importer import SYNC_TOPIC, decode_log, import_logs, load_pools, read_records
+from pool_replay import replay_blocks, replay_market_data
+from replay_store import ReplayStore
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'replay')
+LOGS = [os.path.join(FIXTURES, 'uniswap_v2_logs.json'), os.path.join(FIXTURES, 'sushiswap_logs.csv')]
+BLOCKS = [os.path.join(FIXTURES, 'blocks.json')]
+UNISWAP = '0xb4e16d0168e52d35cacd2c6185b44281ec28c9dc'
+SUSHISWAP = '0x397ff1542f962076d0bfe58ea045ffa2d347aca0'
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReplayStore(str(tmp_path / 'replay'))
+    import_logs(store, LOGS, load_pools(os.path.join(FIXTURES, 'pools.json')), BLOCKS)
+    return store
+
+
+def test_import_decodes_swaps_and_syncs(tmp_path):
+    store = ReplayStore(str(tmp_path / 'replay'))
+    pools = load_pools(os.path.join(FIXTURES, 'pools.json'))
+    stats = import_logs(store, LOGS, pools, BLOCKS)
+
+    assert (stats.swaps, stats.syncs, stats.blocks) == (70, 70, 40)
+    assert (stats.unknown_pool, stats.unknown_topic, stats.removed, stats.missing_timestamp) == (1, 1, 1, 0)
+
+    # Partitioned by date and pair; the fixture crosses midnight UTC
+    assert store.dates('reserves') == ['2024-01-01', '2024-01-02']
+    assert os.listdir(os.path.join(store.root, 'reserves', 'date=2024-01-01')) == ['pair=WETH_USDC']
+    assert store.pairs() == ['WETH/USDC']
+
+    # Reserves are decimal-adjusted and priced in USDC per WETH (token0 is USDC)
+    sync = next(log for log in read_records(LOGS[0]) if log['topics'][0] == SYNC_TOPIC)
+    _, row = decode_log(sync, pools[UNISWAP], 0)
+    first = store.read('reserves', pair='WETH/USDC').iloc[0]
+    assert first['reserve0'] == pytest.approx(row['reserve0'])
+    assert first['price'] == pytest.approx(first['reserve0'] / first['reserve1'])
+    assert 2400 < first['price'] < 2600
+
+    # Re-importing the same dumps adds nothing
+    again = import_logs(store, LOGS, pools, BLOCKS)
+    assert again.swaps == 70
+    assert len(store.read('swaps', pair='WETH/USDC')) == 70
+    assert len(store.read('blocks')) == 40
+
+
+def test_logs_without_block_timestamps_are_skipped(tmp_path):
+    store = ReplayStore(str(tmp_path / 'replay'))
+    stats = import_logs(store, LOGS[:1], load_pools(os.path.join(FIXTURES, 'pools.json')))
+    assert stats.missing_timestamp == 81
+    assert stats.swaps == stats.syncs == 0
+    assert store.dates('reserves') == []
+
+
+def test_merged_events_are_block_ordered_with_small_batches(store):
+    events = list(store.events())
+    assert len(events) == 140
+    assert [(e.block_number, e.log_index) for e in events] == sorted((e.block_number, e.log_index) for e in events)
+    assert {e.data['venue'] for e in events} == {'uniswap_v2', 'sushiswap'}
+
+    # One-row batches take the same path with minimal memory per stream
+    assert [(e.block_number, e.log_index, e.kind) for e in store.events(batch_size=1)] == \
+        [(e.block_number, e.log_index, e.kind) for e in events]
+
+    only_sushi = list(store.events(venues=['sushiswap'], kinds=('reserves',)))
+    assert len(only_sushi) == 30 and all(e.data['pool'] == SUSHISWAP for e in only_sushi)
+
+    window = list(store.events(start='2024-01-02T00:00:00', end='2024-01-02T00:01:00'))
+    assert window and all(1704153600 <= e.timestamp < 1704153660 for e in window)
+
+
+def test_block_replay_carries_pool_state_forward(store):
+    blocks = list(replay_blocks(store))
+    assert [b.block_number for b in blocks] == list(range(19000000, 19000040))
+    assert all(b.base_fee_gwei is not None for b in blocks)
+
+    # Sushiswap is idle in block 19000001 and keeps its state from block 19000000
+    idle = blocks[1]
+    assert idle.pools[SUSHISWAP].block_number == 19000000
+    assert idle.pools[SUSHISWAP] == blocks[0].pools[SUSHISWAP]
+    assert [s['pool'] for s in idle.swaps] == [UNISWAP]
+
+    # Earlier states are not mutated by later blocks
+    assert blocks[0].pools[UNISWAP].block_number == 19000000
+
+
+@pytest.mark.asyncio
+async def test_backtest_replays_recorded_pool_state(store, tmp_path):
+    market = replay_market_data(store)
+    assert len(market) == 40
+    assert market.keys == [('sushiswap', 'WETH/USDC'), ('uniswap_v2', 'WETH/USDC')]
+
+    # Columnar bars match the block-by-block state
+    for bar, block in enumerate(replay_blocks(store)):
+        for (venue, _), fields in market.series.items():
+            pool = UNISWAP if venue == 'uniswap_v2' else SUSHISWAP
+            assert fields['price'][bar] == pytest.approx(block.pools[pool].price)
+            assert fields['gas_price'][bar] == pytest.approx(block.base_fee_gwei)
+
+    engine = BacktestingEngine(store_path=str(tmp_path / 'backtests.sqlite'), replay_dir=store.root)
+    result = await engine.run_backtest('2024-01-01', '2024-01-03', source='replay')
+    trades = engine.get_results(result['backtest_id'])['trades']
+
+    expected = []
+    for block in replay_blocks(store):
+        prices = [state.price for state in block.pools.values()]
+        if len(prices) >= 2 and (max(prices) - min(prices)) / min(prices) > 0.005:
+            expected.append(block.timestamp)
+    assert result['summary']['num_trades'] == len(expected) > 0
+    assert [np.datetime64(t, 's').astype(int) for t in trades['timestamp']] == expected
+
+    with pytest.raises(ValueError):
+        await engine.run_backtest('2023-01-01', '2023-01-02', source='replay')
+    with pytest.raises(ValueError):
+        await engine.run_backtest('2024-01-01', '2024-01-03', source='unknown')
+    engine.close()
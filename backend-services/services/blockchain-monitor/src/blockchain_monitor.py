@@ -5,14 +5,12 @@ Monitors RPC node health, block sync status, and gas price trends
 """
 
 import asyncio
-import aiohttp
-import json
-import time
-from datetime import datetime
 from prometheus_client import Counter, Gauge, Histogram, start_http_server
 import logging
 import os
 
+from chain_state import ChainSnapshot, ChainStateHub
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(level)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -63,91 +61,61 @@ class BlockchainMonitor:
             ['chain']
         )
 
-    async def make_rpc_call(self, chain: str, method: str, params: list = None) -> dict:
-        """Make RPC call with timing and error handling"""
-        if params is None:
-            params = []
-
-        payload = {
-            "jsonrpc": "2.0",
-            "method": method,
-            "params": params,
-            "id": 1
-        }
+        # One head tracker per chain; every consumer in this process shares its snapshots
+        self.chain_state = ChainStateHub(
+            poll_interval=float(os.getenv('CHAIN_STATE_POLL_INTERVAL', '2')),
+            rpc_observer=self.observe_rpc,
+        )
+        for chain, rpc_url in self.rpc_endpoints.items():
+            self.chain_state.add_chain(chain, rpc_url, include_peer_count=(chain == 'ethereum'))
+        self.chain_state.subscribe(self.handle_snapshot)
 
-        start_time = time.time()
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.rpc_endpoints[chain],
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    result = await response.json()
-                    response_time = time.time() - start_time
+    def observe_rpc(self, chain: str, method: str, response_time: float, error_type: str = None):
+        """Record RPC timing/errors reported by the shared chain state service"""
+        if response_time:
+            self.rpc_response_time.labels(chain=chain, method=method).observe(response_time)
+        if error_type:
+            self.rpc_errors.labels(chain=chain, error_type=error_type).inc()
 
-                    self.rpc_response_time.labels(chain=chain, method=method).observe(response_time)
+    async def make_rpc_call(self, chain: str, method: str, params: list = None) -> dict:
+        """Make an ad-hoc RPC call over the chain's shared session"""
+        return await self.chain_state.get(chain).rpc_call(method, params or [])
 
-                    if 'error' in result:
-                        self.rpc_errors.labels(chain=chain, error_type='rpc_error').inc()
-                        logger.error(f"RPC error for {chain}: {result['error']}")
-                        return None
+    def handle_snapshot(self, snapshot: ChainSnapshot):
+        """Update node health metrics from a per-block chain snapshot"""
+        chain = snapshot.chain
+        self.block_height.labels(chain=chain).set(snapshot.block_number)
+        logger.info(f"{chain} block height: {snapshot.block_number}")
 
-                    return result.get('result')
+        if snapshot.gas_price_gwei is not None:
+            self.gas_price.labels(chain=chain).set(snapshot.gas_price_gwei)
 
-        except Exception as e:
-            response_time = time.time() - start_time
-            self.rpc_response_time.labels(chain=chain, method=method).observe(response_time)
-            self.rpc_errors.labels(chain=chain, error_type=type(e).__name__).inc()
-            logger.error(f"Request failed for {chain}: {e}")
-            return None
+        if snapshot.peer_count is not None:
+            self.peer_count.labels(chain=chain).set(snapshot.peer_count)
+
+        if snapshot.is_synced is True:
+            self.sync_status.labels(chain=chain).set(1)  # Synced
+        elif snapshot.is_synced is False:
+            self.sync_status.labels(chain=chain).set(0)  # Syncing
+            logger.warning(f"{chain} is still syncing: {snapshot.syncing}")
 
     async def monitor_chain(self, chain: str):
-        """Monitor a specific blockchain"""
+        """Force a snapshot of a specific blockchain outside the head-tracking loop"""
         try:
-            # Get latest block number
-            block_number_hex = await self.make_rpc_call(chain, 'eth_blockNumber')
-            if block_number_hex:
-                block_number = int(block_number_hex, 16)
-                self.block_height.labels(chain=chain).set(block_number)
-                logger.info(f"{chain} block height: {block_number}")
-
-            # Get gas price
-            gas_price_hex = await self.make_rpc_call(chain, 'eth_gasPrice')
-            if gas_price_hex:
-                gas_price_gwei = int(gas_price_hex, 16) / 1e9  # Convert wei to gwei
-                self.gas_price.labels(chain=chain).set(gas_price_gwei)
-
-            # Get peer count (if available)
-            if chain == 'ethereum':
-                peer_count_hex = await self.make_rpc_call(chain, 'net_peerCount')
-                if peer_count_hex:
-                    peer_count = int(peer_count_hex, 16)
-                    self.peer_count.labels(chain=chain).set(peer_count)
-
-            # Check sync status
-            sync_status = await self.make_rpc_call(chain, 'eth_syncing')
-            if sync_status is False:
-                self.sync_status.labels(chain=chain).set(1)  # Synced
-            elif isinstance(sync_status, dict):
-                self.sync_status.labels(chain=chain).set(0)  # Syncing
-                logger.warning(f"{chain} is still syncing: {sync_status}")
-
+            # Published to handle_snapshot like any other snapshot
+            await self.chain_state.get(chain).poll_once(force=True)
         except Exception as e:
             logger.error(f"Error monitoring {chain}: {e}")
             self.rpc_errors.labels(chain=chain, error_type='monitoring_error').inc()
 
     async def run_monitoring_loop(self):
-        """Main monitoring loop"""
+        """Main monitoring loop, driven by new heads from the shared chain state"""
         logger.info("Starting blockchain monitoring...")
 
-        while True:
-            tasks = []
-            for chain in self.rpc_endpoints.keys():
-                tasks.append(self.monitor_chain(chain))
-
-            await asyncio.gather(*tasks, return_exceptions=True)
-            await asyncio.sleep(30)  # Monitor every 30 seconds
+        try:
+            await self.chain_state.run()
+        finally:
+            await self.chain_state.close()
 
 async def main():
     monitor = BlockchainMonitor()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Alpha-Orion Shared Chain State
+Tracks new heads per chain and batches all per-block RPC queries into a single
+JSON-RPC batch request, fanning the resulting snapshot out to in-process consumers
+
+Consumers subscribe with a min_interval; the head loop only fetches a snapshot
+when at least one of them is due and sleeps until the next one is, so a
+service whose only consumer reconciles every five minutes does not pay for a
+full batch on every block.
+
+Each service image is built from its own directory, so this module is kept as
+identical copies in blockchain-monitor, financial-reconciliation and
+smart-contract-monitor; blockchain-monitor/tests/test_chain_state.py fails if
+they drift apart.
+"""
+
+import asyncio
+import aiohttp
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChainSnapshot:
+    """Consistent view of one chain at a single block"""
+    chain: str
+    block_number: int
+    gas_price_wei: Optional[int] = None
+    syncing: Any = None
+    peer_count: Optional[int] = None
+    balances: Dict[str, int] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def block_tag(self) -> str:
+        return hex(self.block_number)
+
+    @property
+    def gas_price_gwei(self) -> Optional[float]:
+        return self.gas_price_wei / 1e9 if self.gas_price_wei is not None else None
+
+    @property
+    def is_synced(self) -> Optional[bool]:
+        if self.syncing is False:
+            return True
+        if isinstance(self.syncing, dict):
+            return False
+        return None
+
+    def balance_of(self, address: str) -> Optional[int]:
+        return self.balances.get(address.lower())
+
+
+class ChainStateService:
+    """Per-chain head tracker that issues one JSON-RPC batch per new block"""
+
+    def __init__(self, chain: str, rpc_url: str, poll_interval: float = 2.0,
+                 include_peer_count: bool = False, timeout: float = 10.0,
+                 rpc_observer: Optional[Callable[[str, str, float, Optional[str]], None]] = None):
+        self.chain = chain
+        self.rpc_url = rpc_url
+        self.poll_interval = poll_interval
+        self.include_peer_count = include_peer_count
+        self.timeout = timeout
+        self.rpc_observer = rpc_observer
+
+        self.latest: Optional[ChainSnapshot] = None
+        self._watched: set = set()
+        self._subscribers: List[Dict[str, Any]] = []
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._running = False
+
+    def watch_balance(self, address: str):
+        """Include an address' native balance in every snapshot"""
+        self._watched.add(address.lower())
+
+    def subscribe(self, callback: Callable[[ChainSnapshot], Any], min_interval: float = 0.0):
+        """Register a consumer; min_interval throttles delivery for slow consumers"""
+        self._subscribers.append({'callback': callback, 'min_interval': min_interval, 'last': None})
+
+    @staticmethod
+    def _wait(sub: Dict[str, Any], now: float) -> float:
+        """Seconds until a subscriber wants its next snapshot"""
+        if not sub['min_interval'] or sub['last'] is None:
+            return 0.0
+        return max(0.0, sub['last'] + sub['min_interval'] - now)
+
+    def _due(self, now: float) -> List[Dict[str, Any]]:
+        return [sub for sub in self._subscribers if self._wait(sub, now) == 0.0]
+
+    def next_poll_delay(self) -> float:
+        """Head polling pace: the poll interval, or longer while every subscriber is throttled"""
+        if not self._subscribers:
+            return self.poll_interval
+        now = time.monotonic()
+        return max(self.poll_interval, min(self._wait(sub, now) for sub in self._subscribers))
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    def _observe(self, method: str, elapsed: float, error_type: Optional[str] = None):
+        if self.rpc_observer:
+            self.rpc_observer(self.chain, method, elapsed, error_type)
+
+    async def rpc_batch(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """Send calls as one JSON-RPC batch; failed entries come back as None"""
+        if not calls:
+            return []
+
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": i}
+            for i, (method, params) in enumerate(calls)
+        ]
+        label = 'batch' if len(calls) > 1 else calls[0][0]
+
+        start_time = time.time()
+        try:
+            session = await self._get_session()
+            async with session.post(self.rpc_url, json=payload if len(calls) > 1 else payload[0]) as response:
+                body = await response.json(content_type=None)
+        except Exception as e:
+            self._observe(label, time.time() - start_time, type(e).__name__)
+            logger.error(f"Batch request failed for {self.chain}: {e}")
+            return [None] * len(calls)
+
+        self._observe(label, time.time() - start_time)
+
+        if isinstance(body, dict):
+            body = [body]
+
+        results: List[Any] = [None] * len(calls)
+        for entry in body:
+            idx = entry.get('id')
+            if not isinstance(idx, int) or not 0 <= idx < len(calls):
+                continue
+            if 'error' in entry:
+                self._observe(calls[idx][0], 0.0, 'rpc_error')
+                logger.error(f"RPC error for {self.chain} {calls[idx][0]}: {entry['error']}")
+                continue
+            results[idx] = entry.get('result')
+        return results
+
+    async def rpc_call(self, method: str, params: list = None) -> Any:
+        return (await self.rpc_batch([(method, params or [])]))[0]
+
+    async def fetch_snapshot(self, block_number: int) -> ChainSnapshot:
+        """Fetch gas, sync, peers and every watched balance pinned to one block"""
+        block_tag = hex(block_number)
+        watched = sorted(self._watched)
+
+        calls: List[Tuple[str, list]] = [('eth_gasPrice', []), ('eth_syncing', [])]
+        if self.include_peer_count:
+            calls.append(('net_peerCount', []))
+        calls.extend(('eth_getBalance', [address, block_tag]) for address in watched)
+
+        results = await self.rpc_batch(calls)
+        gas_price_hex, syncing = results[0], results[1]
+        offset = 2
+        peer_count = None
+        if self.include_peer_count:
+            peer_count = int(results[2], 16) if results[2] else None
+            offset = 3
+
+        balances = {}
+        for address, balance_hex in zip(watched, results[offset:]):
+            if balance_hex is not None:
+                balances[address] = int(balance_hex, 16)
+
+        return ChainSnapshot(
+            chain=self.chain,
+            block_number=block_number,
+            gas_price_wei=int(gas_price_hex, 16) if gas_price_hex else None,
+            syncing=syncing,
+            peer_count=peer_count,
+            balances=balances,
+        )
+
+    async def poll_once(self, force: bool = False) -> Optional[ChainSnapshot]:
+        """
+        Check for a new head; on a new block build and publish a snapshot.
+        Does nothing while every subscriber is throttled, unless forced.
+        """
+        if not force and self._subscribers and not self._due(time.monotonic()):
+            return None
+
+        block_number_hex = await self.rpc_call('eth_blockNumber')
+        if not block_number_hex:
+            return None
+
+        block_number = int(block_number_hex, 16)
+        if not force and self.latest and block_number <= self.latest.block_number:
+            return None
+
+        snapshot = await self.fetch_snapshot(block_number)
+        self.latest = snapshot
+        await self._publish(snapshot)
+        return snapshot
+
+    async def _publish(self, snapshot: ChainSnapshot):
+        now = time.monotonic()
+        for sub in self._due(now):
+            sub['last'] = now
+            try:
+                result = sub['callback'](snapshot)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Chain state consumer failed on {self.chain}: {e}")
+
+    async def run(self):
+        """Head-tracking loop"""
+        self._running = True
+        while self._running:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Chain state poll failed for {self.chain}: {e}")
+            await asyncio.sleep(self.next_poll_delay())
+
+    def stop(self):
+        self._running = False
+
+    async def close(self):
+        self.stop()
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+class ChainStateHub:
+    """Owns one ChainStateService per chain for the whole process"""
+
+    def __init__(self, poll_interval: float = 2.0,
+                 rpc_observer: Optional[Callable[[str, str, float, Optional[str]], None]] = None):
+        self.poll_interval = poll_interval
+        self.rpc_observer = rpc_observer
+        self.services: Dict[str, ChainStateService] = {}
+
+    def add_chain(self, chain: str, rpc_url: str, include_peer_count: bool = False) -> ChainStateService:
+        if chain not in self.services:
+            self.services[chain] = ChainStateService(
+                chain, rpc_url,
+                poll_interval=self.poll_interval,
+                include_peer_count=include_peer_count,
+                rpc_observer=self.rpc_observer,
+            )
+        return self.services[chain]
+
+    def get(self, chain: str) -> ChainStateService:
+        return self.services[chain]
+
+    def subscribe(self, callback: Callable[[ChainSnapshot], Any], chains: List[str] = None,
+                  min_interval: float = 0.0):
+        for chain in chains or list(self.services):
+            self.services[chain].subscribe(callback, min_interval=min_interval)
+
+    async def run(self):
+        await asyncio.gather(*(service.run() for service in self.services.values()))
+
+    async def close(self):
+        await asyncio.gather(*(service.close() for service in self.services.values()))
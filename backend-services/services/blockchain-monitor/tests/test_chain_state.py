@@ -0,0 +1,208 @@
+"""
+Unit Tests for the shared chain state service
+Runs against a local JSON-RPC stub to check batching and snapshot fan-out
+"""
+
+import pytest
+import pytest_asyncio
+import sys
+import os
+import time
+from aiohttp import web
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+SERVICES = os.path.join(os.path.dirname(__file__), '..', '..')
+
+from chain_state import ChainStateHub, ChainStateService
+
+CONTRACT = '0x00000000000000000000000000000000000000AA'
+
+
+class RpcStub:
+    """Minimal JSON-RPC node that records every HTTP request it serves"""
+
+    def __init__(self):
+        self.block_number = 100
+        self.requests = []
+
+    def answer(self, call):
+        method, params = call['method'], call['params']
+        if method == 'eth_blockNumber':
+            return hex(self.block_number)
+        if method == 'eth_gasPrice':
+            return hex(20 * 10**9)
+        if method == 'eth_syncing':
+            return False
+        if method == 'net_peerCount':
+            return hex(25)
+        if method == 'eth_getBalance':
+            # Balance encodes the pinned block so tests can check it
+            return hex(int(params[1], 16) * 10**18)
+        raise ValueError(method)
+
+    async def handle(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        if isinstance(body, list):
+            return web.json_response([
+                {'jsonrpc': '2.0', 'id': call['id'], 'result': self.answer(call)} for call in body
+            ])
+        return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': self.answer(body)})
+
+
+@pytest_asyncio.fixture
+async def rpc_stub():
+    stub = RpcStub()
+    app = web.Application()
+    app.router.add_post('/', stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    stub.url = f'http://127.0.0.1:{port}/'
+    yield stub
+    await runner.cleanup()
+
+
+class TestChainStateService:
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_one_batch_per_block(self, rpc_stub):
+        service = ChainStateService('ethereum', rpc_stub.url, include_peer_count=True)
+        service.watch_balance(CONTRACT)
+        try:
+            snapshot = await service.poll_once()
+        finally:
+            await service.close()
+
+        assert snapshot.block_number == 100
+        assert snapshot.gas_price_gwei == 20
+        assert snapshot.peer_count == 25
+        assert snapshot.is_synced is True
+        assert snapshot.balance_of(CONTRACT) == 100 * 10**18
+
+        # Head check plus a single batch for everything else
+        assert len(rpc_stub.requests) == 2
+        batch = rpc_stub.requests[1]
+        assert [c['method'] for c in batch] == ['eth_gasPrice', 'eth_syncing', 'net_peerCount', 'eth_getBalance']
+        assert batch[3]['params'][1] == hex(100)
+
+    @pytest.mark.asyncio
+    async def test_no_snapshot_without_new_head(self, rpc_stub):
+        service = ChainStateService('ethereum', rpc_stub.url)
+        try:
+            assert await service.poll_once() is not None
+            assert await service.poll_once() is None
+            rpc_stub.block_number += 1
+            assert (await service.poll_once()).block_number == 101
+        finally:
+            await service.close()
+
+        # Two batches for two blocks, plus three head checks
+        assert sum(isinstance(r, list) for r in rpc_stub.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_consumers_share_the_same_snapshot(self, rpc_stub):
+        hub = ChainStateHub()
+        hub.add_chain('ethereum', rpc_stub.url).watch_balance(CONTRACT)
+        seen_sync, seen_async = [], []
+
+        async def async_consumer(snapshot):
+            seen_async.append(snapshot)
+
+        hub.subscribe(seen_sync.append)
+        hub.subscribe(async_consumer)
+        try:
+            await hub.get('ethereum').poll_once()
+        finally:
+            await hub.close()
+
+        assert len(seen_sync) == 1
+        assert seen_sync[0] is seen_async[0]
+
+    @pytest.mark.asyncio
+    async def test_min_interval_throttles_slow_consumers(self, rpc_stub):
+        service = ChainStateService('ethereum', rpc_stub.url)
+        fast, slow = [], []
+        service.subscribe(fast.append)
+        service.subscribe(slow.append, min_interval=3600)
+        try:
+            for _ in range(3):
+                await service.poll_once()
+                rpc_stub.block_number += 1
+        finally:
+            await service.close()
+
+        assert len(fast) == 3
+        assert len(slow) == 1
+
+    @pytest.mark.asyncio
+    async def test_unreachable_node_returns_none(self):
+        errors = []
+        service = ChainStateService(
+            'ethereum', 'http://127.0.0.1:9/', timeout=1,
+            rpc_observer=lambda chain, method, elapsed, error_type: errors.append(error_type),
+        )
+        try:
+            assert await service.poll_once() is None
+        finally:
+            await service.close()
+        assert errors and errors[0] is not None
+
+    @pytest.mark.asyncio
+    async def test_no_rpc_while_every_consumer_is_throttled(self, rpc_stub):
+        service = ChainStateService('ethereum', rpc_stub.url)
+        slow = []
+        service.subscribe(slow.append, min_interval=3600)
+        try:
+            for _ in range(3):
+                await service.poll_once()
+                rpc_stub.block_number += 1
+        finally:
+            await service.close()
+
+        assert len(slow) == 1
+        # One head check and one batch; later polls never reach the node
+        assert len(rpc_stub.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_head_polling_follows_the_fastest_consumer(self, rpc_stub):
+        service = ChainStateService('ethereum', rpc_stub.url, poll_interval=2)
+        service.subscribe(lambda snapshot: None, min_interval=60)
+        assert service.next_poll_delay() == 2  # Due straight away
+        try:
+            await service.poll_once()
+        finally:
+            await service.close()
+        assert 59 < service.next_poll_delay() <= 60
+
+        service._subscribers[0]['last'] = time.monotonic() - 59.5
+        assert service.next_poll_delay() == 2  # Never polls faster than poll_interval
+
+        service.subscribe(lambda snapshot: None)
+        assert service.next_poll_delay() == 2
+
+    @pytest.mark.asyncio
+    async def test_forced_poll_bypasses_throttling(self, rpc_stub):
+        service = ChainStateService('ethereum', rpc_stub.url)
+        slow = []
+        service.subscribe(slow.append, min_interval=3600)
+        try:
+            await service.poll_once()
+            snapshot = await service.poll_once(force=True)
+        finally:
+            await service.close()
+
+        assert snapshot.block_number == 100
+        assert len(slow) == 1  # Still throttled for delivery
+
+
+@pytest.mark.parametrize('service', ['financial-reconciliation', 'smart-contract-monitor'])
+def test_service_copies_match(service):
+    # Each image only copies its own directory, so the module is vendored per service
+    with open(os.path.join(SERVICES, 'blockchain-monitor', 'src', 'chain_state.py'), 'rb') as f:
+        canonical = f.read()
+    with open(os.path.join(SERVICES, service, 'src', 'chain_state.py'), 'rb') as f:
+        assert f.read() == canonical
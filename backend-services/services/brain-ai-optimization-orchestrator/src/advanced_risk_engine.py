@@ -15,6 +15,9 @@ import numpy as np
 import pandas as pd
 from scipy import stats
 
+from covariance_tracker import CovarianceSnapshot, EWMACovarianceTracker
+from risk_engine import CorrelatedMonteCarloEngine
+
 @dataclass
 class RiskMetrics:
     """Comprehensive risk metrics for portfolio"""
@@ -62,6 +65,14 @@ class AdvancedRiskEngine:
         self.confidence_level = 0.95  # 95% confidence for VaR
         self.risk_free_rate = 0.02  # 2% risk-free rate
 
+        # Correlated return simulator (cached Cholesky factor)
+        self.monte_carlo_engine = CorrelatedMonteCarloEngine()
+
+        # Streaming EWMA covariance fed by price ticks
+        self.covariance_tracker = EWMACovarianceTracker()
+        self.min_covariance_observations = 20
+        self.covariance_periods_per_year = 252  # Tracker updates per year, to annualize its volatility
+
     async def calculate_portfolio_risk_metrics(self, positions: Dict[str, Dict]) -> RiskMetrics:
         """
         Calculate comprehensive risk metrics for portfolio
@@ -80,19 +91,25 @@ class AdvancedRiskEngine:
             # Calculate portfolio returns
             portfolio_returns = np.dot(returns_matrix, weights)
 
-            # Calculate individual metrics
+            # Path-dependent statistics need a return series
             sharpe_ratio = self._calculate_sharpe_ratio(portfolio_returns)
             sortino_ratio = self._calculate_sortino_ratio(portfolio_returns)
             beta = self._calculate_beta(portfolio_returns)
             max_drawdown = self._calculate_max_drawdown(portfolio_returns)
-            var_95 = self._calculate_value_at_risk(portfolio_returns)
-            es_95 = self._calculate_expected_shortfall(portfolio_returns, 0.95)
 
-            # Calculate correlation matrix
-            correlation_matrix = self._calculate_correlation_matrix(returns_matrix, assets)
+            # Volatility, VaR and correlations come from the streaming tracker once it
+            # has enough history; the return series only covers a cold start
+            snapshot = self.covariance_tracker.snapshot()
+            if snapshot.covers(assets, self.min_covariance_observations):
+                volatility, var_95, es_95 = self._snapshot_risk(snapshot, dict(zip(assets, weights)))
+                correlation_matrix = snapshot.correlation_dict(assets)
+            else:
+                volatility = np.std(portfolio_returns) * np.sqrt(252)  # Annualized
+                var_95 = self._calculate_value_at_risk(portfolio_returns)
+                es_95 = self._calculate_expected_shortfall(portfolio_returns, 0.95)
+                correlation_matrix = self._calculate_correlation_matrix(returns_matrix, assets)
 
             # Calculate distributional statistics
-            volatility = np.std(portfolio_returns) * np.sqrt(252)  # Annualized
             skewness = stats.skew(portfolio_returns)
             kurtosis = stats.kurtosis(portfolio_returns)
 
@@ -246,6 +263,17 @@ class AdvancedRiskEngine:
             self.logger.error(f"Error calculating Expected Shortfall: {e}")
             return 0
 
+    def _snapshot_risk(self, snapshot: CovarianceSnapshot, weights: Dict[str, float],
+                       confidence: float = 0.95) -> Tuple[float, float, float]:
+        """
+        Annualized volatility and parametric VaR and Expected Shortfall per tracker
+        interval for portfolio weights
+        """
+        sigma = snapshot.portfolio_volatility(weights)
+        z = stats.norm.ppf(confidence)
+        volatility = sigma * np.sqrt(self.covariance_periods_per_year)
+        return volatility, z * sigma, sigma * stats.norm.pdf(z) / (1 - confidence)
+
     def _calculate_correlation_matrix(self, returns_matrix: np.ndarray, assets: List[str]) -> Dict[str, Dict[str, float]]:
         """
         Calculate correlation matrix for assets
@@ -254,16 +282,12 @@ class AdvancedRiskEngine:
             if returns_matrix.shape[1] != len(assets):
                 return {}
 
-            correlation_matrix = np.corrcoef(returns_matrix.T)
+            # Shrinkage keeps the estimate well conditioned for short histories
+            cov, _ = CorrelatedMonteCarloEngine.shrink_covariance(returns_matrix)
+            std = np.sqrt(np.diag(cov))
+            correlation_matrix = cov / np.outer(std, std)
 
-            # Convert to nested dict
-            corr_dict = {}
-            for i, asset_i in enumerate(assets):
-                corr_dict[asset_i] = {}
-                for j, asset_j in enumerate(assets):
-                    corr_dict[asset_i][asset_j] = float(correlation_matrix[i, j])
-
-            return corr_dict
+            return pd.DataFrame(correlation_matrix, index=assets, columns=assets).to_dict()
 
         except Exception as e:
             self.logger.error(f"Error calculating correlation matrix: {e}")
@@ -284,7 +308,6 @@ class AdvancedRiskEngine:
                 return None
 
             # Generate synthetic return data
-            np.random.seed(42)  # For reproducibility
 
             # Base correlations
             base_corr = 0.3
@@ -295,7 +318,9 @@ class AdvancedRiskEngine:
             mean_returns = np.array([0.0001] * num_assets)  # ~2.5% annual
             cov_matrix = np.outer(np.array([0.02]*num_assets), np.array([0.02]*num_assets)) * corr_matrix
 
-            returns_matrix = np.random.multivariate_normal(mean_returns, cov_matrix, num_periods)
+            returns_matrix = self.monte_carlo_engine.simulate_returns(
+                cov_matrix, mean_returns, num_paths=num_periods, seed=42  # For reproducibility
+            )
 
             return returns_matrix
 
@@ -410,6 +435,42 @@ class AdvancedRiskEngine:
             self.logger.error(f"Error checking correlation alerts: {e}")
             return []
 
+    def update_prices(self, prices: Dict[str, float]):
+        """
+        Feed a price tick into the streaming covariance tracker
+        """
+        self.covariance_tracker.update_prices(prices)
+
+    def _position_exposures(self, positions: Dict[str, Dict]) -> Dict[str, float]:
+        return {
+            asset: pos.get('exposure', pos.get('value', pos.get('weight', 0)))
+            for asset, pos in positions.items()
+        }
+
+    def get_portfolio_volatility(self, positions: Dict[str, Dict],
+                                 snapshot: Optional[CovarianceSnapshot] = None) -> float:
+        """
+        Portfolio volatility per tick interval from the covariance snapshot
+        """
+        snapshot = snapshot or self.covariance_tracker.snapshot()
+        return snapshot.portfolio_volatility(self._position_exposures(positions))
+
+    def get_marginal_var(self, positions: Dict[str, Dict], confidence: float = None,
+                         snapshot: Optional[CovarianceSnapshot] = None) -> Dict[str, float]:
+        """
+        Marginal parametric VaR per asset from the covariance snapshot
+        """
+        snapshot = snapshot or self.covariance_tracker.snapshot()
+        return snapshot.marginal_var(self._position_exposures(positions), confidence or self.confidence_level)
+
+    def get_component_var(self, positions: Dict[str, Dict], confidence: float = None,
+                          snapshot: Optional[CovarianceSnapshot] = None) -> Dict[str, float]:
+        """
+        Component VaR per asset from the covariance snapshot
+        """
+        snapshot = snapshot or self.covariance_tracker.snapshot()
+        return snapshot.component_var(self._position_exposures(positions), confidence or self.confidence_level)
+
     def update_market_data(self, market_returns: List[float]):
         """
         Update market return data for beta calculations
@@ -200,7 +200,9 @@ class ArbitrageScanner:
         'sushiswap': {'router': '0xd9e1cE17f2641f24aE5D51AEe6325DAA6F3Dcf45'}
     }
     
-    def __init__(self):
+    def __init__(self, bridge=None):
+        # Optional AsyncBridge: shares one HTTP session and rate limit across scans
+        self.bridge = bridge
         self.price_predictor = PricePredictor()
         self.min_spread_bps = 5  # 0.05% minimum spread
         self.max_slippage_bps = 50  # 0.5% max slippage
@@ -316,27 +318,33 @@ class ArbitrageScanner:
         url = f"https://api.dexscreener.com/latest/dex/search?q={search_query}"
         
         try:
+            if self.bridge is not None:
+                session = await self.bridge.session('dexscreener')
+                return await self._fetch_screener_pairs(session, url, search_query, dex_screener_chain)
             async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status != 200:
-                        logger.warning(f"DEX Screener API returned status {response.status} for {search_query}")
-                        return []
-                    
-                    data = await response.json()
-                    
-                    if not data or not data.get('pairs'):
-                        return []
-
-                    # Filter for the correct chain and ensure price is available
-                    relevant_pairs = [
-                        p for p in data['pairs'] 
-                        if p.get('chainId') == dex_screener_chain and p.get('priceUsd')
-                    ]
-                    return relevant_pairs
+                return await self._fetch_screener_pairs(session, url, search_query, dex_screener_chain)
         except Exception as e:
             logger.error(f"Error fetching from DEX Screener for {search_query} on {chain_name}: {e}")
             return []
 
+    async def _fetch_screener_pairs(self, session, url: str, search_query: str, dex_screener_chain: str) -> List[Dict]:
+        async with session.get(url, timeout=10) as response:
+            if response.status != 200:
+                logger.warning(f"DEX Screener API returned status {response.status} for {search_query}")
+                return []
+
+            data = await response.json()
+
+            if not data or not data.get('pairs'):
+                return []
+
+            # Filter for the correct chain and ensure price is available
+            relevant_pairs = [
+                p for p in data['pairs'] 
+                if p.get('chainId') == dex_screener_chain and p.get('priceUsd')
+            ]
+            return relevant_pairs
+
     async def scan_pair_on_chain(self, chain_name: str, token_in_symbol: str, token_out_symbol: str) -> List[ArbitrageSignal]:
         """Scans a single token pair on a given chain to find cross-DEX arbitrage."""
         
@@ -436,8 +444,11 @@ class ArbitrageScanner:
             ('OP', 'WETH'),  # Optimism
         ]
 
-        # Create semaphore for rate limiting
-        semaphore = asyncio.Semaphore(10) # DEX Screener has a rate limit
+        # Create semaphore for rate limiting; the bridge's is shared by concurrent scans
+        if self.bridge is not None:
+            semaphore = self.bridge.semaphore('dexscreener', 10)
+        else:
+            semaphore = asyncio.Semaphore(10) # DEX Screener has a rate limit
 
         async def scan_with_semaphore(chain, token_in, token_out):
             async with semaphore:
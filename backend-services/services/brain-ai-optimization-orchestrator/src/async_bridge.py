@@ -0,0 +1,170 @@
+"""
+Alpha-Orion Async Bridge
+One long-lived event loop for synchronous Flask handlers
+
+Flask handlers run on worker threads without an event loop. Rather than
+building and closing a loop per request (losing every connection pool with
+it), the bridge runs a single loop in a daemon thread and handlers submit
+coroutines to it with run_coroutine_threadsafe.
+
+run() waits with a timeout and cancels the coroutine on the loop when the
+caller gives up, so abandoned scans stop consuming connections. The bridge
+also owns the aiohttp sessions and semaphores scanners share across
+requests; both belong to the bridge loop and must only be used from
+coroutines running on it. shutdown() cancels outstanding work, closes the
+sessions and stops the loop.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Awaitable, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class BridgeTimeout(TimeoutError):
+    """The coroutine did not finish in time and was cancelled on the loop"""
+
+
+class AsyncBridge:
+    """
+    Runs coroutines from synchronous code on one persistent event loop.
+    """
+
+    def __init__(self, default_timeout: float = 30.0, name: str = 'async-bridge'):
+        self.default_timeout = default_timeout
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+        }
+
+    # ============ LIFECYCLE ============
+
+    def start(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("AsyncBridge has been shut down")
+            if self._thread is not None:
+                return self
+            ready = threading.Event()
+            self.loop = asyncio.new_event_loop()
+
+            def run():
+                asyncio.set_event_loop(self.loop)
+                self.loop.call_soon(ready.set)
+                self.loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+        logger.info("AsyncBridge event loop started")
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._closed
+
+    def shutdown(self, timeout: float = 5.0):
+        """Cancel outstanding coroutines, close shared sessions and stop the loop"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._thread is None:
+                return
+        try:
+            asyncio.run_coroutine_threadsafe(self._drain(), self.loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"AsyncBridge shutdown did not drain cleanly: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
+        self._thread = None
+        logger.info("AsyncBridge event loop stopped")
+
+    async def _drain(self):
+        current = asyncio.current_task()
+        tasks = [t for t in asyncio.all_tasks() if t is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+        await self.loop.shutdown_asyncgens()
+
+    # ============ SUBMISSION ============
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """Schedule a coroutine on the bridge loop without waiting for it"""
+        if not self.running:
+            coro.close()
+            raise RuntimeError("AsyncBridge is not running")
+        self.stats['submitted'] += 1
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the bridge loop and block until it finishes.
+        Raises BridgeTimeout after `timeout` seconds (default_timeout if None);
+        the coroutine is cancelled whenever the caller stops waiting.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("AsyncBridge.run() called from the bridge loop; await the coroutine instead")
+        future = self.submit(coro)
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            result = future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise BridgeTimeout(f"Coroutine did not finish within {timeout}s")
+        except concurrent.futures.CancelledError:
+            self.stats['cancelled'] += 1
+            raise
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            # Timeouts, interrupts and errors in the caller all cancel the task on the loop
+            if not future.done():
+                future.cancel()
+        self.stats['completed'] += 1
+        return result
+
+    # ============ SHARED RESOURCES ============
+
+    async def session(self, name: str = 'default', **kwargs) -> aiohttp.ClientSession:
+        """
+        Shared aiohttp session, created on first use with kwargs (e.g. a
+        ClientTimeout or a TCPConnector limit). Await from the bridge loop.
+        """
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            session = self._sessions[name] = aiohttp.ClientSession(**kwargs)
+        return session
+
+    def semaphore(self, name: str, limit: int) -> asyncio.Semaphore:
+        """Shared semaphore; the limit given on first use sticks"""
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = self._semaphores[name] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, running=self.running, sessions=sorted(self._sessions))
@@ -0,0 +1,481 @@
+"""
+Alpha-Orion Segmented Audit Log
+Append-only, Merkle-checkpointed audit storage on local disk
+
+Records are appended as canonical JSON lines to fixed-size segment files.
+When a segment fills it is sealed with a final line carrying the Merkle root
+of its record hashes, chained to the previous segment's seal. Verification
+only re-reads segments sealed since the last check, and any record in a
+sealed segment has an inclusion proof against its segment root.
+
+Secondary indexes by actor, action type and time map to record offsets, so
+queries read only the records they return. Indexes are rebuilt from the
+segments on open, and a torn tail left by a crash is truncated away. An
+open log holds an exclusive flock on its directory, so a second writer in
+another process fails at open instead of interleaving segment writes.
+"""
+
+import bisect
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GENESIS_HASH = "0" * 64
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+
+# Domain separation so a leaf can never be passed off as an interior node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def canonical_json(record: Dict) -> str:
+    return json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def leaf_hash(record: Dict) -> str:
+    """Hash of a record's content, excluding its stored hash"""
+    content = canonical_json({k: v for k, v in record.items() if k != "hash"})
+    return hashlib.sha256(LEAF_PREFIX + content.encode()).hexdigest()
+
+
+def _node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def merkle_levels(leaves: List[str]) -> List[List[bytes]]:
+    """All tree levels from leaves to root; an odd last node is promoted unchanged"""
+    level = [bytes.fromhex(h) for h in leaves]
+    levels = [level]
+    while len(level) > 1:
+        level = [
+            _node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+        levels.append(level)
+    return levels
+
+
+def merkle_root(leaves: List[str]) -> str:
+    if not leaves:
+        return GENESIS_HASH
+    return merkle_levels(leaves)[-1][0].hex()
+
+
+def seal_hash(segment: int, count: int, root: str, previous_seal: str) -> str:
+    return hashlib.sha256(f"{segment}:{count}:{root}:{previous_seal}".encode()).hexdigest()
+
+
+def verify_proof(record: Dict, proof: Dict) -> bool:
+    """
+    Check that a record is included under proof['merkle_root'].
+
+    The root itself should be compared against a trusted seal.
+    """
+    node = bytes.fromhex(leaf_hash(record))
+    if node.hex() != proof["leaf_hash"]:
+        return False
+    for sibling, side in proof["path"]:
+        sibling = bytes.fromhex(sibling)
+        node = _node_hash(sibling, node) if side == "L" else _node_hash(node, sibling)
+    return node.hex() == proof["merkle_root"]
+
+
+def _timestamp_seconds(timestamp: Any) -> float:
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+class SegmentedAuditLog:
+    """
+    Append-only audit log split into sealed segment files.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 1000, sync_writes: bool = False):
+        """
+        Args:
+            directory: Where segment files live
+            segment_size: Records per segment before it is sealed
+            sync_writes: fsync after every record instead of only on seal
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync_writes = sync_writes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = self._lock_directory(directory)
+
+        self._lock = threading.RLock()
+        self.seals: List[Dict] = []
+        self._offsets: List[List[int]] = []
+        self._open_hashes: List[str] = []
+        self._file = None
+
+        # Secondary indexes: sequence numbers in append order
+        self._by_actor: Dict[str, List[int]] = defaultdict(list)
+        self._by_action: Dict[str, List[int]] = defaultdict(list)
+        self._times: List[float] = []
+
+        # Incremental verification watermark
+        self.verified_segments = 0
+        self.segments_read_for_verification = 0
+
+        try:
+            self._recover()
+        except Exception:
+            self._unlock_directory()
+            raise
+
+    # ------------------------------------------------------------------
+    # Layout
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _lock_directory(directory: str) -> int:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError(f"Audit log {directory} is already open by another writer")
+        return fd
+
+    def _unlock_directory(self):
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:08d}{SEGMENT_SUFFIX}")
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(numbers)
+
+    @property
+    def open_segment(self) -> int:
+        return len(self.seals)
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    # ------------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------------
+
+    def _scan(self, segment: int) -> Tuple[List[Tuple[int, Dict]], Optional[Dict], int]:
+        """
+        Read a segment file.
+
+        Returns:
+            ([(offset, record), ...], seal or None, length of the intact prefix)
+        """
+        records, seal, good = [], None, 0
+        with open(self._segment_path(segment), "rb") as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if "seal" in entry:
+                    seal = entry["seal"]
+                    good = offset + len(line)
+                    break
+                records.append((offset, entry))
+                offset += len(line)
+                good = offset
+        return records, seal, good
+
+    def _recover(self):
+        numbers = self._segment_numbers()
+        if numbers != list(range(len(numbers))):
+            raise ValueError(f"Audit segments in {self.directory} are not contiguous: {numbers}")
+
+        for segment in numbers:
+            records, seal, good = self._scan(segment)
+            path = self._segment_path(segment)
+            if os.path.getsize(path) > good:
+                with open(path, "rb") as f:
+                    f.seek(good)
+                    tail = f.read()
+                # A crash leaves at most one partial line; anything more is corruption, not a torn write
+                if seal is not None or segment != numbers[-1] or b"\n" in tail[:-1]:
+                    raise ValueError(f"Audit segment {segment} is corrupt after byte {good}")
+                logger.warning(f"Truncating torn tail of audit segment {segment} at byte {good}")
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            self._offsets.append([])
+            for offset, record in records:
+                self._index(record, offset)
+
+            if seal is not None:
+                self.seals.append(seal)
+                self._open_hashes = []
+            elif segment != numbers[-1]:
+                raise ValueError(f"Audit segment {segment} is not sealed")
+            else:
+                self._open_hashes = [r["hash"] for _, r in records]
+
+        if len(self._offsets) > len(self.seals) and len(self._open_hashes) >= self.segment_size:
+            # Crashed after filling a segment but before sealing it
+            self._seal()
+        if len(self._offsets) == len(self.seals):
+            self._offsets.append([])
+            self._open_hashes = []
+
+        if self._times:
+            logger.info(f"Recovered audit log: {len(self._times)} records, {len(self.seals)} sealed segments")
+
+    def _index(self, record: Dict, offset: int):
+        sequence = record["sequence"]
+        self._offsets[-1].append(offset)
+        self._by_actor[record["actor"]].append(sequence)
+        self._by_action[record["action_type"]].append(sequence)
+        # Clamp so the time index stays sorted across clock steps; queries re-check exact times
+        t = _timestamp_seconds(record["timestamp"])
+        self._times.append(max(t, self._times[-1]) if self._times else t)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _writer(self):
+        if self._file is None:
+            self._file = open(self._segment_path(self.open_segment), "ab")
+        return self._file
+
+    def _write_line(self, entry: Dict, sync: bool) -> int:
+        f = self._writer()
+        offset = f.tell()
+        f.write(canonical_json(entry).encode() + b"\n")
+        f.flush()
+        if sync:
+            os.fsync(f.fileno())
+        return offset
+
+    def append(self, record: Dict) -> Dict:
+        """
+        Append a record (timestamp, action_type, actor, ...) and return it with sequence and hash.
+        """
+        with self._lock:
+            record = dict(record)
+            record["sequence"] = len(self._times)
+            record["hash"] = leaf_hash(record)
+
+            offset = self._write_line(record, self.sync_writes)
+            self._index(record, offset)
+            self._open_hashes.append(record["hash"])
+
+            if len(self._open_hashes) >= self.segment_size:
+                self._seal()
+                self._offsets.append([])
+                self._open_hashes = []
+            return record
+
+    def _seal(self):
+        segment = self.open_segment
+        previous = self.seals[-1]["seal_hash"] if self.seals else GENESIS_HASH
+        root = merkle_root(self._open_hashes)
+        seal = {
+            "segment": segment,
+            "count": len(self._open_hashes),
+            "first_sequence": segment * self.segment_size,
+            "merkle_root": root,
+            "previous_seal": previous,
+            "seal_hash": seal_hash(segment, len(self._open_hashes), root, previous),
+            "sealed_at": datetime.utcnow().isoformat(),
+        }
+        self._write_line({"seal": seal}, sync=True)
+        self._file.close()
+        self._file = None
+        self.seals.append(seal)
+        logger.info(f"Sealed audit segment {segment}: {seal['merkle_root'][:16]}...")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._unlock_directory()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _locate(self, sequence: int) -> Tuple[int, int]:
+        segment, position = divmod(sequence, self.segment_size)
+        if sequence < 0 or segment >= len(self._offsets) or position >= len(self._offsets[segment]):
+            raise IndexError(f"No audit record {sequence}")
+        return segment, position
+
+    def read(self, sequences: Iterable[int]) -> List[Dict]:
+        """Load records by sequence number, opening each segment once"""
+        records = []
+        handles = {}
+        try:
+            for sequence in sequences:
+                segment, position = self._locate(sequence)
+                if segment not in handles:
+                    handles[segment] = open(self._segment_path(segment), "rb")
+                f = handles[segment]
+                f.seek(self._offsets[segment][position])
+                records.append(json.loads(f.readline()))
+        finally:
+            for f in handles.values():
+                f.close()
+        return records
+
+    def query(
+        self,
+        actor: str = None,
+        action_type: str = None,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        limit: int = 1000
+    ) -> List[Dict]:
+        """
+        Newest `limit` records matching every given filter, in append order.
+        """
+        with self._lock:
+            low = bisect.bisect_left(self._times, start_time.timestamp()) if start_time else 0
+            high = bisect.bisect_right(self._times, end_time.timestamp()) if end_time else len(self._times)
+
+            # Start from the most selective index; the other filters are checked per record
+            candidates = None
+            for key, index in ((actor, self._by_actor), (action_type, self._by_action)):
+                if key is not None:
+                    sequences = index.get(key, [])
+                    if candidates is None or len(sequences) < len(candidates):
+                        candidates = sequences
+            if candidates is None:
+                candidates = range(low, high)
+            else:
+                candidates = candidates[bisect.bisect_left(candidates, low):bisect.bisect_left(candidates, high)]
+
+        results = []
+        # Walk newest first and read in small chunks until the limit is met
+        position = len(candidates)
+        while position > 0 and len(results) < limit:
+            chunk = candidates[max(0, position - max(limit, 64)):position]
+            position -= len(chunk)
+            for record in reversed(self.read(chunk)):
+                if actor is not None and record["actor"] != actor:
+                    continue
+                if action_type is not None and record["action_type"] != action_type:
+                    continue
+                t = datetime.fromisoformat(record["timestamp"])
+                if (start_time and t < start_time) or (end_time and t > end_time):
+                    continue
+                results.append(record)
+                if len(results) >= limit:
+                    break
+        results.reverse()
+        return results
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+
+    def _check_records(self, segment: int, records: List[Tuple[int, Dict]], invalid: List[Dict]) -> List[str]:
+        hashes = []
+        for position, (_, record) in enumerate(records):
+            expected = leaf_hash(record)
+            sequence = segment * self.segment_size + position
+            if record.get("sequence") != sequence:
+                invalid.append({"segment": segment, "sequence": sequence, "reason": "Sequence mismatch"})
+            if record.get("hash") != expected:
+                invalid.append({"segment": segment, "sequence": sequence, "reason": "Hash mismatch",
+                                "hash": record.get("hash")})
+            hashes.append(expected)
+        return hashes
+
+    def verify(self, full: bool = False) -> Tuple[bool, List[Dict]]:
+        """
+        Verify segments sealed since the last successful check, plus the open segment.
+
+        Args:
+            full: Re-verify every segment from genesis
+
+        Returns:
+            Tuple[is_valid, list_of_invalid_entries]
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            start = 0 if full else self.verified_segments
+            sealed = len(self.seals)
+            invalid: List[Dict] = []
+            previous = self.seals[start - 1]["seal_hash"] if start else GENESIS_HASH
+
+            for segment in range(start, sealed):
+                records, seal, _ = self._scan(segment)
+                self.segments_read_for_verification += 1
+                hashes = self._check_records(segment, records, invalid)
+                root = merkle_root(hashes)
+
+                if seal is None or seal != self.seals[segment]:
+                    invalid.append({"segment": segment, "reason": "Seal missing or altered"})
+                    seal = self.seals[segment]
+                if root != seal["merkle_root"] or len(hashes) != seal["count"]:
+                    invalid.append({"segment": segment, "reason": "Merkle root mismatch",
+                                    "merkle_root": seal["merkle_root"]})
+                if seal["previous_seal"] != previous or \
+                        seal["seal_hash"] != seal_hash(segment, seal["count"], seal["merkle_root"], previous):
+                    invalid.append({"segment": segment, "reason": "Chain break",
+                                    "previous_seal": seal["previous_seal"]})
+                previous = seal["seal_hash"]
+
+            # The open segment has no seal yet; check its record hashes only
+            if os.path.exists(self._segment_path(sealed)):
+                records, _, _ = self._scan(sealed)
+                self._check_records(sealed, records, invalid)
+
+            if not invalid:
+                self.verified_segments = sealed
+            return len(invalid) == 0, invalid
+
+    def proof(self, sequence: int) -> Optional[Dict]:
+        """
+        Inclusion proof for a record in a sealed segment, or None while its segment is open.
+        """
+        segment, position = self._locate(sequence)
+        if segment >= len(self.seals):
+            return None
+
+        records, _, _ = self._scan(segment)
+        levels = merkle_levels([leaf_hash(r) for _, r in records])
+        path = []
+        index = position
+        for level in levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append((level[sibling].hex(), "L" if sibling < index else "R"))
+            index //= 2
+
+        seal = self.seals[segment]
+        return {
+            "sequence": sequence,
+            "segment": segment,
+            "leaf_hash": levels[0][position].hex(),
+            "path": path,
+            "merkle_root": seal["merkle_root"],
+            "seal_hash": seal["seal_hash"],
+        }
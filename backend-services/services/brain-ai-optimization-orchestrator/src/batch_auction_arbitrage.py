@@ -6,13 +6,17 @@ Gnosis/CowSwap-style batch auction implementation for MEV protection.
 import asyncio
 import logging
 import json
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Set
 from enum import Enum
 import time
 import math
 
+from batch_auction_solver import BatchSolver
+from timer_wheel import TimerHandle, TimerScheduler
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -55,6 +59,8 @@ class SolverSolution:
     solver_fee: float
     submitted_at: datetime = field(default_factory=datetime.utcnow)
     score: float = 0.0
+    clearing_prices: Dict[str, float] = field(default_factory=dict)  # token -> uniform price
+    fills: Dict[str, Tuple[float, float]] = field(default_factory=dict)  # order id -> (amount in, amount out)
 
 
 @dataclass
@@ -69,22 +75,38 @@ class BatchAuction:
     winning_solution: Optional[SolverSolution] = None
     total_volume_usd: float = 0.0
     executed_at: Optional[datetime] = None
+    close_at: float = 0.0  # Close deadline on the engine clock
+    closed_at: Optional[float] = None
+    rollover: bool = False  # Open the next auction when this one closes
+    timers: Dict[str, TimerHandle] = field(default_factory=dict, repr=False)
 
 
 class BatchAuctionEngine:
     """
     Gnosis/CowSwap-style batch auction engine.
     Collects orders for 30 seconds, then solvers compete for optimal execution.
+
+    Each auction's close, solve and settle deadlines are timers on a
+    hierarchical timer wheel instead of a polling loop. The next auction opens
+    as soon as the previous one closes, so solving auction N overlaps
+    collecting auction N+1.
     """
 
-    def __init__(self):
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
         self.auctions: Dict[str, BatchAuction] = {}
         self.active_auction: Optional[BatchAuction] = None
+        self.solving: Dict[str, BatchAuction] = {}  # Closed auctions waiting for solutions
         self.auction_duration = 30  # seconds
+        self.solve_window = 5  # seconds solvers have after an auction closes
+        self.settle_delay = 0.0  # seconds between picking a winner and settlement
         self.min_orders = 3  # Minimum orders to start auction
         self.max_orders = 100  # Maximum orders per batch
         self.registered_solvers: Set[str] = set()
         self.is_running = False
+        self.scheduler = TimerScheduler(clock=clock)
+        self.close_lag: Deque[float] = deque(maxlen=10000)  # Seconds each close fired after its deadline
+        self._auction_seq = 0
+        self._settlements: Set[asyncio.Task] = set()
 
         logger.info("BatchAuctionEngine initialized")
 
@@ -93,96 +115,182 @@ class BatchAuctionEngine:
         self.is_running = True
         logger.info("BatchAuctionEngine started")
 
-        while self.is_running:
-            try:
-                await self.run_auction_cycle()
-                await asyncio.sleep(1)  # Check every second
-            except Exception as e:
-                logger.error(f"Error in auction cycle: {e}")
-                await asyncio.sleep(5)
+        if not self.active_auction or self.active_auction.state != AuctionState.COLLECTING:
+            self.open_auction()
+        await self.scheduler.run()
 
     async def stop(self):
         """Stop the batch auction engine"""
         self.is_running = False
+        self.scheduler.stop()
         logger.info("BatchAuctionEngine stopped")
 
-    async def run_auction_cycle(self):
-        """Run one complete auction cycle"""
-        # Start new auction if none active
-        if not self.active_auction:
-            await self.start_new_auction()
-
-        # Check if auction should end
-        if self.active_auction and datetime.utcnow() >= self.active_auction.end_time:
-            await self.finalize_auction()
-
-        # Start new auction if previous completed
-        if (self.active_auction and
-            self.active_auction.state in [AuctionState.COMPLETED, AuctionState.FAILED]):
-            await self.start_new_auction()
-
     async def start_new_auction(self):
         """Start a new batch auction"""
-        auction_id = f"auction_{int(time.time())}"
+        return self.open_auction()
+
+    def open_auction(self, duration: Optional[float] = None, rollover: bool = True) -> BatchAuction:
+        """
+        Open an auction and schedule its close.
+
+        With rollover the auction becomes the active one and opens its
+        successor when it closes; without it the auction runs on its own.
+        """
+        duration = self.auction_duration if duration is None else duration
+        self._auction_seq += 1
+        auction_id = f"auction_{int(time.time())}_{self._auction_seq}"
         start_time = datetime.utcnow()
-        end_time = start_time + timedelta(seconds=self.auction_duration)
 
-        self.active_auction = BatchAuction(
+        auction = BatchAuction(
             id=auction_id,
             start_time=start_time,
-            end_time=end_time
+            end_time=start_time + timedelta(seconds=duration),
+            close_at=self.scheduler.clock() + duration,
+            rollover=rollover
         )
+        auction.timers['close'] = self.scheduler.call_at(auction.close_at, self._close_auction, auction)
+
+        self.auctions[auction_id] = auction
+        if rollover:
+            self.active_auction = auction
+        logger.debug(f"Started new batch auction: {auction_id}")
+        return auction
+
+    def reschedule_close(self, auction_id: str, close_at: float) -> bool:
+        """Move a collecting auction's close deadline (engine clock seconds)"""
+        auction = self.auctions.get(auction_id)
+        if not auction or auction.state != AuctionState.COLLECTING:
+            return False
 
-        self.auctions[auction_id] = self.active_auction
-        logger.info(f"Started new batch auction: {auction_id}")
+        auction.close_at = close_at
+        auction.end_time = datetime.utcnow() + timedelta(seconds=max(close_at - self.scheduler.clock(), 0))
+        auction.timers['close'] = self.scheduler.reschedule(auction.timers['close'], close_at)
+        return True
 
-    async def submit_order(self, order: BatchOrder) -> bool:
-        """Submit an order to the current auction"""
-        if not self.active_auction:
+    def cancel_auction(self, auction_id: str) -> bool:
+        """Cancel an auction that has not settled yet, along with its pending deadlines"""
+        auction = self.auctions.get(auction_id)
+        if not auction or auction.state in (AuctionState.COMPLETED, AuctionState.FAILED):
             return False
 
-        if self.active_auction.state != AuctionState.COLLECTING:
+        for timer in auction.timers.values():
+            timer.cancel()
+        auction.timers.clear()
+        auction.state = AuctionState.FAILED
+        self.solving.pop(auction_id, None)
+        if auction is self.active_auction and auction.rollover:
+            self.open_auction()
+        logger.info(f"Auction {auction_id} cancelled")
+        return True
+
+    def _close_auction(self, auction: BatchAuction):
+        """Close deadline: stop collecting, open the next auction, start the solve window"""
+        auction.timers.pop('close', None)
+        if auction.state != AuctionState.COLLECTING:
+            return
+
+        now = self.scheduler.clock()
+        auction.closed_at = now
+        self.close_lag.append(now - auction.close_at)
+        auction.state = AuctionState.SOLVING
+        self.solving[auction.id] = auction
+        auction.timers['solve'] = self.scheduler.call_at(now + self.solve_window, self._solve_auction, auction)
+
+        if auction.rollover and auction is self.active_auction:
+            self.open_auction()
+
+    def _solve_auction(self, auction: BatchAuction):
+        """Solve deadline: pick the winning solution and schedule settlement"""
+        auction.timers.pop('solve', None)
+        self.solving.pop(auction.id, None)
+        if auction.state != AuctionState.SOLVING:
+            return
+
+        if auction.solutions:
+            auction.winning_solution = max(auction.solutions, key=lambda s: s.score)
+            auction.state = AuctionState.EXECUTING
+            auction.timers['settle'] = self.scheduler.call_at(
+                self.scheduler.clock() + self.settle_delay, self._settle_auction, auction
+            )
+        else:
+            # No solutions submitted
+            auction.state = AuctionState.FAILED
+            logger.warning(f"Auction {auction.id} failed - no solutions")
+
+    def _settle_auction(self, auction: BatchAuction):
+        """Settle deadline: execute the winner off the timer callback"""
+        auction.timers.pop('settle', None)
+        task = asyncio.get_running_loop().create_task(self._settle(auction))
+        self._settlements.add(task)
+        task.add_done_callback(self._settlements.discard)
+
+    async def _settle(self, auction: BatchAuction):
+        try:
+            await self.execute_solution(auction.winning_solution, auction)
+            auction.state = AuctionState.COMPLETED
+            logger.info(f"Auction {auction.id} completed with winner {auction.winning_solution.solver_id}")
+        except Exception as e:
+            auction.state = AuctionState.FAILED
+            logger.error(f"Auction settlement error: {e}")
+
+    async def submit_order(self, order: BatchOrder, auction_id: Optional[str] = None) -> bool:
+        """Submit an order to the current auction, or to `auction_id`"""
+        auction = self.auctions.get(auction_id) if auction_id else self.active_auction
+        if not auction:
+            return False
+
+        if auction.state != AuctionState.COLLECTING:
             return False
 
-        if len(self.active_auction.orders) >= self.max_orders:
+        if len(auction.orders) >= self.max_orders:
             return False
 
         # Add order to auction
-        self.active_auction.orders.append(order)
-        self.active_auction.total_volume_usd += order.amount_in  # Simplified USD calculation
+        auction.orders.append(order)
+        auction.total_volume_usd += order.amount_in  # Simplified USD calculation
 
-        logger.info(f"Order submitted: {order.id} to auction {self.active_auction.id}")
+        # A full batch closes on the next tick instead of waiting out its window
+        if len(auction.orders) >= self.max_orders:
+            self.reschedule_close(auction.id, self.scheduler.clock())
+
+        logger.info(f"Order submitted: {order.id} to auction {auction.id}")
         return True
 
-    async def submit_solution(self, solution: SolverSolution) -> bool:
-        """Submit a solution from a solver"""
-        if not self.active_auction:
+    async def submit_solution(self, solution: SolverSolution, auction_id: Optional[str] = None) -> bool:
+        """Submit a solution for a solving auction (the most recently closed by default)"""
+        if auction_id:
+            auction = self.auctions.get(auction_id)
+        else:
+            auction = next(reversed(self.solving.values()), None)
+        if not auction:
             return False
 
-        if self.active_auction.state != AuctionState.SOLVING:
+        if auction.state != AuctionState.SOLVING:
             return False
 
         if solution.solver_id not in self.registered_solvers:
             return False
 
         # Validate solution
-        if not await self.validate_solution(solution):
+        if not await self.validate_solution(solution, auction):
             return False
 
         # Calculate solution score
         solution.score = await self.score_solution(solution)
 
         # Add to solutions
-        self.active_auction.solutions.append(solution)
+        auction.solutions.append(solution)
 
         logger.info(f"Solution submitted by {solution.solver_id}: score {solution.score:.4f}")
         return True
 
-    async def validate_solution(self, solution: SolverSolution) -> bool:
+    async def validate_solution(self, solution: SolverSolution, auction: Optional[BatchAuction] = None) -> bool:
         """Validate a submitted solution"""
         try:
+            auction = auction or self.active_auction
+
             # Check all orders are included
-            order_ids = {order.id for order in self.active_auction.orders}
+            order_ids = {order.id for order in auction.orders}
             solution_order_ids = set(solution.orders)
 
             if not solution_order_ids.issubset(order_ids):
@@ -230,41 +338,26 @@ class BatchAuctionEngine:
             return 0.0
 
     async def finalize_auction(self):
-        """Finalize the current auction and execute winning solution"""
-        if not self.active_auction:
+        """Close the active auction and settle it now instead of waiting for its deadlines"""
+        auction = self.active_auction
+        if not auction:
             return
 
         try:
-            # Change state to solving
-            self.active_auction.state = AuctionState.SOLVING
-
-            # Wait for solver submissions (simplified - in production would wait for deadline)
-            await asyncio.sleep(5)
-
-            # Select winning solution
-            if self.active_auction.solutions:
-                winning_solution = max(
-                    self.active_auction.solutions,
-                    key=lambda s: s.score
-                )
-                self.active_auction.winning_solution = winning_solution
-
-                # Execute solution
-                await self.execute_solution(winning_solution)
-                self.active_auction.state = AuctionState.COMPLETED
-
-                logger.info(f"Auction {self.active_auction.id} completed with winner {winning_solution.solver_id}")
-
-            else:
-                # No solutions submitted
-                self.active_auction.state = AuctionState.FAILED
-                logger.warning(f"Auction {self.active_auction.id} failed - no solutions")
+            if auction.state == AuctionState.COLLECTING:
+                self._close_auction(auction)
+            if auction.state == AuctionState.SOLVING:
+                auction.timers['solve'].cancel()
+                self._solve_auction(auction)
+            if auction.state == AuctionState.EXECUTING and 'settle' in auction.timers:
+                auction.timers.pop('settle').cancel()
+                await self._settle(auction)
 
         except Exception as e:
-            self.active_auction.state = AuctionState.FAILED
+            auction.state = AuctionState.FAILED
             logger.error(f"Auction finalization error: {e}")
 
-    async def execute_solution(self, solution: SolverSolution):
+    async def execute_solution(self, solution: SolverSolution, auction: Optional[BatchAuction] = None):
         """Execute the winning solution on-chain"""
         try:
             # In production, this would:
@@ -272,17 +365,21 @@ class BatchAuctionEngine:
             # 2. Execute multi-hop swaps across DEXes
             # 3. Distribute outputs to users
             # 4. Pay solver fee
+            auction = auction or self.active_auction
 
             logger.info(f"Executing solution with {len(solution.orders)} orders")
 
-            # Mark orders as executed
+            # Mark orders as executed at their clearing price
+            orders_by_id = {order.id: order for order in auction.orders}
             for order_id in solution.orders:
-                for order in self.active_auction.orders:
-                    if order.id == order_id:
-                        order.executed = True
-                        order.execution_price = 1.0  # Simplified
+                order = orders_by_id.get(order_id)
+                if order is None:
+                    continue
+                order.executed = True
+                amount_in, amount_out = solution.fills.get(order_id, (order.amount_in, order.min_amount_out))
+                order.execution_price = amount_out / amount_in if amount_in else 0.0
 
-            self.active_auction.executed_at = datetime.utcnow()
+            auction.executed_at = datetime.utcnow()
 
         except Exception as e:
             logger.error(f"Solution execution error: {e}")
@@ -308,18 +405,19 @@ class BatchAuctionEngine:
             'state': self.active_auction.state.value,
             'orders_count': len(self.active_auction.orders),
             'solutions_count': len(self.active_auction.solutions),
-            'time_remaining': max(0, (self.active_auction.end_time - datetime.utcnow()).total_seconds()),
-            'total_volume_usd': self.active_auction.total_volume_usd
+            'time_remaining': max(0, self.active_auction.close_at - self.scheduler.clock()),
+            'total_volume_usd': self.active_auction.total_volume_usd,
+            'solving_auctions': list(self.solving)
         }
 
 
 class LinearProgrammingSolver:
     """
     Linear programming solver for optimal batch execution.
-    Uses scipy.optimize.linprog for path optimization.
+    Uses scipy.optimize.linprog (HiGHS) for coincidence-of-wants matching and AMM routing.
     """
 
-    def __init__(self):
+    def __init__(self, deadline: float = 1.0):
         self.dex_fees = {
             'uniswap_v2': 0.003,  # 0.3%
             'uniswap_v3': 0.003,  # 0.3%
@@ -327,55 +425,69 @@ class LinearProgrammingSolver:
             'balancer': 0.0004,   # 0.04%
             '1inch': 0.0          # Aggregator
         }
+        self.deadline = deadline  # Seconds before falling back to greedy matching
+        self.solver = BatchSolver(self.dex_fees)
 
     async def optimize_batch(
         self,
         orders: List[BatchOrder],
-        dex_liquidity: Dict[str, Dict[str, float]]
+        dex_liquidity: Dict[str, Dict[str, Tuple[float, float]]],
+        reference_prices: Optional[Dict[str, float]] = None
     ) -> SolverSolution:
         """
         Optimize batch execution using linear programming.
         Returns the optimal solution.
+
+        Args:
+            dex_liquidity: {dex: {"TOKEN0/TOKEN1": (reserve0, reserve1)}}
+            reference_prices: Optional token prices used to scale the clearing prices
         """
         try:
-            # Simplified LP formulation
-            # In production, would use:
-            # - Objective: Maximize total output value
-            # - Constraints: Token balances, liquidity limits, slippage
-            # - Variables: Flow amounts through each DEX path
+            result = await asyncio.to_thread(
+                self.solver.solve, orders, dex_liquidity, self.deadline, reference_prices
+            )
 
-            # For demo, create a simple optimized solution
             total_input = {}
             total_output = {}
             execution_path = []
+            orders_by_id = {order.id: order for order in orders}
 
-            for order in orders:
-                # Accumulate totals
-                if order.token_in not in total_input:
-                    total_input[order.token_in] = 0
-                total_input[order.token_in] += order.amount_in
-
-                if order.token_out not in total_output:
-                    total_output[order.token_out] = 0
-                total_output[order.token_out] += order.min_amount_out
-
-                # Add to execution path
+            for order_id, (amount_in, amount_out) in result.fills.items():
+                order = orders_by_id[order_id]
+                total_input[order.token_in] = total_input.get(order.token_in, 0) + amount_in
+                total_output[order.token_out] = total_output.get(order.token_out, 0) + amount_out
                 execution_path.append({
-                    'order_id': order.id,
-                    'dex': 'uniswap_v3',  # Optimized choice
+                    'order_id': order_id,
+                    'dex': 'batch',
                     'path': [order.token_in, order.token_out],
-                    'amount_in': order.amount_in,
-                    'expected_out': order.min_amount_out * 1.02  # 2% improvement
+                    'amount_in': amount_in,
+                    'expected_out': amount_out
                 })
 
+            for trade in result.amm_trades:
+                execution_path.append({
+                    'dex': trade['dex'],
+                    'pool': trade['pool'],
+                    'path': [trade['token_in'], trade['token_out']],
+                    'amount_in': trade['amount_in'],
+                    'expected_out': trade['amount_out']
+                })
+
+            logger.info(
+                f"Batch solved ({result.method}) in {result.solve_time * 1000:.1f}ms: "
+                f"{len(result.fills)}/{len(orders)} orders filled, {len(result.amm_trades)} AMM trades"
+            )
+
             solution = SolverSolution(
                 solver_id='lp_solver',
-                orders=[order.id for order in orders],
+                orders=list(result.fills),
                 total_input=total_input,
                 total_output=total_output,
                 execution_path=execution_path,
-                gas_estimate=200000,  # Estimated gas
-                solver_fee=0.001  # 0.1% fee
+                gas_estimate=100000 + 30000 * len(result.fills) + 90000 * len(result.amm_trades),
+                solver_fee=0.001,  # 0.1% fee
+                clearing_prices=result.prices,
+                fills=result.fills
             )
 
             return solution
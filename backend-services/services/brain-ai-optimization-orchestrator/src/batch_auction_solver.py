@@ -0,0 +1,479 @@
+"""
+Alpha-Orion Batch Auction Solver
+Uniform clearing prices and surplus-maximizing fills for batch auctions.
+
+Solving runs in two stages:
+
+1. Clearing prices. For every traded pair the solver finds the exchange rate
+   at which eligible orders either balance each other (coincidence of wants)
+   or leave a net imbalance that the pair's AMM pools can absorb at that same
+   average rate. Pair rates are joined into one price vector along a
+   spanning tree of the pair graph, so every token has exactly one price.
+2. Fills. With prices fixed, a linear program chooses order fills and AMM
+   flows (constant-product curves split into piecewise-linear segments) to
+   maximize user surplus subject to token conservation: the settlement never
+   pays out more of a token than it takes in. It is solved with HiGHS under a
+   time limit; if the limit is hit a greedy per-pair matcher is used instead.
+
+Every filled order trades at p_sell / p_buy and all orders are partially
+fillable.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS = 12  # Piecewise-linear segments per AMM direction
+MAX_POOL_SHARE = 0.5  # Largest input routed through a pool, as a share of its input reserve
+LIMIT_TOLERANCE = 1e-9  # Relative slack when testing limit prices
+VOLUME_WEIGHT = 1e-6  # Tie-breaker favouring volume among orders priced at their limit
+AMM_PENALTY = 1e-7  # Per-unit cost on AMM flow, so coincidences of wants are preferred
+
+
+@dataclass
+class AmmPool:
+    """Constant-product pool"""
+    dex: str
+    token0: str
+    token1: str
+    reserve0: float
+    reserve1: float
+    fee: float = 0.003
+
+    def reserves(self, token_in: str) -> Tuple[float, float]:
+        return (self.reserve0, self.reserve1) if token_in == self.token0 else (self.reserve1, self.reserve0)
+
+    def output(self, token_in: str, amount_in):
+        reserve_in, reserve_out = self.reserves(token_in)
+        effective = np.asarray(amount_in, dtype=float) * (1 - self.fee)
+        return reserve_out * effective / (reserve_in + effective)
+
+    def other(self, token: str) -> str:
+        return self.token1 if token == self.token0 else self.token0
+
+
+@dataclass
+class Segment:
+    """Linear piece of an AMM curve: up to `width` of token_in at `rate` token_out per unit"""
+    pool: int
+    token_in: str
+    token_out: str
+    width: float
+    rate: float
+
+
+@dataclass
+class BatchResult:
+    prices: Dict[str, float]
+    fills: Dict[str, Tuple[float, float]]  # order id -> (amount_in, amount_out)
+    amm_trades: List[Dict]
+    surplus: float  # In price units
+    method: str
+    solve_time: float
+    buffers: Dict[str, float] = field(default_factory=dict)  # Token left in the settlement
+
+
+def parse_pools(dex_liquidity: Dict[str, Dict[str, Sequence[float]]], dex_fees: Dict[str, float]) -> List[AmmPool]:
+    """
+    Pools from {dex: {"TOKEN0/TOKEN1": (reserve0, reserve1)}}.
+    """
+    pools = []
+    for dex, markets in (dex_liquidity or {}).items():
+        for pair, reserves in markets.items():
+            token0, token1 = pair.split('/')
+            reserve0, reserve1 = reserves
+            if reserve0 > 0 and reserve1 > 0:
+                pools.append(AmmPool(dex, token0, token1, float(reserve0), float(reserve1), dex_fees.get(dex, 0.003)))
+    return pools
+
+
+def pool_segments(index: int, pool: AmmPool, token_in: str, segments: int = SEGMENTS) -> List[Segment]:
+    """
+    Chords of the output curve over geometrically spaced inputs.
+
+    Chords lie under the concave curve, so any flow priced by them is
+    covered by the pool's real output.
+    """
+    reserve_in, _ = pool.reserves(token_in)
+    edges = np.concatenate(([0.0], reserve_in * MAX_POOL_SHARE * 2.0 ** -np.arange(segments - 1, -1, -1)))
+    outputs = pool.output(token_in, edges)
+    widths = np.diff(edges)
+    rates = np.diff(outputs) / widths
+    token_out = pool.other(token_in)
+    return [Segment(index, token_in, token_out, float(w), float(r)) for w, r in zip(widths, rates)]
+
+
+class _Curve:
+    """Combined piecewise-linear output of several pools in one direction, best chords first"""
+
+    def __init__(self, segments: List[Segment]):
+        self.segments = sorted(segments, key=lambda s: -s.rate)
+        widths = np.array([s.width for s in self.segments])
+        outputs = widths * np.array([s.rate for s in self.segments])
+        self.inputs = np.concatenate(([0.0], np.cumsum(widths)))
+        self.outputs = np.concatenate(([0.0], np.cumsum(outputs)))
+
+    def __bool__(self):
+        return bool(self.segments)
+
+    @property
+    def capacity(self) -> float:
+        return float(self.inputs[-1])
+
+    def output(self, amount: float) -> float:
+        return float(np.interp(amount, self.inputs, self.outputs))
+
+    def max_input_at(self, rate: float) -> float:
+        """Largest input whose total output is at least rate * input"""
+        gain = self.outputs - rate * self.inputs
+        below = np.flatnonzero(gain < 0)
+        if not len(below):
+            return self.capacity
+        k = below[0]
+        if k == 0:
+            return 0.0
+        # Root of the linear piece between breakpoints k-1 and k
+        slope = (gain[k] - gain[k - 1]) / (self.inputs[k] - self.inputs[k - 1])
+        return float(self.inputs[k - 1] - gain[k - 1] / slope)
+
+    def allocate(self, amount: float) -> Dict[int, float]:
+        """Split an input across pools following the combined curve"""
+        flows: Dict[int, float] = {}
+        remaining = amount
+        for segment in self.segments:
+            if remaining <= 0:
+                break
+            take = min(segment.width, remaining)
+            flows[segment.pool] = flows.get(segment.pool, 0.0) + take
+            remaining -= take
+        return flows
+
+
+class _OrderBook:
+    """Orders as arrays: sell and buy token, amount in and limit (buy per sell)"""
+
+    def __init__(self, orders, now: datetime):
+        live = [o for o in orders if o.amount_in > 0 and o.min_amount_out >= 0
+                and o.token_in != o.token_out and (o.deadline is None or o.deadline >= now)]
+        self.orders = live
+        self.ids = [o.id for o in live]
+        self.sell = [o.token_in for o in live]
+        self.buy = [o.token_out for o in live]
+        self.amount = np.array([o.amount_in for o in live], dtype=float)
+        self.limit = np.array([o.min_amount_out / o.amount_in for o in live], dtype=float)
+        self.tokens = sorted(set(self.sell) | set(self.buy))
+
+    def __len__(self):
+        return len(self.orders)
+
+    def by_pair(self) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+        """(A, B) with A < B -> (indices selling A for B, indices selling B for A)"""
+        groups: Dict[Tuple[str, str], Tuple[List[int], List[int]]] = {}
+        for i, (sell, buy) in enumerate(zip(self.sell, self.buy)):
+            key = (sell, buy) if sell < buy else (buy, sell)
+            side = 0 if sell == key[0] else 1
+            groups.setdefault(key, ([], []))[side].append(i)
+        return {k: (np.array(a, dtype=int), np.array(b, dtype=int)) for k, (a, b) in groups.items()}
+
+
+class _PairMarket:
+    """
+    Eligible supply on one pair as a function of its rate r (B per A).
+    """
+
+    def __init__(self, book: _OrderBook, sell_a: np.ndarray, sell_b: np.ndarray,
+                 curve_ab: _Curve, curve_ba: _Curve):
+        # Sellers of A accept r >= limit; sellers of B accept 1/r >= limit
+        order = np.argsort(book.limit[sell_a])
+        self.limits_a = book.limit[sell_a][order]
+        self.cum_a = np.concatenate(([0.0], np.cumsum(book.amount[sell_a][order])))
+        order = np.argsort(book.limit[sell_b])
+        self.limits_b = book.limit[sell_b][order]
+        self.cum_b = np.concatenate(([0.0], np.cumsum(book.amount[sell_b][order])))
+        self.curve_ab, self.curve_ba = curve_ab, curve_ba
+
+    def net_a(self, r: float) -> float:
+        """Excess supply of A when every eligible order is filled"""
+        supply_a = self.cum_a[np.searchsorted(self.limits_a, r * (1 + LIMIT_TOLERANCE), 'right')]
+        supply_b = self.cum_b[np.searchsorted(self.limits_b, (1 + LIMIT_TOLERANCE) / r, 'right')]
+        return supply_a - supply_b / r
+
+    def excess_rate(self, r: float) -> float:
+        """AMM-implied rate for the imbalance at r, minus r; decreasing in r"""
+        net = self.net_a(r)
+        if net > 0:
+            if not self.curve_ab or net > self.curve_ab.capacity:
+                return -math.inf
+            return self.curve_ab.output(net) / net - r
+        if net < 0:
+            excess_b = -net * r
+            if not self.curve_ba or excess_b > self.curve_ba.capacity:
+                return math.inf
+            received = self.curve_ba.output(excess_b)
+            return (excess_b / received if received > 0 else math.inf) - r
+        return 0.0
+
+    def clearing_rate(self, hint: float) -> float:
+        candidates = [hint] + self.limits_a.tolist()[:1] + self.limits_a.tolist()[-1:] + \
+            [1 / x for x in self.limits_b.tolist()[:1] + self.limits_b.tolist()[-1:] if x > 0]
+        candidates = [c for c in candidates if c > 0 and math.isfinite(c)]
+        lo, hi = min(candidates) / 4, max(candidates) * 4
+        for _ in range(80):
+            mid = math.sqrt(lo * hi)
+            if self.excess_rate(mid) > 0:
+                lo = mid
+            else:
+                hi = mid
+            if hi / lo - 1 < 1e-12:
+                break
+        return math.sqrt(lo * hi)
+
+
+def clearing_prices(
+    book: _OrderBook,
+    pools: List[AmmPool],
+    curves: Dict[Tuple[str, str], _Curve],
+    reference_prices: Dict[str, float] = None
+) -> Dict[str, float]:
+    """One price per token from per-pair clearing rates joined along a spanning tree"""
+    pairs = book.by_pair()
+    rates = {}
+    for (a, b), (sell_a, sell_b) in pairs.items():
+        market = _PairMarket(book, sell_a, sell_b, curves.get((a, b)), curves.get((b, a)))
+        hint = _pool_mid(pools, a, b)
+        rates[(a, b)] = market.clearing_rate(hint if hint else 1.0)
+
+    # Busiest pairs first; union-find keeps the tree acyclic
+    parent = {t: t for t in book.tokens}
+
+    def find(t):
+        while parent[t] != t:
+            parent[t] = parent[parent[t]]
+            t = parent[t]
+        return t
+
+    edges: Dict[str, List[Tuple[str, float]]] = {t: [] for t in book.tokens}
+    for (a, b) in sorted(pairs, key=lambda k: -(len(pairs[k][0]) + len(pairs[k][1]))):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[ra] = rb
+            edges[a].append((b, rates[(a, b)]))  # p_a / p_b = r
+            edges[b].append((a, 1 / rates[(a, b)]))
+
+    prices: Dict[str, float] = {}
+    for root in book.tokens:
+        if root in prices:
+            continue
+        component = {root: 1.0}
+        stack = [root]
+        while stack:
+            token = stack.pop()
+            for neighbour, ratio in edges[token]:
+                if neighbour not in component:
+                    component[neighbour] = component[token] / ratio
+                    stack.append(neighbour)
+        anchor = next((t for t in component if reference_prices and t in reference_prices), None)
+        scale = reference_prices[anchor] / component[anchor] if anchor else 1.0
+        prices.update({t: p * scale for t, p in component.items()})
+    return prices
+
+
+def _pool_mid(pools: List[AmmPool], a: str, b: str) -> Optional[float]:
+    """Liquidity-weighted marginal rate (b per a) over pools on the pair"""
+    weights, logs = 0.0, 0.0
+    for pool in pools:
+        if {pool.token0, pool.token1} == {a, b}:
+            reserve_a, reserve_b = pool.reserves(a)
+            weight = math.sqrt(reserve_a * reserve_b)
+            weights += weight
+            logs += weight * math.log(reserve_b / reserve_a)
+    return math.exp(logs / weights) if weights else None
+
+
+class BatchSolver:
+    """Clearing prices plus LP fills, with a greedy fallback past the deadline"""
+
+    def __init__(self, dex_fees: Dict[str, float] = None, segments: int = SEGMENTS):
+        self.dex_fees = dex_fees or {}
+        self.segments = segments
+
+    def solve(
+        self,
+        orders,
+        dex_liquidity: Dict[str, Dict[str, Sequence[float]]] = None,
+        deadline: float = 1.0,
+        reference_prices: Dict[str, float] = None,
+        method: str = 'lp',
+        now: datetime = None
+    ) -> BatchResult:
+        """
+        Args:
+            deadline: Seconds allowed for the LP before falling back to the greedy matcher
+            method: 'lp' or 'greedy'
+        """
+        started = time.perf_counter()
+        book = _OrderBook(orders, now or datetime.utcnow())
+        tokens = set(book.tokens)
+        pools = [p for p in parse_pools(dex_liquidity, self.dex_fees) if p.token0 in tokens and p.token1 in tokens]
+        segments = [s for i, pool in enumerate(pools) for token in (pool.token0, pool.token1)
+                    for s in pool_segments(i, pool, token, self.segments)]
+        by_direction: Dict[Tuple[str, str], List[Segment]] = {}
+        for segment in segments:
+            by_direction.setdefault((segment.token_in, segment.token_out), []).append(segment)
+        curves = {k: _Curve(v) for k, v in by_direction.items()}
+
+        if not len(book):
+            return BatchResult({}, {}, [], 0.0, method, time.perf_counter() - started)
+        prices = clearing_prices(book, pools, curves, reference_prices)
+
+        fills = amm_flows = None
+        used = method
+        if method == 'lp':
+            remaining = deadline - (time.perf_counter() - started)
+            if remaining > 0:
+                fills, amm_flows = self._solve_lp(book, segments, prices, remaining)
+            if fills is None:
+                logger.warning(f"Batch LP missed its {deadline:.3f}s deadline; using greedy matching")
+                used = 'greedy'
+        if fills is None:
+            fills, amm_flows = self._solve_greedy(book, curves, prices)
+
+        return self._result(book, pools, prices, fills, amm_flows, used, time.perf_counter() - started)
+
+    # ------------------------------------------------------------------
+
+    def _eligible(self, book: _OrderBook, prices: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        p_sell = np.array([prices[t] for t in book.sell])
+        p_buy = np.array([prices[t] for t in book.buy])
+        rate = p_sell / p_buy
+        eligible = rate >= book.limit * (1 - LIMIT_TOLERANCE)
+        return eligible, p_sell, rate
+
+    def _solve_lp(self, book: _OrderBook, segments: List[Segment], prices: Dict[str, float],
+                  time_limit: float) -> Tuple[Optional[np.ndarray], Optional[Dict]]:
+        eligible, p_sell, rate = self._eligible(book, prices)
+        index = np.flatnonzero(eligible)
+        token_row = {t: i for i, t in enumerate(book.tokens)}
+        n_orders, n_segments = len(index), len(segments)
+
+        # Variables are values in price units: v_i = x_i * p_sell, w_k = a_k * p_in
+        surplus = 1 - book.limit[index] / rate[index]
+        cost = np.concatenate((-(np.maximum(surplus, 0) + VOLUME_WEIGHT), np.full(n_segments, AMM_PENALTY)))
+        upper = np.concatenate((book.amount[index] * p_sell[index],
+                                [s.width * prices[s.token_in] for s in segments]))
+
+        # Token rows: value paid out minus value taken in must be <= 0
+        sell_rows = [token_row[book.sell[i]] for i in index]
+        buy_rows = [token_row[book.buy[i]] for i in index]
+        columns = np.arange(n_orders)
+        rows = [buy_rows, sell_rows]
+        cols = [columns, columns]
+        data = [np.ones(n_orders), -np.ones(n_orders)]
+        if n_segments:
+            seg_cols = n_orders + np.arange(n_segments)
+            rows += [[token_row[s.token_in] for s in segments], [token_row[s.token_out] for s in segments]]
+            cols += [seg_cols, seg_cols]
+            data += [np.ones(n_segments),
+                     -np.array([s.rate * prices[s.token_out] / prices[s.token_in] for s in segments])]
+        matrix = sparse.csr_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(len(book.tokens), n_orders + n_segments)
+        )
+
+        result = linprog(
+            cost, A_ub=matrix, b_ub=np.zeros(len(book.tokens)),
+            bounds=np.column_stack((np.zeros(len(upper)), upper)),
+            method='highs', options={'time_limit': max(time_limit, 1e-3)}
+        )
+        if result.status != 0 or result.x is None:
+            logger.info(f"Batch LP stopped without an optimum: {result.message}")
+            return None, None
+
+        fills = np.zeros(len(book))
+        fills[index] = np.minimum(result.x[:n_orders] / p_sell[index], book.amount[index])
+        flows: Dict[Tuple[int, str], float] = {}
+        for segment, value in zip(segments, result.x[n_orders:]):
+            if value > 0:
+                key = (segment.pool, segment.token_in)
+                flows[key] = flows.get(key, 0.0) + float(value) / prices[segment.token_in]
+        return self._trim(book, fills, flows, prices)
+
+    def _solve_greedy(self, book: _OrderBook, curves: Dict[Tuple[str, str], _Curve],
+                      prices: Dict[str, float]) -> Tuple[np.ndarray, Dict]:
+        """Per pair: match both sides, route the larger side's excess through the pair's pools"""
+        eligible, p_sell, rate = self._eligible(book, prices)
+        fills = np.zeros(len(book))
+        flows: Dict[Tuple[int, str], float] = {}
+
+        for (a, b), sides in book.by_pair().items():
+            sides = [s[eligible[s]] for s in sides]
+            values = [float((book.amount[s] * p_sell[s]).sum()) for s in sides]
+            big = 0 if values[0] >= values[1] else 1
+            small = 1 - big
+            token_big, token_small = (a, b) if big == 0 else (b, a)
+
+            fills[sides[small]] = book.amount[sides[small]]
+            routed = 0.0
+            curve = curves.get((token_big, token_small))
+            excess = (values[big] - values[small]) / prices[token_big]
+            if curve and excess > 0:
+                routed = min(excess, curve.max_input_at(prices[token_big] / prices[token_small]))
+                for pool, amount in curve.allocate(routed).items():
+                    flows[(pool, token_big)] = flows.get((pool, token_big), 0.0) + amount
+
+            # Best limit first on the larger side
+            budget = values[small] + routed * prices[token_big]
+            order = sides[big][np.argsort(book.limit[sides[big]] / rate[sides[big]])]
+            for i in order:
+                if budget <= 0:
+                    break
+                value = min(book.amount[i] * p_sell[i], budget)
+                fills[i] = value / p_sell[i]
+                budget -= value
+        return self._trim(book, fills, flows, prices)
+
+    def _trim(self, book: _OrderBook, fills: np.ndarray, flows: Dict, prices: Dict[str, float]):
+        """Drop dust so solver tolerances never show up as fills or pool calls"""
+        fills = np.where(fills > book.amount * 1e-12, fills, 0.0)
+        flows = {k: v for k, v in flows.items() if v * prices[k[1]] > 1e-12}
+        return fills, flows
+
+    def _result(self, book: _OrderBook, pools: List[AmmPool], prices: Dict[str, float],
+                fills: np.ndarray, flows: Dict, method: str, elapsed: float) -> BatchResult:
+        _, p_sell, rate = self._eligible(book, prices)
+        balance = {t: 0.0 for t in book.tokens}
+        result_fills = {}
+        surplus = 0.0
+        for i in np.flatnonzero(fills):
+            amount_in = float(fills[i])
+            amount_out = amount_in * float(rate[i])
+            result_fills[book.ids[i]] = (amount_in, amount_out)
+            balance[book.sell[i]] += amount_in
+            balance[book.buy[i]] -= amount_out
+            surplus += (amount_out - amount_in * book.limit[i]) * prices[book.buy[i]]
+
+        amm_trades = []
+        for (pool_index, token_in), amount_in in sorted(flows.items()):
+            pool = pools[pool_index]
+            token_out = pool.other(token_in)
+            amount_out = float(pool.output(token_in, amount_in))
+            balance[token_in] -= amount_in
+            balance[token_out] += amount_out
+            amm_trades.append({
+                'dex': pool.dex,
+                'pool': f"{pool.token0}/{pool.token1}",
+                'token_in': token_in,
+                'token_out': token_out,
+                'amount_in': amount_in,
+                'amount_out': amount_out,
+            })
+        return BatchResult(prices, result_fills, amm_trades, surplus, method, elapsed, balance)
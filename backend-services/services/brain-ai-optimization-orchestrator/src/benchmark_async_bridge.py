@@ -0,0 +1,160 @@
+"""
+Alpha-Orion Async Bridge Benchmark
+
+Serves two Flask routes that fan out to a local upstream venue stub over
+aiohttp: one builds and closes an event loop (and session) per request as
+the handlers used to, the other submits to the persistent AsyncBridge and
+reuses its shared session. A threaded load generator drives each route and
+reports throughput and latency.
+
+Usage:
+    python benchmark_async_bridge.py
+    python benchmark_async_bridge.py --requests 2000 --clients 16 --fanout 8
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import numpy as np
+import requests
+from aiohttp import web
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+from async_bridge import AsyncBridge
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+logging.getLogger('async_bridge').setLevel(logging.WARNING)
+
+
+def start_upstream():
+    """Venue stub on its own loop; returns its base URL"""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    address = {}
+
+    async def quote(request):
+        return web.json_response({'price': 2500.0})
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get('/quote/{venue}', quote)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        address['port'] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{address['port']}"
+
+
+async def scan(session, upstream, fanout):
+    async def one(i):
+        async with session.get(f'{upstream}/quote/{i}') as resp:
+            return (await resp.json())['price']
+    return await asyncio.gather(*(one(i) for i in range(fanout)))
+
+
+def build_app(upstream, bridge, fanout):
+    app = Flask(__name__)
+
+    @app.route('/per-request-loop')
+    def per_request_loop():
+        async def run():
+            async with aiohttp.ClientSession() as session:
+                return await scan(session, upstream, fanout)
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            prices = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        return jsonify({'quotes': len(prices)})
+
+    @app.route('/bridge')
+    def bridged():
+        async def run():
+            return await scan(await bridge.session('upstream'), upstream, fanout)
+
+        prices = bridge.run(run(), timeout=10)
+        return jsonify({'quotes': len(prices)})
+
+    return app
+
+
+def load(base, route, count, clients):
+    local = threading.local()
+
+    def call(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        resp = session.get(f'{base}{route}', timeout=30)
+        resp.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = list(pool.map(call, range(count)))
+    return count / (time.perf_counter() - start), latencies
+
+
+def report(name, throughput, latencies):
+    ms = np.asarray(latencies) * 1000
+    logging.info(
+        f"{name:>17}: {throughput:8.1f} req/s | p50 {np.percentile(ms, 50):7.2f}ms "
+        f"p99 {np.percentile(ms, 99):7.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask async route throughput benchmark")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--fanout', type=int, default=4, help="Upstream calls per request")
+    parser.add_argument('--warmup', type=int, default=50)
+    args = parser.parse_args()
+
+    upstream = start_upstream()
+    bridge = AsyncBridge().start()
+    server = make_server('127.0.0.1', 0, build_app(upstream, bridge, args.fanout), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    try:
+        for name, route in (('per-request loop', '/per-request-loop'), ('async bridge', '/bridge')):
+            load(base, route, args.warmup, args.clients)
+            report(name, *load(base, route, args.requests, args.clients))
+        logging.info(f"bridge stats: {bridge.snapshot()}")
+    finally:
+        server.shutdown()
+        bridge.shutdown()
+
+
+if __name__ == "__main__":
+    main()
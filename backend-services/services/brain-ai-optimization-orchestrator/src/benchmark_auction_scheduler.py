@@ -0,0 +1,101 @@
+"""
+Alpha-Orion Auction Scheduler Benchmark
+
+Opens many concurrent batch auctions on the real event loop and reports how
+far each close fired after its deadline, for the timer wheel, for bare
+event-loop timers (the host's noise floor) and for the one-second polling
+loop the engine used before.
+
+Usage:
+    python benchmark_auction_scheduler.py
+    python benchmark_auction_scheduler.py --auctions 1000 --window 3 --skip-polling
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+import numpy as np
+
+from batch_auction_arbitrage import BatchAuctionEngine
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+logging.getLogger('batch_auction_arbitrage').setLevel(logging.ERROR)
+
+
+def report(name, lags):
+    lags_ms = np.asarray(lags) * 1000
+    logging.info(
+        f"{name:>12}: {len(lags_ms)} closes, lag p50 {np.percentile(lags_ms, 50):7.2f}ms "
+        f"p99 {np.percentile(lags_ms, 99):7.2f}ms max {lags_ms.max():7.2f}ms"
+    )
+
+
+async def run_timer_wheel(durations):
+    engine = BatchAuctionEngine()
+    engine.solve_window = 60
+    auctions = [engine.open_auction(duration=float(d), rollover=False) for d in durations]
+    runner = asyncio.create_task(engine.scheduler.run())
+    await asyncio.sleep(float(max(durations)) + 0.1)
+    engine.scheduler.stop()
+    await runner
+    return [a.closed_at - a.close_at for a in auctions]
+
+
+async def run_loop_timers(durations):
+    # Noise floor: one native event-loop timer per deadline, no auction work
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    lags = []
+    for duration in durations:
+        deadline = start + float(duration)
+        loop.call_at(deadline, lambda deadline=deadline: lags.append(loop.time() - deadline))
+    await asyncio.sleep(float(max(durations)) + 0.1)
+    return lags
+
+
+async def run_polling(durations, interval):
+    start = time.monotonic()
+    deadlines = start + np.asarray(durations)
+    closed = np.full(len(deadlines), np.nan)
+    while np.isnan(closed).any():
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        closed[np.isnan(closed) & (deadlines <= now)] = now
+    return (closed - deadlines).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auction close-time jitter benchmark")
+    parser.add_argument('--auctions', type=int, default=1000)
+    parser.add_argument('--window', type=float, default=3.0, help="Close deadlines spread over this many seconds")
+    parser.add_argument('--burst', type=int, default=100, help="Extra auctions sharing a single deadline")
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--skip-polling', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    durations = np.concatenate([
+        rng.uniform(0.5, 0.5 + args.window, args.auctions),
+        np.full(args.burst, 0.5 + args.window / 2)
+    ])
+
+    report('timer wheel', asyncio.run(run_timer_wheel(durations)))
+    report('loop timers', asyncio.run(run_loop_timers(durations)))
+    if not args.skip_polling:
+        report(f'poll {args.poll_interval:g}s', asyncio.run(run_polling(durations, args.poll_interval)))
+
+
+if __name__ == "__main__":
+    main()
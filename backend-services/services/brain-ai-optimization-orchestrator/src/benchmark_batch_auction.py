@@ -0,0 +1,87 @@
+"""
+Alpha-Orion Batch Auction Solver Benchmark
+
+Solves random batches at several sizes with the HiGHS LP and the greedy
+fallback, and reports solve time, fill rate and user surplus.
+
+Usage:
+    python benchmark_batch_auction.py
+    python benchmark_batch_auction.py --orders 100 1000 10000 --tokens 12 --deadline 2
+"""
+
+import argparse
+import logging
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from batch_auction_arbitrage import BatchOrder, LinearProgrammingSolver
+from batch_auction_solver import BatchSolver
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+logging.getLogger('batch_auction_solver').setLevel(logging.WARNING)
+
+
+def make_batch(num_orders, num_tokens, seed=0):
+    rng = np.random.default_rng(seed)
+    tokens = [f"TOKEN{i}" for i in range(num_tokens)]
+    market = dict(zip(tokens, np.exp(rng.uniform(-3, 10, num_tokens)).tolist()))
+    deadline = datetime.utcnow() + timedelta(hours=1)
+
+    sells = rng.integers(0, num_tokens, num_orders)
+    buys = (sells + rng.integers(1, num_tokens, num_orders)) % num_tokens
+    values = rng.lognormal(8, 1.5, num_orders)
+    slack = rng.uniform(0.97, 1.02, num_orders)
+    orders = []
+    for i in range(num_orders):
+        sell, buy = tokens[sells[i]], tokens[buys[i]]
+        amount_in = values[i] / market[sell]
+        limit = market[sell] / market[buy] * slack[i]
+        orders.append(BatchOrder(f"o{i}", sell, buy, amount_in, amount_in * limit, "0x0", deadline))
+
+    liquidity = {}
+    for dex in ('uniswap_v2', 'sushiswap', 'balancer'):
+        markets = {}
+        for a in range(num_tokens):
+            for b in range(a + 1, num_tokens):
+                if rng.random() < 0.5:
+                    depth = rng.lognormal(14, 1)
+                    markets[f"{tokens[a]}/{tokens[b]}"] = (
+                        depth / market[tokens[a]], depth * rng.uniform(0.995, 1.005) / market[tokens[b]]
+                    )
+        liquidity[dex] = markets
+    return orders, liquidity
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch auction solver benchmark")
+    parser.add_argument('--orders', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--tokens', type=int, default=8)
+    parser.add_argument('--deadline', type=float, default=5.0, help="LP time limit in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    solver = BatchSolver(LinearProgrammingSolver().dex_fees)
+    for num_orders in args.orders:
+        orders, liquidity = make_batch(num_orders, args.tokens, args.seed)
+        lp = solver.solve(orders, liquidity, deadline=args.deadline)
+        greedy = solver.solve(orders, liquidity, method='greedy')
+        logging.info(
+            f"{num_orders:>6} orders: {lp.method} {lp.solve_time * 1000:8.1f}ms "
+            f"filled {len(lp.fills) / num_orders:6.1%} surplus {lp.surplus:12,.0f} "
+            f"amm {len(lp.amm_trades):3d} | greedy {greedy.solve_time * 1000:8.1f}ms "
+            f"filled {len(greedy.fills) / num_orders:6.1%} surplus {greedy.surplus:12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
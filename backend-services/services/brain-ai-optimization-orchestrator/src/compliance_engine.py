@@ -13,6 +13,7 @@ Provides:
 import asyncio
 import logging
 import json
+import os
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
@@ -20,6 +21,9 @@ from typing import Dict, List, Optional, Tuple
 from hashlib import sha256
 import hashlib
 
+from audit_log import SegmentedAuditLog, verify_proof
+from velocity_index import WalletActivity, WalletVelocityIndex
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -108,7 +112,7 @@ class ComplianceAlert:
     wallet_address: str
     tx_hash: str
     description: str
-    timestamp: datetime
+    timestamp: datetime = field(default_factory=datetime.utcnow)
     status: str = "OPEN"  # OPEN, INVESTIGATING, RESOLVED, ESCALATED
     assigned_to: Optional[str] = None
     resolution: Optional[str] = None
@@ -242,9 +246,17 @@ class TransactionMonitor:
     VELOCITY_MAX_TRANSACTIONS = 10
     VELOCITY_MAX_VOLUME = 50000  # $50K in 24h
     
-    def __init__(self):
-        self.transaction_history: List[TransactionRecord] = []
+    def __init__(self, max_wallets: int = 100000):
         self.alert_rules: Dict[str, Dict] = self._default_rules()
+        self.velocity_index = WalletVelocityIndex(
+            near_threshold=(
+                self.alert_rules["structuring"]["threshold_usd"],
+                self.alert_rules["large_transaction"]["threshold_usd"]
+            ),
+            max_wallets=max_wallets
+        )
+        self.transactions_monitored = 0
+        self.flagged_transactions = 0
         self.chainalysis = ChainalysisIntegration()
         self.trm = TRMLabsIntegration()
         
@@ -259,6 +271,7 @@ class TransactionMonitor:
                 "enabled": True
             },
             "velocity": {
+                "max_transactions_per_minute": 5,
                 "max_transactions_per_day": 10,
                 "max_volume_per_day_usd": 50000,
                 "severity": AlertSeverity.HIGH,
@@ -266,10 +279,16 @@ class TransactionMonitor:
             },
             "structuring": {
                 "threshold_usd": 9000,  # Just under $10K reporting threshold
-                "time_window_hours": 24,
+                "window": "24h",
+                "min_transactions": 2,
                 "severity": AlertSeverity.CRITICAL,
                 "enabled": True
             },
+            "round_trip": {
+                "window": "1h",  # Funds sent back to a wallet they just came from
+                "severity": AlertSeverity.HIGH,
+                "enabled": True
+            },
             "sanctions": {
                 "severity": AlertSeverity.CRITICAL,
                 "enabled": True
@@ -288,8 +307,8 @@ class TransactionMonitor:
         """
         alerts = []
         
-        # Store transaction
-        self.transaction_history.append(tx)
+        # Index transaction
+        activity = self.record_transaction(tx)
         
         # Run screening
         screening = await self.chainalysis.screen_address(tx.wallet_address)
@@ -320,40 +339,90 @@ class TransactionMonitor:
                 description=f"Large transaction: ${tx.amount_usd:,.2f}"
             ))
         
-        # Check velocity
-        recent_txs = self._get_recent_transactions(tx.wallet_address)
-        recent_volume = sum(t.amount_usd for t in recent_txs)
+        alerts.extend(self._check_patterns(tx, activity))
         
-        if len(recent_txs) >= self.alert_rules["velocity"]["max_transactions_per_day"]:
-            alerts.append(ComplianceAlert(
-                alert_id=self._generate_alert_id(),
-                alert_type=AlertType.VELOCITY_BREACH,
-                severity=AlertSeverity.HIGH,
-                wallet_address=tx.wallet_address,
-                tx_hash=tx.tx_hash,
-                description=f"High velocity: {len(recent_txs)} transactions in 24h"
-            ))
+        # Update compliance status
+        if alerts:
+            tx.compliance_status = "FLAGGED"
+            self.flagged_transactions += 1
+        else:
+            tx.compliance_status = "CLEAR"
+        
+        logger.info(f"Monitored transaction {tx.tx_hash[:16]}... - {tx.compliance_status}")
+        
+        return alerts
+    
+    def record_transaction(self, tx: TransactionRecord) -> WalletActivity:
+        """Add a transaction to the velocity index"""
+        self.transactions_monitored += 1
+        return self.velocity_index.record(
+            tx.wallet_address,
+            tx.timestamp,
+            tx.amount_usd,
+            sent_to=tx.to_address if tx.direction == "OUT" else None,
+            received_from=tx.from_address if tx.direction == "IN" else None,
+            payload=tx
+        )
+    
+    def _check_patterns(
+        self,
+        tx: TransactionRecord,
+        activity: WalletActivity
+    ) -> List[ComplianceAlert]:
+        """Velocity, structuring and round-trip rules over the wallet's windows"""
+        alerts = []
+        
+        velocity = self.alert_rules["velocity"]
+        if velocity["enabled"]:
+            day = activity.window("24h")
+            minute = activity.window("1m")
+            breaches = []
+            if day.count >= velocity["max_transactions_per_day"]:
+                breaches.append(f"{day.count} transactions in 24h")
+            if day.volume > velocity["max_volume_per_day_usd"]:
+                breaches.append(f"${day.volume:,.2f} volume in 24h")
+            if minute.count >= velocity["max_transactions_per_minute"]:
+                breaches.append(f"{minute.count} transactions in 1m")
+            if breaches:
+                alerts.append(ComplianceAlert(
+                    alert_id=self._generate_alert_id(),
+                    alert_type=AlertType.VELOCITY_BREACH,
+                    severity=velocity["severity"],
+                    wallet_address=tx.wallet_address,
+                    tx_hash=tx.tx_hash,
+                    description=f"High velocity: {', '.join(breaches)}"
+                ))
         
         # Check for structuring
-        near_threshold = [t for t in recent_txs 
-                         if 9000 <= t.amount_usd < 10000]
-        if len(near_threshold) >= 2:
+        structuring = self.alert_rules["structuring"]
+        near_threshold = activity.window(structuring["window"]).near_threshold
+        if structuring["enabled"] and near_threshold >= structuring["min_transactions"]:
             alerts.append(ComplianceAlert(
                 alert_id=self._generate_alert_id(),
                 alert_type=AlertType.STRUCTURING,
-                severity=AlertSeverity.CRITICAL,
+                severity=structuring["severity"],
                 wallet_address=tx.wallet_address,
                 tx_hash=tx.tx_hash,
-                description=f"Potential structuring: {len(near_threshold)} near-$10K transactions"
+                description=f"Potential structuring: {near_threshold} near-$10K transactions"
             ))
         
-        # Update compliance status
-        if alerts:
-            tx.compliance_status = "FLAGGED"
-        else:
-            tx.compliance_status = "CLEAR"
-        
-        logger.info(f"Monitored transaction {tx.tx_hash[:16]}... - {tx.compliance_status}")
+        round_trip = self.alert_rules["round_trip"]
+        if round_trip["enabled"]:
+            window = activity.window(round_trip["window"])
+            counterparty = None
+            if tx.direction == "OUT" and tx.to_address in window.received_from:
+                counterparty = tx.to_address
+            elif tx.direction == "IN" and tx.from_address in window.sent_to:
+                counterparty = tx.from_address
+            if counterparty:
+                alerts.append(ComplianceAlert(
+                    alert_id=self._generate_alert_id(),
+                    alert_type=AlertType.UNUSUAL_PATTERN,
+                    severity=round_trip["severity"],
+                    wallet_address=tx.wallet_address,
+                    tx_hash=tx.tx_hash,
+                    description=f"Round trip with {counterparty} within {round_trip['window']}"
+                ))
         
         return alerts
     
@@ -365,9 +434,8 @@ class TransactionMonitor:
         """Get recent transactions for a wallet"""
         cutoff = datetime.utcnow() - timedelta(hours=hours)
         return [
-            tx for tx in self.transaction_history
-            if tx.wallet_address == wallet_address
-            and tx.timestamp >= cutoff
+            tx for tx in self.velocity_index.recent_records(wallet_address)
+            if tx.timestamp >= cutoff
         ]
     
     def _generate_alert_id(self) -> str:
@@ -380,16 +448,25 @@ class TransactionMonitor:
 class AuditTrail:
     """
     Immutable audit trail for all system actions.
-    Uses blockchain-like hashing for tamper detection.
+    Records are appended to segment files sealed with chained Merkle roots.
+    The directory comes from AUDIT_LOG_DIR unless passed in; there is no
+    default, since a temp directory would lose the trail on reboot.
     """
     
-    def __init__(self):
-        self.chain: List[Dict] = []
-        self.pending_batch: List[Dict] = []
-        self.batch_size = 100
-        self.batch_timeout_seconds = 300  # 5 minutes
+    def __init__(self, directory: str = None, segment_size: int = 1000, sync_writes: bool = False):
+        directory = directory or os.getenv("AUDIT_LOG_DIR")
+        if not directory:
+            raise RuntimeError("AUDIT_LOG_DIR must be set to a persistent directory for the audit trail")
+        self.log = SegmentedAuditLog(
+            directory,
+            segment_size=segment_size,
+            sync_writes=sync_writes
+        )
         
-        logger.info("AuditTrail initialized")
+        logger.info(f"AuditTrail initialized with {len(self.log)} records")
+    
+    def __len__(self) -> int:
+        return len(self.log)
     
     def record_action(
         self,
@@ -419,66 +496,27 @@ class AuditTrail:
             }
         }
         
-        # Generate hash (includes previous hash for chain)
-        if self.chain:
-            prev_hash = self.chain[-1]["hash"]
-        else:
-            prev_hash = "0" * 64
-        
-        record["previous_hash"] = prev_hash
-        record["hash"] = self._compute_hash(record)
-        
-        self.pending_batch.append(record)
-        
-        # Flush if batch is full or timeout reached
-        if len(self.pending_batch) >= self.batch_size:
-            self._flush_batch()
-        
-        return record["hash"]
+        return self.log.append(record)["hash"]
     
-    def _compute_hash(self, record: Dict) -> str:
-        """Compute SHA-256 hash of a record"""
-        content = json.dumps(record, sort_keys=True)
-        return sha256(content.encode()).hexdigest()
-    
-    def _flush_batch(self):
-        """Flush pending batch to main chain"""
-        self.chain.extend(self.pending_batch)
-        self.pending_batch = []
-        logger.info(f"Flushed audit batch: {len(self.chain)} total records")
-    
-    def verify_integrity(self) -> Tuple[bool, List[Dict]]:
+    def verify_integrity(self, full: bool = False) -> Tuple[bool, List[Dict]]:
         """
         Verify audit trail integrity.
         
+        Only segments sealed since the last successful check are re-read
+        unless full is set.
+        
         Returns:
             Tuple[is_valid, list_of_invalid_records]
         """
-        invalid = []
-        
-        for i, record in enumerate(self.chain):
-            # Verify hash
-            expected_hash = self._compute_hash({
-                k: v for k, v in record.items() 
-                if k != "hash"
-            })
-            
-            if record["hash"] != expected_hash:
-                invalid.append({
-                    "index": i,
-                    "reason": "Hash mismatch",
-                    "hash": record["hash"]
-                })
-            
-            # Verify chain
-            if i > 0 and record["previous_hash"] != self.chain[i-1]["hash"]:
-                invalid.append({
-                    "index": i,
-                    "reason": "Chain break",
-                    "previous_hash": record["previous_hash"]
-                })
-        
-        return len(invalid) == 0, invalid
+        return self.log.verify(full=full)
+    
+    def get_proof(self, sequence: int) -> Optional[Dict]:
+        """Merkle inclusion proof for a record, once its segment is sealed"""
+        return self.log.proof(sequence)
+    
+    @staticmethod
+    def verify_proof(record: Dict, proof: Dict) -> bool:
+        return verify_proof(record, proof)
     
     def get_records(
         self,
@@ -489,23 +527,13 @@ class AuditTrail:
         limit: int = 1000
     ) -> List[Dict]:
         """Query audit records with filters"""
-        results = self.chain
-        
-        if actor:
-            results = [r for r in results if r["actor"] == actor]
-        
-        if action_type:
-            results = [r for r in results if r["action_type"] == action_type]
-        
-        if start_time:
-            results = [r for r in results 
-                      if datetime.fromisoformat(r["timestamp"]) >= start_time]
-        
-        if end_time:
-            results = [r for r in results 
-                      if datetime.fromisoformat(r["timestamp"]) <= end_time]
-        
-        return results[-limit:]
+        return self.log.query(
+            actor=actor,
+            action_type=action_type,
+            start_time=start_time,
+            end_time=end_time,
+            limit=limit
+        )
 
 
 class SARFilingSystem:
@@ -775,11 +803,9 @@ class ComplianceManager:
         """Generate compliance status report"""
         return {
             "timestamp": datetime.utcnow().isoformat(),
-            "audit_chain_length": len(self.audit_trail.chain),
-            "pending_alerts": len([
-                a for a in self.transaction_monitor.transaction_history
-                if a.compliance_status == "FLAGGED"
-            ]),
+            "audit_chain_length": len(self.audit_trail),
+            "audit_segments_sealed": len(self.audit_trail.log.seals),
+            "pending_alerts": self.transaction_monitor.flagged_transactions,
             "filed_sars": len(self.sar_system.filed_sars),
             "draft_sars": len(self.sar_system.draft_sars),
             "blocked_wallets": sum(
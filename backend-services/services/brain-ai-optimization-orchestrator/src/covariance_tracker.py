@@ -0,0 +1,216 @@
+"""
+Alpha-Orion Streaming Covariance Tracker
+EWMA covariance matrix maintained incrementally from price ticks
+
+Writers update the working matrix under a lock in O(k^2) for the k assets in a
+tick. Readers get an immutable snapshot that is only rebuilt when the matrix has
+changed, so Flask routes can read it while a feed thread keeps writing.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import stats
+
+
+@dataclass(frozen=True)
+class CovarianceSnapshot:
+    """Read-only view of the EWMA covariance at one version"""
+    symbols: Tuple[str, ...]
+    index: Dict[str, int]
+    covariance: np.ndarray
+    observations: np.ndarray
+    version: int
+    timestamp: float
+
+    def covers(self, symbols: List[str], min_observations: int = 1) -> bool:
+        return all(
+            s in self.index and self.observations[self.index[s]] >= min_observations
+            for s in symbols
+        )
+
+    def volatility(self, symbol: str) -> float:
+        i = self.index[symbol]
+        return math.sqrt(self.covariance[i, i])
+
+    def sub_covariance(self, symbols: List[str]) -> np.ndarray:
+        idx = [self.index[s] for s in symbols]
+        return self.covariance[np.ix_(idx, idx)]
+
+    def correlation_matrix(self, symbols: List[str] = None) -> np.ndarray:
+        cov = self.sub_covariance(symbols) if symbols is not None else self.covariance
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        corr = np.nan_to_num(corr)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    def correlation_dict(self, symbols: List[str] = None) -> Dict[str, Dict[str, float]]:
+        symbols = list(symbols) if symbols is not None else list(self.symbols)
+        corr = self.correlation_matrix(symbols)
+        return {a: dict(zip(symbols, map(float, row))) for a, row in zip(symbols, corr)}
+
+    def _weights(self, exposures: Dict[str, float]) -> Tuple[List[str], np.ndarray]:
+        symbols = [s for s in exposures if s in self.index]
+        return symbols, np.array([exposures[s] for s in symbols], dtype=float)
+
+    def portfolio_volatility(self, exposures: Dict[str, float]) -> float:
+        """Portfolio standard deviation per tick interval, in exposure units"""
+        symbols, w = self._weights(exposures)
+        if not symbols:
+            return 0.0
+        return math.sqrt(max(w @ self.sub_covariance(symbols) @ w, 0.0))
+
+    def marginal_var(self, exposures: Dict[str, float], confidence: float = 0.95) -> Dict[str, float]:
+        """dVaR/dw_i for parametric VaR"""
+        symbols, w = self._weights(exposures)
+        if not symbols:
+            return {}
+        cov = self.sub_covariance(symbols)
+        sigma = math.sqrt(max(w @ cov @ w, 0.0))
+        if sigma == 0:
+            return {s: 0.0 for s in symbols}
+        z = stats.norm.ppf(confidence)
+        return dict(zip(symbols, map(float, z * (cov @ w) / sigma)))
+
+    def component_var(self, exposures: Dict[str, float], confidence: float = 0.95) -> Dict[str, float]:
+        """Euler allocation of parametric VaR; components sum to portfolio VaR"""
+        marginal = self.marginal_var(exposures, confidence)
+        return {s: exposures[s] * m for s, m in marginal.items()}
+
+    def to_dict(self) -> Dict:
+        return {
+            'symbols': list(self.symbols),
+            'volatilities': {s: self.volatility(s) for s in self.symbols},
+            'correlation_matrix': self.correlation_dict(),
+            'version': self.version,
+            'timestamp': self.timestamp,
+        }
+
+
+class EWMACovarianceTracker:
+    """RiskMetrics-style EWMA covariance over a growable asset index"""
+
+    def __init__(self, decay: float = 0.94, initial_capacity: int = 16,
+                 initial_variance: Optional[float] = None):
+        self.decay = decay
+        self.initial_variance = initial_variance
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._free_slots: List[int] = []
+        self._capacity = initial_capacity
+        self._cov = np.zeros((initial_capacity, initial_capacity))
+        self._observations = np.zeros(initial_capacity, dtype=np.int64)
+        self._last_prices: Dict[str, float] = {}
+
+        self._version = 0
+        self._snapshot: Optional[CovarianceSnapshot] = None
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._index)
+
+    def _grow(self):
+        capacity = self._capacity * 2
+        cov = np.zeros((capacity, capacity))
+        cov[:self._capacity, :self._capacity] = self._cov
+        observations = np.zeros(capacity, dtype=np.int64)
+        observations[:self._capacity] = self._observations
+        self._free_slots.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity, self._cov, self._observations = capacity, cov, observations
+
+    def _add_locked(self, symbol: str) -> int:
+        if not self._free_slots and len(self._index) >= self._capacity:
+            self._grow()
+        slot = self._free_slots.pop() if self._free_slots else len(self._index)
+
+        # Seed with the average variance seen so far until the asset has its own history
+        variance = self.initial_variance
+        if variance is None:
+            active = [i for i in self._index.values() if self._observations[i] > 0]
+            variance = float(np.mean(self._cov[active, active])) if active else 0.0
+        self._cov[slot, :] = 0.0
+        self._cov[:, slot] = 0.0
+        self._cov[slot, slot] = variance
+        self._observations[slot] = 0
+        self._index[symbol] = slot
+        return slot
+
+    def add_asset(self, symbol: str):
+        with self._lock:
+            if symbol not in self._index:
+                self._add_locked(symbol)
+                self._version += 1
+
+    def remove_asset(self, symbol: str):
+        with self._lock:
+            slot = self._index.pop(symbol, None)
+            if slot is None:
+                return
+            self._cov[slot, :] = 0.0
+            self._cov[:, slot] = 0.0
+            self._observations[slot] = 0
+            self._last_prices.pop(symbol, None)
+            self._free_slots.append(slot)
+            self._version += 1
+
+    def _update_locked(self, returns: Dict[str, float]):
+        idx = np.array([self._index[s] if s in self._index else self._add_locked(s) for s in returns])
+        r = np.fromiter(returns.values(), dtype=float, count=len(returns))
+        block = np.ix_(idx, idx)
+        self._cov[block] = self.decay * self._cov[block] + (1 - self.decay) * np.outer(r, r)
+        self._observations[idx] += 1
+        self._version += 1
+
+    def update_returns(self, returns: Dict[str, float]):
+        """Fold one tick of simultaneous returns into the matrix"""
+        if not returns:
+            return
+        with self._lock:
+            self._update_locked(returns)
+
+    def update_prices(self, prices: Dict[str, float]):
+        """Convert a price tick to log returns against the previous tick"""
+        with self._lock:
+            returns = {}
+            for symbol, price in prices.items():
+                if price <= 0:
+                    continue
+                last = self._last_prices.get(symbol)
+                if last:
+                    returns[symbol] = math.log(price / last)
+                self._last_prices[symbol] = price
+            if returns:
+                self._update_locked(returns)
+
+    def snapshot(self) -> CovarianceSnapshot:
+        """Latest immutable snapshot; rebuilt only if the matrix changed"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.version == self._version:
+                return self._snapshot
+            symbols = tuple(self._index)
+            slots = [self._index[s] for s in symbols]
+            covariance = self._cov[np.ix_(slots, slots)].copy()
+            observations = self._observations[slots].copy()
+            covariance.flags.writeable = False
+            observations.flags.writeable = False
+            snapshot = CovarianceSnapshot(
+                symbols=symbols,
+                index={s: i for i, s in enumerate(symbols)},
+                covariance=covariance,
+                observations=observations,
+                version=self._version,
+                timestamp=time.time(),
+            )
+            self._snapshot = snapshot
+            return snapshot
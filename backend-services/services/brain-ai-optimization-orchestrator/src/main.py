@@ -8,7 +8,7 @@ Date: February 10, 2026
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-import asyncio
+import atexit
 import os
 import json
 import logging
@@ -35,6 +35,10 @@ from perpetuals_arbitrage_scanner import PerpetualsArbitrageScanner
 from gamma_scalping_manager import GammaScalpingManager
 from delta_neutral_manager import DeltaNeutralManager
 from advanced_risk_engine import AdvancedRiskEngine, RiskMetrics
+from async_bridge import AsyncBridge, BridgeTimeout
+from metrics_pipeline import (
+    COUNTER, GAUGE, CloudMonitoringExporter, FileExporter, HttpExporter, MetricsPipeline, PrometheusExporter
+)
 
 # Import Apex Optimizer
 from apex_optimizer import apex_optimizer, start_apex_optimizer
@@ -97,42 +101,42 @@ def get_redis_connection():
             redis_conn = None
     return redis_conn
 
+# ============ ASYNC BRIDGE ============
+# One persistent event loop for async work from Flask handlers
+async_bridge = AsyncBridge(default_timeout=float(os.getenv('ASYNC_BRIDGE_TIMEOUT', '30'))).start()
+atexit.register(async_bridge.shutdown)
+
 # ============ ML SIGNAL GENERATOR ============
 arbitrage_scanner = None
 
 def get_arbitrage_scanner():
     global arbitrage_scanner
     if arbitrage_scanner is None and ENABLE_ML_PIPELINE:
-        arbitrage_scanner = ArbitrageScanner()
+        arbitrage_scanner = ArbitrageScanner(bridge=async_bridge)
     return arbitrage_scanner
 
 # ============ METRICS ============
-def record_metric(metric_name: str, value: float, labels: dict = None):
-    """Record custom metric to Cloud Monitoring"""
-    if not GCP_AVAILABLE:
-        return
-
-    try:
-        series = monitoring_v3.TimeSeries()
-        series.metric.type = f'custom.googleapis.com/{metric_name}'
-        series.resource.type = 'global'
-        series.resource.labels['project_id'] = PROJECT_ID
-
-        if labels:
-            for key, val in labels.items():
-                series.resource.labels[key] = str(val)
-
-        point = monitoring_v3.Point()
-        point.value.double_value = value
-        point.interval.end_time.seconds = int(time.time())
-        series.points.append(point)
-
-        monitoring_client.create_time_series(
-            name=f'projects/{PROJECT_ID}',
-            time_series=[series]
-        )
-    except Exception as e:
-        logger.warning(f"Failed to record metric {metric_name}: {e}")
+# Points are queued and exported in batches from a background thread
+metrics_max_series = int(os.getenv('METRICS_MAX_SERIES', '10000'))
+metrics_exporters = [PrometheusExporter(max_series=metrics_max_series)]
+if GCP_AVAILABLE:
+    metrics_exporters.append(CloudMonitoringExporter(monitoring_client, PROJECT_ID))
+if os.getenv('METRICS_HTTP_ENDPOINT'):
+    metrics_exporters.append(HttpExporter(os.getenv('METRICS_HTTP_ENDPOINT')))
+if os.getenv('METRICS_FILE'):
+    metrics_exporters.append(FileExporter(os.getenv('METRICS_FILE')))
+
+metrics_pipeline = MetricsPipeline(
+    metrics_exporters,
+    interval=float(os.getenv('METRICS_FLUSH_INTERVAL', '10')),
+    capacity=int(os.getenv('METRICS_QUEUE_CAPACITY', '100000')),
+    max_series=metrics_max_series
+).start()
+atexit.register(metrics_pipeline.stop)
+
+def record_metric(metric_name: str, value: float, labels: dict = None, kind: str = GAUGE):
+    """Queue a custom metric point for the next batched export"""
+    metrics_pipeline.record(metric_name, value, labels, kind)
 
 # ============ AI MODEL MONITORING METRICS ============
 # Prometheus metrics for AI model monitoring
@@ -201,6 +205,13 @@ def get_redis_connection_circuit():
 
 # ============ API ROUTES ============
 
+@app.errorhandler(BridgeTimeout)
+def handle_bridge_timeout(e):
+    """Async work that overran its deadline was cancelled on the bridge loop"""
+    logger.log_text(f'{request.path} timed out: {str(e)}', severity='WARNING')
+    return jsonify({'error': str(e), 'status': 'timeout'}), 504
+
+
 @app.route('/orchestrate', methods=['GET', 'POST'])
 def orchestrate():
     """
@@ -227,12 +238,7 @@ def orchestrate():
             }), 500
         
         # Run synchronous scan
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            signals = loop.run_until_complete(scanner.scan_all_pairs())
-        finally:
-            loop.close()
+        signals = async_bridge.run(scanner.scan_all_pairs())
         
         # Process signals
         optimized_strategies = []
@@ -295,6 +301,8 @@ def orchestrate():
         logger.log_text(f'Orchestration completed: {len(signals)} opportunities found', severity='INFO')
         return jsonify(orchestration)
         
+    except BridgeTimeout:
+        raise
     except Exception as e:
         logger.log_text(f'Error in orchestration: {str(e)}', severity='ERROR')
         return jsonify({
@@ -328,27 +336,38 @@ def execute_arbitrage():
         token_address = data['token']
         path_addresses = data['path']
 
-        # Check token address compliance
+        # Screen the token and every path address in one round trip
+        screened = [token_address] + [addr for addr in path_addresses if addr.startswith('0x') and len(addr) == 42]
         try:
             compliance_service_url = os.getenv('COMPLIANCE_SERVICE_URL', 'http://localhost:8003')
             compliance_response = requests.post(
-                f"{compliance_service_url}/check-address",
+                f"{compliance_service_url}/screen-many",
                 json={
-                    "address": token_address,
+                    "addresses": screened,
                     "blockchain": "ethereum",
-                    "asset": token_address
+                    "asset": token_address,
+                    "include_risk": True
                 },
                 timeout=5
             )
 
             if compliance_response.status_code == 200:
-                compliance_result = compliance_response.json()
-                if not compliance_result.get('compliant', False):
-                    logger.log_text(f'Compliance check failed for token {token_address}: {compliance_result.get("flags", [])}', severity='WARNING')
-                    record_metric('compliance_violation', 1, {'type': 'token_address'})
+                screening = compliance_response.json()
+                for compliance_result in screening.get('results', []):
+                    if compliance_result.get('compliant', False):
+                        continue
+                    addr = compliance_result.get('address')
+                    if addr == token_address:
+                        logger.log_text(f'Compliance check failed for token {token_address}: {compliance_result.get("flags", [])}', severity='WARNING')
+                        record_metric('compliance_violation', 1, {'type': 'token_address'}, COUNTER)
+                        details = 'Token address flagged for regulatory reasons'
+                    else:
+                        logger.log_text(f'Compliance check failed for path address {addr}: {compliance_result.get("flags", [])}', severity='WARNING')
+                        record_metric('compliance_violation', 1, {'type': 'path_address'}, COUNTER)
+                        details = f'Address {addr} flagged for regulatory reasons'
                     return jsonify({
                         'error': 'Compliance check failed',
-                        'details': 'Token address flagged for regulatory reasons',
+                        'details': details,
                         'flags': compliance_result.get('flags', []),
                         'status': 'blocked'
                     }), 403
@@ -358,34 +377,6 @@ def execute_arbitrage():
         except Exception as e:
             logger.log_text(f'Compliance check error: {str(e)}, proceeding with caution', severity='WARNING')
 
-        # Check path addresses for sanctions
-        for addr in path_addresses:
-            if addr.startswith('0x') and len(addr) == 42:  # Ethereum address
-                try:
-                    compliance_response = requests.post(
-                        f"{compliance_service_url}/check-address",
-                        json={
-                            "address": addr,
-                            "blockchain": "ethereum"
-                        },
-                        timeout=5
-                    )
-
-                    if compliance_response.status_code == 200:
-                        compliance_result = compliance_response.json()
-                        if not compliance_result.get('compliant', False):
-                            logger.log_text(f'Compliance check failed for path address {addr}: {compliance_result.get("flags", [])}', severity='WARNING')
-                            record_metric('compliance_violation', 1, {'type': 'path_address'})
-                            return jsonify({
-                                'error': 'Compliance check failed',
-                                'details': f'Address {addr} flagged for regulatory reasons',
-                                'flags': compliance_result.get('flags', []),
-                                'status': 'blocked'
-                            }), 403
-
-                except Exception as e:
-                    logger.log_text(f'Compliance check error for {addr}: {str(e)}', severity='WARNING')
-
         # ===== END COMPLIANCE CHECK =====
 
         # Prepare transaction
@@ -402,7 +393,7 @@ def execute_arbitrage():
         }
 
         # Record execution attempt
-        record_metric('arbitrage_execution_attempt', 1, {'status': 'attempted'})
+        record_metric('arbitrage_execution_attempt', 1, {'status': 'attempted'}, COUNTER)
 
         # In production, execute via web3.py or ethers.py
         # contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=ABI)
@@ -420,7 +411,7 @@ def execute_arbitrage():
 
     except Exception as e:
         logger.log_text(f'Error executing arbitrage: {str(e)}', severity='ERROR')
-        record_metric('arbitrage_execution_error', 1)
+        record_metric('arbitrage_execution_error', 1, kind=COUNTER)
         return jsonify({'error': str(e)}), 500
 
 
@@ -450,12 +441,7 @@ def get_signals():
                 'message': 'Scanner not initialized'
             }), 503
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            signals = loop.run_until_complete(scanner.scan_all_pairs())
-        finally:
-            loop.close()
+        signals = async_bridge.run(scanner.scan_all_pairs())
         
         return jsonify({
             'status': 'fresh',
@@ -464,6 +450,8 @@ def get_signals():
             'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
         })
         
+    except BridgeTimeout:
+        raise
     except Exception as e:
         logger.log_text(f'Error getting signals: {str(e)}', severity='ERROR')
         return jsonify({'error': str(e)}), 500
@@ -534,7 +522,9 @@ def metrics():
             'ai_model_prediction_accuracy': 0.85,  # Mock accuracy
             'ai_model_drift_score': 0.15,  # Mock drift score
             'ai_model_gpu_utilization_percent': 75.5,  # Mock GPU utilization
-            'ai_model_performance_degradation_total': 0
+            'ai_model_performance_degradation_total': 0,
+            'metrics_pipeline': metrics_pipeline.snapshot(),
+            'async_bridge': async_bridge.snapshot()
         }
 
         redis_client = get_redis_connection_circuit()
@@ -559,12 +549,7 @@ def metrics():
 def scan_options_arbitrage():
     """Scan for options arbitrage opportunities"""
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            signals = loop.run_until_complete(options_scanner.scan_all_options())
-        finally:
-            loop.close()
+        signals = async_bridge.run(options_scanner.scan_all_options())
 
         return jsonify({
             'status': 'success',
@@ -588,6 +573,8 @@ def scan_options_arbitrage():
             'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
         })
 
+    except BridgeTimeout:
+        raise
     except Exception as e:
         logger.log_text(f'Error scanning options arbitrage: {str(e)}', severity='ERROR')
         return jsonify({'error': str(e)}), 500
@@ -597,12 +584,7 @@ def scan_options_arbitrage():
 def scan_perpetuals_arbitrage():
     """Scan for perpetuals arbitrage opportunities"""
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            signals = loop.run_until_complete(perpetuals_scanner.scan_all_perpetuals())
-        finally:
-            loop.close()
+        signals = async_bridge.run(perpetuals_scanner.scan_all_perpetuals())
 
         return jsonify({
             'status': 'success',
@@ -628,6 +610,8 @@ def scan_perpetuals_arbitrage():
             'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
         })
 
+    except BridgeTimeout:
+        raise
     except Exception as e:
         logger.log_text(f'Error scanning perpetuals arbitrage: {str(e)}', severity='ERROR')
         return jsonify({'error': str(e)}), 500
@@ -705,12 +689,7 @@ def get_advanced_risk_metrics():
         }
 
         # Calculate real risk metrics
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            metrics = loop.run_until_complete(risk_engine.calculate_portfolio_risk_metrics(mock_positions))
-        finally:
-            loop.close()
+        metrics = async_bridge.run(risk_engine.calculate_portfolio_risk_metrics(mock_positions))
 
         return jsonify({
             'status': 'success',
@@ -727,11 +706,53 @@ def get_advanced_risk_metrics():
             }
         })
 
+    except BridgeTimeout:
+        raise
     except Exception as e:
         logger.log_text(f'Error getting advanced risk metrics: {str(e)}', severity='ERROR')
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/advanced-risk/prices', methods=['POST'])
+def ingest_risk_prices():
+    """Feed a price tick into the streaming covariance tracker"""
+    try:
+        prices = request.get_json(force=True) or {}
+        risk_engine.update_prices({asset: float(price) for asset, price in prices.items()})
+        return jsonify({'status': 'success', 'assets': len(prices)})
+
+    except Exception as e:
+        logger.log_text(f'Error ingesting risk prices: {str(e)}', severity='ERROR')
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/advanced-risk/var-decomposition', methods=['GET'])
+def get_var_decomposition():
+    """Portfolio volatility and marginal/component VaR from the covariance snapshot"""
+    try:
+        # Mock positions for demonstration
+        mock_positions = {
+            'ETH': {'weight': 0.3, 'value': 30000, 'exposure': 30000},
+            'BTC': {'weight': 0.4, 'value': 40000, 'exposure': 40000},
+            'LINK': {'weight': 0.2, 'value': 20000, 'exposure': 20000},
+            'UNI': {'weight': 0.1, 'value': 10000, 'exposure': 10000}
+        }
+
+        snapshot = risk_engine.covariance_tracker.snapshot()
+        return jsonify({
+            'status': 'success',
+            'covariance_version': snapshot.version,
+            'portfolio_volatility': risk_engine.get_portfolio_volatility(mock_positions, snapshot),
+            'marginal_var_95': risk_engine.get_marginal_var(mock_positions, 0.95, snapshot),
+            'component_var_95': risk_engine.get_component_var(mock_positions, 0.95, snapshot),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        })
+
+    except Exception as e:
+        logger.log_text(f'Error getting VaR decomposition: {str(e)}', severity='ERROR')
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/regulatory-report', methods=['GET'])
 def generate_regulatory_report():
     """Generate regulatory compliance report"""
@@ -745,19 +766,16 @@ def generate_regulatory_report():
         }
 
         # Calculate risk metrics
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            metrics = loop.run_until_complete(risk_engine.calculate_portfolio_risk_metrics(mock_positions))
-            report = loop.run_until_complete(risk_engine.generate_regulatory_report(mock_positions, metrics))
-        finally:
-            loop.close()
+        metrics = async_bridge.run(risk_engine.calculate_portfolio_risk_metrics(mock_positions))
+        report = async_bridge.run(risk_engine.generate_regulatory_report(mock_positions, metrics))
 
         return jsonify({
             'status': 'success',
             'report': report
         })
 
+    except BridgeTimeout:
+        raise
     except Exception as e:
         logger.log_text(f'Error generating regulatory report: {str(e)}', severity='ERROR')
         return jsonify({'error': str(e)}), 500
@@ -769,18 +787,15 @@ def generate_regulatory_report():
 def get_apex_optimization_status():
     """Get Apex optimization status"""
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            status = loop.run_until_complete(apex_optimizer.get_optimization_status())
-        finally:
-            loop.close()
+        status = async_bridge.run(apex_optimizer.get_optimization_status())
 
         return jsonify({
             'status': 'success',
             **status
         })
 
+    except BridgeTimeout:
+        raise
     except Exception as e:
         logger.log_text(f'Error getting Apex optimization status: {str(e)}', severity='ERROR')
         return jsonify({'error': str(e)}), 500
@@ -790,18 +805,15 @@ def get_apex_optimization_status():
 def get_root_cause_analysis():
     """Get recent root cause analyses"""
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            analyses = loop.run_until_complete(apex_optimizer.get_root_cause_analyses())
-        finally:
-            loop.close()
+        analyses = async_bridge.run(apex_optimizer.get_root_cause_analyses())
 
         return jsonify({
             'status': 'success',
             'analyses': analyses
         })
 
+    except BridgeTimeout:
+        raise
     except Exception as e:
         logger.log_text(f'Error getting root cause analysis: {str(e)}', severity='ERROR')
         return jsonify({'error': str(e)}), 500
@@ -841,7 +853,7 @@ def submit_optimization_feedback():
         notes = data.get('notes', '')
 
         # Store feedback for ML model improvement
-        record_metric('optimization_feedback_received', 1, {'type': feedback_type or 'unknown'})
+        record_metric('optimization_feedback_received', 1, {'type': feedback_type or 'unknown'}, COUNTER)
 
         logger.log_text(f'Optimization feedback received: {feedback_type} for {metric}', severity='INFO')
 
@@ -0,0 +1,364 @@
+"""
+Alpha-Orion Metrics Pipeline
+Batched, off-request-path export of custom metrics
+
+record() only appends a tuple to a deque, which is atomic under the GIL, so
+request handlers never take a lock or wait on the network. A background
+thread drains the queue every interval, aggregates points per series
+(counters sum, gauges keep the last value, distributions keep count, sum,
+min, max and bucket counts) and hands one batch to each exporter.
+
+Memory is bounded twice: the queue drops new points when full and each
+interval tracks at most max_series distinct series. Both drops are counted.
+PrometheusExporter, which keeps series across intervals, has its own
+max_series cap.
+stop() drains and flushes whatever is left.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+# Optional exporter backends
+try:
+    from prometheus_client import REGISTRY
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    REGISTRY = None
+
+try:
+    from google.cloud import monitoring_v3
+except ImportError:
+    monitoring_v3 = None
+
+logger = logging.getLogger(__name__)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+DISTRIBUTION = 'distribution'
+KINDS = (COUNTER, GAUGE, DISTRIBUTION)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+CLOUD_MONITORING_BATCH = 200  # create_time_series accepts at most 200 series per call
+
+
+@dataclass
+class Aggregate:
+    """One series' points over a flush interval"""
+    name: str
+    kind: str
+    labels: Tuple[Tuple[str, str], ...]
+    count: int = 0
+    sum: float = 0.0
+    last: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+    buckets: List[int] = field(default_factory=list)
+
+    def add(self, value: float, bounds: Sequence[float]):
+        self.count += 1
+        self.sum += value
+        self.last = value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if self.kind == DISTRIBUTION:
+            if not self.buckets:
+                self.buckets = [0] * len(bounds)
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    self.buckets[i] += 1
+                    break
+
+    @property
+    def value(self) -> float:
+        """Counter increment or gauge reading for the interval"""
+        return self.sum if self.kind == COUNTER else self.last
+
+    def to_dict(self) -> Dict:
+        data = {'name': self.name, 'kind': self.kind, 'labels': dict(self.labels), 'count': self.count}
+        if self.kind == DISTRIBUTION:
+            data.update(sum=self.sum, min=self.min, max=self.max, buckets=self.buckets)
+        else:
+            data['value'] = self.value
+        return data
+
+
+class MetricsExporter:
+    """Receives one aggregated batch per flush interval, on the pipeline thread"""
+
+    def export(self, batch: List[Aggregate], interval_start: float, interval_end: float):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PrometheusExporter(MetricsExporter):
+    """
+    Collector on a Prometheus registry. Counters and distributions accumulate
+    across flushes as Prometheus expects; gauges show the latest reading.
+    Series live for the process, so at most `max_series` are kept; new series
+    beyond that are dropped and counted in dropped_series.
+    """
+
+    def __init__(self, registry=None, prefix: str = 'alpha_orion_', buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 max_series: int = 10_000):
+        if not PROMETHEUS_AVAILABLE:
+            raise RuntimeError("prometheus_client is not installed")
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.max_series = max_series
+        self.dropped_series = 0
+        self._series: Dict[Tuple, Aggregate] = {}
+        self._lock = threading.Lock()  # Scrapes run on the HTTP server's threads
+        self.registry = registry if registry is not None else REGISTRY
+        self.registry.register(self)
+
+    def export(self, batch, interval_start, interval_end):
+        with self._lock:
+            for agg in batch:
+                key = (agg.name, agg.kind, agg.labels)
+                total = self._series.get(key)
+                if total is None and len(self._series) >= self.max_series:
+                    self.dropped_series += 1
+                    continue
+                if total is None or agg.kind == GAUGE:
+                    self._series[key] = total = Aggregate(agg.name, agg.kind, agg.labels)
+                    total.buckets = [0] * len(self.buckets)
+                total.count += agg.count
+                total.sum += agg.sum
+                total.last = agg.last
+                for i, n in enumerate(agg.buckets):
+                    total.buckets[i] += n
+
+    def collect(self):
+        with self._lock:
+            series = list(self._series.values())
+        families = {}
+        for agg in series:
+            name = self.prefix + agg.name
+            label_names = [k for k, _ in agg.labels]
+            label_values = [v for _, v in agg.labels]
+            family = families.get((name, agg.kind, tuple(label_names)))
+            if family is None:
+                if agg.kind == COUNTER:
+                    family = CounterMetricFamily(name, f'{agg.name} (batched)', labels=label_names)
+                elif agg.kind == GAUGE:
+                    family = GaugeMetricFamily(name, f'{agg.name} (batched)', labels=label_names)
+                else:
+                    family = HistogramMetricFamily(name, f'{agg.name} (batched)', labels=label_names)
+                families[(name, agg.kind, tuple(label_names))] = family
+            if agg.kind == DISTRIBUTION:
+                cumulative, running = [], 0
+                for bound, n in zip(self.buckets, agg.buckets):
+                    running += n
+                    cumulative.append(('+Inf' if math.isinf(bound) else str(bound), running))
+                family.add_metric(label_values, cumulative, agg.sum)
+            else:
+                family.add_metric(label_values, agg.value)
+        return iter(families.values())
+
+    def close(self):
+        self.registry.unregister(self)
+
+
+class FileExporter(MetricsExporter):
+    """Appends each batch to a JSON-lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, batch, interval_start, interval_end):
+        with open(self.path, 'a') as f:
+            for agg in batch:
+                f.write(json.dumps(dict(agg.to_dict(), start=interval_start, end=interval_end)) + '\n')
+
+
+class HttpExporter(MetricsExporter):
+    """Posts each batch as one JSON document, e.g. to a local stand-in for the cloud backend"""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def export(self, batch, interval_start, interval_end):
+        resp = self.session.post(self.url, json={
+            'start': interval_start,
+            'end': interval_end,
+            'series': [agg.to_dict() for agg in batch]
+        }, timeout=self.timeout)
+        resp.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class CloudMonitoringExporter(MetricsExporter):
+    """
+    Writes custom.googleapis.com/<name> series, up to 200 per API call.
+    Counters are written as the interval's sum, gauges as the last reading
+    and distributions as Cloud Monitoring distribution values.
+    """
+
+    def __init__(self, client, project_id: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        if monitoring_v3 is None:
+            raise RuntimeError("google-cloud-monitoring is not installed")
+        self.client = client
+        self.project_id = project_id
+        self.bounds = [b for b in buckets if not math.isinf(b)]
+
+    def _series(self, agg: Aggregate, interval_end: float):
+        series = monitoring_v3.TimeSeries()
+        series.metric.type = f'custom.googleapis.com/{agg.name}'
+        for key, val in agg.labels:
+            series.metric.labels[key] = val
+        series.resource.type = 'global'
+        series.resource.labels['project_id'] = self.project_id
+
+        point = monitoring_v3.Point()
+        point.interval.end_time.seconds = int(interval_end)
+        point.interval.end_time.nanos = int((interval_end % 1) * 1e9)
+        if agg.kind == DISTRIBUTION:
+            dist = point.value.distribution_value
+            dist.count = agg.count
+            dist.mean = agg.sum / agg.count
+            dist.bucket_options.explicit_buckets.bounds.extend(self.bounds)
+            # Cloud Monitoring buckets have an explicit underflow bucket below the first bound
+            dist.bucket_counts.extend([0] + agg.buckets)
+        else:
+            point.value.double_value = agg.value
+        series.points.append(point)
+        return series
+
+    def export(self, batch, interval_start, interval_end):
+        series = [self._series(agg, interval_end) for agg in batch]
+        for i in range(0, len(series), CLOUD_MONITORING_BATCH):
+            self.client.create_time_series(
+                name=f'projects/{self.project_id}',
+                time_series=series[i:i + CLOUD_MONITORING_BATCH]
+            )
+
+
+class MetricsPipeline:
+    """
+    Queue, aggregate and batch-export metric points off the request path.
+
+    record() never blocks; points beyond `capacity` queued, or series beyond
+    `max_series` per interval, are dropped and counted in stats.
+    """
+
+    def __init__(self, exporters: Sequence[MetricsExporter] = (), interval: float = 10.0,
+                 capacity: int = 100_000, max_series: int = 10_000,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, clock=time.time):
+        self.exporters = list(exporters)
+        self.interval = interval
+        self.capacity = capacity
+        self.max_series = max_series
+        self.buckets = tuple(buckets)
+        self.clock = clock
+        self._queue = deque()
+        self._append = self._queue.append
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._interval_start = clock()
+        self.dropped = 0
+        self.stats = {
+            'flushed_points': 0,
+            'flushed_series': 0,
+            'dropped_series': 0,
+            'batches': 0,
+            'export_errors': 0,
+        }
+
+    def record(self, name: str, value: float, labels: Dict = None, kind: str = GAUGE):
+        """Queue one point; safe from any thread"""
+        if len(self._queue) >= self.capacity:
+            self.dropped += 1  # Approximate under contention; never blocks the caller
+            return
+        self._append((name, value, labels, kind))
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-pipeline', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Metrics flush failed: {e}")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the background thread and flush what is still queued"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+        for exporter in self.exporters:
+            try:
+                exporter.close()
+            except Exception as e:
+                logger.warning(f"Closing {type(exporter).__name__} failed: {e}")
+
+    def drain(self) -> List[Aggregate]:
+        """Pop everything queued so far and aggregate it per series"""
+        series: Dict[Tuple, Aggregate] = {}
+        popleft = self._queue.popleft
+        points = 0
+        # Only what is queued now; points recorded meanwhile wait for the next interval
+        for _ in range(len(self._queue)):
+            try:
+                name, value, labels, kind = popleft()
+            except IndexError:
+                break
+            points += 1
+            key = (name, kind, tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ())
+            agg = series.get(key)
+            if agg is None:
+                if len(series) >= self.max_series or kind not in KINDS:
+                    self.stats['dropped_series'] += 1
+                    continue
+                agg = series[key] = Aggregate(name, kind, key[2])
+            agg.add(float(value), self.buckets)
+        self.stats['flushed_points'] += points
+        return list(series.values())
+
+    def flush(self) -> List[Aggregate]:
+        """Aggregate the queue and send one batch to every exporter"""
+        with self._flush_lock:
+            batch = self.drain()
+            start, end = self._interval_start, self.clock()
+            self._interval_start = end
+            if not batch:
+                return batch
+            self.stats['flushed_series'] += len(batch)
+            self.stats['batches'] += 1
+            for exporter in self.exporters:
+                try:
+                    exporter.export(batch, start, end)
+                except Exception as e:
+                    self.stats['export_errors'] += 1
+                    logger.warning(f"{type(exporter).__name__} export failed: {e}")
+            return batch
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, dropped=self.dropped, pending=self.pending())
@@ -94,6 +94,131 @@ class StressTestScenario:
     probability: float = 0.01  # Annual probability
 
 
+class CorrelatedMonteCarloEngine:
+    """
+    Vectorized multi-asset Monte Carlo simulator.
+    
+    Draws correlated shocks through the Cholesky factor of a shrinkage-estimated
+    covariance matrix and prices every path across the whole portfolio in one
+    batched matmul. The factor is reused until the covariance drifts past
+    drift_threshold (relative Frobenius norm).
+    """
+    
+    def __init__(
+        self,
+        num_paths: int = 100000,
+        drift_threshold: float = 0.05,
+        seed: Optional[int] = None
+    ):
+        self.num_paths = num_paths
+        self.drift_threshold = drift_threshold
+        self.rng = np.random.default_rng(seed)
+        
+        self._factor_cov: Optional[np.ndarray] = None
+        self._factor: Optional[np.ndarray] = None
+        self.factorizations = 0
+    
+    @staticmethod
+    def shrink_covariance(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+        
+        Args:
+            returns: (periods x assets) matrix of returns
+            
+        Returns:
+            Tuple[covariance, shrinkage intensity]
+        """
+        X = np.asarray(returns, dtype=float)
+        X = X - X.mean(axis=0)
+        periods, num_assets = X.shape
+        
+        sample = X.T @ X / periods
+        mu = np.trace(sample) / num_assets
+        target = mu * np.eye(num_assets)
+        
+        d2 = np.sum((sample - target) ** 2)
+        if d2 == 0:
+            return sample, 0.0
+        
+        X2 = X ** 2
+        b2_bar = np.sum(X2.T @ X2 / periods - sample ** 2) / periods
+        shrinkage = min(b2_bar, d2) / d2
+        
+        return shrinkage * target + (1 - shrinkage) * sample, float(shrinkage)
+    
+    def cholesky_factor(self, cov: np.ndarray) -> np.ndarray:
+        """Cholesky factor of cov, reusing the cached one while drift is small"""
+        if self._factor is not None and self._factor_cov.shape == cov.shape:
+            drift = np.linalg.norm(cov - self._factor_cov) / max(np.linalg.norm(self._factor_cov), 1e-300)
+            if drift <= self.drift_threshold:
+                return self._factor
+        
+        try:
+            factor = np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:
+            # Clip negative eigenvalues to get the nearest positive definite matrix
+            eigenvalues, eigenvectors = np.linalg.eigh(cov)
+            floor = max(eigenvalues.max(), 1e-300) * 1e-10
+            repaired = (eigenvectors * np.maximum(eigenvalues, floor)) @ eigenvectors.T
+            factor = np.linalg.cholesky((repaired + repaired.T) / 2)
+        
+        self._factor_cov = cov.copy()
+        self._factor = factor
+        self.factorizations += 1
+        return factor
+    
+    def simulate_returns(
+        self,
+        cov: np.ndarray,
+        mean: np.ndarray = None,
+        num_paths: int = None,
+        horizon_days: int = 1,
+        seed: Optional[int] = None
+    ) -> np.ndarray:
+        """(paths x assets) matrix of correlated horizon returns"""
+        num_paths = num_paths or self.num_paths
+        rng = np.random.default_rng(seed) if seed is not None else self.rng
+        factor = self.cholesky_factor(cov)
+        
+        shocks = rng.standard_normal((num_paths, len(cov))) @ factor.T
+        returns = shocks * math.sqrt(horizon_days)
+        if mean is not None:
+            returns += np.asarray(mean) * horizon_days
+        return returns
+    
+    def simulate_pnl(
+        self,
+        exposures: np.ndarray,
+        cov: np.ndarray,
+        mean: np.ndarray = None,
+        num_paths: int = None,
+        horizon_days: int = 1,
+        seed: Optional[int] = None
+    ) -> np.ndarray:
+        """Portfolio PnL for every path"""
+        return self.simulate_returns(cov, mean, num_paths, horizon_days, seed) @ np.asarray(exposures, dtype=float)
+    
+    def value_at_risk(
+        self,
+        exposures: np.ndarray,
+        cov: np.ndarray,
+        confidence_levels: List[float] = (0.95, 0.99),
+        mean: np.ndarray = None,
+        num_paths: int = None,
+        horizon_days: int = 1,
+        seed: Optional[int] = None
+    ) -> Dict[str, Dict[float, float]]:
+        """VaR and CVaR (positive losses) per confidence level"""
+        pnl = self.simulate_pnl(exposures, cov, mean, num_paths, horizon_days, seed)
+        var, cvar = {}, {}
+        for confidence in confidence_levels:
+            threshold = np.quantile(pnl, 1 - confidence)
+            var[confidence] = float(max(-threshold, 0.0))
+            cvar[confidence] = float(max(-pnl[pnl <= threshold].mean(), 0.0))
+        return {'var': var, 'cvar': cvar}
+
+
 class VaRCalculator:
     """
     Value at Risk calculator using multiple methods:
@@ -117,6 +242,9 @@ class VaRCalculator:
         self.portfolio_history: List[float] = []
         self.portfolio_timestamps: List[datetime] = []
         
+        # Correlated multi-asset simulator
+        self.monte_carlo_engine = CorrelatedMonteCarloEngine()
+        
         logger.info(f"VaRCalculator initialized with {lookback_days}-day lookback")
     
     async def calculate_historical_var(
@@ -147,41 +275,40 @@ class VaRCalculator:
         
         return var_results
     
-    async def calculate_monte_carlo_var(
+    async def calculate_portfolio_monte_carlo_var(
         self,
-        portfolio_value: float,
-        mean_return: float,
-        std_return: float,
-        num_simulations: int = 10000,
-        time_horizon_days: int = 1
+        exposures: Dict[str, float],
+        returns_history: Dict[str, List[float]],
+        num_simulations: int = 100000,
+        time_horizon_days: int = 1,
+        seed: Optional[int] = None
     ) -> Dict[float, float]:
         """
-        Calculate VaR using Monte Carlo simulation.
+        Calculate portfolio VaR with correlated multi-asset Monte Carlo.
         
         Args:
-            portfolio_value: Current portfolio value
-            mean_return: Mean daily return
-            std_return: Std deviation of returns
-            num_simulations: Number of simulations
+            exposures: token -> USD exposure
+            returns_history: token -> aligned historical daily returns
+            num_simulations: Number of simulated paths
             time_horizon_days: Time horizon in days
+            seed: Seed for reproducible paths
         """
-        var_results = {}
-        
-        # Generate random returns
-        daily_returns = np.random.normal(
-            mean_return, std_return, (num_simulations, time_horizon_days)
+        tokens = [t for t in exposures if t in returns_history]
+        if not tokens:
+            return {c: 0.0 for c in self.confidence_levels}
+        
+        returns = np.column_stack([returns_history[t] for t in tokens])
+        cov, _ = self.monte_carlo_engine.shrink_covariance(returns)
+        result = self.monte_carlo_engine.value_at_risk(
+            np.array([exposures[t] for t in tokens]),
+            cov,
+            self.confidence_levels,
+            mean=returns.mean(axis=0),
+            num_paths=num_simulations,
+            horizon_days=time_horizon_days,
+            seed=seed
         )
-        
-        # Calculate portfolio returns
-        portfolio_returns = daily_returns.sum(axis=1)
-        
-        for confidence in self.confidence_levels:
-            percentile = (1 - confidence) * 100
-            return_at_risk = np.percentile(portfolio_returns, percentile)
-            var_value = abs(portfolio_value * return_at_risk)
-            var_results[confidence] = var_value
-        
-        return var_results
+        return result['var']
     
     async def calculate_parametric_var(
         self,
@@ -383,65 +510,108 @@ class StressTestingEngine:
         # Results cache
         self.last_results: Dict[str, Dict] = {}
         
+        # Compiled (scenario x token) shock matrix and per-book result cache
+        self._compiled: Optional[Tuple[List[str], Dict[str, int], np.ndarray]] = None
+        self._results_cache_key = None
+        self._results_cache: List[Dict] = []
+        
         logger.info("StressTestingEngine initialized with default scenarios")
     
     def load_default_scenarios(self):
         """Load default stress test scenarios"""
         self.scenarios = self.HISTORICAL_SCENARIOS + self.HYPOTHETICAL_SCENARIOS
+        self._invalidate()
         logger.info(f"Loaded {len(self.scenarios)} default stress scenarios")
     
     def add_custom_scenario(self, scenario: StressTestScenario):
         """Add a custom stress test scenario"""
         self.scenarios.append(scenario)
+        self._invalidate()
         logger.info(f"Added custom scenario: {scenario.name}")
     
-    async def run_scenario(
+    def _invalidate(self):
+        self._compiled = None
+        self._results_cache_key = None
+    
+    def compile_scenarios(self) -> Tuple[List[str], Dict[str, int], np.ndarray]:
+        """
+        Compile scenarios into a (scenario x token) matrix of % price shocks.
+        Tokens missing from a scenario get a zero shock.
+        """
+        if self._compiled is None:
+            tokens = sorted({t for s in self.scenarios for t in s.price_changes})
+            token_index = {t: i for i, t in enumerate(tokens)}
+            shocks = np.zeros((len(self.scenarios), len(tokens)))
+            for row, scenario in enumerate(self.scenarios):
+                for token, change in scenario.price_changes.items():
+                    shocks[row, token_index[token]] = change
+            self._compiled = (tokens, token_index, shocks)
+        return self._compiled
+    
+    @staticmethod
+    def book_fingerprint(positions: List[Position]) -> int:
+        """Identify a position book by content when the caller has no version counter"""
+        return hash(tuple((p.token, p.size_usd, p.pnl_pct) for p in positions))
+    
+    @staticmethod
+    def exposure_vector(positions: List[Position], token_index: Dict[str, int]) -> np.ndarray:
+        """Aggregate position size per token; shocks act linearly on size"""
+        exposure = np.zeros(len(token_index))
+        for p in positions:
+            idx = token_index.get(p.token)
+            if idx is not None:
+                exposure[idx] += p.size_usd
+        return exposure
+    
+    def evaluate_shocks(
         self,
-        scenario: StressTestScenario,
+        shocks: np.ndarray,
+        token_index: Dict[str, int],
         positions: List[Position]
-    ) -> Dict:
+    ) -> Tuple[float, np.ndarray]:
         """
-        Run a single stress test scenario.
+        Evaluate every row of a shock matrix in one matrix product.
+        
+        A position's value after a shock of s% is size * (1 + (pnl + s) / 100),
+        so the portfolio loss for every scenario is -(shocks @ exposure) / 100.
         
         Returns:
-            Dict with scenario results including:
-            - total_loss
-            - loss_percentage
-            - affected_positions
-            - recovery_time_estimate
+            Tuple[total_value_before, loss per scenario]
         """
-        total_value_before = sum(p.market_value for p in positions)
-        total_value_after = total_value_before
-        affected_positions = []
+        total_value_before = float(sum(p.market_value for p in positions))
+        exposure = self.exposure_vector(positions, token_index)
+        losses = -(shocks @ exposure) / 100
+        return total_value_before, losses
+    
+    def _scenario_result(
+        self,
+        scenario: StressTestScenario,
+        positions: List[Position],
+        total_value_before: float,
+        loss: float
+    ) -> Dict:
+        loss_pct = (loss / total_value_before) * 100 if total_value_before > 0 else 0
+        
+        # Estimate recovery time based on volatility
+        base_recovery_days = abs(loss_pct) / 2  # Assume 2% recovery per day
+        recovery_time = base_recovery_days * scenario.volatility_multiplier
         
+        affected_positions = []
         for position in positions:
             price_change = scenario.price_changes.get(position.token, 0)
-            new_pnl = position.pnl_pct + price_change
-            new_value = position.size_usd * (1 + new_pnl / 100)
-            
-            if new_value != position.market_value:
+            if price_change:
                 affected_positions.append({
                     'token': position.token,
                     'before': position.market_value,
-                    'after': new_value,
+                    'after': position.size_usd * (1 + (position.pnl_pct + price_change) / 100),
                     'change_pct': price_change
                 })
-            
-            total_value_after += (new_value - position.market_value)
-        
-        loss = total_value_before - total_value_after
-        loss_pct = (loss / total_value_before) * 100 if total_value_before > 0 else 0
-        
-        # Estimate recovery time based on volatility
-        volatility_adj = scenario.volatility_multiplier
-        base_recovery_days = abs(loss_pct) / 2  # Assume 2% recovery per day
-        recovery_time = base_recovery_days * volatility_adj
         
         return {
             'scenario_name': scenario.name,
             'description': scenario.description,
             'total_value_before': total_value_before,
-            'total_value_after': total_value_after,
+            'total_value_after': total_value_before - loss,
             'loss': loss,
             'loss_percentage': loss_pct,
             'affected_positions': affected_positions,
@@ -451,38 +621,75 @@ class StressTestingEngine:
             'probability': scenario.probability
         }
     
-    async def run_all_scenarios(
+    async def run_scenario(
         self,
+        scenario: StressTestScenario,
         positions: List[Position]
+    ) -> Dict:
+        """
+        Run a single stress test scenario.
+        
+        Returns:
+            Dict with scenario results including:
+            - total_loss
+            - loss_percentage
+            - affected_positions
+            - recovery_time_estimate
+        """
+        tokens = sorted(scenario.price_changes)
+        token_index = {t: i for i, t in enumerate(tokens)}
+        shocks = np.array([[scenario.price_changes[t] for t in tokens]])
+        total_value_before, losses = self.evaluate_shocks(shocks, token_index, positions)
+        return self._scenario_result(scenario, positions, total_value_before, float(losses[0]))
+    
+    async def run_all_scenarios(
+        self,
+        positions: List[Position],
+        book_version=None
     ) -> List[Dict]:
-        """Run all stress test scenarios"""
-        results = []
+        """
+        Run all stress test scenarios.
+        
+        Results are cached per position-book version; pass book_version from a
+        caller that tracks book changes, otherwise the book is fingerprinted.
+        """
+        if book_version is None:
+            book_version = self.book_fingerprint(positions)
+        if self._compiled is not None and self._results_cache_key == book_version:
+            return self._results_cache
         
-        for scenario in self.scenarios:
-            result = await self.run_scenario(scenario, positions)
-            results.append(result)
+        _, token_index, shocks = self.compile_scenarios()
+        total_value_before, losses = self.evaluate_shocks(shocks, token_index, positions)
+        
+        results = [
+            self._scenario_result(scenario, positions, total_value_before, float(loss))
+            for scenario, loss in zip(self.scenarios, losses)
+        ]
         
         # Sort by loss percentage (worst first)
         results.sort(key=lambda x: x['loss_percentage'], reverse=True)
         
         self.last_results = {r['scenario_name']: r for r in results}
+        self._results_cache_key = book_version
+        self._results_cache = results
         
         return results
     
-    async def get_worst_case(self, positions: List[Position]) -> Dict:
+    async def get_worst_case(self, positions: List[Position], book_version=None) -> Dict:
         """Get the worst-case scenario result"""
-        results = await self.run_all_scenarios(positions)
+        results = await self.run_all_scenarios(positions, book_version)
         return results[0] if results else {}
     
     async def get_expected_shortfall(
         self,
         positions: List[Position],
-        confidence: float = 0.95
+        confidence: float = 0.95,
+        book_version=None
     ) -> float:
         """
         Calculate Expected Shortfall (average loss in worst X% of scenarios).
         """
-        results = await self.run_all_scenarios(positions)
+        results = await self.run_all_scenarios(positions, book_version)
         
         if not results:
             return 0.0
@@ -496,6 +703,77 @@ class StressTestingEngine:
         
         tail_losses = [r['loss'] for r in results[:num_tail]]
         return sum(tail_losses) / len(tail_losses)
+    
+    def generate_scenarios(
+        self,
+        tokens: List[str],
+        num_scenarios: int = 10000,
+        method: str = 'random',
+        volatilities: Dict[str, float] = None,
+        correlation: np.ndarray = None,
+        returns_history: np.ndarray = None,
+        horizon_days: int = 1,
+        seed: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Generate a (num_scenarios x token) matrix of % price shocks.
+        
+        Methods:
+        - 'random': correlated normal shocks from per-token daily volatilities
+        - 'historical': bootstrap of horizon_days-day windows from a
+          (days x token) matrix of daily returns
+        """
+        rng = np.random.default_rng(seed)
+        
+        if method == 'random':
+            vols = np.array([(volatilities or {}).get(t, 0.05) for t in tokens])
+            if correlation is None:
+                correlation = np.eye(len(tokens))
+            cov = np.outer(vols, vols) * correlation * horizon_days
+            shocks = rng.multivariate_normal(np.zeros(len(tokens)), cov, size=num_scenarios, method='cholesky')
+        elif method == 'historical':
+            if returns_history is None or len(returns_history) < horizon_days:
+                raise ValueError("Historical scenarios require at least horizon_days of returns")
+            returns_history = np.asarray(returns_history)
+            starts = rng.integers(0, len(returns_history) - horizon_days + 1, size=num_scenarios)
+            windows = starts[:, None] + np.arange(horizon_days)[None, :]
+            shocks = np.prod(1 + returns_history[windows], axis=1) - 1
+        else:
+            raise ValueError(f"Unknown scenario generation method: {method}")
+        
+        # Prices cannot fall more than 100%
+        return np.maximum(shocks * 100, -100.0)
+    
+    async def run_simulated_scenarios(
+        self,
+        positions: List[Position],
+        num_scenarios: int = 10000,
+        method: str = 'random',
+        confidence: float = 0.95,
+        **kwargs
+    ) -> Dict:
+        """
+        Run thousands of generated scenarios and summarize the loss distribution.
+        """
+        tokens = sorted({p.token for p in positions})
+        token_index = {t: i for i, t in enumerate(tokens)}
+        shocks = self.generate_scenarios(tokens, num_scenarios, method, **kwargs)
+        total_value_before, losses = self.evaluate_shocks(shocks, token_index, positions)
+        
+        var = float(np.quantile(losses, confidence))
+        tail = losses[losses >= var]
+        
+        return {
+            'method': method,
+            'num_scenarios': num_scenarios,
+            'total_value_before': total_value_before,
+            'mean_loss': float(losses.mean()),
+            'worst_loss': float(losses.max()),
+            'var': var,
+            'expected_shortfall': float(tail.mean()) if len(tail) else var,
+            'confidence': confidence,
+            'losses': losses
+        }
 
 
 class CircuitBreaker:
@@ -770,7 +1048,7 @@ class DynamicPositionLimit:
         
         return max_position
     
-    def can_open_position(
+    async def can_open_position(
         self,
         token: str,
         proposed_size: float,
@@ -795,6 +1073,136 @@ class DynamicPositionLimit:
         return True, max_size, "Position allowed"
 
 
+class PreTradeGate:
+    """
+    O(1) pre-trade risk gate for the execution hot path.
+    
+    Keeps exposure totals per asset and per strategy that are updated
+    incrementally as fills arrive, plus per-asset limit factors that are
+    refreshed off the hot path, so a check never walks the portfolio.
+    Applies the same rules as DynamicPositionLimit and CircuitBreaker.
+    """
+    
+    def __init__(
+        self,
+        circuit_breaker: CircuitBreaker,
+        position_limits: DynamicPositionLimit,
+        strategy_limits: Dict[str, float] = None
+    ):
+        self.circuit_breaker = circuit_breaker
+        self.position_limits = position_limits
+        self.strategy_limits = strategy_limits or {}
+        
+        # Incrementally maintained exposure (USD size)
+        self.asset_exposure: Dict[str, float] = defaultdict(float)
+        self.strategy_exposure: Dict[str, float] = defaultdict(float)
+        self.total_market_value = 0.0
+        
+        # position_id -> (asset, strategy, size_usd, market_value)
+        self.open_positions: Dict[str, Tuple[str, str, float, float]] = {}
+        
+        # Volatility x liquidity factor per asset, refreshed off the hot path
+        self.limit_factors: Dict[str, float] = {}
+    
+    def refresh_limit_factors(
+        self,
+        volatilities: Dict[str, float] = None,
+        liquidity_usd: Dict[str, float] = None
+    ):
+        """Precompute per-asset volatility and liquidity adjustments"""
+        volatilities = volatilities or {}
+        liquidity_usd = liquidity_usd or {}
+        for asset in set(volatilities) | set(liquidity_usd):
+            base_limit = self.position_limits.base_limits.get(asset, 100000.0)
+            vol_adj = self.position_limits.calculate_volatility_adjustment(
+                asset, volatilities.get(asset, 0.02)
+            )
+            liq_adj = self.position_limits.calculate_liquidity_adjustment(
+                asset, liquidity_usd.get(asset, float('inf')), base_limit
+            )
+            self.limit_factors[asset] = vol_adj * liq_adj
+    
+    def on_fill(
+        self,
+        position_id: str,
+        asset: str,
+        size_usd: float,
+        strategy: str = 'default',
+        market_value: float = None
+    ):
+        """Record a fill; a repeated position_id replaces the previous fill"""
+        if position_id in self.open_positions:
+            self.on_close(position_id)
+        if market_value is None:
+            market_value = size_usd
+        self.open_positions[position_id] = (asset, strategy, size_usd, market_value)
+        self.asset_exposure[asset] += size_usd
+        self.strategy_exposure[strategy] += size_usd
+        self.total_market_value += market_value
+    
+    def on_close(self, position_id: str):
+        """Remove a closed position from the running totals"""
+        entry = self.open_positions.pop(position_id, None)
+        if entry is None:
+            return
+        asset, strategy, size_usd, market_value = entry
+        self.asset_exposure[asset] -= size_usd
+        self.strategy_exposure[strategy] -= size_usd
+        self.total_market_value -= market_value
+    
+    def on_mark(self, position_id: str, market_value: float):
+        """Apply a mark-to-market change to a position's value"""
+        entry = self.open_positions.get(position_id)
+        if entry is None:
+            return
+        asset, strategy, size_usd, old_value = entry
+        self.open_positions[position_id] = (asset, strategy, size_usd, market_value)
+        self.total_market_value += market_value - old_value
+    
+    def check(
+        self,
+        asset: str,
+        size_usd: float,
+        strategy: str = 'default'
+    ) -> Tuple[bool, float, str]:
+        """
+        Can a position of size_usd be opened on asset?
+        
+        Returns:
+            Tuple[allowed: bool, max_size: float, reason: str]
+        """
+        breaker = self.circuit_breaker
+        state = breaker.current_state
+        if state == CircuitBreakerState.EMERGENCY_SHUTDOWN:
+            return False, 0.0, "Emergency shutdown active"
+        if state == CircuitBreakerState.TRADING_HALT:
+            return False, 0.0, "Trading halted due to high drawdown"
+        
+        limits = self.position_limits
+        max_size = limits.base_limits.get(asset, 100000.0) * self.limit_factors.get(asset, 1.0)
+        
+        # Concentration adjustment against running totals
+        total = self.total_market_value
+        if total > 0:
+            concentration = self.asset_exposure.get(asset, 0.0) / total
+            max_concentration = limits.max_concentration_pct / 100
+            if concentration > max_concentration:
+                max_size *= max_concentration / concentration
+        
+        max_size = max(1000.0, max_size)
+        if size_usd > max_size:
+            return False, max_size, f"Proposed ${size_usd:,.0f} exceeds max ${max_size:,.0f}"
+        
+        strategy_limit = self.strategy_limits.get(strategy)
+        if strategy_limit is not None and self.strategy_exposure.get(strategy, 0.0) + size_usd > strategy_limit:
+            return False, max_size, f"Strategy {strategy} exposure would exceed ${strategy_limit:,.0f}"
+        
+        if breaker.current_balance - size_usd < breaker.initial_balance * 0.7:
+            return False, max_size, "Position would exceed emergency shutdown threshold"
+        
+        return True, max_size, "Position allowed"
+
+
 class RiskManager:
     """
     Main risk management orchestrator.
@@ -806,9 +1214,11 @@ class RiskManager:
         self.stress_tester = StressTestingEngine()
         self.circuit_breaker = CircuitBreaker(initial_balance)
         self.position_limits = DynamicPositionLimit()
+        self.pre_trade_gate = PreTradeGate(self.circuit_breaker, self.position_limits)
         
         # Position tracking
         self.positions: Dict[str, Position] = {}
+        self.book_version = 0
         
         # Risk metrics cache
         self.current_risk_metrics: RiskMetrics = RiskMetrics()
@@ -817,31 +1227,45 @@ class RiskManager:
     
     async def calculate_portfolio_risk(
         self,
-        returns_history: List[float] = None
+        returns_history: List[float] = None,
+        asset_returns: Dict[str, List[float]] = None
     ) -> RiskMetrics:
         """
         Calculate comprehensive risk metrics for the portfolio.
+        
+        Args:
+            returns_history: Portfolio daily returns, for historical VaR and CVaR
+            asset_returns: token -> aligned daily returns; when given, the
+                Monte Carlo VaR simulates the open positions jointly with
+                their shrunk covariance instead of the portfolio series alone
         """
         portfolio_value = self.circuit_breaker.current_balance
         
-        # Calculate VaR
+        # Historical VaR and CVaR from the portfolio's own returns
         if returns_history:
             var_95 = await self.var_calculator.calculate_historical_var(
                 portfolio_value, returns_history
             )
-            var_99 = await self.var_calculator.calculate_monte_carlo_var(
-                portfolio_value, 
-                np.mean(returns_history) if returns_history else 0,
-                np.std(returns_history) if returns_history else 0.02
-            )
             cvar_95 = await self.var_calculator.calculate_cvar(
                 portfolio_value, returns_history
             )
         else:
             var_95 = {0.95: portfolio_value * 0.02}
-            var_99 = {0.99: portfolio_value * 0.03}
             cvar_95 = portfolio_value * 0.025
         
+        # Monte Carlo VaR: open positions jointly when per-asset returns are known
+        if asset_returns and self.positions:
+            var_99 = await self.var_calculator.calculate_portfolio_monte_carlo_var(
+                {token: pos.market_value for token, pos in self.positions.items()},
+                asset_returns
+            )
+        elif returns_history:
+            var_99 = await self.var_calculator.calculate_portfolio_monte_carlo_var(
+                {'portfolio': portfolio_value}, {'portfolio': returns_history}
+            )
+        else:
+            var_99 = {0.99: portfolio_value * 0.03}
+        
         # Calculate drawdown
         drawdown = self.circuit_breaker.current_drawdown
         
@@ -899,31 +1323,21 @@ class RiskManager:
         
         return self.current_risk_metrics
     
-    async def add_position(self, position: Position):
+    async def add_position(self, position: Position, strategy: str = 'default'):
         """Add a new position with risk checks"""
         token = position.token
         
-        # Check position limits
-        current_positions = {k: v.size_usd for k, v in self.positions.items()}
-        total_value = sum(p.market_value for p in self.positions.values())
-        
-        can_open, max_size, reason = self.position_limits.can_open_position(
-            token, position.size_usd, current_positions, total_value
-        )
-        
-        if not can_open:
-            logger.warning(f"Position rejected: {reason}")
-            raise ValueError(reason)
-        
-        # Check circuit breaker
-        allowed, reason = self.circuit_breaker.can_open_new_position(position.size_usd)
+        # O(1) pre-trade gate: position limits, strategy limits and circuit breaker
+        allowed, max_size, reason = self.pre_trade_gate.check(token, position.size_usd, strategy)
         
         if not allowed:
-            logger.warning(f"Position rejected by circuit breaker: {reason}")
+            logger.warning(f"Position rejected: {reason}")
             raise ValueError(reason)
         
         # Add position
         self.positions[token] = position
+        self.pre_trade_gate.on_fill(token, token, position.size_usd, strategy, position.market_value)
+        self.book_version += 1
         
         logger.info(f"Position added: {token} ${position.size_usd:,.0f}")
     
@@ -931,6 +1345,8 @@ class RiskManager:
         """Remove a position"""
         if token in self.positions:
             del self.positions[token]
+            self.pre_trade_gate.on_close(token)
+            self.book_version += 1
             logger.info(f"Position removed: {token}")
     
     async def update_prices(self, prices: Dict[str, float]):
@@ -939,12 +1355,15 @@ class RiskManager:
         pnl_total = 0.0
         
         for token, price in prices.items():
-            if token in self.positions:
-                pos = self.positions[token]
+            pos = self.positions.get(token)
+            if pos is not None:
                 old_value = pos.market_value
                 pos.current_price = price
                 pos.pnl_pct = (price - pos.entry_price) / pos.entry_price * 100
                 pnl_total += (pos.market_value - old_value)
+                self.pre_trade_gate.on_mark(token, pos.market_value)
+        
+        self.book_version += 1
         
         # Update balance
         new_balance = total_value + pnl_total
@@ -953,7 +1372,7 @@ class RiskManager:
     async def run_stress_tests(self) -> List[Dict]:
         """Run all stress tests"""
         positions = list(self.positions.values())
-        return await self.stress_tester.run_all_scenarios(positions)
+        return await self.stress_tester.run_all_scenarios(positions, self.book_version)
     
     def get_risk_report(self) -> Dict:
         """Generate comprehensive risk report"""
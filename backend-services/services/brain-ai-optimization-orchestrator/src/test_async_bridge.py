@@ -0,0 +1,140 @@
+import pytest
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path to import the bridge
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from aiohttp import web
+
+from async_bridge import AsyncBridge, BridgeTimeout
+from arbitrage_signal_generator import ArbitrageScanner
+
+
+@pytest.fixture
+def bridge():
+    bridge = AsyncBridge(default_timeout=5.0).start()
+    yield bridge
+    bridge.shutdown()
+
+
+async def running_loop():
+    return asyncio.get_running_loop()
+
+
+def test_every_call_runs_on_the_same_persistent_loop(bridge):
+    loops = {bridge.run(running_loop()) for _ in range(20)}
+    assert loops == {bridge.loop}
+    assert bridge.loop.is_running()
+    assert bridge.stats['completed'] == 20
+
+
+def test_concurrent_handlers_share_the_loop(bridge):
+    async def work(i):
+        await asyncio.sleep(0.2)
+        return i
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(lambda i: bridge.run(work(i)), range(16)))
+    assert results == list(range(16))
+    # Sixteen 200ms sleeps overlap on the loop
+    assert time.monotonic() - start < 1.0
+
+
+def test_timeout_cancels_the_coroutine_on_the_loop(bridge):
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(BridgeTimeout):
+        bridge.run(hang(), timeout=0.1)
+    assert cancelled.wait(1.0)
+    assert bridge.stats['timeouts'] == 1
+
+    # The loop is still healthy afterwards
+    assert bridge.run(running_loop()) is bridge.loop
+
+
+def test_errors_propagate_to_the_caller(bridge):
+    async def fail():
+        raise ValueError("bad quote")
+
+    with pytest.raises(ValueError, match="bad quote"):
+        bridge.run(fail())
+    assert bridge.stats['failed'] == 1
+
+    async def nested():
+        return bridge.run(running_loop())
+
+    with pytest.raises(RuntimeError, match="await the coroutine instead"):
+        bridge.run(nested())
+
+
+def test_shared_session_pools_connections_and_closes_on_shutdown():
+    bridge = AsyncBridge().start()
+    peers = []
+
+    async def handle(request):
+        peers.append(request.transport.get_extra_info('peername'))
+        return web.json_response({'ok': True})
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get('/', handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        return runner, site._server.sockets[0].getsockname()[1]
+
+    async def fetch(port):
+        session = await bridge.session('venues')
+        async with session.get(f'http://127.0.0.1:{port}/') as resp:
+            return await resp.json()
+
+    runner, port = bridge.run(serve())
+    for _ in range(5):
+        assert bridge.run(fetch(port)) == {'ok': True}
+    # Every request reused one keep-alive connection
+    assert len(set(peers)) == 1
+
+    session = bridge.run(bridge.session('venues'))
+    bridge.run(runner.cleanup())
+    pending = bridge.submit(asyncio.sleep(10))
+    bridge.shutdown()
+    assert session.closed
+    assert pending.cancelled()
+    assert bridge.loop.is_closed()
+    with pytest.raises(RuntimeError):
+        bridge.run(running_loop())
+    bridge.shutdown()  # Idempotent
+
+
+def test_scanner_rate_limit_is_shared_across_requests(bridge, monkeypatch):
+    scanner = ArbitrageScanner(bridge=bridge)
+    active, peak = 0, 0
+
+    async def scan_pair(chain, token_in, token_out):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return []
+
+    monkeypatch.setattr(scanner, 'scan_pair_on_chain', scan_pair)
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: bridge.run(scanner.scan_all_pairs()), range(4)))
+    assert results == [[]] * 4
+    # Four concurrent requests, one 10-slot DEX Screener limit between them
+    assert peak == 10
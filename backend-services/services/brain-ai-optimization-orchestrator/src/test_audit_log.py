@@ -0,0 +1,223 @@
+import pytest
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+# Add src to path to import the audit log
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from audit_log import SegmentedAuditLog, verify_proof
+from compliance_engine import AuditTrail
+
+START = datetime(2026, 1, 1)
+ACTORS = ["system", "0xalice", "0xbob", "0xcarol"]
+ACTIONS = ["COMPLIANCE_CHECK", "TRANSACTION_PROCESSED", "SAR_FILED"]
+
+
+def make_record(i):
+    return {
+        "timestamp": (START + timedelta(seconds=i)).isoformat(),
+        "action_type": ACTIONS[i % 3],
+        "actor": ACTORS[i % 4],
+        "target": f"0xtx{i}",
+        "details": {"n": i},
+    }
+
+
+def fill(log, start, stop):
+    return [log.append(make_record(i)) for i in range(start, stop)]
+
+
+def segment_path(directory, segment):
+    return os.path.join(directory, f"segment-{segment:08d}.log")
+
+
+def test_sealed_segments_verify_and_prove_inclusion(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    records = fill(log, 0, 2550)
+    assert len(log.seals) == 25
+    assert log.seals[1]["previous_seal"] == log.seals[0]["seal_hash"]
+    assert log.verify() == (True, [])
+
+    for record in random.Random(0).sample(records[:2500], 50) + [records[99], records[2499]]:
+        proof = log.proof(record["sequence"])
+        assert verify_proof(record, proof)
+        assert proof["merkle_root"] == log.seals[record["sequence"] // 100]["merkle_root"]
+        assert not verify_proof(dict(record, actor="0xmallory"), proof)
+
+    # Records in the open segment have no proof until it is sealed
+    assert log.proof(2520) is None
+
+
+def test_verification_is_incremental_and_detects_tampering(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    fill(log, 0, 1000)
+    assert log.verify()[0]
+    assert log.segments_read_for_verification == 10
+
+    fill(log, 1000, 1250)
+    assert log.verify()[0]
+    assert log.segments_read_for_verification == 12
+
+    # Rewrite a record in an already verified segment, keeping the line valid JSON
+    path = segment_path(str(tmp_path), 3)
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    record = json.loads(lines[5])
+    record["details"]["n"] = -1
+    lines[5] = json.dumps(record, sort_keys=True, separators=(",", ":")).encode() + b"\n"
+    with open(path, "wb") as f:
+        f.writelines(lines)
+
+    assert log.verify()[0]  # incremental check skips verified segments
+    valid, invalid = log.verify(full=True)
+    assert not valid
+    reasons = {(entry["segment"], entry["reason"]) for entry in invalid}
+    assert (3, "Hash mismatch") in reasons
+    assert (3, "Merkle root mismatch") in reasons
+
+
+def test_get_records_uses_indexes_and_matches_filters(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    records = fill(log, 0, 1234)
+    start, end = START + timedelta(seconds=200), START + timedelta(seconds=900)
+
+    queries = [
+        dict(),
+        dict(actor="0xbob"),
+        dict(action_type="SAR_FILED", limit=7),
+        dict(actor="0xalice", action_type="COMPLIANCE_CHECK"),
+        dict(start_time=start, end_time=end),
+        dict(actor="system", start_time=start, end_time=end, limit=20),
+        dict(actor="0xnobody"),
+    ]
+    for query in queries:
+        expected = [
+            r for r in records
+            if ("actor" not in query or r["actor"] == query["actor"])
+            and ("action_type" not in query or r["action_type"] == query["action_type"])
+            and ("start_time" not in query or datetime.fromisoformat(r["timestamp"]) >= query["start_time"])
+            and ("end_time" not in query or datetime.fromisoformat(r["timestamp"]) <= query["end_time"])
+        ][-query.get("limit", 1000):]
+        assert log.query(**query) == expected
+
+
+def test_reopen_rebuilds_indexes(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    records = fill(log, 0, 321)
+    log.close()
+
+    reopened = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    assert len(reopened) == 321
+    assert reopened.seals == log.seals
+    assert reopened.query(actor="0xcarol", limit=3) == [r for r in records if r["actor"] == "0xcarol"][-3:]
+    assert reopened.append(make_record(321))["sequence"] == 321
+    assert reopened.verify() == (True, [])
+
+
+def test_recovers_from_record_truncated_mid_write(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    records = fill(log, 0, 150)
+    log.close()
+
+    path = segment_path(str(tmp_path), 1)
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 10)
+
+    recovered = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    assert len(recovered) == 149
+    assert recovered.read([148]) == [records[148]]
+    assert recovered.append(make_record(149))["sequence"] == 149
+    fill(recovered, 150, 200)
+    assert len(recovered.seals) == 2
+    assert recovered.verify(full=True) == (True, [])
+
+
+def test_recovers_from_seal_truncated_mid_write(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    fill(log, 0, 100)
+    original_seal = log.seals[0]
+    log.close()
+
+    # Leave the segment full but with a torn seal line
+    path = segment_path(str(tmp_path), 0)
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    with open(path, "wb") as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:20])
+
+    recovered = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    assert len(recovered.seals) == 1
+    assert recovered.seals[0]["merkle_root"] == original_seal["merkle_root"]
+    assert recovered.seals[0]["seal_hash"] == original_seal["seal_hash"]
+    assert recovered.verify(full=True) == (True, [])
+    assert recovered.append(make_record(100))["sequence"] == 100
+
+
+def test_corruption_before_the_tail_is_not_truncated(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    fill(log, 0, 50)
+    log.close()
+
+    path = segment_path(str(tmp_path), 0)
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    lines[10] = b"{not json\n"
+    with open(path, "wb") as f:
+        f.writelines(lines)
+
+    with pytest.raises(ValueError):
+        SegmentedAuditLog(str(tmp_path), segment_size=100)
+    assert os.path.getsize(path) == sum(len(line) for line in lines)
+
+
+def test_directory_is_locked_while_open(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    fill(log, 0, 5)
+
+    # flock is per open file, so a second open in this process conflicts like another process would
+    with pytest.raises(RuntimeError, match="already open"):
+        SegmentedAuditLog(str(tmp_path), segment_size=100)
+
+    log.close()
+    reopened = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    assert len(reopened) == 5
+    reopened.close()
+
+
+def test_failed_recovery_releases_the_lock(tmp_path):
+    log = SegmentedAuditLog(str(tmp_path), segment_size=100)
+    fill(log, 0, 5)
+    log.close()
+    os.rename(segment_path(str(tmp_path), 0), segment_path(str(tmp_path), 1))
+
+    with pytest.raises(ValueError):
+        SegmentedAuditLog(str(tmp_path), segment_size=100)
+    os.rename(segment_path(str(tmp_path), 1), segment_path(str(tmp_path), 0))
+    assert len(SegmentedAuditLog(str(tmp_path), segment_size=100)) == 5
+
+
+def test_audit_trail_requires_a_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("AUDIT_LOG_DIR", raising=False)
+    with pytest.raises(RuntimeError, match="AUDIT_LOG_DIR"):
+        AuditTrail()
+
+    monkeypatch.setenv("AUDIT_LOG_DIR", str(tmp_path))
+    assert len(AuditTrail()) == 0
+
+
+def test_audit_trail_records_actions(tmp_path):
+    trail = AuditTrail(str(tmp_path), segment_size=10)
+    hashes = [trail.record_action("COMPLIANCE_CHECK", "system", f"0x{i}", {"i": i}) for i in range(25)]
+
+    assert len(trail) == 25
+    assert trail.verify_integrity() == (True, [])
+    records = trail.get_records(actor="system", limit=5)
+    assert [r["hash"] for r in records] == hashes[-5:]
+
+    record = trail.get_records(limit=25)[3]
+    assert trail.verify_proof(record, trail.get_proof(3))
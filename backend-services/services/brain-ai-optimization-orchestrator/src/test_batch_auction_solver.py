@@ -0,0 +1,155 @@
+import pytest
+
+# Add src to path to import the batch auction solver
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from batch_auction_arbitrage import BatchAuction, BatchAuctionEngine, BatchOrder, LinearProgrammingSolver
+from batch_auction_solver import BatchSolver, parse_pools
+
+MARKET = {'WETH': 2500.0, 'WBTC': 60000.0, 'USDC': 1.0, 'LINK': 15.0}
+
+
+def random_batch(seed, num_orders=60, with_pools=True):
+    """Orders with limits scattered around market prices, plus pools on most pairs"""
+    rng = np.random.default_rng(seed)
+    tokens = list(MARKET)
+    deadline = datetime.utcnow() + timedelta(minutes=5)
+    orders = []
+    for i in range(num_orders):
+        sell, buy = rng.choice(tokens, 2, replace=False)
+        value = float(rng.lognormal(8, 1.2))
+        amount_in = value / MARKET[sell]
+        limit = MARKET[sell] / MARKET[buy] * float(rng.uniform(0.97, 1.02))
+        orders.append(BatchOrder(f"o{i}", str(sell), str(buy), amount_in, amount_in * limit, f"0x{i:040x}", deadline))
+
+    liquidity = {}
+    if with_pools:
+        for dex in ('uniswap_v2', 'sushiswap'):
+            markets = {}
+            for a in range(len(tokens)):
+                for b in range(a + 1, len(tokens)):
+                    if rng.random() < 0.7:
+                        depth = float(rng.lognormal(13, 1))
+                        skew = float(rng.uniform(0.99, 1.01))
+                        markets[f"{tokens[a]}/{tokens[b]}"] = (depth / MARKET[tokens[a]], depth * skew / MARKET[tokens[b]])
+            liquidity[dex] = markets
+    return orders, liquidity
+
+
+def check_solution(orders, result, liquidity, solver):
+    orders = {o.id: o for o in orders}
+    # Uniform prices: every fill trades at p_sell / p_buy and respects its limit
+    for order_id, (amount_in, amount_out) in result.fills.items():
+        order = orders[order_id]
+        assert 0 < amount_in <= order.amount_in * (1 + 1e-9)
+        rate = result.prices[order.token_in] / result.prices[order.token_out]
+        assert amount_out == pytest.approx(amount_in * rate, rel=1e-9)
+        assert amount_out >= amount_in * order.min_amount_out / order.amount_in * (1 - 1e-8)
+
+    # Conservation: recompute token balances from fills and exact pool outputs
+    pools = {(p.dex, f"{p.token0}/{p.token1}"): p for p in parse_pools(liquidity, solver.dex_fees)}
+    balance, volume = {}, {}
+    for order_id, (amount_in, amount_out) in result.fills.items():
+        order = orders[order_id]
+        balance[order.token_in] = balance.get(order.token_in, 0) + amount_in
+        balance[order.token_out] = balance.get(order.token_out, 0) - amount_out
+        volume[order.token_in] = volume.get(order.token_in, 0) + amount_in
+    for trade in result.amm_trades:
+        pool = pools[(trade['dex'], trade['pool'])]
+        assert trade['amount_in'] <= pool.reserves(trade['token_in'])[0] * 0.5 * (1 + 1e-9)
+        assert trade['amount_out'] == pytest.approx(float(pool.output(trade['token_in'], trade['amount_in'])))
+        balance[trade['token_in']] = balance.get(trade['token_in'], 0) - trade['amount_in']
+        balance[trade['token_out']] = balance.get(trade['token_out'], 0) + trade['amount_out']
+    for token, value in balance.items():
+        assert value >= -1e-7 * max(volume.get(token, 0), 1.0), f"{token} short by {-value}"
+        assert value == pytest.approx(result.buffers.get(token, 0.0), rel=1e-6, abs=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(25))
+@pytest.mark.parametrize("method", ['lp', 'greedy'])
+def test_uniform_prices_and_token_conservation(seed, method):
+    orders, liquidity = random_batch(seed, with_pools=seed % 5 != 0)
+    solver = BatchSolver(LinearProgrammingSolver().dex_fees)
+    result = solver.solve(orders, liquidity, deadline=10, method=method)
+    assert result.method == method
+    assert result.fills
+    check_solution(orders, result, liquidity, solver)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_lp_surplus_at_least_greedy(seed):
+    orders, liquidity = random_batch(seed, num_orders=120)
+    solver = BatchSolver(LinearProgrammingSolver().dex_fees)
+    lp = solver.solve(orders, liquidity, deadline=10)
+    greedy = solver.solve(orders, liquidity, method='greedy')
+    assert lp.prices == greedy.prices
+    assert lp.surplus >= greedy.surplus * (1 - 1e-4) - 1e-6
+
+
+def test_coincidence_of_wants_without_pools():
+    deadline = datetime.utcnow() + timedelta(minutes=5)
+    orders = [
+        BatchOrder('sell_weth', 'WETH', 'USDC', 2.0, 4800.0, '0x1', deadline),  # >= 2400 USDC/WETH
+        BatchOrder('buy_weth', 'USDC', 'WETH', 5200.0, 2.0, '0x2', deadline),  # <= 2600 USDC/WETH
+        BatchOrder('too_greedy', 'WETH', 'USDC', 1.0, 3000.0, '0x3', deadline),
+        BatchOrder('expired', 'USDC', 'WETH', 1000.0, 0.1, '0x4', datetime.utcnow() - timedelta(seconds=1)),
+    ]
+    result = BatchSolver().solve(orders, {})
+    price = result.prices['WETH'] / result.prices['USDC']
+    # Supply of 2 WETH meets 5200 USDC of demand at 2600, the buyer's limit
+    assert price == pytest.approx(2600, rel=1e-9)
+    assert set(result.fills) == {'sell_weth', 'buy_weth'}
+    assert not result.amm_trades
+    # Both sides clear against each other exactly
+    sold, bought = result.fills['sell_weth'], result.fills['buy_weth']
+    assert sold[0] == pytest.approx(bought[1]) and sold[1] == pytest.approx(bought[0])
+
+
+def test_imbalance_routed_through_amm_at_uniform_price():
+    deadline = datetime.utcnow() + timedelta(minutes=5)
+    orders = [
+        BatchOrder('a', 'WETH', 'USDC', 10.0, 24000.0, '0x1', deadline),
+        BatchOrder('b', 'USDC', 'WETH', 5000.0, 1.9, '0x2', deadline),
+    ]
+    liquidity = {'uniswap_v2': {'WETH/USDC': (1000.0, 2500000.0)}, 'sushiswap': {'WETH/USDC': (500.0, 1251000.0)}}
+    solver = BatchSolver(LinearProgrammingSolver().dex_fees)
+    result = solver.solve(orders, liquidity)
+    assert set(result.fills) == {'a', 'b'}
+    assert {t['dex'] for t in result.amm_trades} == {'uniswap_v2', 'sushiswap'}
+    assert all(t['token_in'] == 'WETH' for t in result.amm_trades)
+    # Clearing price sits below the pools' mid, by roughly the fee and slippage on the net flow
+    price = result.prices['WETH'] / result.prices['USDC']
+    assert 2470 < price < 2500
+    check_solution(orders, result, liquidity, solver)
+
+
+def test_deadline_falls_back_to_greedy():
+    orders, liquidity = random_batch(3)
+    result = BatchSolver().solve(orders, liquidity, deadline=0)
+    assert result.method == 'greedy'
+    assert result.fills
+
+
+@pytest.mark.asyncio
+async def test_engine_executes_solver_fills():
+    orders, liquidity = random_batch(7, num_orders=20)
+    solution = await LinearProgrammingSolver().optimize_batch(orders, liquidity, reference_prices={'USDC': 1.0})
+    assert solution.clearing_prices['USDC'] == pytest.approx(1.0)
+    assert 2300 < solution.clearing_prices['WETH'] < 2700
+
+    engine = BatchAuctionEngine()
+    engine.active_auction = BatchAuction('auction', datetime.utcnow(), datetime.utcnow(), orders=orders)
+    await engine.execute_solution(solution)
+    for order in orders:
+        if order.id in solution.fills:
+            amount_in, amount_out = solution.fills[order.id]
+            assert order.executed
+            assert order.execution_price == pytest.approx(amount_out / amount_in)
+        else:
+            assert not order.executed
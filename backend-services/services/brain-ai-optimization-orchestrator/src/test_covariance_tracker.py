@@ -0,0 +1,162 @@
+import pytest
+import threading
+
+# Add src to path to import the covariance tracker
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+from scipy import stats
+
+from advanced_risk_engine import AdvancedRiskEngine
+from covariance_tracker import EWMACovarianceTracker
+
+
+def reference_ewma(returns, decay):
+    """Full recompute of the EWMA covariance from the whole return history"""
+    cov = np.zeros((returns.shape[1], returns.shape[1]))
+    for r in returns:
+        cov = decay * cov + (1 - decay) * np.outer(r, r)
+    return cov
+
+
+def test_streaming_updates_match_full_recompute():
+    rng = np.random.default_rng(0)
+    symbols = ['WETH', 'WBTC', 'LINK', 'UNI']
+    returns = rng.normal(0, 0.02, (300, 4))
+    tracker = EWMACovarianceTracker(decay=0.94, initial_variance=0.0)
+
+    for r in returns:
+        tracker.update_returns(dict(zip(symbols, r)))
+
+    snapshot = tracker.snapshot()
+    assert snapshot.symbols == tuple(symbols)
+    assert np.allclose(snapshot.covariance, reference_ewma(returns, 0.94))
+
+
+def test_price_ticks_are_converted_to_log_returns():
+    tracker = EWMACovarianceTracker(decay=0.5, initial_variance=0.0)
+    tracker.update_prices({'WETH': 2000.0})
+    tracker.update_prices({'WETH': 2200.0})
+
+    snapshot = tracker.snapshot()
+    assert snapshot.covariance[0, 0] == pytest.approx(0.5 * np.log(1.1) ** 2)
+    assert snapshot.observations[0] == 1
+
+
+def test_assets_are_added_and_dropped_without_rebuild():
+    rng = np.random.default_rng(1)
+    tracker = EWMACovarianceTracker(initial_capacity=2)
+    for _ in range(50):
+        tracker.update_returns({'WETH': rng.normal(0, 0.02), 'WBTC': rng.normal(0, 0.02)})
+    before = tracker.snapshot().sub_covariance(['WETH', 'WBTC']).copy()
+
+    # Growing past capacity keeps existing estimates
+    tracker.add_asset('LINK')
+    tracker.add_asset('UNI')
+    after = tracker.snapshot()
+    assert np.array_equal(after.sub_covariance(['WETH', 'WBTC']), before)
+    assert after.volatility('LINK') == pytest.approx(np.sqrt(np.mean(np.diag(before))))
+    assert after.sub_covariance(['WETH', 'LINK'])[0, 1] == 0
+
+    # A dropped slot is reused by the next symbol with a clean row
+    tracker.remove_asset('WBTC')
+    tracker.add_asset('AAVE')
+    snapshot = tracker.snapshot()
+    assert 'WBTC' not in snapshot.index
+    assert snapshot.sub_covariance(['WETH', 'AAVE'])[0, 1] == 0
+    assert np.array_equal(snapshot.sub_covariance(['WETH']), before[:1, :1])
+
+
+def test_component_var_sums_to_portfolio_var():
+    rng = np.random.default_rng(2)
+    tracker = EWMACovarianceTracker()
+    mix = rng.normal(size=(3, 3))
+    for _ in range(200):
+        r = mix @ rng.normal(0, 0.01, 3)
+        tracker.update_returns(dict(zip(['A', 'B', 'C'], r)))
+
+    snapshot = tracker.snapshot()
+    exposures = {'A': 1e5, 'B': 5e4, 'C': -2e4}
+    components = snapshot.component_var(exposures, 0.99)
+    portfolio_var = stats.norm.ppf(0.99) * snapshot.portfolio_volatility(exposures)
+    assert sum(components.values()) == pytest.approx(portfolio_var)
+
+    # Marginal VaR is the gradient of portfolio VaR
+    bumped = dict(exposures, A=exposures['A'] + 1.0)
+    gradient = stats.norm.ppf(0.99) * (snapshot.portfolio_volatility(bumped) - snapshot.portfolio_volatility(exposures))
+    assert snapshot.marginal_var(exposures, 0.99)['A'] == pytest.approx(gradient, rel=1e-3)
+
+
+def test_snapshot_reads_are_consistent_under_concurrent_writes():
+    tracker = EWMACovarianceTracker(initial_capacity=2)
+    symbols = [f"TOKEN{i}" for i in range(20)]
+    stop = threading.Event()
+
+    def writer():
+        rng = np.random.default_rng(3)
+        i = 0
+        while not stop.is_set():
+            tracker.update_returns(dict(zip(symbols[:2 + i % 18], rng.normal(0, 0.02, 20))))
+            if i % 7 == 0:
+                tracker.remove_asset(symbols[i % 20])
+            i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        last_version = -1
+        for _ in range(2000):
+            snapshot = tracker.snapshot()
+            assert snapshot.version >= last_version
+            last_version = snapshot.version
+            assert snapshot.covariance.shape == (len(snapshot.symbols),) * 2
+            assert np.allclose(snapshot.covariance, snapshot.covariance.T)
+            assert not snapshot.covariance.flags.writeable
+    finally:
+        stop.set()
+        thread.join()
+
+    # Unchanged matrix returns the cached snapshot
+    assert tracker.snapshot() is tracker.snapshot()
+
+
+@pytest.mark.asyncio
+async def test_risk_engine_reads_correlations_from_snapshot():
+    engine = AdvancedRiskEngine()
+    rng = np.random.default_rng(4)
+    prices = np.array([2000.0, 40000.0])
+    for _ in range(engine.min_covariance_observations + 1):
+        shock = rng.normal(0, 0.01)
+        prices = prices * np.exp([shock, shock])
+        engine.update_prices({'ETH': prices[0], 'BTC': prices[1]})
+
+    positions = {'ETH': {'weight': 0.5, 'exposure': 50000}, 'BTC': {'weight': 0.5, 'exposure': 50000}}
+    metrics = await engine.calculate_portfolio_risk_metrics(positions)
+    assert metrics.correlation_matrix['ETH']['BTC'] == pytest.approx(1.0)
+
+    components = engine.get_component_var(positions)
+    assert components['ETH'] == pytest.approx(components['BTC'])
+
+
+@pytest.mark.asyncio
+async def test_risk_engine_reads_volatility_and_var_from_snapshot():
+    engine = AdvancedRiskEngine()
+    positions = {'ETH': {'weight': 0.6}, 'BTC': {'weight': 0.4}}
+
+    # Cold start: nothing tracked yet, so the return series is used
+    cold = await engine.calculate_portfolio_risk_metrics(positions)
+    returns = await engine._get_historical_returns(['ETH', 'BTC'])
+    assert cold.value_at_risk == engine._calculate_value_at_risk(returns @ np.array([0.6, 0.4]))
+
+    rng = np.random.default_rng(5)
+    for r in rng.normal(0, [0.03, 0.01], (engine.min_covariance_observations, 2)):
+        engine.covariance_tracker.update_returns({'ETH': r[0], 'BTC': r[1]})
+
+    metrics = await engine.calculate_portfolio_risk_metrics(positions)
+    sigma = engine.get_portfolio_volatility(positions)
+    assert metrics.volatility == pytest.approx(sigma * np.sqrt(engine.covariance_periods_per_year))
+    assert metrics.value_at_risk == pytest.approx(stats.norm.ppf(0.95) * sigma)
+    assert metrics.expected_shortfall == pytest.approx(sigma * stats.norm.pdf(stats.norm.ppf(0.95)) / 0.05)
+    assert metrics.expected_shortfall > metrics.value_at_risk
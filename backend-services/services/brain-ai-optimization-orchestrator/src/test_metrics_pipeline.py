@@ -0,0 +1,183 @@
+import pytest
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Add src to path to import the metrics pipeline
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from metrics_pipeline import (
+    COUNTER, DISTRIBUTION, FileExporter, HttpExporter, MetricsExporter, MetricsPipeline, PrometheusExporter
+)
+
+
+class ListExporter(MetricsExporter):
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def export(self, batch, interval_start, interval_end):
+        if self.fail:
+            raise ConnectionError("backend unavailable")
+        self.batches.append({(agg.name, agg.labels): agg for agg in batch})
+
+
+class CloudStub:
+    """Local HTTP stand-in for the cloud metrics backend"""
+
+    def __init__(self):
+        self.received = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.received.append(json.loads(body))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/v3/timeSeries'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_points_are_aggregated_per_series_and_kind():
+    exporter = ListExporter()
+    pipeline = MetricsPipeline([exporter])
+    for _ in range(5):
+        pipeline.record('violations', 1, {'type': 'token_address'}, COUNTER)
+    pipeline.record('violations', 1, {'type': 'path_address'}, COUNTER)
+    for value in (3, 7, 4):
+        pipeline.record('opportunities', value)
+    for value in (0.002, 0.03, 0.03, 20.0):
+        pipeline.record('latency', value, kind=DISTRIBUTION)
+
+    pipeline.flush()
+    batch = exporter.batches[0]
+    assert batch[('violations', (('type', 'token_address'),))].value == 5
+    assert batch[('violations', (('type', 'path_address'),))].value == 1
+    assert batch[('opportunities', ())].value == 4
+    latency = batch[('latency', ())]
+    assert (latency.count, latency.min, latency.max) == (4, 0.002, 20.0)
+    assert latency.sum == pytest.approx(20.062)
+    assert latency.buckets[0] == 1 and latency.buckets[3] == 2 and latency.buckets[-1] == 1
+    assert pipeline.stats['flushed_points'] == 13 and pipeline.stats['flushed_series'] == 4
+
+    # Nothing queued means nothing exported
+    pipeline.flush()
+    assert len(exporter.batches) == 1
+
+
+def test_memory_is_bounded_and_drops_are_counted():
+    exporter = ListExporter()
+    pipeline = MetricsPipeline([exporter], capacity=100, max_series=10)
+    for i in range(150):
+        pipeline.record('per_request', i, {'request': i})
+    assert pipeline.pending() == 100 and pipeline.dropped == 50
+
+    pipeline.flush()
+    assert len(exporter.batches[0]) == 10
+    assert pipeline.stats['dropped_series'] == 90
+    assert pipeline.snapshot()['pending'] == 0
+
+
+def test_failing_exporter_does_not_block_the_others():
+    good, bad = ListExporter(), ListExporter(fail=True)
+    pipeline = MetricsPipeline([bad, good])
+    pipeline.record('x', 1.0)
+    pipeline.flush()
+    assert pipeline.stats['export_errors'] == 1
+    assert len(good.batches) == 1
+
+
+def test_background_thread_flushes_and_stop_flushes_the_rest(tmp_path):
+    path = tmp_path / 'metrics.jsonl'
+    stub = CloudStub()
+    try:
+        pipeline = MetricsPipeline([FileExporter(str(path)), HttpExporter(stub.url)], interval=0.05).start()
+        pipeline.record('profit', 1.5, kind=COUNTER)
+        deadline = time.time() + 5
+        while not stub.received and time.time() < deadline:
+            time.sleep(0.01)
+        assert stub.received[0]['series'] == [
+            {'name': 'profit', 'kind': 'counter', 'labels': {}, 'count': 1, 'value': 1.5}
+        ]
+
+        pipeline.interval = 60
+        time.sleep(0.1)  # Let the thread enter its long wait
+        pipeline.record('profit', 2.5, kind=COUNTER)
+        pipeline.stop()
+        assert stub.received[-1]['series'][0]['value'] == 2.5
+    finally:
+        stub.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line['value'] for line in lines] == [1.5, 2.5]
+    assert lines[1]['start'] >= lines[0]['end']
+
+
+def test_prometheus_exporter_accumulates_counters_and_histograms():
+    registry = CollectorRegistry()
+    pipeline = MetricsPipeline([PrometheusExporter(registry)])
+    for _ in range(3):
+        pipeline.record('executions', 1, {'status': 'attempted'}, COUNTER)
+        pipeline.record('confidence', 0.8)
+        pipeline.record('latency', 0.02, kind=DISTRIBUTION)
+        pipeline.flush()
+    pipeline.record('confidence', 0.6)
+    pipeline.flush()
+
+    assert registry.get_sample_value('alpha_orion_executions_total', {'status': 'attempted'}) == 3
+    assert registry.get_sample_value('alpha_orion_confidence') == 0.6
+    assert registry.get_sample_value('alpha_orion_latency_bucket', {'le': '0.025'}) == 3
+    assert registry.get_sample_value('alpha_orion_latency_bucket', {'le': '0.01'}) == 0
+    assert registry.get_sample_value('alpha_orion_latency_count') == 3
+    assert b'alpha_orion_latency_bucket{le="+Inf"} 3.0' in generate_latest(registry)
+
+    pipeline.stop()
+    assert registry.get_sample_value('alpha_orion_confidence') is None
+
+
+def test_prometheus_exporter_keeps_at_most_max_series():
+    registry = CollectorRegistry()
+    exporter = PrometheusExporter(registry, max_series=3)
+    pipeline = MetricsPipeline([exporter])
+    for batch in range(3):
+        for token in range(2):
+            pipeline.record('violations', 1, {'token': f'0x{batch}{token}'}, COUNTER)
+        pipeline.flush()
+    pipeline.record('violations', 1, {'token': '0x00'}, COUNTER)
+    pipeline.flush()
+
+    # The first three series stay and keep accumulating; later ones are dropped
+    assert registry.get_sample_value('alpha_orion_violations_total', {'token': '0x00'}) == 2
+    assert registry.get_sample_value('alpha_orion_violations_total', {'token': '0x10'}) == 1
+    assert registry.get_sample_value('alpha_orion_violations_total', {'token': '0x11'}) is None
+    assert exporter.dropped_series == 3
+    pipeline.stop()
+
+
+def test_record_adds_under_10us_to_the_request_path():
+    pipeline = MetricsPipeline([ListExporter()], capacity=1_000_000)
+    labels = {'type': 'token_address'}
+    n = 50_000
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(n):
+            pipeline.record('compliance_violation', 1, labels, COUNTER)
+        best = min(best, (time.perf_counter() - start) / n)
+        pipeline.flush()
+    assert best < 10e-6
@@ -0,0 +1,244 @@
+import pytest
+
+# Add src to path to import the risk engine
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+
+from risk_engine import (
+    CircuitBreaker, CircuitBreakerState, CorrelatedMonteCarloEngine, DynamicPositionLimit, Position,
+    PreTradeGate, RiskManager, StressTestingEngine, StressTestScenario, VaRCalculator
+)
+
+
+def reference_loss(scenario, positions):
+    """Per-position loop from the original StressTestingEngine.run_scenario"""
+    total_before = sum(p.market_value for p in positions)
+    total_after = total_before
+    for p in positions:
+        new_value = p.size_usd * (1 + (p.pnl_pct + scenario.price_changes.get(p.token, 0)) / 100)
+        total_after += new_value - p.market_value
+    return total_before - total_after
+
+
+@pytest.fixture
+def positions():
+    rng = np.random.default_rng(3)
+    tokens = ['WETH', 'WBTC', 'USDC', 'USDT', 'DAI', 'LINK']
+    return [
+        Position(token=tokens[i % len(tokens)], size_usd=float(rng.uniform(1e3, 1e5)),
+                 entry_price=1.0, current_price=1.0, pnl_pct=float(rng.normal(0, 5)))
+        for i in range(200)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_matrix_results_match_per_position_loop(positions):
+    engine = StressTestingEngine()
+    results = await engine.run_all_scenarios(positions)
+
+    assert len(results) == len(engine.scenarios)
+    by_name = {s.name: s for s in engine.scenarios}
+    for result in results:
+        assert result['loss'] == pytest.approx(reference_loss(by_name[result['scenario_name']], positions))
+    assert [r['loss_percentage'] for r in results] == sorted((r['loss_percentage'] for r in results), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_results_cached_per_book_version(positions):
+    engine = StressTestingEngine()
+    first = await engine.run_all_scenarios(positions, book_version=1)
+    assert await engine.get_worst_case(positions, book_version=1) is first[0]
+
+    engine.add_custom_scenario(StressTestScenario(
+        name="LINK_Wipeout", description="LINK goes to zero", price_changes={'LINK': -100.0}
+    ))
+    rerun = await engine.run_all_scenarios(positions, book_version=1)
+    assert rerun is not first
+    assert 'LINK_Wipeout' in engine.last_results
+
+
+@pytest.mark.asyncio
+async def test_single_scenario_matches_reference(positions):
+    engine = StressTestingEngine()
+    scenario = engine.scenarios[0]
+    result = await engine.run_scenario(scenario, positions)
+    assert result['loss'] == pytest.approx(reference_loss(scenario, positions))
+
+
+def test_historical_scenarios_compound_returns():
+    engine = StressTestingEngine()
+    history = np.array([[0.10, 0.0], [-0.50, 0.0]])
+    shocks = engine.generate_scenarios(['A', 'B'], 50, method='historical',
+                                       returns_history=history, horizon_days=2, seed=1)
+    assert np.allclose(shocks[:, 0], (1.10 * 0.50 - 1) * 100)
+    assert np.allclose(shocks[:, 1], 0)
+
+
+@pytest.mark.asyncio
+async def test_random_scenarios_are_seeded():
+    # Throughput is checked by benchmark_risk_engine.py stress --budget-ms
+    rng = np.random.default_rng(0)
+    tokens = [f"T{i}" for i in range(50)]
+    book = [Position(token=tokens[i % 50], size_usd=float(rng.uniform(1e3, 1e5)),
+                     entry_price=1.0, current_price=1.0) for i in range(1000)]
+    engine = StressTestingEngine()
+
+    summary = await engine.run_simulated_scenarios(book, num_scenarios=10000, seed=42)
+    again = await engine.run_simulated_scenarios(book, num_scenarios=10000, seed=42)
+    assert np.array_equal(summary['losses'], again['losses'])
+    assert summary['expected_shortfall'] >= summary['var']
+
+
+@pytest.mark.asyncio
+async def test_gate_matches_dynamic_position_limit():
+    rng = np.random.default_rng(5)
+    limits = DynamicPositionLimit()
+    gate = PreTradeGate(CircuitBreaker(initial_balance=1e9), limits)
+    vols = {'WETH': 0.05, 'WBTC': 0.03}
+    gate.refresh_limit_factors(volatilities=vols)
+
+    book = {}
+    for i in range(500):
+        asset = ['WETH', 'WBTC', 'USDC', 'LINK'][i % 4]
+        size = float(rng.uniform(1e3, 5e4))
+        gate.on_fill(f"p{i}", asset, size)
+        book[f"p{i}"] = (asset, size)
+    for i in range(0, 500, 7):
+        gate.on_close(f"p{i}")
+        del book[f"p{i}"]
+
+    current = {}
+    for asset, size in book.values():
+        current[asset] = current.get(asset, 0.0) + size
+    total = sum(current.values())
+    assert gate.total_market_value == pytest.approx(total)
+
+    for asset in ['WETH', 'WBTC', 'USDC', 'LINK', 'NEW']:
+        expected = await limits.get_max_position(asset, current, total, vols.get(asset, 0.02))
+        allowed, max_size, _ = gate.check(asset, 1000.0)
+        assert max_size == pytest.approx(expected)
+        assert allowed == (1000.0 <= expected)
+
+
+def test_gate_enforces_strategy_limits_and_breaker():
+    breaker = CircuitBreaker(initial_balance=1e6)
+    gate = PreTradeGate(breaker, DynamicPositionLimit(), strategy_limits={'stat_arb': 50000.0})
+    gate.on_fill('a', 'USDC', 40000.0, 'stat_arb')
+
+    assert gate.check('USDC', 5000.0, 'stat_arb')[0]
+    assert not gate.check('USDC', 20000.0, 'stat_arb')[0]
+    assert gate.check('USDC', 20000.0, 'other')[0]
+
+    breaker.current_state = CircuitBreakerState.TRADING_HALT
+    assert gate.check('USDC', 1000.0, 'other') == (False, 0.0, "Trading halted due to high drawdown")
+
+
+@pytest.mark.asyncio
+async def test_risk_manager_keeps_gate_in_sync():
+    manager = RiskManager(initial_balance=1e6)
+    await manager.add_position(Position(token='WETH', size_usd=100000, entry_price=2000, current_price=2000))
+    await manager.add_position(Position(token='USDC', size_usd=50000, entry_price=1, current_price=1))
+    await manager.update_prices({'WETH': 2200})
+
+    gate = manager.pre_trade_gate
+    assert gate.total_market_value == pytest.approx(sum(p.market_value for p in manager.positions.values()))
+
+    await manager.remove_position('WETH')
+    assert gate.asset_exposure['WETH'] == 0
+    assert gate.total_market_value == pytest.approx(50000)
+
+
+def make_covariance(num_assets, rng):
+    vols = rng.uniform(0.01, 0.05, num_assets)
+    corr = np.full((num_assets, num_assets), 0.3) + 0.7 * np.eye(num_assets)
+    corr[0, 1] = corr[1, 0] = -0.2
+    return corr * np.outer(vols, vols), corr
+
+
+def test_simulated_correlations_match_input():
+    cov, corr = make_covariance(8, np.random.default_rng(7))
+    engine = CorrelatedMonteCarloEngine(num_paths=100000)
+
+    simulated = engine.simulate_returns(cov, seed=11)
+    assert simulated.shape == (100000, 8)
+    # Standard error of a sample correlation at 100k paths is ~0.003
+    assert np.abs(np.corrcoef(simulated, rowvar=False) - corr).max() < 0.015
+    assert np.allclose(simulated.std(axis=0), np.sqrt(np.diag(cov)), rtol=0.02)
+
+
+def test_seeded_paths_are_reproducible_and_factor_is_cached():
+    cov, _ = make_covariance(5, np.random.default_rng(1))
+    engine = CorrelatedMonteCarloEngine(num_paths=10000, drift_threshold=0.05)
+    exposures = np.full(5, 1e5)
+
+    first = engine.simulate_pnl(exposures, cov, seed=3)
+    assert np.array_equal(first, engine.simulate_pnl(exposures, cov, seed=3))
+
+    factor = engine.cholesky_factor(cov)
+    assert engine.cholesky_factor(cov * 1.01) is factor
+    assert engine.cholesky_factor(cov * 1.5) is not factor
+    assert engine.factorizations == 2
+
+
+def test_shrinkage_covariance_is_positive_definite():
+    rng = np.random.default_rng(2)
+    # Fewer observations than assets: the sample covariance is singular
+    returns = rng.normal(0, 0.02, (20, 40))
+    cov, shrinkage = CorrelatedMonteCarloEngine.shrink_covariance(returns)
+    assert 0 < shrinkage <= 1
+    assert np.linalg.eigvalsh(cov).min() > 0
+    np.linalg.cholesky(cov)
+
+
+@pytest.mark.asyncio
+async def test_portfolio_monte_carlo_var_matches_analytic():
+    rng = np.random.default_rng(4)
+    cov, _ = make_covariance(4, rng)
+    returns = rng.multivariate_normal(np.zeros(4), cov, size=5000)
+    tokens = ['WETH', 'WBTC', 'LINK', 'UNI']
+    exposures = {t: 1e6 for t in tokens}
+
+    var = await VaRCalculator().calculate_portfolio_monte_carlo_var(
+        exposures, {t: returns[:, i].tolist() for i, t in enumerate(tokens)}, seed=5
+    )
+
+    weights = np.full(4, 1e6)
+    sample_cov = np.cov(returns, rowvar=False)
+    analytic = 2.326 * np.sqrt(weights @ sample_cov @ weights)
+    assert var[0.99] == pytest.approx(analytic, rel=0.05)
+    assert var[0.95] < var[0.99]
+
+
+@pytest.mark.asyncio
+async def test_risk_manager_var_simulates_positions_jointly():
+    rng = np.random.default_rng(6)
+    cov, _ = make_covariance(2, rng)
+    returns = rng.multivariate_normal(np.zeros(2), cov, size=5000)
+    manager = RiskManager(initial_balance=1e6)
+    await manager.add_position(Position(token='WETH', size_usd=100000, entry_price=2000, current_price=2000))
+    await manager.add_position(Position(token='WBTC', size_usd=50000, entry_price=60000, current_price=60000))
+
+    metrics = await manager.calculate_portfolio_risk(
+        asset_returns={'WETH': returns[:, 0].tolist(), 'WBTC': returns[:, 1].tolist()}
+    )
+
+    # WETH and WBTC are negatively correlated, so the joint VaR is below the sum of the parts
+    weights = np.array([100000, 50000])
+    analytic = 2.326 * np.sqrt(weights @ np.cov(returns, rowvar=False) @ weights)
+    assert metrics.var_99 == pytest.approx(analytic, rel=0.05)
+    assert metrics.var_99 < 2.326 * (weights * returns.std(axis=0)).sum()
+
+
+def test_non_positive_definite_covariance_is_repaired():
+    corr = np.full((4, 4), 0.9) + 0.1 * np.eye(4)
+    corr[0, 1] = corr[1, 0] = -0.9
+    engine = CorrelatedMonteCarloEngine()
+
+    factor = engine.cholesky_factor(corr)
+    assert np.all(np.isfinite(factor))
+    # Eigenvalue clipping is the Frobenius-nearest PSD matrix
+    negative = np.linalg.eigvalsh(corr).clip(max=0)
+    assert np.linalg.norm(factor @ factor.T - corr) == pytest.approx(np.linalg.norm(negative), rel=1e-6)
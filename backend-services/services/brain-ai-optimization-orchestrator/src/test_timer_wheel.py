@@ -0,0 +1,211 @@
+import pytest
+
+# Add src to path to import the timer wheel
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from batch_auction_arbitrage import AuctionState, BatchAuctionEngine, BatchOrder, SolverSolution
+from timer_wheel import ManualClock, TimerScheduler, TimerWheel
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("levels", [(256, 64, 64, 64), (8, 4, 4)])
+def test_wheel_matches_heap_reference(seed, levels):
+    """Random schedule/cancel/reschedule/advance against a heap; small wheels exercise cascades and overflow"""
+    rng = np.random.default_rng(seed)
+    wheel = TimerWheel(0.001, levels)
+    fired, reference, handles = [], [], {}
+    now = 0.0
+    for step in range(400):
+        action = rng.random()
+        if action < 0.5:
+            deadline = now + float(rng.choice([rng.uniform(0, 0.01), rng.uniform(0, 2), rng.uniform(0, 600)]))
+            key = len(handles)
+            handles[key] = wheel.schedule(deadline, fired.append, key)
+            heapq.heappush(reference, (handles[key].tick, deadline, key))
+        elif action < 0.6 and handles:
+            key = int(rng.integers(len(handles)))
+            handles[key].cancel()
+        elif action < 0.7 and handles:
+            key = int(rng.integers(len(handles)))
+            if handles[key].active:
+                deadline = now + float(rng.uniform(0, 5))
+                handles[key] = wheel.reschedule(handles[key], deadline)
+                heapq.heappush(reference, (handles[key].tick, deadline, key))
+        else:
+            now += float(rng.choice([rng.uniform(0, 0.005), rng.uniform(0, 1), rng.uniform(0, 120)]))
+            for handle in wheel.advance(now):
+                # Never early, and fired at the first advance past its tick
+                assert handle.deadline <= now + 1e-9
+                handle.callback(*handle.args)
+            expected = []
+            while reference and reference[0][0] * 0.001 <= now + 1e-9:
+                tick, deadline, key = heapq.heappop(reference)
+                if handles[key].tick == tick and handles[key].deadline == deadline and not handles[key].cancelled:
+                    expected.append(key)
+            assert sorted(fired) == sorted(expected)
+            fired.clear()
+
+            pending = [h.deadline for h in handles.values() if h.active]
+            assert len(wheel) == len(pending)
+            assert wheel.next_deadline() == (min(pending) if pending else None)
+
+
+def test_deadlines_round_up_and_fire_in_order():
+    wheel = TimerWheel(0.001)
+    order = []
+    for deadline in (0.0105, 0.0101, 0.010, 5.0, 0.3):
+        wheel.schedule(deadline, order.append, deadline)
+    assert [h.deadline for h in wheel.advance(0.010)] == [0.010]
+    assert wheel.advance(0.0109) == []
+    assert [h.deadline for h in wheel.advance(0.011)] == [0.0101, 0.0105]
+    assert wheel.next_deadline() == 0.3
+    assert [h.deadline for h in wheel.advance(10)] == [0.3, 5.0]
+
+    # Deadlines already in the past fire on the next advance
+    late = wheel.schedule(1.0, order.append, 'late')
+    assert wheel.advance(10) == [late]
+
+
+def test_scheduler_cancel_and_reschedule_with_manual_clock():
+    clock = ManualClock(100.0)
+    scheduler = TimerScheduler(clock=clock)
+    fired = []
+    a = scheduler.call_later(1.0, lambda: fired.append(('a', clock())))
+    b = scheduler.call_later(2.0, lambda: fired.append(('b', clock())))
+    c = scheduler.call_later(3.0, lambda: fired.append(('c', clock())))
+    b.cancel()
+    c = scheduler.reschedule(c, 100.5)
+    assert not a.cancelled and len(scheduler) == 2
+
+    scheduler.run_until(110.0, clock)
+    assert fired == [('c', 100.5), ('a', 101.0)]
+    assert clock() == 110.0 and len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_wakes_for_earlier_timer():
+    scheduler = TimerScheduler()
+    loop = asyncio.get_running_loop()
+    fired = []
+    scheduler.call_later(10.0, fired.append, 'late')
+    runner = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0)
+
+    # Added while the driver sleeps towards the 10s timer
+    done = loop.create_future()
+    scheduler.call_later(0.02, lambda: done.set_result(scheduler.clock()))
+    start = scheduler.clock()
+    await asyncio.wait_for(done, 2.0)
+    assert 0.02 <= done.result() - start < 1.0
+    assert fired == []
+
+    scheduler.stop()
+    await asyncio.wait_for(runner, 1.0)
+
+
+def make_order(i):
+    return BatchOrder(f"o{i}", 'WETH', 'USDC', 1.0, 2400.0, f"0x{i:040x}", datetime.utcnow() + timedelta(minutes=5))
+
+
+def make_solution(order_ids):
+    return SolverSolution('lp_solver', list(order_ids), {'WETH': 1.0}, {'USDC': 2500.0}, [], 100000, 0.001)
+
+
+@pytest.mark.asyncio
+async def test_auctions_pipeline_on_simulated_clock():
+    clock = ManualClock()
+    engine = BatchAuctionEngine(clock=clock)
+    engine.register_solver('lp_solver')
+    first = engine.open_auction()
+    await engine.submit_order(make_order(1))
+
+    engine.scheduler.run_until(30.0, clock)
+    # Auction N is solving while auction N+1 already collects
+    second = engine.active_auction
+    assert first.state == AuctionState.SOLVING and first.closed_at == 30.0
+    assert second is not first and second.state == AuctionState.COLLECTING
+    assert second.close_at == 60.0
+    assert await engine.submit_order(make_order(2))
+    assert [o.id for o in first.orders] == ['o1']
+
+    assert await engine.submit_solution(make_solution(['o1']))
+    engine.scheduler.run_until(35.0, clock)
+    await asyncio.sleep(0)
+    assert first.state == AuctionState.COMPLETED and first.orders[0].executed
+    assert first.winning_solution.solver_id == 'lp_solver'
+
+    # No solutions by the solve deadline fails the auction; the pipeline keeps going
+    engine.scheduler.run_until(65.0, clock)
+    assert second.state == AuctionState.FAILED
+    assert engine.active_auction.state == AuctionState.COLLECTING
+    assert engine.get_auction_status()['time_remaining'] == pytest.approx(25.0)
+
+
+@pytest.mark.asyncio
+async def test_full_batch_closes_early_and_cancel():
+    clock = ManualClock()
+    engine = BatchAuctionEngine(clock=clock)
+    engine.max_orders = 3
+    auction = engine.open_auction()
+    clock.advance(2.0)
+    for i in range(3):
+        assert await engine.submit_order(make_order(i))
+    assert not await engine.submit_order(make_order(3))
+
+    engine.scheduler.run_until(2.0, clock)
+    assert auction.state == AuctionState.SOLVING and auction.closed_at == 2.0
+
+    assert engine.reschedule_close(engine.active_auction.id, 10.0)
+    assert engine.cancel_auction(auction.id)
+    assert auction.state == AuctionState.FAILED and not auction.timers
+    assert engine.solving == {}
+
+    engine.scheduler.run_until(9.999, clock)
+    assert engine.active_auction.state == AuctionState.COLLECTING
+    engine.scheduler.run_until(10.0, clock)
+    assert engine.active_auction.close_at == 40.0
+
+
+@pytest.mark.asyncio
+async def test_close_jitter_with_1000_concurrent_auctions():
+    """Closes land within 5ms of their deadlines even when every callback costs simulated time"""
+    rng = np.random.default_rng(0)
+    clock = ManualClock()
+    engine = BatchAuctionEngine(clock=clock)
+    engine.register_solver('lp_solver')
+    engine.solve_window = 60
+    close_auction = engine._close_auction
+
+    def slow_close(auction):
+        clock.advance(20e-6)  # Simulated work per close callback
+        close_auction(auction)
+
+    engine._close_auction = slow_close
+    auctions = [engine.open_auction(duration=float(d), rollover=False) for d in rng.uniform(1, 30, 1000)]
+    # A burst of auctions sharing one deadline
+    auctions += [engine.open_auction(duration=15.0, rollover=False) for _ in range(100)]
+    for i, auction in enumerate(auctions[:50]):
+        await engine.submit_order(make_order(i), auction_id=auction.id)
+
+    engine.scheduler.run_until(31.0, clock)
+    assert all(a.state == AuctionState.SOLVING for a in auctions)
+    lags = np.array([a.closed_at - a.close_at for a in auctions])
+    assert lags.min() >= 0
+    assert lags.max() < 0.005
+    assert len(engine.close_lag) == 1100
+
+    for auction in auctions[:50]:
+        assert await engine.submit_solution(make_solution([o.id for o in auction.orders]), auction_id=auction.id)
+    engine.scheduler.run_until(100.0, clock)
+    await asyncio.sleep(0)
+    assert all(a.state == AuctionState.COMPLETED for a in auctions[:50])
+    assert all(a.state == AuctionState.FAILED for a in auctions[50:])
+    assert len(engine.scheduler) == 0
@@ -0,0 +1,148 @@
+import pytest
+from datetime import datetime, timedelta
+
+# Add src to path to import the velocity index
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+
+from compliance_engine import AlertType, TransactionMonitor, TransactionRecord
+from velocity_index import DEFAULT_WINDOWS, WalletVelocityIndex
+
+
+def reference_stats(events, now, seconds, buckets=60):
+    """Brute-force totals over the same bucket-aligned window"""
+    width = seconds / buckets
+    oldest = int(now // width) - buckets + 1
+    live = [e for e in events if int(e[0] // width) >= oldest]
+    return (
+        len(live),
+        sum(e[1] for e in live),
+        sum(1 for e in live if 9000 <= e[1] < 10000),
+        {e[2] for e in live if e[2]},
+        {e[3] for e in live if e[3]},
+    )
+
+
+def make_tx(wallet, timestamp, amount, direction="OUT", counterparty="0xcounterparty", n=[0]):
+    n[0] += 1
+    return TransactionRecord(
+        tx_hash=f"0x{n[0]:064x}",
+        timestamp=timestamp,
+        wallet_address=wallet,
+        direction=direction,
+        token="USDC",
+        amount_usd=amount,
+        from_address=counterparty if direction == "IN" else wallet,
+        to_address=counterparty if direction == "OUT" else wallet,
+        gas_used=21000,
+        gas_price_gwei=30,
+        block_number=18000000,
+        risk_score=0,
+        compliance_status="PENDING"
+    )
+
+
+def test_million_transaction_replay_matches_brute_force():
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    hot = [f"0xhot{i}" for i in range(10)]
+    cold = [f"0xcold{i}" for i in range(25000)]
+    counterparties = [f"0xcp{i}" for i in range(200)]
+
+    # ~2.3 days of traffic: 30% from a few hot wallets, the rest spread over churning cold wallets
+    timestamps = np.cumsum(rng.exponential(0.2, n)).tolist()
+    is_hot = (rng.random(n) < 0.3).tolist()
+    hot_pick = rng.integers(0, len(hot), n).tolist()
+    cold_pick = rng.integers(0, len(cold), n).tolist()
+    amounts = np.where(rng.random(n) < 0.05, rng.uniform(9000, 10000, n), rng.lognormal(6, 1.5, n)).tolist()
+    directions = (rng.random(n) < 0.5).tolist()
+    cp_pick = rng.integers(0, len(counterparties), n).tolist()
+
+    index = WalletVelocityIndex(max_wallets=20000)
+    history = {wallet: [] for wallet in hot}
+    max_tracked = 0
+    for i in range(n):
+        wallet = hot[hot_pick[i]] if is_hot[i] else cold[cold_pick[i]]
+        counterparty = counterparties[cp_pick[i]]
+        sent_to, received_from = (counterparty, None) if directions[i] else (None, counterparty)
+        index.record(wallet, timestamps[i], amounts[i], sent_to=sent_to, received_from=received_from)
+        if is_hot[i]:
+            history[wallet].append((timestamps[i], amounts[i], sent_to, received_from))
+        if i % 1000 == 0:
+            max_tracked = max(max_tracked, len(index))
+
+    assert max_tracked <= 20000
+    assert index.evicted > 0
+
+    for wallet in hot:
+        for name, seconds in DEFAULT_WINDOWS.items():
+            stats = index.stats(wallet, name)
+            count, volume, near, sent_to, received_from = reference_stats(history[wallet], index.now, seconds)
+            assert stats.count == count
+            assert stats.volume == pytest.approx(volume)
+            assert stats.near_threshold == near
+            assert stats.sent_to == sent_to
+            assert stats.received_from == received_from
+
+
+def test_windows_roll_and_idle_wallets_are_evicted():
+    index = WalletVelocityIndex()
+    for t in range(0, 120, 10):
+        index.record("0xa", t, 100.0, sent_to="0xb")
+
+    assert index.stats("0xa", "1m").count == 6
+    assert index.stats("0xa", "1h").count == 12
+    assert index.stats("0xa", "1h").volume == pytest.approx(1200.0)
+
+    # Buckets dropped from the window release their counterparties
+    index.record("0xc", 4000, 1.0)
+    assert index.stats("0xa", "1h").count == 0
+    assert index.stats("0xa", "1h").sent_to == frozenset()
+    assert index.stats("0xa", "24h").count == 12
+
+    # A wallet idle past the largest window is evicted on the next update
+    index.record("0xc", 200000, 1.0)
+    assert "0xa" not in index
+    assert index.stats("0xa", "24h").count == 0
+    assert len(index) == 1
+
+
+def test_late_transactions_land_in_newest_bucket():
+    index = WalletVelocityIndex()
+    index.record("0xa", 1000, 1.0)
+    index.record("0xa", 500, 2.0)
+    stats = index.stats("0xa", "1m")
+    assert stats.count == 2
+    assert stats.volume == pytest.approx(3.0)
+
+
+@pytest.mark.asyncio
+async def test_monitor_rules_use_velocity_windows():
+    monitor = TransactionMonitor()
+    start = datetime.utcnow() - timedelta(hours=2)
+
+    # Structuring: two near-$10K transfers within 24h
+    alerts = await monitor.monitor_transaction(make_tx("0xs", start, 9500))
+    assert AlertType.STRUCTURING not in {a.alert_type for a in alerts}
+    alerts = await monitor.monitor_transaction(make_tx("0xs", start + timedelta(hours=1), 9600))
+    assert AlertType.STRUCTURING in {a.alert_type for a in alerts}
+
+    # Velocity: five transactions in one minute
+    for i in range(5):
+        alerts = await monitor.monitor_transaction(make_tx("0xv", start + timedelta(seconds=i), 10))
+    assert [a.alert_type for a in alerts] == [AlertType.VELOCITY_BREACH]
+    assert "5 transactions in 1m" in alerts[0].description
+
+    # Round trip: funds sent back to the wallet they came from within the hour
+    await monitor.monitor_transaction(make_tx("0xr", start, 500, direction="IN", counterparty="0xmixer"))
+    alerts = await monitor.monitor_transaction(make_tx("0xr", start + timedelta(minutes=30), 480, counterparty="0xmixer"))
+    assert [a.alert_type for a in alerts] == [AlertType.UNUSUAL_PATTERN]
+    alerts = await monitor.monitor_transaction(make_tx("0xr", start + timedelta(minutes=95), 480, counterparty="0xother"))
+    assert alerts == []
+
+    assert monitor.transactions_monitored == 10
+    assert monitor.flagged_transactions == 3
+    assert len(monitor._get_recent_transactions("0xr")) == 3
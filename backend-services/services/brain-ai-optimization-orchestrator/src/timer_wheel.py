@@ -0,0 +1,306 @@
+"""
+Alpha-Orion Timer Wheel
+Hierarchical timing wheel and asyncio driver for deadline scheduling.
+
+Timers are bucketed by deadline tick into a small stack of wheels
+(1ms x 256, then 256ms x 64, ...), so scheduling, cancelling and firing are
+O(1) regardless of how many timers are pending. Far timers cascade down a
+level each time the wheel below wraps. TimerScheduler sleeps until the next
+deadline instead of polling, and takes an injectable clock so lifecycles can
+be driven by a simulated clock in tests.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEVELS = (256, 64, 64, 64)  # Slots per wheel; ~18.6 hours of 1ms ticks in total
+
+
+class TimerHandle:
+    """A scheduled callback; cancel() or TimerScheduler.reschedule() it"""
+
+    __slots__ = ('deadline', 'tick', 'callback', 'args', 'cancelled', 'fired', 'seq', '_wheel')
+
+    def __init__(self, deadline: float, tick: int, callback: Callable, args: tuple, seq: int, wheel):
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.fired = False
+        self.seq = seq
+        self._wheel = wheel
+
+    @property
+    def active(self) -> bool:
+        return not (self.cancelled or self.fired)
+
+    def cancel(self):
+        if self.active:
+            self.cancelled = True
+            self._wheel._discard(self)
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel over integer ticks of `resolution` seconds.
+
+    Deadlines round up to the next tick, so timers never fire early.
+    Cancelled timers are dropped lazily when their slot is reached.
+    """
+
+    def __init__(self, resolution: float = 0.001, levels: Sequence[int] = DEFAULT_LEVELS, start: float = 0.0):
+        if any(size & (size - 1) for size in levels):
+            raise ValueError("Wheel sizes must be powers of two")
+        self.resolution = resolution
+        self.sizes = list(levels)
+        self.bits = [size.bit_length() - 1 for size in levels]
+        self.shifts = [sum(self.bits[:i]) for i in range(len(levels))]
+        self.wheels: List[List[List[TimerHandle]]] = [[[] for _ in range(size)] for size in levels]
+        self.counts = [0] * len(levels)  # Entries per level, including cancelled ones
+        self.current = self.to_tick(start)
+        self._pending = 0
+        self._seq = 0
+        self._earliest: Optional[float] = None  # Cached next_deadline(); None when stale or idle
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def to_tick(self, deadline: float) -> int:
+        return math.ceil(round(deadline / self.resolution, 9))
+
+    def schedule(self, deadline: float, callback: Callable, *args) -> TimerHandle:
+        self._seq += 1
+        handle = TimerHandle(deadline, self.to_tick(deadline), callback, args, self._seq, self)
+        self._pending += 1
+        if self._pending == 1 or (self._earliest is not None and deadline < self._earliest):
+            self._earliest = deadline
+        self._insert(handle)
+        return handle
+
+    def _discard(self, handle: TimerHandle):
+        self._pending -= 1
+        if handle.deadline == self._earliest:
+            self._earliest = None
+
+    def reschedule(self, handle: TimerHandle, deadline: float) -> TimerHandle:
+        """Move a pending timer; the old entry is cancelled and a new handle returned"""
+        handle.cancel()
+        return self.schedule(deadline, handle.callback, *handle.args)
+
+    def _insert(self, handle: TimerHandle):
+        tick = max(handle.tick, self.current)
+        top = len(self.sizes) - 1
+        for level in range(top + 1):
+            # Distance in this level's slots, so a timer never lands in the slot just cascaded
+            distance = (tick >> self.shifts[level]) - (self.current >> self.shifts[level])
+            if distance < self.sizes[level] or level == top:
+                # Timers past the top wheel's span wait in it and re-cascade
+                slot = (tick >> self.shifts[level]) & (self.sizes[level] - 1)
+                self.wheels[level][slot].append(handle)
+                self.counts[level] += 1
+                return
+
+    def _cascade(self, level: int):
+        slot = (self.current >> self.shifts[level]) & (self.sizes[level] - 1)
+        entries = self.wheels[level][slot]
+        if not entries:
+            return
+        self.wheels[level][slot] = []
+        self.counts[level] -= len(entries)
+        for handle in entries:
+            if handle.active:
+                self._insert(handle)
+
+    def advance(self, now: float) -> List[TimerHandle]:
+        """
+        Move the wheel to `now` and return due timers in deadline order.
+
+        Returned handles are marked fired; the caller runs their callbacks.
+        """
+        target = math.floor(round(now / self.resolution, 9))
+        due: List[TimerHandle] = []
+        mask0 = self.sizes[0] - 1
+        # Fire anything already due at the current tick (scheduled in the past)
+        self._collect(self.current, due)
+        while self.current < target:
+            if self._pending == 0:
+                self.current = target
+                break
+            if self.counts[0] == 0:
+                # Nothing on the lowest wheel: skip to the tick before its next wrap
+                boundary = (self.current | mask0) + 1
+                if boundary > target:
+                    self.current = target
+                    break
+                self.current = boundary - 1
+            self.current += 1
+            if self.current & mask0 == 0:
+                for level in range(1, len(self.sizes)):
+                    self._cascade(level)
+                    if (self.current >> self.shifts[level]) & (self.sizes[level] - 1):
+                        break
+            self._collect(self.current, due)
+        if due:
+            self._earliest = None
+            due.sort(key=lambda h: (h.deadline, h.seq))
+        return due
+
+    def _collect(self, tick: int, due: List[TimerHandle]):
+        slot = tick & (self.sizes[0] - 1)
+        entries = self.wheels[0][slot]
+        if not entries:
+            return
+        keep = []
+        for handle in entries:
+            if not handle.active:
+                self.counts[0] -= 1
+            elif handle.tick <= tick:
+                handle.fired = True
+                self._pending -= 1
+                self.counts[0] -= 1
+                due.append(handle)
+            else:
+                keep.append(handle)
+        self.wheels[0][slot] = keep
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest pending deadline, or None when idle"""
+        if self._pending == 0:
+            return None
+        if self._earliest is not None:
+            return self._earliest
+        best = None
+        top = len(self.wheels) - 1
+        for level, wheel in enumerate(self.wheels):
+            if self.counts[level] == 0:
+                continue
+            if level == top:
+                # Overflow timers can sit in any top slot, so take the minimum over all of them
+                deadlines = [h.deadline for entries in wheel for h in entries if h.active]
+                if deadlines:
+                    best = min(deadlines) if best is None else min(best, min(deadlines))
+                continue
+            size = self.sizes[level]
+            start = (self.current >> self.shifts[level]) & (size - 1)
+            for offset in range(size):
+                entries = wheel[(start + offset) & (size - 1)]
+                deadlines = [h.deadline for h in entries if h.active]
+                if deadlines:
+                    earliest = min(deadlines)
+                    best = earliest if best is None else min(best, earliest)
+                    break
+        self._earliest = best
+        return best
+
+
+class ManualClock:
+    """Settable clock for driving schedulers in tests and simulations"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class TimerScheduler:
+    """
+    Runs a TimerWheel on asyncio: sleeps until the next deadline and fires
+    due callbacks in deadline order. Callbacks are plain functions; they can
+    start coroutines with asyncio.create_task.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, resolution: float = 0.001,
+                 levels: Sequence[int] = DEFAULT_LEVELS):
+        self.clock = clock
+        self.wheel = TimerWheel(resolution, levels, start=clock())
+        self.is_running = False
+        self._waiter: Optional[asyncio.Future] = None
+        self._sleep_until: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.wheel)
+
+    def call_at(self, deadline: float, callback: Callable, *args) -> TimerHandle:
+        handle = self.wheel.schedule(deadline, callback, *args)
+        self._maybe_wake(deadline)
+        return handle
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def reschedule(self, handle: TimerHandle, deadline: float) -> TimerHandle:
+        handle = self.wheel.reschedule(handle, deadline)
+        self._maybe_wake(deadline)
+        return handle
+
+    def _maybe_wake(self, deadline: float):
+        if self._sleep_until is None or deadline < self._sleep_until:
+            self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def run_due(self, now: float = None) -> int:
+        """Fire every timer due at `now` (default: the clock); returns the number fired"""
+        fired = 0
+        while True:
+            due = self.wheel.advance(self.clock() if now is None else now)
+            if not due:
+                return fired
+            for handle in due:
+                fired += 1
+                try:
+                    handle.callback(*handle.args)
+                except Exception as e:
+                    logger.error(f"Timer callback failed: {e}")
+
+    def run_until(self, deadline: float, clock: ManualClock):
+        """Step a ManualClock from deadline to deadline up to `deadline`, firing timers on the way"""
+        while True:
+            upcoming = self.wheel.next_deadline()
+            if upcoming is None or upcoming > deadline:
+                break
+            clock.now = max(clock.now, self.wheel.to_tick(upcoming) * self.wheel.resolution)
+            self.run_due()
+        clock.now = max(clock.now, deadline)
+        self.run_due()
+
+    async def run(self):
+        """Drive the wheel on the running loop until stop()"""
+        loop = asyncio.get_running_loop()
+        self.is_running = True
+        try:
+            while self.is_running:
+                self.run_due()
+                upcoming = self.wheel.next_deadline()
+                self._waiter = loop.create_future()
+                sleeper = None
+                if upcoming is None:
+                    self._sleep_until = None
+                else:
+                    # One loop timer per wakeup; earlier timers added meanwhile resolve the waiter
+                    self._sleep_until = self.wheel.to_tick(upcoming) * self.wheel.resolution
+                    sleeper = loop.call_later(max(self._sleep_until - self.clock(), 0), self._wake)
+                try:
+                    await self._waiter
+                finally:
+                    if sleeper is not None:
+                        sleeper.cancel()
+        finally:
+            self._waiter = None
+            self._sleep_until = None
+
+    def stop(self):
+        self.is_running = False
+        self._wake()
@@ -0,0 +1,290 @@
+"""
+Alpha-Orion Wallet Velocity Index
+Sliding-window transaction aggregates per wallet
+
+Each wallet keeps one ring of time buckets per window (1m, 1h and 24h by
+default) with running totals for count, volume, near-threshold count and
+counterparties. A transaction is added to the newest bucket after expired
+buckets are dropped from the totals, so every bucket is added and removed
+once and updates cost O(1) amortized however long the service has run.
+
+Windows are bucket-granular: a window of W seconds split into B buckets
+covers between W - W/B and W seconds of history. Time is event time, taken
+from the transactions themselves, so replays behave like live traffic.
+"""
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+DEFAULT_WINDOWS = {
+    "1m": 60,
+    "1h": 3600,
+    "24h": 86400,
+}
+
+Timestamp = Union[datetime, float]
+
+
+def _seconds(timestamp: Timestamp) -> float:
+    return timestamp.timestamp() if isinstance(timestamp, datetime) else float(timestamp)
+
+
+def _release(counts: Dict[str, int], addresses: Tuple[Tuple[str, int], ...]):
+    for address, n in addresses:
+        remaining = counts[address] - n
+        if remaining:
+            counts[address] = remaining
+        else:
+            del counts[address]
+
+
+@dataclass(frozen=True)
+class WindowStats:
+    """Totals for one wallet over one window"""
+    window: str
+    count: int
+    volume: float
+    near_threshold: int
+    sent_to: FrozenSet[str]
+    received_from: FrozenSet[str]
+
+
+class SlidingWindow:
+    """
+    Ring of time buckets with running totals.
+
+    Only the newest bucket is mutable. Closed buckets are stored as flat tuples,
+    which keeps the many long-lived buckets out of the garbage collector's scans.
+    """
+
+    __slots__ = ("name", "width", "size", "closed", "epoch", "bucket_count", "bucket_volume",
+                 "bucket_near", "bucket_sent", "bucket_received", "count", "volume",
+                 "near_threshold", "sent_to", "received_from")
+
+    def __init__(self, name: str, seconds: float, buckets: int):
+        self.name = name
+        self.width = seconds / buckets
+        self.size = buckets
+        # (epoch, count, volume, near_threshold, ((sent_to, n), ...), ((received_from, n), ...))
+        self.closed: deque = deque()
+
+        # Open bucket
+        self.epoch = None
+        self.bucket_count = 0
+        self.bucket_volume = 0.0
+        self.bucket_near = 0
+        self.bucket_sent: Optional[Dict[str, int]] = None
+        self.bucket_received: Optional[Dict[str, int]] = None
+
+        # Totals over the closed and open buckets
+        self.count = 0
+        self.volume = 0.0
+        self.near_threshold = 0
+        self.sent_to: Dict[str, int] = {}
+        self.received_from: Dict[str, int] = {}
+
+    def _close(self):
+        self.closed.append((
+            self.epoch,
+            self.bucket_count,
+            self.bucket_volume,
+            self.bucket_near,
+            tuple(self.bucket_sent.items()) if self.bucket_sent else (),
+            tuple(self.bucket_received.items()) if self.bucket_received else (),
+        ))
+        self.bucket_count = 0
+        self.bucket_volume = 0.0
+        self.bucket_near = 0
+        self.bucket_sent = self.bucket_received = None
+
+    def expire(self, epoch: int):
+        """Drop buckets that no longer overlap the window ending at epoch"""
+        oldest = epoch - self.size + 1
+        if self.epoch is not None and self.epoch < oldest and self.bucket_count:
+            self._close()
+        closed = self.closed
+        while closed and closed[0][0] < oldest:
+            _, count, volume, near, sent_to, received_from = closed.popleft()
+            self.count -= count
+            self.volume -= volume
+            self.near_threshold -= near
+            if sent_to:
+                _release(self.sent_to, sent_to)
+            if received_from:
+                _release(self.received_from, received_from)
+        if not self.count:
+            # Clear accumulated float error whenever the window empties
+            self.volume = 0.0
+
+    def add(self, seconds: float, amount: float, near: bool,
+            sent_to: Optional[str], received_from: Optional[str]):
+        epoch = int(seconds // self.width)
+        # Late transactions land in the open bucket rather than reopening old ones
+        if self.epoch is None or epoch > self.epoch:
+            if self.bucket_count:
+                self._close()
+            self.epoch = epoch
+            closed = self.closed
+            if closed and closed[0][0] <= epoch - self.size:
+                self.expire(epoch)
+
+        self.bucket_count += 1
+        self.bucket_volume += amount
+        self.count += 1
+        self.volume += amount
+        if near:
+            self.bucket_near += 1
+            self.near_threshold += 1
+        if sent_to:
+            bucket = self.bucket_sent
+            if bucket is None:
+                self.bucket_sent = {sent_to: 1}
+            else:
+                bucket[sent_to] = bucket.get(sent_to, 0) + 1
+            counts = self.sent_to
+            counts[sent_to] = counts.get(sent_to, 0) + 1
+        if received_from:
+            bucket = self.bucket_received
+            if bucket is None:
+                self.bucket_received = {received_from: 1}
+            else:
+                bucket[received_from] = bucket.get(received_from, 0) + 1
+            counts = self.received_from
+            counts[received_from] = counts.get(received_from, 0) + 1
+
+    def stats(self) -> WindowStats:
+        return WindowStats(
+            window=self.name,
+            count=self.count,
+            volume=max(self.volume, 0.0),
+            near_threshold=self.near_threshold,
+            sent_to=frozenset(self.sent_to),
+            received_from=frozenset(self.received_from),
+        )
+
+
+class WalletActivity:
+    """All windows and a bounded tail of recent records for one wallet"""
+
+    __slots__ = ("wallet_address", "windows", "last_seen", "recent")
+
+    def __init__(self, wallet_address: str, windows: Dict[str, float], buckets: int, max_recent: int):
+        self.wallet_address = wallet_address
+        self.windows = {name: SlidingWindow(name, seconds, buckets) for name, seconds in windows.items()}
+        self.last_seen = float("-inf")
+        self.recent: deque = deque(maxlen=max_recent)
+
+    def window(self, name: str) -> SlidingWindow:
+        return self.windows[name]
+
+    def stats(self, name: str) -> WindowStats:
+        return self.windows[name].stats()
+
+
+class WalletVelocityIndex:
+    """
+    Per-wallet rolling count, volume and counterparty sets over several windows.
+
+    Wallets idle for longer than the largest window hold nothing but expired
+    buckets and are evicted; max_wallets caps memory under wallet churn by
+    evicting the least recently active wallet first.
+    """
+
+    def __init__(
+        self,
+        windows: Dict[str, float] = None,
+        buckets: int = 60,
+        near_threshold: Tuple[float, float] = (9000, 10000),
+        max_wallets: int = 100000,
+        max_recent: int = 100
+    ):
+        """
+        Args:
+            windows: Window name to length in seconds
+            buckets: Buckets per window; more buckets tighten the window edge
+            near_threshold: [low, high) amount band counted as near the reporting threshold
+            max_wallets: Wallets tracked before the least recently active is evicted
+            max_recent: Records kept per wallet for SAR evidence
+        """
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self.buckets = buckets
+        self.near_low, self.near_high = near_threshold
+        self.max_wallets = max_wallets
+        self.max_recent = max_recent
+        self.idle_seconds = max(self.windows.values())
+
+        self._wallets: "OrderedDict[str, WalletActivity]" = OrderedDict()
+        self.now = float("-inf")
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._wallets)
+
+    def __contains__(self, wallet_address: str) -> bool:
+        return wallet_address in self._wallets
+
+    def record(
+        self,
+        wallet_address: str,
+        timestamp: Timestamp,
+        amount_usd: float,
+        sent_to: Optional[str] = None,
+        received_from: Optional[str] = None,
+        payload: Any = None
+    ) -> WalletActivity:
+        """
+        Add one transaction and return the wallet's updated activity.
+        """
+        seconds = _seconds(timestamp)
+        if seconds > self.now:
+            self.now = seconds
+
+        wallets = self._wallets
+        activity = wallets.get(wallet_address)
+        if activity is None:
+            activity = WalletActivity(wallet_address, self.windows, self.buckets, self.max_recent)
+            wallets[wallet_address] = activity
+        else:
+            wallets.move_to_end(wallet_address)
+
+        near = self.near_low <= amount_usd < self.near_high
+        for window in activity.windows.values():
+            window.add(seconds, amount_usd, near, sent_to, received_from)
+        if seconds > activity.last_seen:
+            activity.last_seen = seconds
+        if payload is not None:
+            activity.recent.append(payload)
+
+        self._evict()
+        return activity
+
+    def _evict(self):
+        wallets = self._wallets
+        cutoff = self.now - self.idle_seconds
+        while wallets:
+            oldest = next(iter(wallets.values()))
+            if oldest.last_seen >= cutoff and len(wallets) <= self.max_wallets:
+                break
+            wallets.popitem(last=False)
+            self.evicted += 1
+
+    def get(self, wallet_address: str) -> Optional[WalletActivity]:
+        return self._wallets.get(wallet_address)
+
+    def stats(self, wallet_address: str, window: str, at: Timestamp = None) -> WindowStats:
+        """
+        Totals for a wallet over a window ending at `at` (default: latest event time).
+        """
+        activity = self._wallets.get(wallet_address)
+        if activity is None:
+            return WindowStats(window, 0, 0.0, 0, frozenset(), frozenset())
+        sliding = activity.window(window)
+        seconds = self.now if at is None else _seconds(at)
+        sliding.expire(int(seconds // sliding.width))
+        return sliding.stats()
+
+    def recent_records(self, wallet_address: str) -> List[Any]:
+        activity = self._wallets.get(wallet_address)
+        return list(activity.recent) if activity else []
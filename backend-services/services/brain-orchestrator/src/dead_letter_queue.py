@@ -2,17 +2,30 @@
 Dead Letter Queue (DLQ) System for Alpha-Orion Brain Orchestrator
 
 Provides Redis-based message queue with DLQ support for failed tasks.
-Implements retry logic with configurable attempts and dead letter storage.
+Implements retry logic with configurable attempts and dead letter storage,
+and a per-queue worker pool with rate limits and Prometheus metrics.
 """
 
+import asyncio
+import bisect
+import inspect
 import json
 import logging
+import os
+import socket
+import threading
 import time
 import uuid
-from datetime import datetime, timedelta
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Any, Dict, List, Optional, Callable
 import redis
 
+try:
+    from prometheus_client.parser import text_string_to_metric_families
+except ImportError:
+    text_string_to_metric_families = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,18 +34,190 @@ class DeadLetterQueue:
     Redis-based queue with Dead Letter Queue support.
     
     Features:
-    - Main task queue with FIFO processing
-    - Automatic retry with configurable attempts
+    - Priority ordering with FIFO within a priority level
+    - Automatic retry with exponential backoff and configurable attempts
     - DLQ for permanently failed messages
-    - Message TTL for automatic cleanup
-    - Priority support
+    - Visibility timeout: stalled in-flight messages are redelivered
+    - O(1) ack/nack through an in-flight hash keyed by message id
+    
+    Each queue is a handful of keys sharing the queue name:
+    - tasks:<q>       ready zset of message ids, ordered by (priority, sequence)
+    - delayed:<q>     zset of retrying message ids scored by due time
+    - processing:<q>  in-flight hash of message id -> worker id
+    - deadlines:<q>   zset of in-flight message ids scored by visibility deadline
+    - messages:<q>    hash of message id -> envelope JSON
+    - ranks:<q>       hash of message id -> ready score, reused when a retry is promoted
+    
+    All state transitions run as Lua scripts so they are atomic on the server.
+    Live queue keys never expire: a message stays until it is acked or dead
+    lettered, however long its queue sits idle or its handler runs. Only the
+    DLQ list carries a TTL.
+    A message reclaimed after its visibility timeout counts as a failed
+    attempt, so a message that keeps crashing its worker is dead-lettered
+    after max_retries redeliveries instead of cycling forever.
     """
     
     # Queue key prefixes
     MAIN_QUEUE_PREFIX = "alpha:queue:tasks"
     DLQ_PREFIX = "alpha:queue:dlq"
     PROCESSING_PREFIX = "alpha:queue:processing"
-    RETRY_COUNT_PREFIX = "alpha:queue:retry"
+    DELAYED_PREFIX = "alpha:queue:delayed"
+    DEADLINES_PREFIX = "alpha:queue:deadlines"
+    MESSAGES_PREFIX = "alpha:queue:messages"
+    RANKS_PREFIX = "alpha:queue:ranks"
+    SEQUENCE_PREFIX = "alpha:queue:seq"
+    
+    # KEYS: ready, ranks, messages, seq
+    # ARGV: priority, then (message id, envelope) pairs
+    # Sequence numbers stay below 1e12, so priority dominates the ready score
+    _ENQUEUE_SCRIPT = """
+    local count = (#ARGV - 1) / 2
+    local last = redis.call('INCRBY', KEYS[4], count)
+    local base = -tonumber(ARGV[1]) * 1e12 + last - count
+    for i = 1, count do
+        local id = ARGV[2 * i]
+        local rank = string.format('%.0f', base + i)
+        redis.call('HSET', KEYS[3], id, ARGV[1 + 2 * i])
+        redis.call('HSET', KEYS[2], id, rank)
+        redis.call('ZADD', KEYS[1], rank, id)
+    end
+    return count
+    """
+    
+    # Shared by the pop and reclaim scripts. Updated fields are appended to the
+    # stored envelope instead of re-encoding it with cjson, which would round
+    # payload numbers to 14 significant digits; JSON decoders keep the last
+    # value of a repeated key.
+    # Returns the number of stalled messages moved to the DLQ.
+    _RECLAIM_FUNCTION = """
+    local function reclaim(ids, ready, ranks, messages, inflight, deadlines, dlq, max_retries, dlq_ttl, now_iso)
+        local dead = 0
+        for _, id in ipairs(ids) do
+            redis.call('HDEL', inflight, id)
+            redis.call('ZREM', deadlines, id)
+            local body = redis.call('HGET', messages, id)
+            if body then
+                local retries = tonumber(cjson.decode(body)['retry_count']) or 0
+                local head = string.sub(body, 1, -2)
+                local reason = cjson.encode('Visibility timeout exceeded')
+                if retries >= tonumber(max_retries) then
+                    redis.call('HDEL', messages, id)
+                    redis.call('HDEL', ranks, id)
+                    redis.call('RPUSH', dlq, head .. ', "status": "dead_lettered", "failed_at": '
+                        .. cjson.encode(now_iso) .. ', "failure_reason": ' .. reason .. '}')
+                    redis.call('EXPIRE', dlq, dlq_ttl)
+                    dead = dead + 1
+                else
+                    redis.call('HSET', messages, id, head .. ', "retry_count": ' .. (retries + 1)
+                        .. ', "status": "queued", "last_retry_at": ' .. cjson.encode(now_iso)
+                        .. ', "last_error": ' .. reason .. '}')
+                    local rank = redis.call('HGET', ranks, id)
+                    if rank then
+                        redis.call('ZADD', ready, rank, id)
+                    end
+                end
+            end
+        end
+        return dead
+    end
+    """
+    
+    # KEYS: ready, delayed, ranks, messages, inflight, deadlines, dlq
+    # ARGV: now, count, worker id, visibility deadline, promote limit, max retries, dlq ttl, now (ISO)
+    _POP_SCRIPT = _RECLAIM_FUNCTION + """
+    local function requeue(source, ids)
+        for _, id in ipairs(ids) do
+            redis.call('ZREM', source, id)
+            local rank = redis.call('HGET', KEYS[3], id)
+            if rank then
+                redis.call('ZADD', KEYS[1], rank, id)
+            end
+        end
+    end
+    
+    -- Promote due retries and reclaim stalled in-flight messages
+    local limit = tonumber(ARGV[5])
+    requeue(KEYS[2], redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, limit))
+    local stalled = redis.call('ZRANGEBYSCORE', KEYS[6], '-inf', ARGV[1], 'LIMIT', 0, limit)
+    reclaim(stalled, KEYS[1], KEYS[3], KEYS[4], KEYS[5], KEYS[6], KEYS[7], ARGV[6], ARGV[7], ARGV[8])
+    
+    local popped = redis.call('ZPOPMIN', KEYS[1], tonumber(ARGV[2]))
+    local out = {}
+    for i = 1, #popped, 2 do
+        local id = popped[i]
+        local body = redis.call('HGET', KEYS[4], id)
+        if body then
+            redis.call('HSET', KEYS[5], id, ARGV[3])
+            redis.call('ZADD', KEYS[6], ARGV[4], id)
+            table.insert(out, body)
+        end
+    end
+    return out
+    """
+    
+    # KEYS: inflight, deadlines, messages, ranks
+    # ARGV: worker id, then message ids
+    _ACK_SCRIPT = """
+    local acked = 0
+    for i = 2, #ARGV do
+        local id = ARGV[i]
+        if redis.call('HGET', KEYS[1], id) == ARGV[1] then
+            redis.call('HDEL', KEYS[1], id)
+            redis.call('ZREM', KEYS[2], id)
+            redis.call('HDEL', KEYS[3], id)
+            redis.call('HDEL', KEYS[4], id)
+            acked = acked + 1
+        end
+    end
+    return acked
+    """
+    
+    # KEYS: inflight, deadlines, ready, ranks
+    # ARGV: worker id, then message ids
+    _RELEASE_SCRIPT = """
+    local released = 0
+    for i = 2, #ARGV do
+        local id = ARGV[i]
+        if redis.call('HGET', KEYS[1], id) == ARGV[1] then
+            redis.call('HDEL', KEYS[1], id)
+            redis.call('ZREM', KEYS[2], id)
+            local rank = redis.call('HGET', KEYS[4], id)
+            if rank then
+                redis.call('ZADD', KEYS[3], rank, id)
+            end
+            released = released + 1
+        end
+    end
+    return released
+    """
+    
+    # KEYS: inflight, deadlines, messages, ranks, delayed, dlq
+    # ARGV: message id, worker id, envelope, mode ('retry' | 'dead'), due time, dlq ttl
+    _NACK_SCRIPT = """
+    if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+        return 0
+    end
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    if ARGV[4] == 'retry' then
+        redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+        redis.call('ZADD', KEYS[5], ARGV[5], ARGV[1])
+    else
+        redis.call('HDEL', KEYS[3], ARGV[1])
+        redis.call('HDEL', KEYS[4], ARGV[1])
+        redis.call('RPUSH', KEYS[6], ARGV[3])
+        redis.call('EXPIRE', KEYS[6], ARGV[6])
+    end
+    return 1
+    """
+    
+    # KEYS: ready, ranks, inflight, deadlines, messages, dlq
+    # ARGV: now, limit, max retries, dlq ttl, now (ISO)
+    _RECLAIM_SCRIPT = _RECLAIM_FUNCTION + """
+    local stalled = redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+    local dead = reclaim(stalled, KEYS[1], KEYS[2], KEYS[5], KEYS[3], KEYS[4], KEYS[6], ARGV[3], ARGV[4], ARGV[5])
+    return {#stalled, dead}
+    """
     
     def __init__(
         self,
@@ -40,7 +225,10 @@ class DeadLetterQueue:
         max_retries: int = 3,
         retry_delay: float = 5.0,
         message_ttl: int = 86400,  # 24 hours
-        dlq_ttl: int = 604800  # 7 days
+        dlq_ttl: int = 604800,  # 7 days
+        visibility_timeout: float = 300.0,
+        poll_interval: float = 0.1,
+        promote_limit: int = 1000
     ):
         """
         Initialize the Dead Letter Queue system.
@@ -49,46 +237,73 @@ class DeadLetterQueue:
             redis_client: Redis client instance
             max_retries: Maximum retry attempts before moving to DLQ
             retry_delay: Delay between retries in seconds
-            message_ttl: Time to live for main queue messages (seconds)
+            message_ttl: Unused; kept for callers that pass it. Queue state
+                is removed by ack and dead-lettering rather than by expiry
             dlq_ttl: Time to live for DLQ messages (seconds)
+            visibility_timeout: Seconds before an unacknowledged message is
+                redelivered; each redelivery counts towards max_retries
+            poll_interval: Sleep between polls for blocking dequeue
+            promote_limit: Maximum retries/stalled messages moved back per pop
         """
         self.redis = redis_client
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.message_ttl = message_ttl
         self.dlq_ttl = dlq_ttl
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.promote_limit = promote_limit
         
-        # Lua script for atomic pop and push to processing
-        self._pop_script = """
-        local queue = KEYS[1]
-        local item = redis.call('LPOP', queue)
-        if item then
-            redis.call('RPUSH', KEYS[2] .. ':' .. ARGV[1], item)
-            redis.call('EXPIRE', KEYS[2] .. ':' .. ARGV[1], ARGV[2])
-        end
-        return item
-        """
+        self._enqueue_script = self.redis.register_script(self._ENQUEUE_SCRIPT)
+        self._pop_script = self.redis.register_script(self._POP_SCRIPT)
+        self._ack_script = self.redis.register_script(self._ACK_SCRIPT)
+        self._nack_script = self.redis.register_script(self._NACK_SCRIPT)
+        self._reclaim_script = self.redis.register_script(self._RECLAIM_SCRIPT)
+        self._release_script = self.redis.register_script(self._RELEASE_SCRIPT)
         
         logger.info(
             f"DLQ initialized: max_retries={max_retries}, "
-            f"retry_delay={retry_delay}s, ttl={message_ttl}s"
+            f"retry_delay={retry_delay}s, ttl={message_ttl}s, "
+            f"visibility_timeout={visibility_timeout}s"
         )
     
     def _get_main_queue_key(self, queue_name: str = "default") -> str:
-        """Get the main queue key."""
+        """Get the ready queue key."""
         return f"{self.MAIN_QUEUE_PREFIX}:{queue_name}"
     
     def _get_dlq_key(self) -> str:
         """Get the DLQ key."""
         return self.DLQ_PREFIX
     
-    def _get_processing_key(self, worker_id: str) -> str:
-        """Get the processing queue key for a worker."""
-        return f"{self.PROCESSING_PREFIX}:{worker_id}"
+    def _get_processing_key(self, queue_name: str) -> str:
+        """Get the in-flight hash key for a queue."""
+        return f"{self.PROCESSING_PREFIX}:{queue_name}"
+    
+    def _get_delayed_key(self, queue_name: str) -> str:
+        return f"{self.DELAYED_PREFIX}:{queue_name}"
+    
+    def _get_deadlines_key(self, queue_name: str) -> str:
+        return f"{self.DEADLINES_PREFIX}:{queue_name}"
+    
+    def _get_messages_key(self, queue_name: str) -> str:
+        return f"{self.MESSAGES_PREFIX}:{queue_name}"
+    
+    def _get_ranks_key(self, queue_name: str) -> str:
+        return f"{self.RANKS_PREFIX}:{queue_name}"
     
-    def _get_retry_key(self, message_id: str) -> str:
-        """Get the retry count key for a message."""
-        return f"{self.RETRY_COUNT_PREFIX}:{message_id}"
+    def _get_sequence_key(self, queue_name: str) -> str:
+        return f"{self.SEQUENCE_PREFIX}:{queue_name}"
+    
+    def _envelope(self, message: Dict[str, Any], queue_name: str, priority: int) -> Dict[str, Any]:
+        return {
+            "id": str(uuid.uuid4()),
+            "queue": queue_name,
+            "payload": message,
+            "priority": priority,
+            "enqueued_at": datetime.utcnow().isoformat(),
+            "retry_count": 0,
+            "status": "queued"
+        }
     
     def enqueue(
         self,
@@ -107,37 +322,97 @@ class DeadLetterQueue:
         Returns:
             Message ID
         """
-        message_id = str(uuid.uuid4())
+        message_id = self.enqueue_batch([message], queue_name, priority)[0]
+        logger.debug(f"Enqueued message {message_id} to queue '{queue_name}'")
+        return message_id
+    
+    def enqueue_batch(
+        self,
+        messages: List[Dict[str, Any]],
+        queue_name: str = "default",
+        priority: int = 0
+    ) -> List[str]:
+        """
+        Add several messages with one script call, preserving their order.
         
-        # Add metadata to message
-        envelope = {
-            "id": message_id,
-            "payload": message,
-            "priority": priority,
-            "enqueued_at": datetime.utcnow().isoformat(),
-            "retry_count": 0,
-            "status": "queued"
-        }
+        Returns:
+            Message IDs
+        """
+        if not messages:
+            return []
         
-        # Serialize and push to queue
-        payload = json.dumps(envelope)
+        envelopes = [self._envelope(message, queue_name, priority) for message in messages]
+        args = [priority]
+        for envelope in envelopes:
+            args.extend((envelope["id"], json.dumps(envelope)))
         
-        if priority > 0:
-            # Use sorted set for priority queue
-            self.redis.zadd(
+        self._enqueue_script(
+            keys=[
                 self._get_main_queue_key(queue_name),
-                {payload: -priority}  # Negative for descending order
-            )
-        else:
-            # Use list for FIFO queue
-            self.redis.rpush(self._get_main_queue_key(queue_name), payload)
+                self._get_ranks_key(queue_name),
+                self._get_messages_key(queue_name),
+                self._get_sequence_key(queue_name)
+            ],
+            args=args
+        )
+        
+        return [envelope["id"] for envelope in envelopes]
+    
+    def dequeue_batch(
+        self,
+        n: int,
+        queue_name: str = "default",
+        worker_id: str = "worker-1"
+    ) -> List[Dict[str, Any]]:
+        """
+        Atomically take up to n messages in priority order.
         
-        # Set TTL
-        self.redis.expire(self._get_main_queue_key(queue_name), self.message_ttl)
+        Due retries and messages whose visibility timeout has expired are moved
+        back to the ready queue in the same script, so they are picked up here.
+        A stalled message that has used up max_retries goes to the DLQ instead.
         
-        logger.debug(f"Enqueued message {message_id} to queue '{queue_name}'")
+        Args:
+            n: Maximum number of messages to take
+            queue_name: Name of the queue
+            worker_id: ID of the worker processing the messages
+            
+        Returns:
+            List of message envelopes (may be empty)
+        """
+        now = time.time()
+        bodies = self._pop_script(
+            keys=[
+                self._get_main_queue_key(queue_name),
+                self._get_delayed_key(queue_name),
+                self._get_ranks_key(queue_name),
+                self._get_messages_key(queue_name),
+                self._get_processing_key(queue_name),
+                self._get_deadlines_key(queue_name),
+                self._get_dlq_key()
+            ],
+            args=[
+                now, n, worker_id, now + self.visibility_timeout, self.promote_limit,
+                self.max_retries, self.dlq_ttl, datetime.utcnow().isoformat()
+            ]
+        )
         
-        return message_id
+        started_at = datetime.utcnow().isoformat()
+        messages = []
+        for body in bodies:
+            try:
+                envelope = json.loads(body)
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to decode message: {e}")
+                continue
+            envelope["status"] = "processing"
+            envelope["started_at"] = started_at
+            envelope["worker_id"] = worker_id
+            messages.append(envelope)
+        
+        if messages:
+            logger.debug(f"Dequeued {len(messages)} messages from '{queue_name}' for worker {worker_id}")
+        
+        return messages
     
     def dequeue(
         self,
@@ -149,6 +424,13 @@ class DeadLetterQueue:
         """
         Get a message from the queue for processing.
         
+        Blocking mode polls every poll_interval rather than using a blocking
+        Redis pop: retries and stalled messages become ready when their due
+        time passes, not when anything is written, so BZPOPMIN on the ready
+        set would sleep through them. Polling runs the same atomic pop script,
+        so promotion and reclaim still happen on each attempt; idle cost is
+        one script call per poll_interval per waiting worker.
+        
         Args:
             queue_name: Name of the queue
             worker_id: ID of the worker processing the message
@@ -158,42 +440,20 @@ class DeadLetterQueue:
         Returns:
             Message envelope or None if queue is empty
         """
-        queue_key = self._get_main_queue_key(queue_name)
-        
-        if block:
-            # Use BLPOP for blocking pop
-            result = self.redis.blpop(queue_key, timeout=timeout)
-            if result:
-                _, payload = result
-            else:
-                return None
-        else:
-            payload = self.redis.lpop(queue_key)
-            if not payload:
+        deadline = time.time() + timeout
+        while True:
+            messages = self.dequeue_batch(1, queue_name, worker_id)
+            if messages:
+                return messages[0]
+            if not block or time.time() >= deadline:
                 return None
-        
-        try:
-            envelope = json.loads(payload)
-            envelope["status"] = "processing"
-            envelope["started_at"] = datetime.utcnow().isoformat()
-            
-            # Move to processing queue for tracking
-            processing_key = self._get_processing_key(worker_id)
-            self.redis.rpush(processing_key, json.dumps(envelope))
-            self.redis.expire(processing_key, self.message_ttl * 2)
-            
-            logger.debug(f"Dequeued message {envelope['id']} for worker {worker_id}")
-            
-            return envelope
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to decode message: {e}")
-            return None
+            time.sleep(self.poll_interval)
     
     def ack(
         self,
         message_id: str,
-        worker_id: str = "worker-1"
+        worker_id: str = "worker-1",
+        queue_name: str = "default"
     ) -> bool:
         """
         Acknowledge successful processing of a message.
@@ -201,30 +461,65 @@ class DeadLetterQueue:
         Args:
             message_id: ID of the message to acknowledge
             worker_id: ID of the worker that processed the message
+            queue_name: Queue the message was taken from
             
         Returns:
-            True if acknowledged successfully
+            True if acknowledged; False if the message is not held by this worker
+            (e.g. it was reclaimed after its visibility timeout)
         """
-        processing_key = self._get_processing_key(worker_id)
-        
-        # Find and remove the message from processing queue
-        items = self.redis.lrange(processing_key, 0, -1)
+        acked = self.ack_batch([message_id], worker_id, queue_name)
+        if acked:
+            logger.debug(f"Acknowledged message {message_id}")
+        return bool(acked)
+    
+    def ack_batch(
+        self,
+        message_ids: List[str],
+        worker_id: str = "worker-1",
+        queue_name: str = "default"
+    ) -> int:
+        """
+        Acknowledge several messages held by worker_id in one script call.
         
-        for i, item in enumerate(items):
-            try:
-                envelope = json.loads(item)
-                if envelope.get("id") == message_id:
-                    self.redis.lrem(processing_key, 1, item)
-                    
-                    # Remove retry count
-                    self.redis.delete(self._get_retry_key(message_id))
-                    
-                    logger.info(f"Acknowledged message {message_id}")
-                    return True
-            except (json.JSONDecodeError, Exception) as e:
-                logger.warning(f"Error processing queue item: {e}")
+        Returns:
+            Number of messages acknowledged
+        """
+        if not message_ids:
+            return 0
+        return self._ack_script(
+            keys=[
+                self._get_processing_key(queue_name),
+                self._get_deadlines_key(queue_name),
+                self._get_messages_key(queue_name),
+                self._get_ranks_key(queue_name)
+            ],
+            args=[worker_id, *message_ids]
+        )
+    
+    def release(
+        self,
+        message_ids: List[str],
+        worker_id: str = "worker-1",
+        queue_name: str = "default"
+    ) -> int:
+        """
+        Hand unprocessed in-flight messages back to the ready queue without
+        counting a retry (used when a worker drains on shutdown).
         
-        return False
+        Returns:
+            Number of messages released
+        """
+        if not message_ids:
+            return 0
+        return self._release_script(
+            keys=[
+                self._get_processing_key(queue_name),
+                self._get_deadlines_key(queue_name),
+                self._get_main_queue_key(queue_name),
+                self._get_ranks_key(queue_name)
+            ],
+            args=[worker_id, *message_ids]
+        )
     
     def nack(
         self,
@@ -243,46 +538,54 @@ class DeadLetterQueue:
         Returns:
             True if message was requeued or moved to DLQ
         """
-        message_id = message.get("id")
         retry_count = message.get("retry_count", 0)
         
-        # Remove from processing queue
-        processing_key = self._get_processing_key(worker_id)
-        self.redis.lrem(processing_key, 1, json.dumps(message))
-        
         if retry_count >= self.max_retries:
             # Move to DLQ
-            return self._move_to_dlq(message, error or "Max retries exceeded")
+            return self._move_to_dlq(message, worker_id, error or "Max retries exceeded")
         else:
             # Requeue with incremented retry count
-            return self._requeue_with_retry(message, retry_count + 1)
+            return self._requeue_with_retry(message, worker_id, retry_count + 1, error)
+    
+    def _nack(
+        self,
+        message: Dict[str, Any],
+        worker_id: str,
+        mode: str,
+        due: float = 0
+    ) -> bool:
+        queue_name = message.get("queue", "default")
+        return bool(self._nack_script(
+            keys=[
+                self._get_processing_key(queue_name),
+                self._get_deadlines_key(queue_name),
+                self._get_messages_key(queue_name),
+                self._get_ranks_key(queue_name),
+                self._get_delayed_key(queue_name),
+                self._get_dlq_key()
+            ],
+            args=[message["id"], worker_id, json.dumps(message), mode, due, self.dlq_ttl]
+        ))
     
     def _requeue_with_retry(
         self,
         message: Dict[str, Any],
-        new_retry_count: int
+        worker_id: str,
+        new_retry_count: int,
+        error: Optional[str] = None
     ) -> bool:
-        """Requeue a message with incremented retry count."""
+        """Schedule a message for retry with exponential backoff."""
+        message = {k: v for k, v in message.items() if k not in ("started_at", "worker_id")}
         message["retry_count"] = new_retry_count
         message["status"] = "queued"
         message["last_retry_at"] = datetime.utcnow().isoformat()
+        if error:
+            message["last_error"] = error
         
-        # Store retry count
-        self.redis.set(
-            self._get_retry_key(message["id"]),
-            new_retry_count,
-            ex=self.message_ttl
-        )
-        
-        # Requeue with delay (using sorted set for delayed processing)
-        queue_key = self._get_main_queue_key("default")
         delay = self.retry_delay * (2 ** (new_retry_count - 1))  # Exponential backoff
-        
-        score = time.time() + delay
-        self.redis.zadd(
-            queue_key,
-            {json.dumps(message): score}
-        )
+        if not self._nack(message, worker_id, "retry", time.time() + delay):
+            logger.warning(f"Message {message['id']} is no longer held by {worker_id}; retry skipped")
+            return False
         
         logger.info(
             f"Message {message['id']} requeued for retry "
@@ -294,21 +597,18 @@ class DeadLetterQueue:
     def _move_to_dlq(
         self,
         message: Dict[str, Any],
+        worker_id: str,
         reason: str
     ) -> bool:
         """Move a permanently failed message to the DLQ."""
+        message = dict(message)
         message["status"] = "dead_lettered"
         message["failed_at"] = datetime.utcnow().isoformat()
         message["failure_reason"] = reason
         
-        dlq_key = self._get_dlq_key()
-        
-        # Add to DLQ
-        self.redis.rpush(dlq_key, json.dumps(message))
-        self.redis.expire(dlq_key, self.dlq_ttl)
-        
-        # Remove retry count
-        self.redis.delete(self._get_retry_key(message["id"]))
+        if not self._nack(message, worker_id, "dead"):
+            logger.warning(f"Message {message['id']} is no longer held by {worker_id}; DLQ move skipped")
+            return False
         
         logger.warning(
             f"Message {message['id']} moved to DLQ: {reason}"
@@ -316,6 +616,39 @@ class DeadLetterQueue:
         
         return True
     
+    def reclaim_stalled(
+        self,
+        queue_name: str = "default",
+        limit: int = 1000
+    ) -> int:
+        """
+        Return in-flight messages past their visibility timeout to the ready queue,
+        counting a retry; those that have used up max_retries go to the DLQ.
+        
+        dequeue/dequeue_batch already do this on every pop; call it directly to
+        recover messages on queues that are not being polled.
+        
+        Returns:
+            Number of stalled messages handled (requeued or dead-lettered)
+        """
+        count, dead = self._reclaim_script(
+            keys=[
+                self._get_main_queue_key(queue_name),
+                self._get_ranks_key(queue_name),
+                self._get_processing_key(queue_name),
+                self._get_deadlines_key(queue_name),
+                self._get_messages_key(queue_name),
+                self._get_dlq_key()
+            ],
+            args=[time.time(), limit, self.max_retries, self.dlq_ttl, datetime.utcnow().isoformat()]
+        )
+        if count:
+            logger.warning(
+                f"Reclaimed {count} stalled messages on queue '{queue_name}' "
+                f"({dead} moved to DLQ)"
+            )
+        return count
+    
     def get_dlq_messages(
         self,
         limit: int = 100,
@@ -358,21 +691,18 @@ class DeadLetterQueue:
         Returns:
             True if message was retried successfully
         """
-        dlq_messages = self.get_dlq_messages(limit=1000)
+        dlq_key = self._get_dlq_key()
         
-        for message in dlq_messages:
+        for item in self.redis.lrange(dlq_key, 0, 999):
+            try:
+                message = json.loads(item)
+            except json.JSONDecodeError:
+                continue
             if message.get("id") == message_id:
-                # Reset message for retry
-                message["retry_count"] = 0
-                message["status"] = "queued"
-                message["retried_at"] = datetime.utcnow().isoformat()
-                
-                # Remove from DLQ
-                dlq_key = self._get_dlq_key()
-                self.redis.lrem(dlq_key, 1, json.dumps(message))
-                
-                # Requeue
-                self.enqueue(message["payload"], queue_name)
+                # Remove the stored item as-is, then requeue the payload
+                if not self.redis.lrem(dlq_key, 1, item):
+                    return False
+                self.enqueue(message["payload"], queue_name, message.get("priority", 0))
                 
                 logger.info(f"DLQ message {message_id} retried")
                 return True
@@ -393,6 +723,24 @@ class DeadLetterQueue:
         logger.info(f"DLQ cleared: {count} messages removed")
         return count
     
+    def get_queue_depth(self, queue_name: str = "default") -> Dict[str, int]:
+        """Ready, delayed and in-flight counts for one queue."""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zcard(self._get_main_queue_key(queue_name))
+        pipe.zcard(self._get_delayed_key(queue_name))
+        pipe.hlen(self._get_processing_key(queue_name))
+        ready, delayed, processing = pipe.execute()
+        return {"ready": ready, "delayed": delayed, "processing": processing}
+    
+    def list_queues(self) -> List[str]:
+        """Names of queues that currently hold messages (SCAN, never KEYS)."""
+        prefix = f"{self.MESSAGES_PREFIX}:"
+        names = set()
+        for key in self.redis.scan_iter(match=f"{prefix}*", count=500):
+            key = key.decode() if isinstance(key, bytes) else key
+            names.add(key[len(prefix):])
+        return sorted(names)
+    
     def get_queue_stats(self) -> Dict[str, Any]:
         """
         Get queue statistics.
@@ -402,24 +750,25 @@ class DeadLetterQueue:
         """
         stats = {
             "main_queues": {},
+            "delayed_queues": {},
             "dlq_size": self.redis.llen(self._get_dlq_key()),
             "processing_queues": {},
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        # Get all queue keys
-        queue_keys = self.redis.keys(f"{self.MAIN_QUEUE_PREFIX}:*")
-        for key in queue_keys:
-            queue_name = key.decode() if isinstance(key, bytes) else key
-            queue_name = queue_name.replace(f"{self.MAIN_QUEUE_PREFIX}:", "")
-            stats["main_queues"][queue_name] = self.redis.zcard(key) + self.redis.llen(key)
+        queues = self.list_queues()
+        pipe = self.redis.pipeline(transaction=False)
+        for queue_name in queues:
+            pipe.zcard(self._get_main_queue_key(queue_name))
+            pipe.zcard(self._get_delayed_key(queue_name))
+            pipe.hlen(self._get_processing_key(queue_name))
+        counts = pipe.execute()
         
-        # Get processing queue keys
-        proc_keys = self.redis.keys(f"{self.PROCESSING_PREFIX}:*")
-        for key in proc_keys:
-            worker_id = key.decode() if isinstance(key, bytes) else key
-            worker_id = worker_id.replace(f"{self.PROCESSING_PREFIX}:", "")
-            stats["processing_queues"][worker_id] = self.redis.llen(key)
+        for i, queue_name in enumerate(queues):
+            ready, delayed, processing = counts[3 * i:3 * i + 3]
+            stats["main_queues"][queue_name] = ready
+            stats["delayed_queues"][queue_name] = delayed
+            stats["processing_queues"][queue_name] = processing
         
         return stats
 
@@ -465,7 +814,7 @@ class DLQProcessor:
             success = handler(payload)
             
             if success:
-                self.dlq.ack(message_id, self.worker_id)
+                self.dlq.ack(message_id, self.worker_id, self.queue_name)
                 return True
             else:
                 # Handler returned False - treat as failure
@@ -515,9 +864,6 @@ class DLQProcessor:
             if message:
                 self.process_message(handler, message)
                 iterations += 1
-            else:
-                # No message available, continue polling
-                time.sleep(0.1)
         
         logger.info(f"DLQ processor stopped: processed {iterations} messages")
     
@@ -526,6 +872,425 @@ class DLQProcessor:
         self._running = False
 
 
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    
+    Callers reserve tokens up front and sleep for the deficit, so concurrent
+    workers sharing a bucket are served in arrival order without busy-waiting.
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (defaults to one second of tokens)
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens and return how long the caller must wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+    
+    def acquire(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+    
+    async def acquire_async(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class QueueMetrics:
+    """Per-queue counters, latency histogram and sampled throughput/backlog."""
+    
+    LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self, queue_name: str, workers: int):
+        self.queue_name = queue_name
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.outcomes = {"success": 0, "failure": 0}
+        self.bucket_counts = [0] * len(self.LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.in_flight = 0
+        self.errors = 0
+        
+        # Sampled by the pool monitor
+        self.backlog = 0
+        self.throughput = 0.0
+        self._last_sample = (time.monotonic(), 0)
+    
+    @property
+    def processed(self) -> int:
+        return self.outcomes["success"] + self.outcomes["failure"]
+    
+    def observe(self, latency: float, success: bool):
+        with self._lock:
+            self.outcomes["success" if success else "failure"] += 1
+            self.latency_sum += latency
+            self.latency_count += 1
+            i = bisect.bisect_left(self.LATENCY_BUCKETS, latency)
+            if i < len(self.bucket_counts):
+                self.bucket_counts[i] += 1
+    
+    def add_in_flight(self, delta: int):
+        with self._lock:
+            self.in_flight += delta
+    
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+    
+    def sample(self, backlog: int):
+        now = time.monotonic()
+        processed = self.processed
+        last_time, last_processed = self._last_sample
+        if now > last_time:
+            self.throughput = (processed - last_processed) / (now - last_time)
+        self._last_sample = (now, processed)
+        self.backlog = backlog
+    
+    def render(self) -> List[str]:
+        label = f'queue="{self.queue_name}"'
+        with self._lock:
+            lines = [
+                f'dlq_messages_processed_total{{{label},outcome="{outcome}"}} {count}'
+                for outcome, count in self.outcomes.items()
+            ]
+            cumulative = 0
+            for bound, count in zip(self.LATENCY_BUCKETS, self.bucket_counts):
+                cumulative += count
+                lines.append(f'dlq_processing_latency_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'dlq_processing_latency_seconds_bucket{{{label},le="+Inf"}} {self.latency_count}')
+            lines.append(f'dlq_processing_latency_seconds_sum{{{label}}} {self.latency_sum}')
+            lines.append(f'dlq_processing_latency_seconds_count{{{label}}} {self.latency_count}')
+            lines.append(f'dlq_throughput_messages_per_second{{{label}}} {self.throughput}')
+            lines.append(f'dlq_backlog_messages{{{label}}} {self.backlog}')
+            lines.append(f'dlq_in_flight_messages{{{label}}} {self.in_flight}')
+            lines.append(f'dlq_workers{{{label}}} {self.workers}')
+            lines.append(f'dlq_worker_errors_total{{{label}}} {self.errors}')
+        return lines
+
+
+@dataclass
+class QueueWorkerConfig:
+    """Handler registration for one queue."""
+    queue_name: str
+    handler: Callable[[Dict[str, Any]], Any]
+    workers: int = 1
+    mode: str = "thread"  # "thread" or "asyncio"
+    rate_limiter: Optional[TokenBucket] = None
+
+
+class DLQWorkerPool:
+    """
+    Worker-pool runtime for queue processing.
+    
+    Each registered queue gets its own workers, so a slow handler only stalls
+    its own queue. Thread workers run sync handlers; asyncio workers run
+    coroutine handlers on a shared event loop thread. Workers take messages in
+    batches, acknowledge successes with one script call per batch and, on
+    stop(), finish the message in hand and release the rest of their batch
+    back to the ready queue.
+    
+    The pool is also a prometheus_client collector: REGISTRY.register(pool)
+    exposes the per-queue metrics alongside the process's other metrics.
+    """
+    
+    METRIC_HEADERS = {
+        "dlq_messages_processed_total": ("counter", "Messages processed by the worker pool"),
+        "dlq_processing_latency_seconds": ("histogram", "Handler latency"),
+        "dlq_throughput_messages_per_second": ("gauge", "Processing rate over the last sample interval"),
+        "dlq_backlog_messages": ("gauge", "Ready plus delayed messages"),
+        "dlq_in_flight_messages": ("gauge", "Messages taken by workers and not yet settled"),
+        "dlq_workers": ("gauge", "Configured workers"),
+        "dlq_worker_errors_total": ("counter", "Queue operations that failed in a worker and were retried after a backoff"),
+    }
+    
+    def __init__(
+        self,
+        dlq: DeadLetterQueue,
+        batch_size: int = 10,
+        poll_interval: float = 0.05,
+        metrics_interval: float = 5.0,
+        worker_id_prefix: Optional[str] = None,
+        error_backoff: float = 1.0
+    ):
+        self.dlq = dlq
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.error_backoff = error_backoff
+        self.metrics_interval = metrics_interval
+        self.worker_id_prefix = worker_id_prefix or f"{socket.gethostname()}-{os.getpid()}"
+        
+        self.configs: Dict[str, QueueWorkerConfig] = {}
+        self.metrics: Dict[str, QueueMetrics] = {}
+        
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_workers: Optional[asyncio.Future] = None
+    
+    def register(
+        self,
+        queue_name: str,
+        handler: Callable[[Dict[str, Any]], Any],
+        workers: int = 1,
+        mode: str = "thread",
+        rate_limit: Optional[float] = None,
+        burst: Optional[float] = None
+    ):
+        """
+        Register a handler for a queue.
+        
+        Args:
+            queue_name: Queue to consume
+            handler: Callable taking the payload and returning True on success
+                     (a coroutine function when mode is "asyncio")
+            workers: Number of concurrent workers for this queue
+            mode: "thread" or "asyncio"
+            rate_limit: Maximum messages per second for this handler
+            burst: Token bucket capacity
+        """
+        if mode not in ("thread", "asyncio"):
+            raise ValueError(f"Unknown worker mode: {mode}")
+        self.configs[queue_name] = QueueWorkerConfig(
+            queue_name=queue_name,
+            handler=handler,
+            workers=workers,
+            mode=mode,
+            rate_limiter=TokenBucket(rate_limit, burst) if rate_limit else None
+        )
+        self.metrics[queue_name] = QueueMetrics(queue_name, workers)
+    
+    def _worker_id(self, queue_name: str, index: int) -> str:
+        return f"{self.worker_id_prefix}-{queue_name}-{index}"
+    
+    def start(self):
+        """Start all workers and the metrics sampler."""
+        self._stopping.clear()
+        
+        async_workers = []
+        for config in self.configs.values():
+            for i in range(config.workers):
+                worker_id = self._worker_id(config.queue_name, i)
+                if config.mode == "asyncio":
+                    async_workers.append((config, worker_id))
+                else:
+                    thread = threading.Thread(
+                        target=self._thread_worker, args=(config, worker_id),
+                        name=worker_id, daemon=True
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+        
+        if async_workers:
+            self._loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._loop.run_forever, name="dlq-asyncio", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            
+            async def run_all():
+                await asyncio.gather(*(self._async_worker(c, w) for c, w in async_workers))
+            
+            self._async_workers = asyncio.run_coroutine_threadsafe(run_all(), self._loop)
+        
+        monitor = threading.Thread(target=self._monitor, name="dlq-metrics", daemon=True)
+        monitor.start()
+        self._threads.append(monitor)
+        
+        logger.info(
+            "DLQ worker pool started: "
+            + ", ".join(f"{c.queue_name}={c.workers}x{c.mode}" for c in self.configs.values())
+        )
+    
+    def stop(self, timeout: float = 30.0) -> bool:
+        """
+        Drain and stop all workers.
+        
+        Workers stop taking batches, finish the message they are handling and
+        release the rest of their batch to the ready queue.
+        
+        Returns:
+            True if every worker exited within the timeout
+        """
+        self._stopping.set()
+        deadline = time.monotonic() + timeout
+        
+        if self._async_workers is not None:
+            try:
+                self._async_workers.result(timeout=max(deadline - time.monotonic(), 0))
+            except Exception as e:
+                logger.error(f"Async DLQ workers did not drain cleanly: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        
+        for thread in self._threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+        
+        drained = not any(thread.is_alive() for thread in self._threads)
+        if self._loop is not None and drained:
+            self._loop.close()
+        self._threads, self._loop, self._async_workers = [], None, None
+        
+        logger.info(f"DLQ worker pool stopped (drained={drained})")
+        return drained
+    
+    def _settle(self, config: QueueWorkerConfig, message: Dict[str, Any], worker_id: str,
+                success: bool, error: Optional[str], started: float, acks: List[str]):
+        self.metrics[config.queue_name].observe(time.perf_counter() - started, success)
+        if success:
+            acks.append(message["id"])
+        else:
+            self.dlq.nack(message, worker_id, error)
+    
+    def _worker_error(self, config: QueueWorkerConfig, worker_id: str, error: Exception):
+        # Redis being unreachable must not kill the worker; messages left in
+        # flight are reclaimed once their visibility timeout passes
+        logger.error(f"DLQ worker {worker_id} failed on queue {config.queue_name}, retrying: {error}")
+        self.metrics[config.queue_name].record_error()
+    
+    def _thread_worker(self, config: QueueWorkerConfig, worker_id: str):
+        while not self._stopping.is_set():
+            try:
+                self._thread_batch(config, worker_id)
+            except Exception as e:
+                self._worker_error(config, worker_id, e)
+                self._stopping.wait(self.error_backoff)
+    
+    def _thread_batch(self, config: QueueWorkerConfig, worker_id: str):
+        metrics = self.metrics[config.queue_name]
+        batch = self.dlq.dequeue_batch(self.batch_size, config.queue_name, worker_id)
+        if not batch:
+            self._stopping.wait(self.poll_interval)
+            return
+        
+        metrics.add_in_flight(len(batch))
+        acks: List[str] = []
+        handled = 0
+        try:
+            for message in batch:
+                if self._stopping.is_set():
+                    break
+                if config.rate_limiter:
+                    config.rate_limiter.acquire()
+                
+                started = time.perf_counter()
+                error = None
+                try:
+                    success = bool(config.handler(message.get("payload", {})))
+                    if not success:
+                        error = "Handler returned False"
+                except Exception as e:
+                    logger.error(f"Error processing message {message.get('id')}: {e}")
+                    success, error = False, str(e)
+                self._settle(config, message, worker_id, success, error, started, acks)
+                handled += 1
+        finally:
+            try:
+                self.dlq.ack_batch(acks, worker_id, config.queue_name)
+                self.dlq.release([m["id"] for m in batch[handled:]], worker_id, config.queue_name)
+            finally:
+                metrics.add_in_flight(-len(batch))
+    
+    async def _async_worker(self, config: QueueWorkerConfig, worker_id: str):
+        while not self._stopping.is_set():
+            try:
+                await self._async_batch(config, worker_id)
+            except Exception as e:
+                self._worker_error(config, worker_id, e)
+                await asyncio.sleep(self.error_backoff)
+    
+    async def _async_batch(self, config: QueueWorkerConfig, worker_id: str):
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics[config.queue_name]
+        batch = await loop.run_in_executor(
+            None, self.dlq.dequeue_batch, self.batch_size, config.queue_name, worker_id
+        )
+        if not batch:
+            await asyncio.sleep(self.poll_interval)
+            return
+        
+        metrics.add_in_flight(len(batch))
+        acks: List[str] = []
+        handled = 0
+        try:
+            for message in batch:
+                if self._stopping.is_set():
+                    break
+                if config.rate_limiter:
+                    await config.rate_limiter.acquire_async()
+                
+                started = time.perf_counter()
+                error = None
+                try:
+                    result = config.handler(message.get("payload", {}))
+                    if inspect.isawaitable(result):
+                        result = await result
+                    success = bool(result)
+                    if not success:
+                        error = "Handler returned False"
+                except Exception as e:
+                    logger.error(f"Error processing message {message.get('id')}: {e}")
+                    success, error = False, str(e)
+                if success:
+                    self._settle(config, message, worker_id, True, None, started, acks)
+                else:
+                    await loop.run_in_executor(
+                        None, self._settle, config, message, worker_id, False, error, started, acks
+                    )
+                handled += 1
+        finally:
+            try:
+                await loop.run_in_executor(None, self.dlq.ack_batch, acks, worker_id, config.queue_name)
+                await loop.run_in_executor(
+                    None, self.dlq.release, [m["id"] for m in batch[handled:]], worker_id, config.queue_name
+                )
+            finally:
+                metrics.add_in_flight(-len(batch))
+    
+    def sample_metrics(self):
+        """Refresh backlog and throughput gauges."""
+        for queue_name, metrics in self.metrics.items():
+            try:
+                depth = self.dlq.get_queue_depth(queue_name)
+                metrics.sample(depth["ready"] + depth["delayed"])
+            except Exception as e:
+                logger.error(f"Failed to sample DLQ metrics for {queue_name}: {e}")
+    
+    def _monitor(self):
+        while not self._stopping.wait(self.metrics_interval):
+            self.sample_metrics()
+    
+    def render_metrics(self) -> str:
+        """Per-queue metrics in Prometheus text exposition format."""
+        lines = []
+        for name, (metric_type, help_text) in self.METRIC_HEADERS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for metrics in self.metrics.values():
+                lines.extend(line for line in metrics.render() if line.startswith(name))
+        return "\n".join(lines) + "\n"
+    
+    def collect(self):
+        """prometheus_client collector hook yielding the rendered metric families."""
+        if text_string_to_metric_families is None:
+            raise RuntimeError("prometheus_client is not installed")
+        return text_string_to_metric_families(self.render_metrics())
+
+
 def create_dlq_from_redis_url(redis_url: str, **kwargs) -> DeadLetterQueue:
     """
     Create a DLQ instance from a Redis URL.
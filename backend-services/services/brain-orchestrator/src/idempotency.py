@@ -0,0 +1,298 @@
+"""
+Idempotency Store for Alpha-Orion Brain Orchestrator
+
+Shares request idempotency state between processes through Redis.
+
+A key moves through two states:
+- in_flight: claimed with SET NX and a short lock TTL by the one caller that executes
+- completed: holds the recorded result for the full TTL so retries replay it
+
+Concurrent duplicates wait for the in-flight owner instead of executing. The
+owner renews its lock while it runs; if it dies, the lock expires and a waiter
+takes over. Each record carries a fingerprint of the request, so reusing a key
+for a different request is rejected rather than answered with the old result.
+Completed results are also kept in a small local LRU so hot replays skip the
+Redis round trip.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyInFlightError(Exception):
+    """Raised when a duplicate request times out waiting for the original."""
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """Raised when a key is reused for a request with a different fingerprint."""
+
+
+class IdempotencyStore:
+    """
+    Redis-backed idempotency keys with result replay and in-flight locking.
+    """
+
+    KEY_PREFIX = "alpha:idempotency"
+
+    STATE_IN_FLIGHT = "in_flight"
+    STATE_COMPLETED = "completed"
+
+    # KEYS: record key
+    # ARGV: owner token, new value, ttl (0 deletes)
+    _FINISH_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if not current then
+        return 0
+    end
+    if cjson.decode(current)['owner'] ~= ARGV[1] then
+        return 0
+    end
+    if tonumber(ARGV[3]) > 0 then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    else
+        redis.call('DEL', KEYS[1])
+    end
+    return 1
+    """
+
+    # KEYS: record key
+    # ARGV: owner token, lock ttl in milliseconds
+    _RENEW_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if not current then
+        return 0
+    end
+    local record = cjson.decode(current)
+    if record['owner'] ~= ARGV[1] or record['state'] ~= 'in_flight' then
+        return 0
+    end
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        ttl: int = 3600,
+        lock_ttl: int = 30,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+        local_cache_size: int = 1024,
+        local_cache_ttl: float = 60.0
+    ):
+        """
+        Args:
+            redis_client: Redis client instance
+            ttl: Seconds a completed result is replayed
+            lock_ttl: Seconds an in-flight claim survives without renewal; the
+                owner renews it every lock_ttl / 3 while the handler runs
+            wait_timeout: Seconds a duplicate waits for the in-flight owner
+            poll_interval: Seconds between polls while waiting
+            local_cache_size: Completed results kept in the in-process LRU
+            local_cache_ttl: Maximum seconds a result is served from the LRU
+        """
+        self.redis = redis_client
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.local_cache_size = local_cache_size
+        self.local_cache_ttl = local_cache_ttl
+
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._local_lock = threading.Lock()
+        self._finish_script = self.redis.register_script(self._FINISH_SCRIPT)
+        self._renew_script = self.redis.register_script(self._RENEW_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._local_lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, record = entry
+            if expires_at < time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return record
+
+    def _cache_put(self, key: str, record: Dict[str, Any], expires_at: float):
+        with self._local_lock:
+            self._local[key] = (min(expires_at, time.time() + self.local_cache_ttl), record)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_cache_size:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored record ({'state', 'result', ...}) for a key, or None.
+        """
+        record = self._cache_get(key)
+        if record is not None:
+            return record
+
+        raw = self.redis.get(self._key(key))
+        if raw is None:
+            return None
+        record = json.loads(raw)
+        if record.get("state") == self.STATE_COMPLETED:
+            self._cache_put(key, record, record.get("expires_at", 0))
+        return record
+
+    @staticmethod
+    def _check_fingerprint(key: str, record: Dict[str, Any], fingerprint: Optional[str]):
+        stored = record.get("fingerprint")
+        if fingerprint is not None and stored is not None and stored != fingerprint:
+            raise IdempotencyKeyMismatchError(f"Idempotency key {key} was used for a different request")
+
+    def begin(
+        self,
+        key: str,
+        fingerprint: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Claim a key for execution, or wait for the result of whoever holds it.
+
+        Args:
+            key: Idempotency key
+            fingerprint: Digest of the request; a key seen with a different one is rejected
+
+        Returns:
+            (owner_token, None) if this caller must execute and then call complete/release,
+            (None, record) if the key already completed and its result should be replayed
+
+        Raises:
+            IdempotencyInFlightError: if the key stays in flight past wait_timeout
+            IdempotencyKeyMismatchError: if the key belongs to a different request
+        """
+        deadline = time.time() + self.wait_timeout
+        while True:
+            record = self._cache_get(key)
+            if record is not None:
+                self._check_fingerprint(key, record, fingerprint)
+                return None, record
+
+            token = uuid.uuid4().hex
+            claim = json.dumps({
+                "state": self.STATE_IN_FLIGHT,
+                "owner": token,
+                "fingerprint": fingerprint,
+                "started_at": time.time()
+            })
+            if self.redis.set(self._key(key), claim, nx=True, px=int(self.lock_ttl * 1000)):
+                return token, None
+
+            record = self.get(key)
+            if record is not None:
+                self._check_fingerprint(key, record, fingerprint)
+                if record.get("state") == self.STATE_COMPLETED:
+                    logger.info(f"Idempotent request detected: {key}")
+                    return None, record
+
+            # Still in flight, or expired between SET and GET; retry the claim
+            if time.time() >= deadline:
+                raise IdempotencyInFlightError(f"Request {key} is still in progress")
+            time.sleep(self.poll_interval)
+
+    def renew(self, key: str, token: str) -> bool:
+        """
+        Extend an in-flight claim by lock_ttl.
+
+        Returns:
+            False if the claim was lost or already finished
+        """
+        return bool(self._renew_script(keys=[self._key(key)], args=[token, int(self.lock_ttl * 1000)]))
+
+    def complete(self, key: str, token: str, result: Any, fingerprint: Optional[str] = None) -> bool:
+        """
+        Record the result of an execution claimed with begin().
+
+        Returns:
+            False if the claim had expired and been taken over
+        """
+        expires_at = time.time() + self.ttl
+        record = {
+            "state": self.STATE_COMPLETED,
+            "owner": token,
+            "fingerprint": fingerprint,
+            "result": result,
+            "completed_at": time.time(),
+            "expires_at": expires_at
+        }
+        stored = self._finish_script(keys=[self._key(key)], args=[token, json.dumps(record), self.ttl])
+        if stored:
+            self._cache_put(key, record, expires_at)
+        else:
+            logger.warning(f"Idempotency claim for {key} expired before completion")
+        return bool(stored)
+
+    def release(self, key: str, token: str) -> bool:
+        """
+        Drop an in-flight claim without recording a result, so a retry can execute.
+        """
+        return bool(self._finish_script(keys=[self._key(key)], args=[token, "", 0]))
+
+    def _keep_alive(self, key: str, token: str, done: threading.Event):
+        """Renew the claim every lock_ttl / 3 until the handler finishes"""
+        while not done.wait(self.lock_ttl / 3):
+            try:
+                if not self.renew(key, token):
+                    logger.warning(f"Idempotency claim for {key} was lost while executing")
+                    return
+            except redis.RedisError as e:
+                logger.warning(f"Failed to renew idempotency claim for {key}: {e}")
+
+    def execute(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        should_store: Callable[[Any], bool] = lambda result: True,
+        fingerprint: Optional[str] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn at most once per key and replay its result for duplicates.
+
+        Args:
+            key: Idempotency key
+            fn: Zero-argument callable producing a JSON-serializable result
+            should_store: Whether a result is final; if not the claim is released
+            fingerprint: Digest of the request the key was issued for
+
+        Returns:
+            (result, replayed)
+
+        Raises:
+            IdempotencyKeyMismatchError: if the key was recorded for a different request
+        """
+        token, record = self.begin(key, fingerprint)
+        if record is not None:
+            return record["result"], True
+
+        done = threading.Event()
+        keeper = threading.Thread(target=self._keep_alive, args=(key, token, done), daemon=True)
+        keeper.start()
+        try:
+            result = fn()
+        except Exception:
+            self.release(key, token)
+            raise
+        finally:
+            done.set()
+            keeper.join()
+
+        if should_store(result):
+            self.complete(key, token, result, fingerprint)
+        else:
+            self.release(key, token)
+        return result, False
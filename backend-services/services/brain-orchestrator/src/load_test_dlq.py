@@ -0,0 +1,102 @@
+"""
+Alpha-Orion DLQ Worker Pool Load Test
+
+Pushes messages through DLQWorkerPool and reports the sustained processing
+rate. Uses an in-process fakeredis server unless --redis-url is given.
+
+Usage:
+    python load_test_dlq.py --messages 100000 --workers 4 --batch-size 100
+    python load_test_dlq.py --redis-url redis://localhost:6379/15 --mode asyncio
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+import redis
+
+from dead_letter_queue import DeadLetterQueue, DLQWorkerPool
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+logging.getLogger('dead_letter_queue').setLevel(logging.WARNING)
+
+
+def make_client(redis_url):
+    if redis_url:
+        client = redis.from_url(redis_url)
+        client.flushdb()
+        return client
+    import fakeredis
+    return fakeredis.FakeRedis()
+
+
+def make_handler(mode, work_ms):
+    if mode == 'asyncio':
+        async def handler(payload):
+            if work_ms:
+                await asyncio.sleep(work_ms / 1000)
+            return True
+    else:
+        def handler(payload):
+            if work_ms:
+                time.sleep(work_ms / 1000)
+            return True
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DLQ worker pool load test")
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--queues', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=4, help="Workers per queue")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--mode', choices=['thread', 'asyncio'], default='thread')
+    parser.add_argument('--work-ms', type=float, default=0.0, help="Simulated handler time")
+    parser.add_argument('--redis-url', default=None)
+    args = parser.parse_args()
+
+    dlq = DeadLetterQueue(make_client(args.redis_url))
+    queues = [f"load-{i}" for i in range(args.queues)]
+
+    start = time.perf_counter()
+    per_queue = args.messages // args.queues
+    for queue_name in queues:
+        for offset in range(0, per_queue, 1000):
+            dlq.enqueue_batch([{'n': offset + i} for i in range(min(1000, per_queue - offset))], queue_name)
+    total = per_queue * args.queues
+    logging.info(f"Enqueued {total} messages in {time.perf_counter() - start:.1f}s")
+
+    pool = DLQWorkerPool(dlq, batch_size=args.batch_size, metrics_interval=1.0)
+    for queue_name in queues:
+        pool.register(queue_name, make_handler(args.mode, args.work_ms), workers=args.workers, mode=args.mode)
+
+    start = time.perf_counter()
+    pool.start()
+    while sum(m.processed for m in pool.metrics.values()) < total:
+        time.sleep(0.5)
+        processed = sum(m.processed for m in pool.metrics.values())
+        logging.info(f"Processed {processed}/{total}")
+    elapsed = time.perf_counter() - start
+    pool.stop()
+    pool.sample_metrics()
+
+    stats = dlq.get_queue_stats()
+    logging.info(f"Sustained rate: {total / elapsed:,.0f} msg/s ({total} messages in {elapsed:.1f}s, "
+                 f"{args.queues} queues x {args.workers} {args.mode} workers, batch {args.batch_size})")
+    logging.info(f"Remaining: ready={sum(stats['main_queues'].values())} "
+                 f"processing={sum(stats['processing_queues'].values())} dlq={stats['dlq_size']}")
+    print(pool.render_metrics())
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ from web3 import Web3
 import requests
 import sys
 import time
+import atexit
 
 # Add the benchmarking tracker
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../../..'))
@@ -31,12 +32,27 @@ except ImportError:
 
 # Dead Letter Queue for failed task processing
 try:
-    from dead_letter_queue import DeadLetterQueue, DLQProcessor, create_dlq_from_redis_url
+    from dead_letter_queue import DeadLetterQueue, DLQWorkerPool, create_dlq_from_redis_url
     DLQ_AVAILABLE = True
 except ImportError:
     DLQ_AVAILABLE = False
     print("⚠️  DLQ module not available - failed tasks will not be tracked")
 
+try:
+    from prometheus_client import REGISTRY, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    print("⚠️  prometheus_client not available - worker pool metrics will not be exported")
+
+# Redis-backed idempotency keys for write endpoints
+try:
+    from idempotency import IdempotencyStore, IdempotencyInFlightError, IdempotencyKeyMismatchError
+    IDEMPOTENCY_AVAILABLE = True
+except ImportError:
+    IDEMPOTENCY_AVAILABLE = False
+    print("⚠️  Idempotency module not available - duplicate requests will not be detected")
+
 # Error Notifier for real-time alerts via Telegram/Discord
 try:
     from error_notifier import ErrorNotifier, get_error_notifier, notify_error
@@ -419,41 +435,104 @@ except Exception as e:
     logger.error(f"Failed to initialize Apex Benchmarking System: {e}")
     apex_benchmarker = None
 
+# ============================
+# DLQ worker pool
+# ============================
+
+def handle_benchmark_metric(payload):
+    """Record a metric enqueued on the benchmark_metrics queue"""
+    if apex_benchmarker is None:
+        return False
+    apex_benchmarker.record_metric(payload['metric'], float(payload['value']))
+    return True
+
+# Queue name -> handler; each queue gets its own workers (DLQ_<QUEUE>_WORKERS)
+# and optional rate limit in messages per second (DLQ_<QUEUE>_RATE_LIMIT)
+DLQ_TASK_HANDLERS = {
+    'benchmark_metrics': handle_benchmark_metric,
+}
+
+dlq_worker_pool = None
+if dead_letter_queue:
+    try:
+        dlq_worker_pool = DLQWorkerPool(
+            dead_letter_queue,
+            batch_size=int(os.getenv('DLQ_BATCH_SIZE', '10'))
+        )
+        for queue_name, task_handler in DLQ_TASK_HANDLERS.items():
+            rate_limit = os.getenv(f'DLQ_{queue_name.upper()}_RATE_LIMIT')
+            dlq_worker_pool.register(
+                queue_name,
+                task_handler,
+                workers=int(os.getenv(f'DLQ_{queue_name.upper()}_WORKERS', '2')),
+                rate_limit=float(rate_limit) if rate_limit else None
+            )
+        dlq_worker_pool.start()
+        atexit.register(dlq_worker_pool.stop)
+        if PROMETHEUS_AVAILABLE:
+            REGISTRY.register(dlq_worker_pool)
+        logger.info(f"DLQ worker pool started for queues: {', '.join(DLQ_TASK_HANDLERS)}")
+    except Exception as e:
+        logger.error(f"Failed to start DLQ worker pool: {e}")
+        dlq_worker_pool = None
+
 # Database connection pooling
 db_pool = None
 DB_POOL_SIZE = 10
 DB_POOL_MAX_OVERFLOW = 20
 DB_POOL_TIMEOUT = 30
 
-# Transaction idempotency tracking
-idempotency_cache = {}
+# Transaction idempotency tracking (shared across workers through Redis)
+idempotency_store = None
 IDEMPOTENCY_TTL = 3600  # 1 hour
 
-def check_idempotency(key):
-    """Check if a request has already been processed"""
-    import time
-    current_time = time.time()
-    
-    if key in idempotency_cache:
-        stored_time, result = idempotency_cache[key]
-        if current_time - stored_time < IDEMPOTENCY_TTL:
-            logger.info(f"Idempotent request detected: {key}")
-            return result
-        else:
-            # Remove expired entry
-            del idempotency_cache[key]
-    return None
+def get_idempotency_store():
+    """Lazily build the Redis-backed idempotency store"""
+    global idempotency_store
+    if idempotency_store is None and IDEMPOTENCY_AVAILABLE:
+        conn = get_redis_connection()
+        if conn is not None:
+            idempotency_store = IdempotencyStore(conn, ttl=IDEMPOTENCY_TTL)
+    return idempotency_store
+
+def idempotent(f):
+    """Execute once per Idempotency-Key header and replay the recorded response"""
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        store = get_idempotency_store() if key else None
+        if store is None:
+            if key:
+                logger.warning("Idempotency store unavailable - executing without deduplication")
+            return f(*args, **kwargs)
 
-def store_idempotency(key, result):
-    """Store request result for idempotency"""
-    import time
-    idempotency_cache[key] = (time.time(), result)
-    # Cleanup old entries periodically
-    if len(idempotency_cache) > 1000:
-        current_time = time.time()
-        expired_keys = [k for k, (t, _) in idempotency_cache.items() if current_time - t > IDEMPOTENCY_TTL]
-        for k in expired_keys:
-            del idempotency_cache[k]
+        def run():
+            response = app.make_response(f(*args, **kwargs))
+            return {
+                'body': response.get_data(as_text=True),
+                'status': response.status_code,
+                'mimetype': response.mimetype
+            }
+
+        # Keys are scoped per user, and bound to the request body they were first sent with
+        user = getattr(request, 'user', None) or {}
+        scoped_key = f"{request.path}:{user.get('username', 'anonymous')}:{key}"
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        try:
+            # Server errors are not recorded so the client can retry them
+            result, replayed = store.execute(
+                scoped_key, run, should_store=lambda r: r['status'] < 500, fingerprint=fingerprint
+            )
+        except IdempotencyKeyMismatchError as e:
+            return jsonify({'error': str(e)}), 422
+        except IdempotencyInFlightError as e:
+            return jsonify({'error': str(e)}), 409
+
+        response = app.response_class(result['body'], status=result['status'], mimetype=result['mimetype'])
+        if replayed:
+            response.headers['Idempotent-Replayed'] = 'true'
+        return response
+    wrapper.__name__ = f.__name__
+    return wrapper
 
 def get_db_connection():
     """Get database connection with connection pooling"""
@@ -979,6 +1058,9 @@ contract_deployed {1 if ARBITRAGE_CONTRACT_ADDRESS else 0}
 # TYPE blockchain_connected gauge
 blockchain_connected {1 if get_web3_connection().is_connected() else 0}
 """
+        if PROMETHEUS_AVAILABLE:
+            # DLQ worker pool and any other registered collectors
+            metrics_text += "\n" + generate_latest(REGISTRY).decode()
         return metrics_text, 200, {'Content-Type': 'text/plain'}
     except Exception as e:
         return f"# Error: {str(e)}\n", 500, {'Content-Type': 'text/plain'}
@@ -1354,6 +1436,7 @@ def setup_routes():
     
     @app.route('/dlq/enqueue', methods=['POST'])
     @require_auth
+    @idempotent
     def dlq_enqueue():
         """Enqueue a new task to the processing queue."""
         if not dead_letter_queue:
@@ -25,7 +25,7 @@ for path in possible_paths:
 if not router_imported:
     # Fallback - create a mock router for development
     class MultiDexRouter:
-        def get_best_price(self, token_in, token_out, amount):
+        async def get_best_price(self, token_in, token_out, amount):
             return None
 
 class TriangularArbitrage(BaseStrategy):
@@ -50,17 +50,17 @@ class TriangularArbitrage(BaseStrategy):
 
         try:
             # Leg 1: WETH -> USDC
-            quote1 = self.router.get_best_price(path[0][0], path[0][1], amount_in)
+            quote1 = await self.router.get_best_price(path[0][0], path[0][1], amount_in)
             if not quote1: return []
             amount_out1 = float(quote1['best_quote']['output_amount'])
 
             # Leg 2: USDC -> DAI
-            quote2 = self.router.get_best_price(path[1][0], path[1][1], amount_out1)
+            quote2 = await self.router.get_best_price(path[1][0], path[1][1], amount_out1)
             if not quote2: return []
             amount_out2 = float(quote2['best_quote']['output_amount'])
 
             # Leg 3: DAI -> WETH
-            quote3 = self.router.get_best_price(path[2][0], path[2][1], amount_out2)
+            quote3 = await self.router.get_best_price(path[2][0], path[2][1], amount_out2)
             if not quote3: return []
             amount_out3 = float(quote3['best_quote']['output_amount'])
 
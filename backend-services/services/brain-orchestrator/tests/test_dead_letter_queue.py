@@ -0,0 +1,345 @@
+"""
+Unit Tests for the Redis Dead Letter Queue and its worker pool
+Runs the Lua scripts against fakeredis
+"""
+
+import pytest
+import sys
+import os
+import threading
+import time
+
+import fakeredis
+import redis
+from prometheus_client import CollectorRegistry, generate_latest
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dead_letter_queue import DeadLetterQueue, DLQWorkerPool, TokenBucket
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def dlq(redis_client):
+    return DeadLetterQueue(redis_client, max_retries=2, retry_delay=0.05, visibility_timeout=60)
+
+
+class TestDeadLetterQueue:
+
+    def test_priority_then_fifo_order(self, dlq):
+        low = [dlq.enqueue({'n': i}) for i in range(3)]
+        high = dlq.enqueue({'n': 'urgent'}, priority=5)
+        mid = dlq.enqueue({'n': 'soon'}, priority=1)
+
+        ids = [m['id'] for m in dlq.dequeue_batch(10)]
+        assert ids == [high, mid] + low
+        assert dlq.dequeue(block=False) is None
+
+    def test_queues_are_isolated(self, dlq):
+        dlq.enqueue({'n': 1}, queue_name='a')
+        dlq.enqueue({'n': 2}, queue_name='b')
+
+        assert [m['payload']['n'] for m in dlq.dequeue_batch(5, queue_name='b')] == [2]
+        assert [m['payload']['n'] for m in dlq.dequeue_batch(5, queue_name='a')] == [1]
+
+    def test_ack_clears_message_state(self, dlq, redis_client):
+        dlq.enqueue({'n': 1})
+        message = dlq.dequeue(worker_id='w1', block=False)
+        assert message['status'] == 'processing'
+
+        assert not dlq.ack(message['id'], 'w2')
+        assert dlq.ack(message['id'], 'w1')
+        assert not dlq.ack(message['id'], 'w1')
+
+        # Only the sequence counter is left behind
+        assert [k.decode() for k in redis_client.keys('*')] == ['alpha:queue:seq:default']
+
+    def test_in_flight_messages_outlive_an_idle_period(self, redis_client):
+        dlq = DeadLetterQueue(redis_client, message_ttl=1, retry_delay=0.01, visibility_timeout=60)
+        dlq.enqueue_batch([{'n': 1}, {'n': 2}])
+        first, second = dlq.dequeue_batch(2, worker_id='w1')
+
+        # Longer than message_ttl with ids in flight and no other queue traffic
+        assert all(redis_client.ttl(key) == -1 for key in redis_client.keys('alpha:queue:*'))
+        time.sleep(1.1)
+
+        assert dlq.ack(first['id'], 'w1')
+        assert dlq.nack(second, worker_id='w1', error='boom')
+        time.sleep(0.03)
+        retried = dlq.dequeue_batch(1)
+        assert [(m['id'], m['payload']) for m in retried] == [(second['id'], {'n': 2})]
+
+    def test_nack_retries_with_backoff_then_dead_letters(self, dlq):
+        message_id = dlq.enqueue({'n': 1}, priority=3)
+        dlq.enqueue({'n': 2})
+
+        for attempt in range(3):
+            message = dlq.dequeue_batch(1)[0]
+            assert message['id'] == message_id
+            assert message['retry_count'] == attempt
+            assert dlq.nack(message, error='boom')
+
+            # Once its backoff elapses the retry is promoted ahead of the lower priority message
+            time.sleep(0.05 * 2 ** attempt + 0.02)
+
+        stats = dlq.get_queue_stats()
+        assert stats['dlq_size'] == 1
+        assert stats['main_queues']['default'] == 1
+        assert stats['processing_queues']['default'] == 0
+        dead = dlq.get_dlq_messages()[0]
+        assert dead['id'] == message_id
+        assert dead['failure_reason'] == 'boom'
+        assert dead['status'] == 'dead_lettered'
+
+    def test_retry_waits_in_delayed_set(self, dlq):
+        dlq.enqueue({'n': 1})
+        message = dlq.dequeue_batch(1)[0]
+        dlq.nack(message, error='boom')
+
+        stats = dlq.get_queue_stats()
+        assert stats['delayed_queues']['default'] == 1
+        assert dlq.dequeue_batch(1) == []
+
+        time.sleep(0.07)
+        retried = dlq.dequeue_batch(1)
+        assert [m['id'] for m in retried] == [message['id']]
+        assert retried[0]['last_error'] == 'boom'
+
+    def test_stalled_messages_are_reclaimed(self, redis_client):
+        dlq = DeadLetterQueue(redis_client, visibility_timeout=0.05)
+        dlq.enqueue({'n': 1})
+        stalled = dlq.dequeue_batch(1, worker_id='crashed')[0]
+
+        assert dlq.dequeue_batch(1, worker_id='w2') == []
+        time.sleep(0.07)
+        assert dlq.reclaim_stalled() == 1
+
+        redelivered = dlq.dequeue_batch(1, worker_id='w2')[0]
+        assert redelivered['id'] == stalled['id']
+
+        # The stalled worker no longer owns it
+        assert not dlq.ack(stalled['id'], 'crashed')
+        assert not dlq.nack(stalled, 'crashed')
+        assert dlq.ack(redelivered['id'], 'w2')
+
+    def test_pop_reclaims_without_explicit_call(self, redis_client):
+        dlq = DeadLetterQueue(redis_client, visibility_timeout=0.05)
+        message_id = dlq.enqueue({'n': 1})
+        dlq.dequeue_batch(1, worker_id='crashed')
+        time.sleep(0.07)
+        assert dlq.dequeue_batch(1, worker_id='w2')[0]['id'] == message_id
+
+    def test_stalls_count_as_retries_then_dead_letter(self, redis_client):
+        dlq = DeadLetterQueue(redis_client, max_retries=2, visibility_timeout=0.05)
+        payload = {'amount_wei': 1500000000000000001, 'price': 0.1 + 0.2, 'route': ['a', 'b']}
+        message_id = dlq.enqueue(payload)
+
+        # Every worker that takes the message crashes; each pop reclaims the last one
+        for attempt in range(3):
+            message = dlq.dequeue_batch(1, worker_id=f'crashed-{attempt}')[0]
+            assert message['id'] == message_id
+            assert message['retry_count'] == attempt
+            assert message['payload'] == payload  # Reclaim never re-encodes the payload
+            time.sleep(0.07)
+
+        assert dlq.dequeue_batch(1, worker_id='w2') == []
+        dead = dlq.get_dlq_messages()
+        assert [m['id'] for m in dead] == [message_id]
+        assert dead[0]['status'] == 'dead_lettered'
+        assert dead[0]['failure_reason'] == 'Visibility timeout exceeded'
+        assert dead[0]['retry_count'] == 2
+        assert dead[0]['payload'] == payload
+        assert dlq.get_queue_depth() == {'ready': 0, 'delayed': 0, 'processing': 0}
+        assert not dlq.ack(message_id, 'crashed-2')
+
+    def test_reclaim_stalled_dead_letters_exhausted_messages(self, redis_client):
+        dlq = DeadLetterQueue(redis_client, max_retries=0, visibility_timeout=0.05)
+        dlq.enqueue({'n': 1})
+        dlq.enqueue({'n': 2})
+        dlq.dequeue_batch(2, worker_id='crashed')
+        time.sleep(0.07)
+        assert dlq.reclaim_stalled() == 2
+        assert sorted(m['payload']['n'] for m in dlq.get_dlq_messages()) == [1, 2]
+
+    def test_stats_use_scan(self, dlq, redis_client, monkeypatch):
+        for i in range(5):
+            dlq.enqueue({'n': i}, queue_name='alpha')
+        dlq.enqueue({'n': 0}, queue_name='beta')
+        dlq.dequeue_batch(2, queue_name='alpha')
+
+        monkeypatch.setattr(redis_client, 'keys', lambda *a, **k: pytest.fail('KEYS used'))
+        stats = dlq.get_queue_stats()
+        assert stats['main_queues'] == {'alpha': 3, 'beta': 1}
+        assert stats['processing_queues'] == {'alpha': 2, 'beta': 0}
+
+    def test_retry_dlq_message(self, redis_client):
+        dlq = DeadLetterQueue(redis_client, max_retries=0)
+        message_id = dlq.enqueue({'n': 1})
+        dlq.nack(dlq.dequeue_batch(1)[0], error='fatal')
+        assert dlq.get_queue_stats()['dlq_size'] == 1
+
+        assert dlq.retry_dlq_message(message_id)
+        assert dlq.get_queue_stats()['dlq_size'] == 0
+        assert dlq.dequeue_batch(1)[0]['payload'] == {'n': 1}
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestTokenBucket:
+
+    def test_limits_sustained_rate(self):
+        bucket = TokenBucket(rate=50, burst=1)
+        start = time.monotonic()
+        for _ in range(11):
+            bucket.acquire()
+        assert time.monotonic() - start >= 0.19
+
+    def test_burst_is_immediate(self):
+        bucket = TokenBucket(rate=1, burst=5)
+        assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+        assert bucket.reserve() > 0
+
+
+class TestDLQWorkerPool:
+
+    def test_slow_queue_does_not_stall_fast_queue(self, dlq):
+        release = threading.Event()
+        dlq.enqueue_batch([{'n': i} for i in range(3)], queue_name='slow')
+        dlq.enqueue_batch([{'n': i} for i in range(200)], queue_name='fast')
+
+        pool = DLQWorkerPool(dlq, batch_size=10, poll_interval=0.01)
+        pool.register('slow', lambda payload: release.wait(5), workers=1)
+        pool.register('fast', lambda payload: True, workers=2)
+        pool.start()
+        try:
+            assert wait_for(lambda: pool.metrics['fast'].processed == 200)
+            assert pool.metrics['slow'].processed == 0
+        finally:
+            release.set()
+            assert pool.stop(timeout=5)
+
+        assert dlq.get_queue_depth('fast') == {'ready': 0, 'delayed': 0, 'processing': 0}
+
+    def test_rate_limit_per_handler(self, dlq):
+        dlq.enqueue_batch([{'n': i} for i in range(11)], queue_name='limited')
+        pool = DLQWorkerPool(dlq, poll_interval=0.01)
+        pool.register('limited', lambda payload: True, workers=3, rate_limit=50, burst=1)
+
+        start = time.monotonic()
+        pool.start()
+        try:
+            assert wait_for(lambda: pool.metrics['limited'].processed == 11)
+        finally:
+            pool.stop()
+        assert time.monotonic() - start >= 0.19
+
+    def test_stop_drains_and_releases_unstarted_messages(self, dlq):
+        started = threading.Event()
+        release = threading.Event()
+
+        def handler(payload):
+            started.set()
+            return release.wait(5)
+
+        dlq.enqueue_batch([{'n': i} for i in range(20)], queue_name='drain')
+        pool = DLQWorkerPool(dlq, batch_size=20, poll_interval=0.01)
+        pool.register('drain', handler)
+        pool.start()
+        assert started.wait(5)
+
+        stopper = threading.Thread(target=pool.stop)
+        stopper.start()
+        time.sleep(0.05)
+        release.set()
+        stopper.join(5)
+
+        # The message in hand completes; the rest go back to ready, none stay in flight
+        assert pool.metrics['drain'].processed == 1
+        assert dlq.get_queue_depth('drain') == {'ready': 19, 'delayed': 0, 'processing': 0}
+        assert pool.metrics['drain'].in_flight == 0
+
+    def test_asyncio_workers_and_failures(self, dlq):
+        async def handler(payload):
+            if payload['n'] % 4 == 0:
+                raise ValueError('bad payload')
+            return True
+
+        dlq.enqueue_batch([{'n': i} for i in range(40)], queue_name='async')
+        pool = DLQWorkerPool(dlq, batch_size=5, poll_interval=0.01)
+        pool.register('async', handler, workers=3, mode='asyncio')
+        pool.start()
+        try:
+            assert wait_for(lambda: pool.metrics['async'].processed == 40)
+        finally:
+            assert pool.stop(timeout=5)
+
+        assert pool.metrics['async'].outcomes == {'success': 30, 'failure': 10}
+        assert dlq.get_queue_depth('async')['delayed'] == 10
+
+    @pytest.mark.parametrize('mode', ['thread', 'asyncio'])
+    def test_dequeue_failure_backs_off_and_keeps_the_worker(self, dlq, monkeypatch, mode):
+        dequeue_batch = dlq.dequeue_batch
+        failures = []
+
+        def flaky_dequeue(*args):
+            if len(failures) < 2:
+                failures.append(time.monotonic())
+                raise redis.ConnectionError('Connection refused')
+            return dequeue_batch(*args)
+
+        monkeypatch.setattr(dlq, 'dequeue_batch', flaky_dequeue)
+        dlq.enqueue_batch([{'n': i} for i in range(5)], queue_name='flaky')
+        pool = DLQWorkerPool(dlq, poll_interval=0.01, error_backoff=0.1)
+        pool.register('flaky', lambda payload: True, mode=mode)
+        pool.start()
+        try:
+            assert wait_for(lambda: pool.metrics['flaky'].processed == 5)
+        finally:
+            assert pool.stop(timeout=5)
+
+        assert failures[1] - failures[0] >= 0.09
+        assert pool.metrics['flaky'].errors == 2
+        assert 'dlq_worker_errors_total{queue="flaky"} 2' in pool.render_metrics()
+        assert dlq.get_queue_depth('flaky') == {'ready': 0, 'delayed': 0, 'processing': 0}
+
+    def test_prometheus_metrics(self, dlq):
+        dlq.enqueue_batch([{'n': i} for i in range(5)], queue_name='metrics')
+        pool = DLQWorkerPool(dlq, poll_interval=0.01)
+        pool.register('metrics', lambda payload: True, workers=2)
+        pool.start()
+        try:
+            assert wait_for(lambda: pool.metrics['metrics'].processed == 5)
+        finally:
+            pool.stop()
+        dlq.enqueue({'n': 'late'}, queue_name='metrics')
+        pool.sample_metrics()
+
+        text = pool.render_metrics()
+        assert '# TYPE dlq_processing_latency_seconds histogram' in text
+        assert 'dlq_messages_processed_total{queue="metrics",outcome="success"} 5' in text
+        assert 'dlq_processing_latency_seconds_count{queue="metrics"} 5' in text
+        assert 'dlq_processing_latency_seconds_bucket{queue="metrics",le="+Inf"} 5' in text
+        assert 'dlq_backlog_messages{queue="metrics"} 1' in text
+        assert 'dlq_workers{queue="metrics"} 2' in text
+
+        # The pool registers as a prometheus_client collector
+        registry = CollectorRegistry()
+        registry.register(pool)
+        assert registry.get_sample_value(
+            'dlq_messages_processed_total', {'queue': 'metrics', 'outcome': 'success'}) == 5
+        assert registry.get_sample_value(
+            'dlq_processing_latency_seconds_bucket', {'queue': 'metrics', 'le': '+Inf'}) == 5
+        assert registry.get_sample_value('dlq_backlog_messages', {'queue': 'metrics'}) == 1
+        assert b'# TYPE dlq_processing_latency_seconds histogram' in generate_latest(registry)
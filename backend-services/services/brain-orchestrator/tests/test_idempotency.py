@@ -0,0 +1,166 @@
+"""
+Unit Tests for the Redis idempotency store
+Includes concurrent duplicate submissions from several processes
+"""
+
+import pytest
+import multiprocessing
+import sys
+import os
+import threading
+import time
+
+import fakeredis
+import redis
+from fakeredis import TcpFakeServer
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from idempotency import IdempotencyInFlightError, IdempotencyKeyMismatchError, IdempotencyStore
+
+
+@pytest.fixture
+def store():
+    return IdempotencyStore(fakeredis.FakeRedis(), wait_timeout=2, poll_interval=0.01)
+
+
+@pytest.fixture
+def redis_server():
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def submit_duplicates(address, key, submissions, results):
+    """Child process: fire duplicate submissions from several threads"""
+    client = redis.Redis(host=address[0], port=address[1])
+    store = IdempotencyStore(client, wait_timeout=10, poll_interval=0.01)
+
+    def execute():
+        client.incr('executions')
+        time.sleep(0.3)
+        return {'order_id': f'order-{os.getpid()}'}
+
+    def submit():
+        result, replayed = store.execute(key, execute)
+        results.put((result['order_id'], replayed))
+
+    threads = [threading.Thread(target=submit) for _ in range(submissions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class TestIdempotencyStore:
+
+    def test_result_is_replayed(self, store):
+        calls = []
+        first = store.execute('k', lambda: calls.append(1) or {'status': 201})
+        second = store.execute('k', lambda: calls.append(1) or {'status': 500})
+
+        assert first == ({'status': 201}, False)
+        assert second == ({'status': 201}, True)
+        assert len(calls) == 1
+
+    def test_failure_releases_the_key(self, store):
+        with pytest.raises(RuntimeError):
+            store.execute('k', lambda: (_ for _ in ()).throw(RuntimeError('boom')))
+        assert store.get('k') is None
+
+        # Results rejected by should_store are not recorded either
+        store.execute('k', lambda: {'status': 503}, should_store=lambda r: r['status'] < 500)
+        assert store.execute('k', lambda: {'status': 200}) == ({'status': 200}, False)
+
+    def test_duplicate_waits_for_in_flight_owner(self, store):
+        token, _ = store.begin('k')
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(store.execute('k', lambda: 'second')))
+        waiter.start()
+        time.sleep(0.1)
+        assert waiter.is_alive()
+
+        store.complete('k', token, 'first')
+        waiter.join(2)
+        assert results == [('first', True)]
+
+    def test_wait_times_out_while_in_flight(self):
+        store = IdempotencyStore(fakeredis.FakeRedis(), wait_timeout=0.1, poll_interval=0.01)
+        store.begin('k')
+        with pytest.raises(IdempotencyInFlightError):
+            store.begin('k')
+
+    def test_expired_claim_is_taken_over(self):
+        store = IdempotencyStore(fakeredis.FakeRedis(), lock_ttl=1, wait_timeout=3, poll_interval=0.05)
+        stale_token, _ = store.begin('k')
+
+        token, record = store.begin('k')
+        assert token is not None and record is None
+        assert not store.complete('k', stale_token, 'stale')
+        assert store.complete('k', token, 'fresh')
+        assert store.get('k')['result'] == 'fresh'
+
+    def test_key_reused_for_a_different_request_is_rejected(self, store):
+        assert store.execute('k', lambda: 'first', fingerprint='body-a') == ('first', False)
+        assert store.execute('k', lambda: 'again', fingerprint='body-a') == ('first', True)
+        with pytest.raises(IdempotencyKeyMismatchError):
+            store.execute('k', lambda: 'other', fingerprint='body-b')
+
+        # A duplicate with a different body fails fast instead of waiting on the in-flight owner
+        store.begin('in-flight', fingerprint='body-a')
+        started = time.time()
+        with pytest.raises(IdempotencyKeyMismatchError):
+            store.begin('in-flight', fingerprint='body-b')
+        assert time.time() - started < 1
+
+    def test_claim_is_renewed_while_the_handler_runs(self):
+        store = IdempotencyStore(fakeredis.FakeRedis(), lock_ttl=0.3, wait_timeout=5, poll_interval=0.02)
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(1.0)  # Several lock TTLs
+            return 'done'
+
+        results = []
+        owner = threading.Thread(target=lambda: results.append(store.execute('k', slow)))
+        owner.start()
+        time.sleep(0.1)
+        results.append(store.execute('k', lambda: calls.append(1) or 'duplicate'))
+        owner.join()
+
+        assert len(calls) == 1
+        assert sorted(results) == [('done', False), ('done', True)]
+
+    def test_local_lru_serves_hot_reads(self, store, monkeypatch):
+        store.local_cache_size = 2
+        for key in ['a', 'b', 'c']:
+            store.execute(key, lambda: key)
+        assert list(store._local) == ['b', 'c']
+
+        monkeypatch.setattr(store.redis, 'get', lambda *a: pytest.fail('Redis read for a hot key'))
+        monkeypatch.setattr(store.redis, 'set', lambda *a, **k: pytest.fail('Redis write for a hot key'))
+        assert store.execute('c', lambda: 'again') == ('c', True)
+
+    def test_concurrent_duplicates_from_several_processes(self, redis_server):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=submit_duplicates, args=(redis_server, 'order:42', 4, results))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+            assert process.exitcode == 0
+
+        outcomes = [results.get(timeout=5) for _ in range(16)]
+        client = redis.Redis(host=redis_server[0], port=redis_server[1])
+        assert int(client.get('executions')) == 1
+        assert len({order_id for order_id, _ in outcomes}) == 1
+        assert sorted(replayed for _, replayed in outcomes) == [False] + [True] * 15
@@ -6,7 +6,6 @@ from flask_caching import Cache
 import random
 import os
 import json
-import numpy as np
 import pandas as pd
 from scipy import stats
 from datetime import datetime, timedelta
@@ -17,6 +16,9 @@ from google.cloud import bigtable
 from google.cloud import secretmanager
 from sqlalchemy import create_engine
 import redis
+import threading
+
+from streaming_risk import StreamingRiskAccumulator
 
 app = Flask(__name__)
 CORS(app)
@@ -59,90 +61,91 @@ def get_redis_connection():
             redis_conn = None
     return redis_conn
 
-def calculate_var(returns, confidence_level=0.95, time_horizon=1):
-    """Calculate Value at Risk using historical simulation"""
-    if len(returns) < 30:
-        return 0
-
-    # Sort returns in ascending order
-    sorted_returns = np.sort(returns)
-
-    # Calculate VaR
-    var_index = int((1 - confidence_level) * len(sorted_returns))
-    var = sorted_returns[var_index]
-
-    # Scale for time horizon (assuming daily returns)
-    if time_horizon > 1:
-        var = var * np.sqrt(time_horizon)
-
-    return abs(var)  # Return positive value
-
-def calculate_expected_shortfall(returns, var):
-    """Calculate Expected Shortfall (CVaR)"""
-    if len(returns) < 30:
-        return 0
-
-    # Returns worse than VaR
-    tail_returns = returns[returns <= -var]
-
-    if len(tail_returns) == 0:
-        return var
-
-    return abs(np.mean(tail_returns))
-
-def calculate_sharpe_ratio(returns, risk_free_rate=0.02):
-    """Calculate Sharpe ratio"""
-    if len(returns) < 2 or np.std(returns) == 0:
-        return 0
-
-    excess_returns = returns - risk_free_rate/365  # Daily risk-free rate
-    return np.mean(excess_returns) / np.std(excess_returns)
-
-def calculate_max_drawdown(price_series):
-    """Calculate maximum drawdown"""
-    if len(price_series) < 2:
-        return 0
-
-    peak = price_series[0]
-    max_drawdown = 0
-
-    for price in price_series:
-        if price > peak:
-            peak = price
-        drawdown = (peak - price) / peak
-        max_drawdown = max(max_drawdown, drawdown)
-
-    return max_drawdown
+# Streaming risk state, checkpointed to Redis
+RISK_STATE_KEY = 'risk:accumulator'
+RISK_BUCKETS_KEY = 'risk:accumulator:buckets'
+RISK_WINDOW_DAYS = float(os.getenv('RISK_WINDOW_DAYS', '30'))
+RISK_INGEST_LATENESS = float(os.getenv('RISK_INGEST_LATENESS', '300'))  # Seconds a trade may commit late
+risk_accumulator = None
+risk_lock = threading.Lock()
+
+def get_risk_accumulator():
+    """Load the accumulator from its Redis checkpoint, or start a fresh one"""
+    global risk_accumulator
+    if risk_accumulator is None:
+        r = get_redis_connection()
+        state, buckets = None, {}
+        if r:
+            try:
+                state = r.get(RISK_STATE_KEY)
+                buckets = r.hgetall(RISK_BUCKETS_KEY)
+            except Exception as e:
+                print(f"[ERROR] Failed to load risk checkpoint: {e}")
+        if state:
+            risk_accumulator = StreamingRiskAccumulator.from_checkpoint(state, buckets)
+        else:
+            risk_accumulator = StreamingRiskAccumulator(
+                window_seconds=RISK_WINDOW_DAYS * 86400,
+                lateness=RISK_INGEST_LATENESS
+            )
+    return risk_accumulator
+
+def checkpoint_risk_accumulator(accumulator):
+    """Write the metadata and only the buckets that changed since the last checkpoint"""
+    r = get_redis_connection()
+    if r:
+        try:
+            meta, changed, removed = accumulator.checkpoint_delta()
+            pipe = r.pipeline(transaction=True)
+            if changed:
+                pipe.hset(RISK_BUCKETS_KEY, mapping=changed)
+            if removed:
+                pipe.hdel(RISK_BUCKETS_KEY, *removed)
+            pipe.set(RISK_STATE_KEY, meta)
+            pipe.execute()
+            accumulator.checkpoint_written(changed, removed)
+        except Exception as e:
+            print(f"[ERROR] Failed to checkpoint risk state: {e}")
+
+def ingest_new_trades(cursor, accumulator):
+    """
+    Feed trades the accumulator has not counted yet. Without a checkpoint this
+    seeds the whole window; afterwards it re-reads from shortly before the
+    newest trade seen and the accumulator skips ids it already has, so trades
+    sharing a timestamp or committed late are not missed.
+    """
+    cursor.execute("""
+        SELECT trade_id, pnl, timestamp
+        FROM trade_history
+        WHERE timestamp >= %s
+        ORDER BY timestamp ASC, trade_id ASC
+    """, (accumulator.resume_from(),))
+
+    ingested = 0
+    for trade_id, pnl, timestamp in cursor.fetchall():
+        if accumulator.update(pnl, timestamp, trade_id=trade_id):
+            ingested += 1
+
+    if ingested:
+        checkpoint_risk_accumulator(accumulator)
+    return ingested
 
 def get_portfolio_risk_metrics():
     """Calculate comprehensive portfolio risk metrics"""
     try:
-        # Get historical trade data
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Get PnL data for last 30 days
-        cursor.execute("""
-            SELECT pnl, timestamp
-            FROM trade_history
-            WHERE timestamp >= NOW() - INTERVAL '30 days'
-            ORDER BY timestamp ASC
-        """)
-        pnl_data = cursor.fetchall()
+        # Fold in trades not counted yet; buckets older than the window expire
+        with risk_lock:
+            accumulator = get_risk_accumulator()
+            ingest_new_trades(cursor, accumulator)
+            metrics = accumulator.metrics()
 
-        if len(pnl_data) < 10:
+        if metrics['total_trades'] < 10:
+            cursor.close()
             return get_default_risk_metrics()
 
-        pnl_values = [row[0] for row in pnl_data]
-        returns = np.array(pnl_values)
-
-        # Calculate risk metrics
-        var_95 = calculate_var(returns, 0.95)
-        var_99 = calculate_var(returns, 0.99)
-        es_95 = calculate_expected_shortfall(returns, var_95)
-        sharpe = calculate_sharpe_ratio(returns)
-        max_dd = calculate_max_drawdown(np.cumsum(returns))
-
         # Current exposure
         cursor.execute("""
             SELECT SUM(position_size * current_price) as total_exposure
@@ -154,17 +157,8 @@ def get_portfolio_risk_metrics():
 
         cursor.close()
 
-        return {
-            'var_95': var_95,
-            'var_99': var_99,
-            'expected_shortfall_95': es_95,
-            'sharpe_ratio': sharpe,
-            'max_drawdown': max_dd,
-            'current_exposure': current_exposure,
-            'volatility': np.std(returns),
-            'total_trades': len(returns),
-            'win_rate': len([r for r in returns if r > 0]) / len(returns) if len(returns) > 0 else 0
-        }
+        metrics['current_exposure'] = current_exposure
+        return metrics
 
     except Exception as e:
         print(f"Risk calculation error: {e}")
@@ -217,7 +211,6 @@ def assess_overall_risk(risk_metrics):
 
 @app.route('/risk', methods=['GET'])
 @limiter.limit("100 per minute")
-@cache.cached(timeout=300)
 def risk():
     risk_metrics = get_portfolio_risk_metrics()
     overall_risk = assess_overall_risk(risk_metrics)
@@ -0,0 +1,588 @@
+"""
+Streaming portfolio risk metrics.
+
+Maintains VaR, expected shortfall, Sharpe, volatility, max drawdown and win rate
+over a sliding 30-day window as trades arrive. Trades are folded into hourly
+buckets of fixed-size mergeable statistics held in a segment tree, so a new
+trade costs O(log buckets) merges and reading the metrics does not depend on
+how many trades the window holds. Buckets that fall out of the window are
+dropped. State serializes to JSON, and only the buckets that changed need to
+be rewritten at each checkpoint.
+"""
+
+import json
+import math
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+class TDigest:
+    """Merging t-digest for streaming quantiles and tail means"""
+
+    def __init__(self, compression: float = 100, buffer_size: int = 500):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.buffer: List[float] = []
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.buffer.append(value)
+        self.total += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= self.buffer_size:
+            self.compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q_limit(self, q0: float) -> float:
+        k = self._k(q0) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def compress(self):
+        """Merge buffered points into centroids under the k1 scale function"""
+        if not self.buffer:
+            return
+
+        items = sorted(list(zip(self.means, self.weights)) + [(x, 1.0) for x in self.buffer])
+        self.buffer = []
+        self._merge_sorted(items)
+
+    def _merge_sorted(self, items):
+        means, weights = [], []
+        cur_mean, cur_weight = items[0]
+        weight_so_far = 0.0
+        q_limit = self._q_limit(0.0)
+
+        for mean, weight in items[1:]:
+            if (weight_so_far + cur_weight + weight) / self.total <= q_limit:
+                cur_mean += (mean - cur_mean) * weight / (cur_weight + weight)
+                cur_weight += weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                weight_so_far += cur_weight
+                q_limit = self._q_limit(weight_so_far / self.total)
+                cur_mean, cur_weight = mean, weight
+
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self.means, self.weights = means, weights
+
+    @classmethod
+    def merged(cls, digests: Iterable['TDigest'], compression: float = 100) -> 'TDigest':
+        """One digest summarizing every input digest"""
+        digest = cls(compression=compression)
+        items = []
+        for other in digests:
+            if not other.total:
+                continue
+            other.compress()
+            items.extend(zip(other.means, other.weights))
+            digest.total += other.total
+            digest.min = min(digest.min, other.min)
+            digest.max = max(digest.max, other.max)
+        if items:
+            digest._merge_sorted(sorted(items))
+        return digest
+
+    def _points(self):
+        """Interpolation knots (cumulative weight, value) through centroid centers"""
+        points = [(0.0, self.min)]
+        cumulative = 0.0
+        for mean, weight in zip(self.means, self.weights):
+            points.append((cumulative + weight / 2, mean))
+            cumulative += weight
+        points.append((self.total, self.max))
+        return points
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.total == 0:
+            return None
+        self.compress()
+        target = min(max(q, 0.0), 1.0) * self.total
+        points = self._points()
+        for (left_pos, left_val), (right_pos, right_val) in zip(points, points[1:]):
+            if target <= right_pos:
+                if right_pos == left_pos:
+                    return right_val
+                return left_val + (right_val - left_val) * (target - left_pos) / (right_pos - left_pos)
+        return self.max
+
+    def cdf_weight(self, value: float) -> float:
+        """Approximate number of observations <= value"""
+        if self.total == 0 or value < self.min:
+            return 0.0
+        if value >= self.max:
+            return self.total
+        self.compress()
+        points = self._points()
+        for (left_pos, left_val), (right_pos, right_val) in zip(points, points[1:]):
+            if value <= right_val:
+                if right_val == left_val:
+                    return right_pos
+                return left_pos + (right_pos - left_pos) * (value - left_val) / (right_val - left_val)
+        return self.total
+
+    def mean_below(self, value: float) -> Optional[float]:
+        """Approximate mean of observations <= value"""
+        weight_limit = self.cdf_weight(value)
+        if weight_limit <= 0:
+            return None
+
+        total_weight, total_sum = 0.0, 0.0
+        for mean, weight in zip(self.means, self.weights):
+            take = min(weight, weight_limit - total_weight)
+            if take <= 0:
+                break
+            total_weight += take
+            total_sum += take * mean
+        return total_sum / total_weight if total_weight else None
+
+    def to_dict(self) -> Dict:
+        self.compress()
+        return {
+            'compression': self.compression,
+            'means': self.means,
+            'weights': self.weights,
+            'total': self.total,
+            'min': self.min if self.total else None,
+            'max': self.max if self.total else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TDigest':
+        digest = cls(compression=data['compression'])
+        digest.means = list(data['means'])
+        digest.weights = list(data['weights'])
+        digest.total = data['total']
+        digest.min = data['min'] if data['min'] is not None else math.inf
+        digest.max = data['max'] if data['max'] is not None else -math.inf
+        return digest
+
+
+Timestamp = Union[None, float, int, str, datetime]
+
+
+def to_epoch(timestamp: Timestamp, default: float) -> float:
+    """Seconds since the epoch; naive datetimes and ISO strings are taken as UTC"""
+    if timestamp is None:
+        return default
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+class RiskBucket:
+    """
+    Mergeable PnL statistics for one time bucket, or for a run of consecutive buckets.
+
+    Every field is fixed-size: Welford moments, win and PnL totals, a bounded
+    t-digest and a drawdown summary of the cumulative PnL measured from the
+    bucket start (its highest and lowest point and its largest peak-to-trough
+    decline, with the peak that decline started from).
+    """
+
+    def __init__(self):
+        # Welford mean / variance
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        self.wins = 0
+        self.total_pnl = 0.0
+        self.digest = TDigest()
+
+        # Drawdown summary, relative to the cumulative PnL at the bucket start
+        self.high = 0.0
+        self.low = 0.0
+        self.drawdown = 0.0
+        self.drawdown_peak = 0.0
+
+    def add(self, pnl: float):
+        self.count += 1
+        delta = pnl - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (pnl - self.mean)
+
+        if pnl > 0:
+            self.wins += 1
+        self.digest.add(pnl)
+
+        self.total_pnl += pnl
+        if self.high - self.total_pnl > self.drawdown:
+            self.drawdown, self.drawdown_peak = self.high - self.total_pnl, self.high
+        self.high = max(self.high, self.total_pnl)
+        self.low = min(self.low, self.total_pnl)
+
+    def _append(self, other: 'RiskBucket'):
+        """Fold in the moments and drawdown of a bucket that follows this one"""
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.wins += other.wins
+
+        offset = self.total_pnl
+        # The largest decline lies within this run, within the next one, or runs
+        # from this run's high to the next one's low
+        across = self.high - (offset + other.low)
+        if across > self.drawdown:
+            self.drawdown, self.drawdown_peak = across, self.high
+        if other.drawdown > self.drawdown:
+            self.drawdown, self.drawdown_peak = other.drawdown, offset + other.drawdown_peak
+        self.high = max(self.high, offset + other.high)
+        self.low = min(self.low, offset + other.low)
+        self.total_pnl += other.total_pnl
+
+    @classmethod
+    def combine(cls, buckets: Iterable[Optional['RiskBucket']]) -> 'RiskBucket':
+        """Statistics of the buckets' trades taken in order"""
+        buckets = [bucket for bucket in buckets if bucket is not None and bucket.count]
+        combined = cls()
+        for bucket in buckets:
+            combined._append(bucket)
+        combined.digest = TDigest.merged(bucket.digest for bucket in buckets)
+        return combined
+
+    @property
+    def max_drawdown(self) -> float:
+        """Largest decline of cumulative PnL as a fraction of the peak it started from"""
+        return self.drawdown / self.drawdown_peak if self.drawdown_peak > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'wins': self.wins,
+            'total_pnl': self.total_pnl,
+            'digest': self.digest.to_dict(),
+            'high': self.high,
+            'low': self.low,
+            'drawdown': self.drawdown,
+            'drawdown_peak': self.drawdown_peak,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RiskBucket':
+        bucket = cls()
+        bucket.count = data['count']
+        bucket.mean = data['mean']
+        bucket.m2 = data['m2']
+        bucket.wins = data['wins']
+        bucket.total_pnl = data['total_pnl']
+        bucket.digest = TDigest.from_dict(data['digest'])
+        bucket.high = data['high']
+        bucket.low = data['low']
+        bucket.drawdown = data['drawdown']
+        bucket.drawdown_peak = data['drawdown_peak']
+        return bucket
+
+
+class WindowTree:
+    """
+    Segment tree of RiskBuckets over a ring of bucket slots.
+
+    Changing a slot recomputes only its ancestors (lazily, on the next read),
+    and the in-order aggregate of a ring that starts at any slot is combined
+    from O(log slots) nodes.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.size = 1 << max(slots - 1, 0).bit_length()
+        self.nodes: List[Optional[RiskBucket]] = [None] * (2 * self.size)
+        self._dirty = set()
+
+    def set(self, slot: int, bucket: Optional[RiskBucket]):
+        """Store a slot's bucket; call again after mutating it in place"""
+        self.nodes[self.size + slot] = bucket
+        self._dirty.add((self.size + slot) >> 1)
+
+    def _refresh(self):
+        level = self._dirty
+        while level:
+            parents = set()
+            for node in level:
+                left, right = self.nodes[2 * node], self.nodes[2 * node + 1]
+                if left is None or right is None:
+                    self.nodes[node] = left if right is None else right
+                else:
+                    self.nodes[node] = RiskBucket.combine([left, right])
+                if node > 1:
+                    parents.add(node >> 1)
+            level = parents
+        self._dirty = set()
+
+    def _range(self, lo: int, hi: int) -> List[Optional[RiskBucket]]:
+        left, right = [], []
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                left.append(self.nodes[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right.append(self.nodes[hi])
+            lo >>= 1
+            hi >>= 1
+        return left + right[::-1]
+
+    def aggregate(self, start: int) -> RiskBucket:
+        """Every slot in ring order from `start`"""
+        self._refresh()
+        if start == 0:
+            return RiskBucket.combine(self._range(0, self.slots))
+        return RiskBucket.combine(self._range(start, self.slots) + self._range(0, start))
+
+
+class StreamingRiskAccumulator:
+    """
+    Risk statistics over the trailing window_seconds of a PnL stream.
+
+    Trades land in the bucket their timestamp falls in, so the window is exact
+    to bucket_seconds. Drawdown follows the cumulative PnL of the window's
+    trades in bucket order; a late trade is placed at the end of its bucket.
+    Buckets sit in a ring-indexed WindowTree, so a trade costs O(log buckets)
+    bucket merges on the next read and reads in between are cached.
+
+    Ingestion re-reads from lateness seconds before the newest trade seen
+    (see resume_from) and skips trade ids it has already counted, so trades
+    sharing a timestamp or committed up to `lateness` late are not lost.
+    """
+
+    def __init__(self, risk_free_rate: float = 0.02, window_seconds: float = 30 * 86400,
+                 bucket_seconds: float = 3600, lateness: float = 300,
+                 clock: Callable[[], float] = time.time):
+        self.risk_free_rate = risk_free_rate
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.lateness = lateness
+        self.clock = clock
+
+        self.buckets: Dict[int, RiskBucket] = {}
+        # Every bucket from the first in the window to one past the current one
+        self.slots = math.ceil(window_seconds / bucket_seconds) + 2
+        self._tree = WindowTree(self.slots)
+
+        # High-water mark of ingested trades and the ids seen since lateness before it
+        self.last_timestamp: Optional[float] = None
+        self.recent_ids: Dict[str, float] = {}
+
+        # Buckets added, changed or expired since the last checkpoint
+        self._changed = set()
+        self._removed = set()
+
+        self._window: Optional[RiskBucket] = None
+        self._window_start: Optional[int] = None
+        self._expired_before: Optional[int] = None
+
+    def _first_bucket(self) -> int:
+        return math.floor((self.clock() - self.window_seconds) / self.bucket_seconds)
+
+    def _put(self, key: int, bucket: RiskBucket):
+        self.buckets[key] = bucket
+        self._tree.set(key % self.slots, bucket)
+        self._changed.add(key)
+        self._removed.discard(key)
+        self._window = None
+
+    def expire(self):
+        """Drop buckets that have left the window"""
+        first = self._first_bucket()
+        if first == self._expired_before:
+            return
+        self._expired_before = first
+        for key in [key for key in self.buckets if key < first]:
+            del self.buckets[key]
+            self._tree.set(key % self.slots, None)
+            self._changed.discard(key)
+            self._removed.add(key)
+            self._window = None
+
+    def update(self, pnl: float, timestamp: Timestamp = None, trade_id=None) -> bool:
+        """
+        Fold in one trade; returns False for duplicates, trades outside the window
+        and trades dated beyond the next bucket, which are picked up once current
+        """
+        ts = to_epoch(timestamp, self.clock())
+        if trade_id is not None:
+            trade_id = str(trade_id)
+            if trade_id in self.recent_ids:
+                return False
+
+        self.expire()
+        key = math.floor(ts / self.bucket_seconds)
+        first = self._first_bucket()
+        if key < first or key >= first + self.slots:
+            return False
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = RiskBucket()
+        bucket.add(float(pnl))
+        self._put(key, bucket)
+
+        if self.last_timestamp is None or ts > self.last_timestamp:
+            self.last_timestamp = ts
+            horizon = ts - self.lateness
+            self.recent_ids = {i: t for i, t in self.recent_ids.items() if t >= horizon}
+        if trade_id is not None and ts >= self.last_timestamp - self.lateness:
+            self.recent_ids[trade_id] = ts
+        return True
+
+    def resume_from(self) -> datetime:
+        """Earliest trade timestamp the next ingestion query has to include"""
+        start = self.clock() - self.window_seconds
+        if self.last_timestamp is not None:
+            start = max(start, self.last_timestamp - self.lateness)
+        return datetime.fromtimestamp(start, timezone.utc)
+
+    @property
+    def window(self) -> RiskBucket:
+        """Statistics of every trade currently in the window"""
+        self.expire()
+        first = self._first_bucket()
+        if self._window is None or first != self._window_start:
+            self._window = self._tree.aggregate(first % self.slots)
+            self._window_start = first
+        return self._window
+
+    @property
+    def count(self) -> int:
+        return self.window.count
+
+    @property
+    def volatility(self) -> float:
+        window = self.window
+        return math.sqrt(window.m2 / window.count) if window.count else 0.0
+
+    def var(self, confidence_level: float = 0.95, time_horizon: int = 1) -> float:
+        window = self.window
+        if window.count < 30:
+            return 0
+        var = window.digest.quantile(1 - confidence_level)
+        if time_horizon > 1:
+            var = var * math.sqrt(time_horizon)
+        return abs(var)
+
+    def expected_shortfall(self, var: float) -> float:
+        window = self.window
+        if window.count < 30:
+            return 0
+        tail_mean = window.digest.mean_below(-var)
+        if tail_mean is None:
+            return var
+        return abs(tail_mean)
+
+    def sharpe_ratio(self) -> float:
+        window = self.window
+        volatility = self.volatility
+        if window.count < 2 or volatility == 0:
+            return 0
+        return (window.mean - self.risk_free_rate / 365) / volatility
+
+    def metrics(self) -> Dict:
+        window = self.window
+        var_95 = self.var(0.95)
+        return {
+            'var_95': var_95,
+            'var_99': self.var(0.99),
+            'expected_shortfall_95': self.expected_shortfall(var_95),
+            'sharpe_ratio': self.sharpe_ratio(),
+            'max_drawdown': window.max_drawdown,
+            'max_drawdown_pnl': window.drawdown,
+            'volatility': self.volatility,
+            'total_trades': window.count,
+            'win_rate': window.wins / window.count if window.count else 0,
+        }
+
+    def _meta(self) -> Dict:
+        return {
+            'risk_free_rate': self.risk_free_rate,
+            'window_seconds': self.window_seconds,
+            'bucket_seconds': self.bucket_seconds,
+            'lateness': self.lateness,
+            'last_timestamp': self.last_timestamp,
+            'recent_ids': self.recent_ids,
+        }
+
+    def to_json(self) -> str:
+        """Full state as one JSON document"""
+        self.expire()
+        return json.dumps(dict(
+            self._meta(), buckets={str(key): bucket.to_dict() for key, bucket in self.buckets.items()}
+        ))
+
+    def checkpoint_delta(self) -> Tuple[str, Dict[str, str], List[str]]:
+        """
+        State to write since the last checkpoint_written(): the metadata JSON, the
+        JSON of each bucket added or changed, and the keys of buckets that expired
+        """
+        self.expire()
+        changed = {str(key): json.dumps(self.buckets[key].to_dict()) for key in self._changed}
+        removed = [str(key) for key in self._removed]
+        return json.dumps(self._meta()), changed, removed
+
+    def checkpoint_written(self, changed: Iterable[str], removed: Iterable[str]):
+        """Record that a checkpoint_delta() was stored"""
+        self._changed.difference_update(int(key) for key in changed)
+        self._removed.difference_update(int(key) for key in removed)
+
+    @classmethod
+    def _restore(cls, meta: Dict, buckets: Dict[int, RiskBucket], clock) -> 'StreamingRiskAccumulator':
+        acc = cls(
+            risk_free_rate=meta['risk_free_rate'],
+            window_seconds=meta['window_seconds'],
+            bucket_seconds=meta['bucket_seconds'],
+            lateness=meta['lateness'],
+            clock=clock,
+        )
+        for key, bucket in buckets.items():
+            acc._put(key, bucket)
+        acc.last_timestamp = meta['last_timestamp']
+        acc.recent_ids = dict(meta['recent_ids'])
+        acc.expire()
+        return acc
+
+    @classmethod
+    def from_json(cls, payload, clock: Callable[[], float] = time.time) -> 'StreamingRiskAccumulator':
+        """Restore from to_json(); every bucket counts as changed for the next checkpoint_delta()"""
+        data = json.loads(payload)
+        buckets = data.get('buckets')
+        if buckets is None or any('drawdown' not in bucket for bucket in buckets.values()):
+            # Checkpoint from the all-time accumulator or with unbounded drawdown
+            # steps; reseed from the database
+            return cls(risk_free_rate=data.get('risk_free_rate', 0.02), clock=clock)
+        return cls._restore(data, {int(key): RiskBucket.from_dict(bucket) for key, bucket in buckets.items()}, clock)
+
+    @classmethod
+    def from_checkpoint(cls, meta, buckets: Dict, clock: Callable[[], float] = time.time) -> 'StreamingRiskAccumulator':
+        """
+        Restore from the pieces written by checkpoint_delta(). A to_json() document
+        in place of the metadata is restored with from_json(), so its buckets are
+        moved into the hash by the next checkpoint
+        """
+        data = json.loads(meta)
+        if 'buckets' in data or 'window_seconds' not in data:
+            return cls.from_json(meta, clock)
+        acc = cls._restore(data, {
+            int(key): RiskBucket.from_dict(json.loads(bucket)) for key, bucket in buckets.items()
+        }, clock)
+        acc._changed = set()
+        return acc
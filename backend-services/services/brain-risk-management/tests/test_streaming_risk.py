@@ -0,0 +1,238 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from streaming_risk import StreamingRiskAccumulator, TDigest
+
+
+@pytest.fixture
+def pnl_stream():
+    rng = np.random.default_rng(7)
+    return rng.normal(0.001, 0.02, 20000)
+
+
+def batch_drawdown(pnl):
+    """Largest peak-to-trough decline of cumulative PnL, and that decline over its peak"""
+    cumulative = np.concatenate([[0.0], np.cumsum(pnl)])
+    peak = np.maximum.accumulate(cumulative)
+    decline = peak - cumulative
+    worst = int(np.argmax(decline))
+    return float(decline[worst]), float(decline[worst] / peak[worst]) if peak[worst] > 0 else 0.0
+
+
+def assert_drawdown_matches(metrics, pnl):
+    decline, ratio = batch_drawdown(pnl)
+    assert metrics['max_drawdown_pnl'] == pytest.approx(decline, rel=1e-9)
+    assert metrics['max_drawdown'] == pytest.approx(ratio, rel=1e-9)
+
+
+def test_moments_match_batch(pnl_stream):
+    acc = StreamingRiskAccumulator()
+    for pnl in pnl_stream:
+        acc.update(pnl)
+
+    metrics = acc.metrics()
+    assert metrics['total_trades'] == len(pnl_stream)
+    assert metrics['volatility'] == pytest.approx(np.std(pnl_stream), rel=1e-9)
+    excess = pnl_stream - 0.02 / 365
+    assert metrics['sharpe_ratio'] == pytest.approx(np.mean(excess) / np.std(excess), rel=1e-9)
+    assert metrics['win_rate'] == pytest.approx(np.mean(pnl_stream > 0))
+    assert_drawdown_matches(metrics, pnl_stream)
+
+
+def test_tail_metrics_close_to_batch(pnl_stream):
+    acc = StreamingRiskAccumulator()
+    for pnl in pnl_stream:
+        acc.update(pnl)
+
+    sorted_pnl = np.sort(pnl_stream)
+    var_95 = abs(sorted_pnl[int(0.05 * len(sorted_pnl))])
+    var_99 = abs(sorted_pnl[int(0.01 * len(sorted_pnl))])
+    es_95 = abs(np.mean(pnl_stream[pnl_stream <= -var_95]))
+
+    metrics = acc.metrics()
+    assert metrics['var_95'] == pytest.approx(var_95, rel=0.02)
+    assert metrics['var_99'] == pytest.approx(var_99, rel=0.02)
+    assert metrics['expected_shortfall_95'] == pytest.approx(es_95, rel=0.02)
+
+
+def test_digest_stays_bounded():
+    digest = TDigest(compression=100)
+    for x in np.random.default_rng(1).standard_normal(100000):
+        digest.add(x)
+    digest.compress()
+    assert len(digest.means) < 200
+    assert digest.quantile(0.5) == pytest.approx(0.0, abs=0.02)
+
+
+def test_checkpoint_round_trip(pnl_stream):
+    now = 1_800_000_000.0
+    clock = lambda: now
+    acc = StreamingRiskAccumulator(clock=clock)
+    for i, pnl in enumerate(pnl_stream[:5000]):
+        acc.update(pnl, timestamp=now - 5000 + i, trade_id=i)
+
+    restored = StreamingRiskAccumulator.from_json(json.loads(json.dumps(acc.to_json())), clock=clock)
+    for i, pnl in enumerate(pnl_stream[5000:]):
+        acc.update(pnl, timestamp=now, trade_id=5000 + i)
+        restored.update(pnl, timestamp=now, trade_id=5000 + i)
+
+    assert restored.metrics() == pytest.approx(acc.metrics())
+    assert restored.last_timestamp == acc.last_timestamp
+    assert not restored.update(1.0, timestamp=now, trade_id=len(pnl_stream) - 1)
+
+
+def test_window_matches_batch_over_last_30_days(pnl_stream):
+    day = 86400
+    now = 1_800_000_000.0
+    clock = {'now': now - 10 * day}
+    acc = StreamingRiskAccumulator(clock=lambda: clock['now'])
+
+    # 40 days of trades, fed as they happen
+    timestamps = np.linspace(now - 40 * day, now, len(pnl_stream))
+    for i, (pnl, ts) in enumerate(zip(pnl_stream, timestamps)):
+        clock['now'] = max(clock['now'], ts)
+        acc.update(pnl, timestamp=ts, trade_id=i)
+
+    # Buckets are whole hours, so the window starts at the hour before now - 30 days
+    start = np.floor((now - 30 * day) / 3600) * 3600
+    window = pnl_stream[timestamps >= start]
+    metrics = acc.metrics()
+    assert metrics['total_trades'] == len(window)
+    assert metrics['volatility'] == pytest.approx(np.std(window), rel=1e-9)
+    assert metrics['win_rate'] == pytest.approx(np.mean(window > 0))
+    assert_drawdown_matches(metrics, window)
+    sorted_pnl = np.sort(window)
+    assert metrics['var_95'] == pytest.approx(abs(sorted_pnl[int(0.05 * len(window))]), rel=0.02)
+
+    # Ten more days without trades empties the window
+    clock['now'] = now + 31 * day
+    assert acc.metrics()['total_trades'] == 0
+    assert acc.buckets == {}
+
+
+def test_ingestion_overlaps_and_skips_seen_trades():
+    now = 1_800_000_000.0
+    acc = StreamingRiskAccumulator(lateness=300, clock=lambda: now)
+    assert acc.resume_from().timestamp() == now - 30 * 86400
+
+    assert acc.update(0.01, timestamp=now - 100, trade_id=1)
+    assert acc.update(0.02, timestamp=now - 100, trade_id=2)  # Same timestamp, different trade
+    assert acc.resume_from().timestamp() == now - 400
+
+    # Re-reading the overlap returns trades 1 and 2 again plus one committed late
+    assert not acc.update(0.01, timestamp=now - 100, trade_id=1)
+    assert not acc.update(0.02, timestamp=now - 100, trade_id=2)
+    assert acc.update(-0.03, timestamp=now - 250, trade_id=3)
+    assert acc.count == 3
+
+    # Ids older than the overlap are forgotten
+    assert acc.update(0.01, timestamp=now + 250, trade_id=4)
+    assert set(acc.recent_ids) == {'4'}
+
+
+def test_drawdown_merges_across_buckets():
+    rng = np.random.default_rng(3)
+    pnl = rng.normal(0.0, 1.0, 2000) + 0.05
+    now = 1_800_000_000.0
+    acc = StreamingRiskAccumulator(bucket_seconds=60, clock=lambda: now)
+    for i, x in enumerate(pnl):
+        acc.update(x, timestamp=now - 2000 + i)
+        if i % 97 == 0:
+            # Reads in between only recompute the changed bucket's ancestors
+            assert_drawdown_matches(acc.metrics(), pnl[:i + 1])
+    assert len(acc.buckets) > 30
+    assert_drawdown_matches(acc.metrics(), pnl)
+
+
+def test_late_trade_lands_at_the_end_of_its_bucket():
+    now = 1_800_000_000.0
+    acc = StreamingRiskAccumulator(bucket_seconds=60, clock=lambda: now)
+    early = [5.0, -3.0, 2.0]
+    later = [1.0, -4.0, 6.0, -2.0]
+    for i, x in enumerate(early):
+        acc.update(x, timestamp=now - 300 + i)
+    for i, x in enumerate(later):
+        acc.update(x, timestamp=now - 120 + i)
+    acc.metrics()
+
+    acc.update(-7.0, timestamp=now - 290)
+    assert_drawdown_matches(acc.metrics(), early + [-7.0] + later)
+
+
+def test_state_stays_fixed_size_as_trades_grow():
+    now = 1_800_000_000.0
+    acc = StreamingRiskAccumulator(clock=lambda: now)
+    pnl = np.tile([1.0, -0.5], 100_000)
+    for i, x in enumerate(pnl):
+        acc.update(x, timestamp=now - 3 * 3600 + i * 0.05)
+
+    assert len(acc.buckets) == 3
+    assert all(len(json.dumps(bucket.to_dict())) < 10_000 for bucket in acc.buckets.values())
+    assert len(acc.to_json()) < 30_000
+    assert_drawdown_matches(acc.metrics(), pnl)
+
+
+def test_checkpoint_delta_holds_only_changed_buckets():
+    clock = {'now': 1_800_001_800.0}  # Mid-hour
+    acc = StreamingRiskAccumulator(window_seconds=86400, clock=lambda: clock['now'])
+    for hour in range(24):
+        for i in range(10):
+            acc.update(0.01 * (i - 4), timestamp=clock['now'] - hour * 3600 - i)
+
+    store = {}
+    meta, changed, removed = acc.checkpoint_delta()
+    assert len(changed) == 24 and removed == []
+    acc.checkpoint_written(changed, removed)
+    store.update(changed)
+
+    # One new trade rewrites one bucket; moving the window expires the oldest
+    clock['now'] += 2 * 3600
+    acc.update(0.05, timestamp=clock['now'])
+    meta, changed, removed = acc.checkpoint_delta()
+    assert list(changed) == [str(int(clock['now'] // 3600))]
+    assert len(removed) == 1
+    acc.checkpoint_written(changed, removed)
+    store.update(changed)
+    for key in removed:
+        del store[key]
+
+    restored = StreamingRiskAccumulator.from_checkpoint(meta, store, clock=lambda: clock['now'])
+    assert restored.metrics() == pytest.approx(acc.metrics())
+    assert restored.checkpoint_delta()[1:] == ({}, [])
+
+    # A failed write leaves the delta pending
+    acc.update(0.02, timestamp=clock['now'])
+    assert acc.checkpoint_delta()[1] == acc.checkpoint_delta()[1] != {}
+
+
+def test_all_time_checkpoint_is_discarded():
+    legacy = json.dumps({'risk_free_rate': 0.02, 'count': 10, 'last_timestamp': '2026-01-01T00:00:00'})
+    acc = StreamingRiskAccumulator.from_json(legacy)
+    assert acc.count == 0
+    assert acc.last_timestamp is None
+    assert StreamingRiskAccumulator.from_checkpoint(legacy, {}).count == 0
+
+
+def test_single_document_checkpoint_moves_into_the_hash(pnl_stream):
+    now = 1_800_000_000.0
+    acc = StreamingRiskAccumulator(clock=lambda: now)
+    for i, pnl in enumerate(pnl_stream[:500]):
+        acc.update(pnl, timestamp=now - 5000 + i * 10)
+
+    restored = StreamingRiskAccumulator.from_checkpoint(acc.to_json(), {}, clock=lambda: now)
+    assert restored.metrics() == pytest.approx(acc.metrics())
+    assert set(restored.checkpoint_delta()[1]) == {str(key) for key in acc.buckets}
+
+
+def test_too_few_trades_reports_zero_var():
+    acc = StreamingRiskAccumulator()
+    for pnl in [0.01, -0.02, 0.03]:
+        acc.update(pnl)
+    assert acc.var(0.95) == 0
+    assert acc.expected_shortfall(0) == 0
@@ -0,0 +1,337 @@
+"""
+Alpha-Orion Streaming Anomaly Engine
+Constant-time, bounded-memory anomaly statistics per entity
+
+Events are routed by stream ("transaction", "access", ...) and entity (an
+asset, an IP) to per-entity detector state. Every detector updates in O(1)
+per event, and the engine keeps at most `max_entities` entity states,
+evicting the least recently seen first.
+
+Detectors:
+- ZScoreDetector: sliding-window Welford mean / variance over the last N values
+- EWMADetector: z-score against an exponentially weighted baseline
+- MADDetector: robust modified z-score from streaming median / MAD estimates
+- RateSpikeDetector: time-wheel request and error counts over a rolling window
+"""
+
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class Anomaly:
+    """One detector firing on one event"""
+    detector: str
+    stream: str
+    entity: str
+    value: float
+    score: float
+    reason: str
+
+
+class AnomalyDetector:
+    """
+    Interface for pluggable detectors.
+
+    A detector owns no per-entity data itself: new_state() creates it and
+    observe() updates it with one event and reports anomalies, in O(1).
+    """
+
+    name = "detector"
+
+    def new_state(self) -> Any:
+        raise NotImplementedError
+
+    def observe(self, state: Any, value: float, timestamp: float, **fields) -> List[Tuple[str, float]]:
+        """
+        Returns:
+            List of (reason, score) for each condition the event triggers
+        """
+        raise NotImplementedError
+
+
+class _WindowStats:
+    """Welford accumulator over a fixed-size sliding window"""
+
+    __slots__ = ("values", "count", "mean", "m2", "removals")
+
+    def __init__(self, window: int):
+        self.values: deque = deque(maxlen=window)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.removals = 0
+
+    def push(self, value: float):
+        values = self.values
+        if len(values) == values.maxlen:
+            old = values[0]
+            self.count -= 1
+            if self.count:
+                delta = old - self.mean
+                self.mean -= delta / self.count
+                self.m2 -= delta * (old - self.mean)
+            else:
+                self.mean = self.m2 = 0.0
+            self.removals += 1
+        values.append(value)
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.removals >= values.maxlen:
+            # Re-anchor once per window turnover so removal error cannot accumulate
+            self.removals = 0
+            self.mean = math.fsum(values) / self.count
+            self.m2 = math.fsum((v - self.mean) ** 2 for v in values)
+
+    @property
+    def stdev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1))
+
+
+class ZScoreDetector(AnomalyDetector):
+    """|x - mean| / stdev over the last `window` values, including x itself"""
+
+    name = "zscore"
+
+    def __init__(self, threshold: float = 2.0, window: int = 1000, min_samples: int = 10):
+        self.threshold = threshold
+        self.window = window
+        self.min_samples = min_samples
+
+    def new_state(self) -> _WindowStats:
+        return _WindowStats(self.window)
+
+    def observe(self, state: _WindowStats, value: float, timestamp: float, **fields) -> List[Tuple[str, float]]:
+        state.push(value)
+        if state.count < self.min_samples:
+            return []
+        stdev = state.stdev
+        if stdev > 0:
+            z_score = abs(value - state.mean) / stdev
+            if z_score > self.threshold:
+                return [("zscore", z_score)]
+        return []
+
+
+class _EWMAState:
+    __slots__ = ("count", "mean", "variance")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+
+class EWMADetector(AnomalyDetector):
+    """z-score against an EWMA mean / variance baseline that excludes the current value"""
+
+    name = "ewma"
+
+    def __init__(self, threshold: float = 3.0, alpha: float = 0.05, min_samples: int = 30):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.min_samples = min_samples
+
+    def new_state(self) -> _EWMAState:
+        return _EWMAState()
+
+    def observe(self, state: _EWMAState, value: float, timestamp: float, **fields) -> List[Tuple[str, float]]:
+        result = []
+        if state.count >= self.min_samples and state.variance > 0:
+            z_score = abs(value - state.mean) / math.sqrt(state.variance)
+            if z_score > self.threshold:
+                result.append(("ewma", z_score))
+
+        if state.count == 0:
+            state.mean = value
+        else:
+            delta = value - state.mean
+            state.mean += self.alpha * delta
+            state.variance = (1 - self.alpha) * (state.variance + self.alpha * delta * delta)
+        state.count += 1
+        return result
+
+
+class _MADState:
+    __slots__ = ("count", "median", "mad")
+
+    def __init__(self):
+        self.count = 0
+        self.median = 0.0
+        self.mad = 0.0
+
+
+class MADDetector(AnomalyDetector):
+    """
+    Modified z-score 0.6745 * |x - median| / MAD.
+
+    Median and MAD are tracked with frugal streaming estimates: each event moves
+    them a step proportional to the current MAD, so no history is stored.
+    """
+
+    name = "mad"
+
+    def __init__(self, threshold: float = 3.5, step: float = 0.05, min_samples: int = 30):
+        self.threshold = threshold
+        self.step = step
+        self.min_samples = min_samples
+
+    def new_state(self) -> _MADState:
+        return _MADState()
+
+    def observe(self, state: _MADState, value: float, timestamp: float, **fields) -> List[Tuple[str, float]]:
+        result = []
+        deviation = abs(value - state.median)
+        if state.count >= self.min_samples and state.mad > 0:
+            score = 0.6745 * deviation / state.mad
+            if score > self.threshold:
+                result.append(("mad", score))
+
+        if state.count == 0:
+            state.median = value
+        else:
+            scale = state.mad if state.mad > 0 else max(abs(state.median), 1.0)
+            state.median += self.step * scale * ((value > state.median) - (value < state.median))
+            state.mad += self.step * scale * ((deviation > state.mad) - (deviation < state.mad))
+            if state.mad < 0:
+                state.mad = 0.0
+        state.count += 1
+        return result
+
+
+class _TimeWheel:
+    """Event and failure counts in `slots` rotating buckets"""
+
+    __slots__ = ("counts", "failures", "head", "total", "total_failures")
+
+    def __init__(self, slots: int):
+        self.counts = [0] * slots
+        self.failures = [0] * slots
+        self.head: Optional[int] = None
+        self.total = 0
+        self.total_failures = 0
+
+    def advance(self, tick: int):
+        slots = len(self.counts)
+        if self.head is None or tick - self.head >= slots:
+            self.counts = [0] * slots
+            self.failures = [0] * slots
+            self.total = self.total_failures = 0
+        else:
+            counts, failures = self.counts, self.failures
+            for t in range(self.head + 1, tick + 1):
+                i = t % slots
+                self.total -= counts[i]
+                self.total_failures -= failures[i]
+                counts[i] = failures[i] = 0
+        self.head = tick
+
+    def add(self, tick: int, failed: bool):
+        if self.head is None or tick > self.head:
+            self.advance(tick)
+        # Late events count toward the newest slot
+        i = self.head % len(self.counts)
+        self.counts[i] += 1
+        self.total += 1
+        if failed:
+            self.failures[i] += 1
+            self.total_failures += 1
+
+
+class RateSpikeDetector(AnomalyDetector):
+    """Request count and error ratio over a rolling window, from a time wheel"""
+
+    name = "rate_spike"
+
+    def __init__(
+        self,
+        window_seconds: float = 3600,
+        slots: int = 60,
+        max_events: int = 100,
+        max_error_ratio: float = 0.8,
+        min_events_for_ratio: int = 10
+    ):
+        self.slot_seconds = window_seconds / slots
+        self.slots = slots
+        self.max_events = max_events
+        self.max_error_ratio = max_error_ratio
+        self.min_events_for_ratio = min_events_for_ratio
+
+    def new_state(self) -> _TimeWheel:
+        return _TimeWheel(self.slots)
+
+    def observe(self, state: _TimeWheel, value: float, timestamp: float, failed: bool = False,
+                **fields) -> List[Tuple[str, float]]:
+        state.add(int(timestamp // self.slot_seconds), failed)
+        result = []
+        if state.total > self.max_events:
+            result.append(("high_frequency", float(state.total)))
+        if state.total > self.min_events_for_ratio:
+            ratio = state.total_failures / state.total
+            if ratio > self.max_error_ratio:
+                result.append(("high_error_rate", ratio))
+        return result
+
+
+class StreamingAnomalyEngine:
+    """Routes events to per-entity detector state with LRU-bounded memory"""
+
+    def __init__(self, max_entities: int = 100000):
+        self.max_entities = max_entities
+        self.detectors: Dict[str, List[AnomalyDetector]] = {}
+        self._states: "OrderedDict[Tuple[str, str], List[Any]]" = OrderedDict()
+        self.events = 0
+        self.evicted = 0
+
+    def register(self, stream: str, detector: AnomalyDetector):
+        """Add a detector to a stream; existing entities pick it up on their next event"""
+        self.detectors.setdefault(stream, []).append(detector)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def observe(self, stream: str, entity: str, value: float = 1.0, timestamp: float = None,
+                **fields) -> List[Anomaly]:
+        """
+        Feed one event to every detector registered on the stream.
+
+        Args:
+            stream: Event stream name
+            entity: Entity the event belongs to (asset, IP, ...)
+            value: Observed value
+            timestamp: Event time in seconds (default: now)
+            fields: Extra event fields for detectors, e.g. failed=True
+        """
+        detectors = self.detectors.get(stream)
+        if not detectors:
+            return []
+        if timestamp is None:
+            timestamp = time.time()
+        self.events += 1
+
+        key = (stream, entity)
+        states = self._states.get(key)
+        if states is None:
+            states = self._states[key] = []
+            if len(self._states) > self.max_entities:
+                self._states.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._states.move_to_end(key)
+        while len(states) < len(detectors):
+            states.append(detectors[len(states)].new_state())
+
+        anomalies = []
+        for detector, state in zip(detectors, states):
+            for reason, score in detector.observe(state, value, timestamp, **fields):
+                anomalies.append(Anomaly(detector.name, stream, entity, value, score, reason))
+        return anomalies
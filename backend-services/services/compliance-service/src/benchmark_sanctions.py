@@ -0,0 +1,78 @@
+"""
+Alpha-Orion Sanctions Screening Benchmark
+
+Builds an index of random addresses and measures single-core lookup
+throughput for the batch (screen_many) and scalar (is_sanctioned) paths.
+
+Usage:
+    python benchmark_sanctions.py --entries 50000 --lookups 1000000
+    python benchmark_sanctions.py --batch-size 256 --hit-rate 0.01
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from sanctions_index import SanctionsScreener
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+
+
+def random_addresses(rng, count):
+    raw = rng.integers(0, 256, size=(count, 20), dtype=np.uint8)
+    return ['0x' + row.tobytes().hex() for row in raw]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sanctions screening benchmark")
+    parser.add_argument('--entries', type=int, default=50000, help="Addresses on the sanctions list")
+    parser.add_argument('--lookups', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--hit-rate', type=float, default=0.001)
+    parser.add_argument('--scalar-lookups', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    sanctioned = random_addresses(rng, args.entries)
+
+    with tempfile.TemporaryDirectory() as directory:
+        screener = SanctionsScreener(os.path.join(directory, 'sanctions.idx'))
+        start = time.perf_counter()
+        screener.load_addresses(sanctioned)
+        logging.info(f"Built index of {screener.count} addresses in {time.perf_counter() - start:.2f}s")
+
+        lookups = random_addresses(rng, args.lookups)
+        hits = rng.random(args.lookups) < args.hit_rate
+        for i in np.flatnonzero(hits):
+            lookups[i] = sanctioned[rng.integers(args.entries)]
+        batches = [lookups[i:i + args.batch_size] for i in range(0, args.lookups, args.batch_size)]
+
+        start = time.perf_counter()
+        found = sum(int(screener.screen_many(batch).sum()) for batch in batches)
+        elapsed = time.perf_counter() - start
+        logging.info(f"screen_many: {args.lookups / elapsed:,.0f} lookups/s "
+                     f"({args.lookups} in {elapsed:.2f}s, batch {args.batch_size}, {found} hits of {int(hits.sum())})")
+
+        scalar = lookups[:args.scalar_lookups]
+        start = time.perf_counter()
+        found = sum(map(screener.is_sanctioned, scalar))
+        elapsed = time.perf_counter() - start
+        logging.info(f"is_sanctioned: {len(scalar) / elapsed:,.0f} lookups/s ({len(scalar)} in {elapsed:.2f}s, {found} hits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,10 @@ import json
 from datetime import datetime, timedelta
 import logging
 from collections import defaultdict
-import statistics
+import tempfile
+
+from anomaly_engine import EWMADetector, MADDetector, RateSpikeDetector, StreamingAnomalyEngine, ZScoreDetector
+from sanctions_index import SanctionsScreener
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,7 +41,8 @@ CHAINALYSIS_API_KEY = os.getenv("CHAINALYSIS_API_KEY")
 CHAINALYSIS_BASE_URL = "https://api.chainalysis.com/api/kyt/v1"
 
 OFAC_API_KEY = os.getenv("OFAC_API_KEY")  # If using a commercial OFAC API
-OFAC_SANCTIONS_URL = "https://www.treasury.gov/ofac/downloads/sdn.xml"  # Public OFAC list
+OFAC_SANCTIONS_URL = os.getenv("OFAC_SANCTIONS_URL", "https://www.treasury.gov/ofac/downloads/sdn.xml")  # Public OFAC list
+SANCTIONS_INDEX_PATH = os.getenv("SANCTIONS_INDEX_PATH", os.path.join(tempfile.gettempdir(), "alpha-orion", "sanctions.idx"))
 
 # In-memory cache for sanctions lists
 sanctions_cache = {}
@@ -56,6 +60,12 @@ class TransactionCheckRequest(BaseModel):
     asset: str
     blockchain: str = "ethereum"
 
+class ScreenManyRequest(BaseModel):
+    addresses: List[str]
+    blockchain: str = "ethereum"
+    asset: Optional[str] = None
+    include_risk: bool = False
+
 class ComplianceResult(BaseModel):
     compliant: bool
     risk_score: float
@@ -66,48 +76,43 @@ class ComplianceResult(BaseModel):
 class SanctionsList:
     """Manages OFAC sanctions list"""
 
-    def __init__(self):
-        self.sanctions = set()
-        self.last_updated = None
+    def __init__(self, index_path: str = SANCTIONS_INDEX_PATH):
+        # Reuses the last index on disk so screening works before the first download
+        self.screener = SanctionsScreener(index_path)
+        self.last_updated = (
+            datetime.utcfromtimestamp(self.screener.last_updated) if self.screener.last_updated else None
+        )
+
+    @property
+    def count(self) -> int:
+        return self.screener.count
 
     async def update_sanctions_list(self):
         """Fetch and update OFAC sanctions list"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(OFAC_SANCTIONS_URL)
-                response.raise_for_status()
-
-                # Parse XML and extract addresses
-                # This is a simplified implementation
-                # In production, use proper XML parsing and extract wallet addresses
-                self.sanctions = self._parse_ofac_xml(response.text)
+            # Stream the download to disk, then parse and rebuild off the event loop
+            with tempfile.NamedTemporaryFile(suffix=".sanctions") as download:
+                async with httpx.AsyncClient(timeout=60) as client:
+                    async with client.stream("GET", OFAC_SANCTIONS_URL) as response:
+                        response.raise_for_status()
+                        async for chunk in response.aiter_bytes():
+                            download.write(chunk)
+                download.flush()
+
+                count = await asyncio.to_thread(self.screener.load_file, download.name)
                 self.last_updated = datetime.utcnow()
-                logger.info(f"Updated OFAC sanctions list with {len(self.sanctions)} entries")
+                logger.info(f"Updated OFAC sanctions list with {count} entries")
 
         except Exception as e:
             logger.error(f"Failed to update OFAC sanctions: {e}")
 
-    def _parse_ofac_xml(self, xml_content: str) -> set:
-        """Parse OFAC XML and extract relevant addresses"""
-        # Simplified parsing - in production use proper XML parser
-        addresses = set()
-
-        # Look for ethereum addresses in the XML
-        lines = xml_content.split('\n')
-        for line in lines:
-            if '0x' in line and len(line.split('0x')[1][:40]) == 40:
-                addr = '0x' + line.split('0x')[1][:40]
-                addresses.add(addr.lower())
-
-        return addresses
-
     def is_sanctioned(self, address: str) -> bool:
         """Check if address is sanctioned"""
-        if self.last_updated and datetime.utcnow() - self.last_updated > CACHE_DURATION:
-            # Cache expired, but we'll check with current data
-            pass
+        return self.screener.is_sanctioned(address)
 
-        return address.lower() in self.sanctions
+    def screen_many(self, addresses: List[str]) -> List[bool]:
+        """Check a batch of addresses in one vectorized pass"""
+        return self.screener.screen_many(addresses).tolist()
 
 # Initialize sanctions list
 sanctions_list = SanctionsList()
@@ -167,35 +172,59 @@ class ChainalysisClient:
 chainalysis = ChainalysisClient(CHAINALYSIS_API_KEY)
 
 # Security monitoring
-access_logs = defaultdict(list)
 failed_auth_attempts = defaultdict(int)
-transaction_patterns = defaultdict(list)
 alerts = []
 
 class SecurityMonitor:
     """Security monitoring and anomaly detection"""
 
-    def __init__(self):
+    def __init__(self, max_entities: int = 100000):
         self.suspicious_ips = set()
         self.failed_auth_threshold = 5
         self.transaction_anomaly_threshold = 2.0  # Standard deviations
-
-    def log_access(self, ip: str, endpoint: str, method: str, status_code: int):
+        self.access_events = 0
+
+        # Streaming statistics per asset and per IP, O(1) per event with bounded memory
+        self.engine = StreamingAnomalyEngine(max_entities=max_entities)
+        self.engine.register("transaction", ZScoreDetector(
+            threshold=self.transaction_anomaly_threshold,
+            window=1000,  # Last 1000 transactions per asset
+            min_samples=10
+        ))
+        # Baselines that a drifting or heavy-tailed asset cannot drag along the way it does
+        # the 1000-value window. Each detector keeps its own state, so the z-score alerts
+        # stay identical to the list-based check; these only add alerts, at thresholds that
+        # Gaussian noise rarely crosses
+        self.engine.register("transaction", EWMADetector(
+            threshold=4.0,
+            alpha=0.05,  # Baseline half-life of ~14 transactions
+            min_samples=30
+        ))
+        self.engine.register("transaction", MADDetector(
+            threshold=5.0,
+            step=0.05,
+            min_samples=30
+        ))
+        self.engine.register("access", RateSpikeDetector(
+            window_seconds=3600,
+            slots=60,
+            max_events=100,
+            max_error_ratio=0.8,
+            min_events_for_ratio=10
+        ))
+
+    def log_access(self, ip: str, endpoint: str, method: str, status_code: int, timestamp: float = None):
         """Log access attempt"""
-        timestamp = datetime.utcnow()
-        access_logs[ip].append({
-            'timestamp': timestamp,
-            'endpoint': endpoint,
-            'method': method,
-            'status_code': status_code
-        })
-
-        # Keep only last 1000 entries per IP
-        if len(access_logs[ip]) > 1000:
-            access_logs[ip] = access_logs[ip][-1000:]
+        self.access_events += 1
 
         # Check for unusual access patterns
-        self._check_access_patterns(ip)
+        for anomaly in self.engine.observe("access", ip, timestamp=timestamp, failed=status_code >= 400):
+            if anomaly.reason == "high_frequency":
+                self._trigger_alert(f"High frequency access from IP: {ip}")
+            elif anomaly.reason == "high_error_rate":
+                self._trigger_alert(f"High error rate from IP: {ip}")
+            else:
+                self._trigger_alert(f"Unusual access pattern from IP: {ip} ({anomaly.reason})")
 
     def log_failed_auth(self, ip: str):
         """Log failed authentication"""
@@ -205,45 +234,16 @@ class SecurityMonitor:
             self._trigger_alert(f"Multiple failed auth attempts from IP: {ip}")
             self.suspicious_ips.add(ip)
 
-    def log_transaction(self, amount: float, asset: str):
+    def log_transaction(self, amount: float, asset: str, timestamp: float = None):
         """Log transaction for anomaly detection"""
-        transaction_patterns[asset].append(amount)
-
-        # Keep only last 1000 transactions per asset
-        if len(transaction_patterns[asset]) > 1000:
-            transaction_patterns[asset] = transaction_patterns[asset][-1000:]
-
-        # Check for anomalies
-        self._detect_transaction_anomaly(amount, asset)
-
-    def _check_access_patterns(self, ip: str):
-        """Check for unusual access patterns"""
-        recent_logs = [log for log in access_logs[ip] if (datetime.utcnow() - log['timestamp']).seconds < 3600]
-
-        # Check for high frequency access
-        if len(recent_logs) > 100:
-            self._trigger_alert(f"High frequency access from IP: {ip}")
-
-        # Check for failed requests ratio
-        failed_count = sum(1 for log in recent_logs if log['status_code'] >= 400)
-        if len(recent_logs) > 10 and failed_count / len(recent_logs) > 0.8:
-            self._trigger_alert(f"High error rate from IP: {ip}")
-
-    def _detect_transaction_anomaly(self, amount: float, asset: str):
-        """Detect anomalous transaction amounts"""
-        if len(transaction_patterns[asset]) < 10:
-            return
-
-        try:
-            mean = statistics.mean(transaction_patterns[asset])
-            stdev = statistics.stdev(transaction_patterns[asset])
-
-            if stdev > 0:
-                z_score = abs(amount - mean) / stdev
-                if z_score > self.transaction_anomaly_threshold:
-                    self._trigger_alert(f"Anomalous transaction detected: {amount} {asset} (z-score: {z_score:.2f})")
-        except statistics.StatisticsError:
-            pass
+        anomalies = self.engine.observe("transaction", asset, amount, timestamp=timestamp)
+        if anomalies:
+            # One alert per transaction, however many detectors fired
+            scores = ", ".join(
+                f"z-score: {anomaly.score:.2f}" if anomaly.detector == "zscore" else f"{anomaly.reason} score: {anomaly.score:.2f}"
+                for anomaly in anomalies
+            )
+            self._trigger_alert(f"Anomalous transaction detected: {amount} {asset} ({scores})")
 
     def _trigger_alert(self, message: str):
         """Trigger security alert"""
@@ -262,7 +262,8 @@ class SecurityMonitor:
     def get_security_stats(self):
         """Get security statistics"""
         return {
-            'total_access_logs': sum(len(logs) for logs in access_logs.values()),
+            'total_access_logs': self.access_events,
+            'tracked_entities': len(self.engine),
             'suspicious_ips': list(self.suspicious_ips),
             'failed_auth_attempts': dict(failed_auth_attempts),
             'active_alerts': len(alerts),
@@ -282,23 +283,30 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "compliance"}
 
-@app.post("/check-address", response_model=ComplianceResult)
-async def check_address(request: AddressCheckRequest):
-    """Check if an address is compliant"""
+def assess_address(sanctioned: bool, chainalysis_result: Optional[Dict]) -> ComplianceResult:
+    """Combine the sanctions hit and Chainalysis risk into one result"""
     flags = []
     risk_score = 0.0
     details = {}
 
     # Check OFAC sanctions
-    if sanctions_list.is_sanctioned(request.address):
+    if sanctioned:
         flags.append("OFAC_SANCTIONED")
         risk_score = 1.0
         details["ofac"] = True
     else:
         details["ofac"] = False
 
+    if chainalysis_result is None:
+        return ComplianceResult(
+            compliant=risk_score < 0.7,
+            risk_score=risk_score,
+            flags=flags,
+            details=details,
+            checked_at=datetime.utcnow()
+        )
+
     # Check Chainalysis risk
-    chainalysis_result = await chainalysis.check_address(request.address, request.asset)
     chainalysis_risk = chainalysis_result.get("risk", "unknown")
     chainalysis_score = chainalysis_result.get("score", 0.5)
 
@@ -319,6 +327,37 @@ async def check_address(request: AddressCheckRequest):
         checked_at=datetime.utcnow()
     )
 
+@app.post("/check-address", response_model=ComplianceResult)
+async def check_address(request: AddressCheckRequest):
+    """Check if an address is compliant"""
+    chainalysis_result = await chainalysis.check_address(request.address, request.asset)
+    return assess_address(sanctions_list.is_sanctioned(request.address), chainalysis_result)
+
+@app.post("/screen-many")
+async def screen_many(request: ScreenManyRequest):
+    """Screen a batch of addresses in one round trip"""
+    sanctioned = sanctions_list.screen_many(request.addresses)
+
+    if request.include_risk:
+        # Sanctioned addresses are already blocked; only score the rest
+        risk_results = await asyncio.gather(*(
+            chainalysis.check_address(address, request.asset) if not hit else asyncio.sleep(0)
+            for address, hit in zip(request.addresses, sanctioned)
+        ))
+    else:
+        risk_results = [None] * len(request.addresses)
+
+    results = [
+        dict(address=address, **assess_address(hit, risk).dict())
+        for address, hit, risk in zip(request.addresses, sanctioned, risk_results)
+    ]
+    return {
+        "compliant": all(r["compliant"] for r in results),
+        "sanctioned": [a for a, hit in zip(request.addresses, sanctioned) if hit],
+        "results": results,
+        "list_updated": sanctions_list.last_updated
+    }
+
 @app.post("/check-transaction", response_model=ComplianceResult)
 async def check_transaction(request: TransactionCheckRequest):
     """Check if a transaction is compliant"""
@@ -372,13 +411,13 @@ async def check_transaction(request: TransactionCheckRequest):
 async def update_sanctions():
     """Manually trigger sanctions list update"""
     await sanctions_list.update_sanctions_list()
-    return {"message": "Sanctions list updated", "entries": len(sanctions_list.sanctions)}
+    return {"message": "Sanctions list updated", "entries": sanctions_list.count}
 
 @app.get("/sanctions-count")
 async def get_sanctions_count():
     """Get current sanctions list count"""
     return {
-        "count": len(sanctions_list.sanctions),
+        "count": sanctions_list.count,
         "last_updated": sanctions_list.last_updated
     }
 
@@ -0,0 +1,165 @@
+import os
+import statistics
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+# Add src to path to import the anomaly engine
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from anomaly_engine import (
+    AnomalyDetector,
+    EWMADetector,
+    MADDetector,
+    RateSpikeDetector,
+    StreamingAnomalyEngine,
+    ZScoreDetector,
+)
+
+
+def reference_transaction_alerts(events, threshold=2.0):
+    """The list-based transaction check SecurityMonitor used before the streaming engine"""
+    transaction_patterns = defaultdict(list)
+    alerts = []
+    for i, (asset, amount) in enumerate(events):
+        transaction_patterns[asset].append(amount)
+        if len(transaction_patterns[asset]) > 1000:
+            transaction_patterns[asset] = transaction_patterns[asset][-1000:]
+        if len(transaction_patterns[asset]) < 10:
+            continue
+        mean = statistics.mean(transaction_patterns[asset])
+        stdev = statistics.stdev(transaction_patterns[asset])
+        if stdev > 0:
+            z_score = abs(amount - mean) / stdev
+            if z_score > threshold:
+                alerts.append((i, z_score))
+    return alerts
+
+
+def reference_access_alerts(events):
+    """The list-based access pattern check, evaluated at each event's own time"""
+    access_logs = defaultdict(list)
+    alerts = []
+    for i, (ip, timestamp, status_code) in enumerate(events):
+        access_logs[ip].append({'timestamp': timestamp, 'status_code': status_code})
+        if len(access_logs[ip]) > 1000:
+            access_logs[ip] = access_logs[ip][-1000:]
+        recent_logs = [log for log in access_logs[ip] if (timestamp - log['timestamp']).seconds < 3600]
+        if len(recent_logs) > 100:
+            alerts.append((i, "high_frequency"))
+        failed_count = sum(1 for log in recent_logs if log['status_code'] >= 400)
+        if len(recent_logs) > 10 and failed_count / len(recent_logs) > 0.8:
+            alerts.append((i, "high_error_rate"))
+    return alerts
+
+
+@pytest.mark.parametrize("with_baselines", [False, True])
+def test_zscore_detector_matches_list_based_check(with_baselines):
+    rng = np.random.default_rng(0)
+    assets = ['ETH', 'USDC', 'WBTC']
+    amounts = np.where(rng.random(6000) < 0.02, rng.lognormal(8, 1, 6000), rng.lognormal(4, 0.5, 6000))
+    events = [(assets[i % 3], float(a)) for i, a in enumerate(amounts)]
+
+    engine = StreamingAnomalyEngine()
+    engine.register("transaction", ZScoreDetector(threshold=2.0, window=1000, min_samples=10))
+    if with_baselines:
+        # SecurityMonitor's transaction stream: the extra baselines must not change z-score alerts
+        engine.register("transaction", EWMADetector(threshold=4.0, alpha=0.05, min_samples=30))
+        engine.register("transaction", MADDetector(threshold=5.0, step=0.05, min_samples=30))
+    actual = []
+    for i, (asset, amount) in enumerate(events):
+        actual.extend(
+            (i, a.score) for a in engine.observe("transaction", asset, amount, timestamp=i) if a.detector == "zscore"
+        )
+
+    expected = reference_transaction_alerts(events)
+    assert [i for i, _ in actual] == [i for i, _ in expected]
+    assert [z for _, z in actual] == pytest.approx([z for _, z in expected], rel=1e-9)
+
+
+def test_rate_spike_detector_matches_list_based_check():
+    rng = np.random.default_rng(1)
+    start = datetime(2026, 1, 1)
+    events = []
+    t = 0
+    # Quiet IPs, a bursty scraper and a credential stuffer, all under 1000 requests per hour
+    for _ in range(20000):
+        t += int(rng.integers(0, 3))
+        kind = rng.random()
+        if kind < 0.1:
+            ip, status = "10.0.0.99", 200
+        elif kind < 0.15:
+            ip, status = "10.0.0.66", 401 if rng.random() < 0.9 else 200
+        else:
+            ip, status = f"10.0.1.{int(rng.integers(0, 50))}", 500 if rng.random() < 0.05 else 200
+        events.append((ip, start + timedelta(seconds=t), status))
+
+    # One-second slots so the wheel sees the same window edge as the list scan
+    engine = StreamingAnomalyEngine()
+    engine.register("access", RateSpikeDetector(window_seconds=3600, slots=3600))
+    actual = []
+    for i, (ip, timestamp, status) in enumerate(events):
+        anomalies = engine.observe("access", ip, timestamp=timestamp.timestamp(), failed=status >= 400)
+        actual.extend((i, a.reason) for a in anomalies)
+
+    expected = reference_access_alerts(events)
+    assert any(reason == "high_frequency" for _, reason in expected)
+    assert any(reason == "high_error_rate" for _, reason in expected)
+    assert actual == expected
+
+
+def test_window_statistics_stay_exact_over_long_streams():
+    rng = np.random.default_rng(2)
+    detector = ZScoreDetector(window=100)
+    state = detector.new_state()
+    values = rng.normal(1e6, 1.0, 25000)
+    for t, value in enumerate(values):
+        detector.observe(state, float(value), t)
+
+    assert state.mean == pytest.approx(np.mean(values[-100:]), rel=1e-12)
+    assert state.stdev == pytest.approx(np.std(values[-100:], ddof=1), rel=1e-6)
+
+
+def test_ewma_and_mad_detectors_flag_outliers():
+    rng = np.random.default_rng(3)
+    engine = StreamingAnomalyEngine()
+    engine.register("transaction", EWMADetector(threshold=4.0))
+    engine.register("transaction", MADDetector(threshold=5.0))
+
+    fired = defaultdict(list)
+    values = rng.normal(100, 5, 2000)
+    values[[500, 1500]] = [400, 5]
+    for t, value in enumerate(values):
+        for anomaly in engine.observe("transaction", "ETH", float(value), timestamp=t):
+            fired[anomaly.detector].append(t)
+
+    for detector in ("ewma", "mad"):
+        assert 500 in fired[detector] and 1500 in fired[detector]
+        # Gaussian noise alone rarely crosses these thresholds
+        assert len(fired[detector]) < 10
+
+
+def test_engine_memory_is_bounded_and_detectors_are_pluggable():
+    class CountingDetector(AnomalyDetector):
+        name = "counter"
+
+        def new_state(self):
+            return [0]
+
+        def observe(self, state, value, timestamp, **fields):
+            state[0] += 1
+            return [("every_third", float(state[0]))] if state[0] % 3 == 0 else []
+
+    engine = StreamingAnomalyEngine(max_entities=100)
+    engine.register("access", RateSpikeDetector())
+    for i in range(1000):
+        engine.observe("access", f"10.0.{i // 256}.{i % 256}", timestamp=i)
+    assert len(engine) == 100
+    assert engine.evicted == 900
+
+    engine.register("access", CountingDetector())
+    anomalies = [engine.observe("access", "10.0.3.231", timestamp=1000 + i) for i in range(3)]
+    assert [a.reason for a in anomalies[2]] == ["every_third"]
@@ -0,0 +1,182 @@
+import io
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+# Add src to path to import the sanctions index
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sanctions_index import (
+    SanctionsIndex,
+    SanctionsScreener,
+    build_index,
+    encode_addresses_fast,
+    parse_sanctions_csv,
+    parse_sanctions_xml,
+)
+
+SDN_XML = b"""<?xml version="1.0" standalone="yes"?>
+<sdnList xmlns="http://tempuri.org/sdnList.xsd">
+  <sdnEntry>
+    <uid>1</uid>
+    <lastName>Example Mixer</lastName>
+    <idList>
+      <id><uid>10</uid><idType>Digital Currency Address - ETH</idType><idNumber>0x8589427373D6D84E98730D7795D8f6f8731FDA16</idNumber></id>
+      <id><uid>11</uid><idType>Digital Currency Address - XBT</idType><idNumber>1BoatSLRHtKNngkdXEeobR76b53LETtpyT</idNumber></id>
+      <id><uid>12</uid><idType>Passport</idType><idNumber>0x1111111111111111111111111111111111111111</idNumber></id>
+    </idList>
+  </sdnEntry>
+  <sdnEntry>
+    <uid>2</uid>
+    <idList>
+      <id><uid>20</uid><idType>Digital Currency Address - USDT</idType><idNumber>0x722122dF12D4e14e13Ac3b6895a86e84145b6967</idNumber></id>
+    </idList>
+  </sdnEntry>
+</sdnList>
+"""
+
+
+def random_addresses(seed, count):
+    raw = np.random.default_rng(seed).integers(0, 256, size=(count, 20), dtype=np.uint8)
+    return ['0x' + row.tobytes().hex() for row in raw]
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / 'sanctions.idx')
+
+
+def test_xml_parser_only_reads_digital_currency_ids():
+    addresses = list(parse_sanctions_xml(io.BytesIO(SDN_XML)))
+    assert addresses == [
+        '0x8589427373D6D84E98730D7795D8f6f8731FDA16',
+        '0x722122dF12D4e14e13Ac3b6895a86e84145b6967',
+    ]
+
+
+def test_csv_parser_finds_addresses_in_any_column():
+    csv_text = (
+        'address,note\n'
+        '0x8589427373d6d84e98730d7795d8f6f8731fda16,mixer\n'
+        '36,"Digital Currency Address - ETH 0x722122dF12D4e14e13Ac3b6895a86e84145b6967; alt."\n'
+        'not-an-address,0x1234\n'
+    )
+    assert list(parse_sanctions_csv(io.StringIO(csv_text))) == [
+        '0x8589427373d6d84e98730d7795d8f6f8731fda16',
+        '0x722122dF12D4e14e13Ac3b6895a86e84145b6967',
+    ]
+
+
+def test_index_lookups_match_set_membership(index_path):
+    sanctioned = random_addresses(0, 5000)
+    # Trailing zero bytes must not be lost by the S20 record type
+    sanctioned.append('0x' + 'ab' * 16 + '00' * 4)
+    assert build_index(sanctioned + sanctioned[:10], index_path) == len(sanctioned)
+
+    index = SanctionsIndex(index_path)
+    assert index.count == len(sanctioned)
+    assert list(index.records) == sorted(index.records)
+
+    screener = SanctionsScreener(index_path)
+    probes = sanctioned[::7] + random_addresses(1, 5000) + ['0x' + 'ab' * 16 + '00' * 3 + '01']
+    expected = np.array([p in set(sanctioned) for p in probes])
+
+    assert np.array_equal(screener.screen_many(probes), expected)
+    assert [screener.is_sanctioned(p) for p in probes] == expected.tolist()
+    assert screener.is_sanctioned(sanctioned[-1].upper().replace('0X', '0x'))
+
+
+def test_screen_many_tolerates_malformed_entries(index_path):
+    sanctioned = random_addresses(2, 100)
+    screener = SanctionsScreener(index_path)
+    screener.load_addresses(sanctioned)
+
+    batch = [sanctioned[0], 'garbage', None, sanctioned[1][:-1], sanctioned[2], '0x' + 'zz' * 20]
+    assert screener.screen_many(batch).tolist() == [True, False, False, False, True, False]
+    assert screener.screen_many_dict(sanctioned[:2]) == {sanctioned[0]: True, sanctioned[1]: True}
+    assert screener.screen_many([]).tolist() == []
+
+
+def test_fast_encoding_rejects_batches_that_only_look_aligned(index_path):
+    sanctioned = random_addresses(3, 10)
+    screener = SanctionsScreener(index_path)
+    screener.load_addresses(sanctioned)
+    clean = random_addresses(4, 2)
+
+    # bytes.fromhex would skip the space and read the next entry's first byte into this one
+    spaced = sanctioned[0][:-1] + ' '
+    # Two addresses in one entry and an empty one still join to 84 well-formed characters
+    merged = [clean[0] + sanctioned[1], '']
+    for batch, expected in [
+        ([spaced, sanctioned[2]], [False, True]),
+        (merged + [sanctioned[3]], [False, False, True]),
+        ([sanctioned[4] + '0', clean[1][:-1], sanctioned[5]], [False, False, True]),
+    ]:
+        assert encode_addresses_fast(batch) is None
+        assert screener.screen_many(batch).tolist() == expected
+
+    assert len(encode_addresses_fast(sanctioned)) == len(sanctioned)
+
+
+def test_screener_without_index_passes_everything(index_path):
+    screener = SanctionsScreener(index_path)
+    assert screener.count == 0
+    assert not screener.is_sanctioned(random_addresses(3, 1)[0])
+    assert screener.screen_many(random_addresses(3, 5)).tolist() == [False] * 5
+
+
+def test_index_is_reused_across_restarts(index_path):
+    sanctioned = random_addresses(4, 50)
+    SanctionsScreener(index_path).load_addresses(sanctioned)
+
+    restarted = SanctionsScreener(index_path)
+    assert restarted.count == 50
+    assert restarted.last_updated is not None
+    assert restarted.screen_many(sanctioned).all()
+
+
+def test_load_file_streams_xml(index_path, tmp_path):
+    path = tmp_path / 'sdn.xml'
+    path.write_bytes(SDN_XML)
+    screener = SanctionsScreener(index_path)
+    assert screener.load_file(str(path)) == 2
+    assert screener.is_sanctioned('0x8589427373d6d84e98730d7795d8f6f8731fda16')
+    assert not screener.is_sanctioned('0x1111111111111111111111111111111111111111')
+
+
+def test_hot_reload_does_not_disturb_concurrent_lookups(index_path):
+    old_list = random_addresses(5, 2000)
+    new_list = random_addresses(6, 2000)
+    screener = SanctionsScreener(index_path)
+    screener.load_addresses(old_list)
+
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        probe = old_list[:50] + new_list[:50]
+        while not stop.is_set():
+            try:
+                hits = screener.screen_many(probe)
+                # Every batch sees exactly one whole list, never a mix or an empty index
+                if not (hits.tolist() == [True] * 50 + [False] * 50 or hits.tolist() == [False] * 50 + [True] * 50):
+                    errors.append(hits.tolist())
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        for i in range(20):
+            screener.load_addresses(new_list if i % 2 == 0 else old_list)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert screener.screen_many(old_list).all()
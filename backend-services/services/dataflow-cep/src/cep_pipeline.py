@@ -0,0 +1,444 @@
+"""
+Alpha-Orion Streaming CEP Pipeline
+Event-time complex event processing over market events
+
+Events are JSON objects with an epoch-millisecond 'timestamp', a 'symbol'
+and optionally 'venue', 'price' and 'volume'. Sources are pluggable readers
+(a tailed JSON-lines file, a Redis stream) driven by a splittable DoFn that
+stamps each event with its event time and holds the watermark at
+max(event time) - max_out_of_orderness.
+
+Detection runs in two stages:
+  1. Sliding event-time windows per symbol aggregate venue VWAPs and
+     per-period volume. Each window fires when the watermark passes it and
+     again for every late event within allowed_lateness; it emits a
+     'divergence' leg when venue prices disagree by divergence_bps, and a
+     'spike' leg when its last period's volume is volume_spike_multiple times
+     the mean of its earlier periods.
+  2. A stateful DoFn per symbol buffers legs and emits a match when a spike
+     follows a divergence within match_within seconds, whichever order the
+     legs arrive in. Matched legs are consumed; an event-time timer drops
+     legs that can no longer match once the watermark (less the allowed
+     lateness) has passed them.
+"""
+
+import json
+import logging
+import math
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import apache_beam as beam
+from apache_beam.coders import PickleCoder
+from apache_beam.io.restriction_trackers import OffsetRange, OffsetRestrictionTracker
+from apache_beam.io.watermark_estimators import ManualWatermarkEstimator
+from apache_beam.metrics import Metrics
+from apache_beam.transforms.core import RestrictionProvider
+from apache_beam.transforms.timeutil import TimeDomain
+from apache_beam.transforms.trigger import AccumulationMode, AfterCount, AfterWatermark
+from apache_beam.transforms.userstate import BagStateSpec, ReadModifyWriteStateSpec, TimerSpec, on_timer
+from apache_beam.transforms.window import GlobalWindows, SlidingWindows, TimestampedValue
+from apache_beam.utils.timestamp import Duration, Timestamp
+from apache_beam.utils.windowed_value import PaneInfoTiming
+
+logger = logging.getLogger(__name__)
+
+PATTERN_NAME = 'divergence_then_volume_spike'
+END_OF_SOURCE = sys.maxsize
+
+
+@dataclass
+class CEPConfig:
+    window_size: float = 30.0  # seconds
+    window_period: float = 10.0  # seconds; also the volume bucket width
+    allowed_lateness: float = 60.0  # seconds
+    divergence_bps: float = 20.0
+    volume_spike_multiple: float = 3.0
+    match_within: float = 30.0  # seconds from divergence to spike
+    max_out_of_orderness: float = 5.0  # seconds the source watermark trails event time
+
+
+# ============ SOURCES ============
+
+def parse_event(raw) -> Optional[Dict]:
+    """Decode one JSON event; returns None if it has no usable timestamp or symbol"""
+    try:
+        event = json.loads(raw) if isinstance(raw, (str, bytes)) else dict(raw)
+        event['timestamp'] = int(event['timestamp'])
+        if not event.get('symbol'):
+            return None
+        return event
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+class EventReader:
+    """
+    Replayable log of events addressed by increasing integer positions.
+    read() returns up to `limit` (position, raw_event) pairs at or after
+    `position`; reading resumes from the last returned position + 1.
+    """
+
+    def start_position(self) -> int:
+        return 0
+
+    def read(self, position: int, limit: int) -> List[Tuple[int, object]]:
+        raise NotImplementedError
+
+
+class FileTailReader(EventReader):
+    """JSON-lines file that another process appends to; a line's position is its final byte"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self, position, limit):
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(position)
+                offset = position
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # Partial line still being written
+                    offset += len(line)
+                    if line.strip():
+                        records.append((offset - 1, line))
+                    if len(records) >= limit:
+                        break
+        except FileNotFoundError:
+            pass
+        return records
+
+
+# Redis stream IDs are '<ms>-<seq>'; pack them into one increasing integer
+STREAM_SEQ_BITS = 20
+
+
+def stream_id_to_position(entry_id) -> int:
+    ms, seq = (entry_id.decode() if isinstance(entry_id, bytes) else entry_id).split('-')
+    return (int(ms) << STREAM_SEQ_BITS) | int(seq)
+
+
+def position_to_stream_id(position: int) -> str:
+    return f'{position >> STREAM_SEQ_BITS}-{position & ((1 << STREAM_SEQ_BITS) - 1)}'
+
+
+class RedisStreamReader(EventReader):
+    """Redis stream whose entries carry the JSON event in the 'event' field"""
+
+    def __init__(self, redis_url: str, stream: str, field: str = 'event'):
+        self.redis_url = redis_url
+        self.stream = stream
+        self.field = field
+        self._client = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_client'] = None
+        return state
+
+    def read(self, position, limit):
+        if self._client is None:
+            import redis
+            self._client = redis.from_url(self.redis_url)
+        # XREAD returns entries strictly after the given ID
+        last_id = position_to_stream_id(position - 1) if position > 0 else '0-0'
+        response = self._client.xread({self.stream: last_id}, count=limit)
+        records = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                raw = fields.get(self.field.encode(), fields.get(self.field))
+                records.append((stream_id_to_position(entry_id), raw))
+        return records
+
+
+class _ReaderRestrictionProvider(RestrictionProvider):
+    def initial_restriction(self, reader):
+        return OffsetRange(reader.start_position(), END_OF_SOURCE)
+
+    def create_tracker(self, restriction):
+        return OffsetRestrictionTracker(restriction)
+
+    def restriction_size(self, reader, restriction):
+        return 1
+
+
+def _read_events(reader, tracker, watermark_estimator, follow, poll_interval, batch_size, lag):
+    malformed = Metrics.counter('cep', 'malformed_events')
+    position = tracker.current_restriction().start
+    while True:
+        records = reader.read(position, batch_size)
+        for record_position, raw in records:
+            if not tracker.try_claim(record_position):
+                return
+            position = record_position + 1
+            event = parse_event(raw)
+            if event is None:
+                malformed.inc()
+                continue
+            event_time = Timestamp(micros=event['timestamp'] * 1000)
+            watermark = event_time - Duration(lag)
+            if watermark_estimator.current_watermark() is None or watermark > watermark_estimator.current_watermark():
+                watermark_estimator.set_watermark(watermark)
+            yield TimestampedValue(event, event_time)
+        if len(records) < batch_size:
+            break
+    if follow:
+        tracker.defer_remainder(Duration(poll_interval))
+    else:
+        tracker.try_claim(END_OF_SOURCE)  # Nothing more to read: mark the restriction done
+
+
+class _ReadEventsFn(beam.DoFn):
+    def __init__(self, poll_interval, batch_size, lag):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lag = lag
+
+    def process(self, reader,
+                tracker=beam.DoFn.RestrictionParam(_ReaderRestrictionProvider()),
+                watermark_estimator=beam.DoFn.WatermarkEstimatorParam(ManualWatermarkEstimator.default_provider())):
+        yield from _read_events(reader, tracker, watermark_estimator, False,
+                                self.poll_interval, self.batch_size, self.lag)
+
+
+class _TailEventsFn(_ReadEventsFn):
+    @beam.DoFn.unbounded_per_element()
+    def process(self, reader,
+                tracker=beam.DoFn.RestrictionParam(_ReaderRestrictionProvider()),
+                watermark_estimator=beam.DoFn.WatermarkEstimatorParam(ManualWatermarkEstimator.default_provider())):
+        yield from _read_events(reader, tracker, watermark_estimator, True,
+                                self.poll_interval, self.batch_size, self.lag)
+
+
+class ReadEvents(beam.PTransform):
+    """
+    Reads timestamped events from an EventReader. With follow=True the read
+    never ends and polls for new records every poll_interval seconds;
+    otherwise it stops at the current end of the log.
+    """
+
+    def __init__(self, reader: EventReader, follow: bool = True, poll_interval: float = 1.0,
+                 batch_size: int = 1000, max_out_of_orderness: float = 5.0):
+        super().__init__()
+        self.reader = reader
+        self.follow = follow
+        self.fn = (_TailEventsFn if follow else _ReadEventsFn)(poll_interval, batch_size, max_out_of_orderness)
+
+    def expand(self, pbegin):
+        return (pbegin
+                | 'Impulse' >> beam.Create([self.reader])
+                | 'Read' >> beam.ParDo(self.fn))
+
+
+# ============ STAGE 1: WINDOWED LEGS ============
+
+class WindowStatsFn(beam.CombineFn):
+    """Per-venue VWAP (quotes without volume weigh 1) and volume per period bucket"""
+
+    def __init__(self, period: float):
+        self.period = period
+
+    def create_accumulator(self):
+        return {'venues': {}, 'buckets': {}, 'count': 0}
+
+    def add_input(self, acc, event):
+        acc['count'] += 1
+        volume = float(event.get('volume') or 0.0)
+        if event.get('price') is not None and event.get('venue'):
+            weight = volume or 1.0
+            pv = acc['venues'].setdefault(event['venue'], [0.0, 0.0])
+            pv[0] += float(event['price']) * weight
+            pv[1] += weight
+        if volume:
+            bucket = math.floor(event['timestamp'] / 1000.0 / self.period) * self.period
+            acc['buckets'][bucket] = acc['buckets'].get(bucket, 0.0) + volume
+        return acc
+
+    def merge_accumulators(self, accumulators):
+        merged = self.create_accumulator()
+        for acc in accumulators:
+            merged['count'] += acc['count']
+            for venue, (pv, w) in acc['venues'].items():
+                total = merged['venues'].setdefault(venue, [0.0, 0.0])
+                total[0] += pv
+                total[1] += w
+            for bucket, volume in acc['buckets'].items():
+                merged['buckets'][bucket] = merged['buckets'].get(bucket, 0.0) + volume
+        return merged
+
+    def extract_output(self, acc):
+        return acc
+
+
+class DetectLegsFn(beam.DoFn):
+    """Turns one window's stats into divergence and spike legs stamped at the window end"""
+
+    def __init__(self, config: CEPConfig):
+        self.config = config
+        self.late_legs = Metrics.counter('cep', 'late_legs')
+
+    def process(self, element, window=beam.DoFn.WindowParam, pane=beam.DoFn.PaneInfoParam):
+        symbol, stats = element
+        cfg = self.config
+        end = window.max_timestamp()
+        late = pane.timing == PaneInfoTiming.LATE
+        legs = []
+
+        vwaps = {venue: pv / w for venue, (pv, w) in stats['venues'].items() if w > 0}
+        if len(vwaps) >= 2:
+            low, high = min(vwaps, key=vwaps.get), max(vwaps, key=vwaps.get)
+            bps = (vwaps[high] - vwaps[low]) / vwaps[low] * 1e4
+            if bps >= cfg.divergence_bps:
+                legs.append({'leg': 'divergence', 'bps': bps, 'buy_venue': low, 'sell_venue': high})
+
+        # Last period of the window against the mean of the earlier ones
+        last_start = float(window.end) - cfg.window_period
+        earlier = list(_bucket_starts(float(window.start), last_start, cfg.window_period))
+        if earlier:
+            last = stats['buckets'].get(_bucket_key(last_start, cfg.window_period), 0.0)
+            baseline = sum(stats['buckets'].get(_bucket_key(b, cfg.window_period), 0.0) for b in earlier) / len(earlier)
+            if baseline > 0 and last >= cfg.volume_spike_multiple * baseline:
+                legs.append({'leg': 'spike', 'volume': last, 'volume_ratio': last / baseline})
+
+        for leg in legs:
+            leg.update(symbol=symbol, timestamp=float(end), late=late)
+            if late:
+                self.late_legs.inc()
+            yield TimestampedValue((symbol, leg), end)
+
+
+def _bucket_key(start: float, period: float) -> float:
+    return math.floor(start / period + 1e-9) * period
+
+
+def _bucket_starts(start: float, stop: float, period: float) -> Iterable[float]:
+    t = start
+    while t < stop - 1e-9:
+        yield t
+        t += period
+
+
+# ============ STAGE 2: PATTERN MATCHING ============
+
+class MatchDivergenceThenSpikeFn(beam.DoFn):
+    """
+    Per-symbol matcher: a spike at most match_within seconds after a
+    divergence. Legs are consumed by a match, and anything at or before the
+    last matched spike is ignored so overlapping windows match only once.
+    """
+    DIVERGENCES = BagStateSpec('divergences', PickleCoder())
+    SPIKES = BagStateSpec('spikes', PickleCoder())
+    LAST_MATCH = ReadModifyWriteStateSpec('last_match', PickleCoder())
+    EXPIRY = TimerSpec('expiry', TimeDomain.WATERMARK)
+
+    def __init__(self, config: CEPConfig):
+        self.config = config
+        self.matches = Metrics.counter('cep', 'matches')
+        self.stale_legs = Metrics.counter('cep', 'stale_legs')
+        self.expired_legs = Metrics.counter('cep', 'expired_legs')
+
+    def process(self, element,
+                divergences=beam.DoFn.StateParam(DIVERGENCES),
+                spikes=beam.DoFn.StateParam(SPIKES),
+                last_match=beam.DoFn.StateParam(LAST_MATCH),
+                expiry=beam.DoFn.TimerParam(EXPIRY)):
+        _, leg = element
+        within = self.config.match_within
+        if leg['timestamp'] <= (last_match.read() or -math.inf):
+            self.stale_legs.inc()
+            return
+
+        pending_divergences = list(divergences.read())
+        pending_spikes = list(spikes.read())
+        match = None
+        if leg['leg'] == 'divergence':
+            candidates = [s for s in pending_spikes if 0 <= s['timestamp'] - leg['timestamp'] <= within]
+            if candidates:
+                match = (leg, min(candidates, key=lambda s: s['timestamp']))
+            else:
+                pending_divergences.append(leg)
+        else:
+            candidates = [d for d in pending_divergences if 0 <= leg['timestamp'] - d['timestamp'] <= within]
+            if candidates:
+                match = (min(candidates, key=lambda d: d['timestamp']), leg)
+            else:
+                pending_spikes.append(leg)
+
+        if match is not None:
+            divergence, spike = match
+            last_match.write(spike['timestamp'])
+            pending_divergences = [d for d in pending_divergences if d['timestamp'] > spike['timestamp']]
+            pending_spikes = [s for s in pending_spikes if s['timestamp'] > spike['timestamp']]
+            self.matches.inc()
+            yield self._match(divergence, spike)
+
+        self._store(divergences, pending_divergences, spikes, pending_spikes, expiry)
+
+    @on_timer(EXPIRY)
+    def expire(self,
+               fire_time=beam.DoFn.TimestampParam,
+               divergences=beam.DoFn.StateParam(DIVERGENCES),
+               spikes=beam.DoFn.StateParam(SPIKES),
+               expiry=beam.DoFn.TimerParam(EXPIRY)):
+        # Legs that arrive from now on are no older than the watermark minus the allowed lateness
+        horizon = float(fire_time) - self.config.allowed_lateness
+        all_divergences, all_spikes = list(divergences.read()), list(spikes.read())
+        pending_divergences = [d for d in all_divergences if d['timestamp'] + self.config.match_within >= horizon]
+        pending_spikes = [s for s in all_spikes if s['timestamp'] >= horizon]
+        self.expired_legs.inc(len(all_divergences) + len(all_spikes) - len(pending_divergences) - len(pending_spikes))
+        self._store(divergences, pending_divergences, spikes, pending_spikes, expiry)
+
+    def _store(self, divergences, pending_divergences, spikes, pending_spikes, expiry):
+        divergences.clear()
+        for d in pending_divergences:
+            divergences.add(d)
+        spikes.clear()
+        for s in pending_spikes:
+            spikes.add(s)
+        deadlines = ([d['timestamp'] + self.config.match_within for d in pending_divergences]
+                     + [s['timestamp'] for s in pending_spikes])
+        if deadlines:
+            expiry.set(min(deadlines) + self.config.allowed_lateness + 1e-6)
+        else:
+            expiry.clear()
+
+    @staticmethod
+    def _match(divergence, spike):
+        return {
+            'pattern': PATTERN_NAME,
+            'symbol': divergence['symbol'],
+            'divergence_at': divergence['timestamp'],
+            'spike_at': spike['timestamp'],
+            'lag_seconds': spike['timestamp'] - divergence['timestamp'],
+            'divergence_bps': divergence['bps'],
+            'buy_venue': divergence['buy_venue'],
+            'sell_venue': divergence['sell_venue'],
+            'volume': spike['volume'],
+            'volume_ratio': spike['volume_ratio'],
+            'late': divergence['late'] or spike['late']
+        }
+
+
+class DetectDivergenceThenSpike(beam.PTransform):
+    """Timestamped events in, pattern matches out"""
+
+    def __init__(self, config: CEPConfig = None):
+        super().__init__()
+        self.config = config or CEPConfig()
+
+    def expand(self, events):
+        cfg = self.config
+        return (events
+                | 'KeyBySymbol' >> beam.Map(lambda e: (e['symbol'], e))
+                | 'SlidingWindows' >> beam.WindowInto(
+                    SlidingWindows(cfg.window_size, cfg.window_period),
+                    trigger=AfterWatermark(late=AfterCount(1)),
+                    accumulation_mode=AccumulationMode.ACCUMULATING,
+                    allowed_lateness=Duration(cfg.allowed_lateness))
+                | 'WindowStats' >> beam.CombinePerKey(WindowStatsFn(cfg.window_period))
+                | 'DetectLegs' >> beam.ParDo(DetectLegsFn(cfg))
+                | 'GlobalWindow' >> beam.WindowInto(GlobalWindows())
+                | 'MatchPattern' >> beam.ParDo(MatchDivergenceThenSpikeFn(cfg)))
@@ -1,7 +1,5 @@
 import apache_beam as beam
-from apache_beam.options.pipeline_options import PipelineOptions
-import random
-import time
+from apache_beam.options.pipeline_options import PipelineOptions, StandardOptions
 import os
 import json
 from google.cloud import pubsub_v1
@@ -12,6 +10,8 @@ from google.cloud import secretmanager
 import psycopg2
 import redis
 
+from cep_pipeline import CEPConfig, DetectDivergenceThenSpike, FileTailReader, ReadEvents, RedisStreamReader
+
 # GCP Clients
 project_id = os.getenv('PROJECT_ID', 'alpha-orion')
 publisher = pubsub_v1.PublisherClient()
@@ -57,42 +57,43 @@ def get_system_mode():
     except Exception:
         return 'sim'
 
-def create_event():
-    mode = get_system_mode()
-
-    if mode == 'live':
-        # For live mode, use more conservative event patterns
-        event = {
-            'type': random.choice(['trade', 'order', 'price_update']),
-            'symbol': random.choice(['ETH', 'BTC', 'USDC']),
-            'volume': random.uniform(1000, 50000),  # More realistic volumes
-            'timestamp': int(time.time() * 1000)
-        }
-    else:
-        # For sim mode, use varied event patterns for testing
-        event = {
-            'type': random.choice(['trade', 'order', 'price_update', 'market_data']),
-            'symbol': random.choice(['ETH', 'BTC', 'USDC']),
-            'volume': random.uniform(100, 100000),
-            'timestamp': int(time.time() * 1000)
-        }
-
-    return event
+def get_cep_config():
+    config = CEPConfig(
+        window_size=float(os.getenv('CEP_WINDOW_SECONDS', '30')),
+        window_period=float(os.getenv('CEP_WINDOW_PERIOD_SECONDS', '10')),
+        allowed_lateness=float(os.getenv('CEP_ALLOWED_LATENESS_SECONDS', '60')),
+        divergence_bps=float(os.getenv('CEP_DIVERGENCE_BPS', '20')),
+        volume_spike_multiple=float(os.getenv('CEP_VOLUME_SPIKE_MULTIPLE', '3')),
+        match_within=float(os.getenv('CEP_MATCH_WITHIN_SECONDS', '30')),
+        max_out_of_orderness=float(os.getenv('CEP_MAX_OUT_OF_ORDERNESS_SECONDS', '5'))
+    )
+    if get_system_mode() == 'live':
+        # For live mode, only act on wider divergences
+        config.divergence_bps = max(config.divergence_bps, 50.0)
+    return config
 
-def filter_high_volume(event):
-    return event['volume'] > 50000
+def get_event_reader():
+    source = os.getenv('CEP_SOURCE', 'file')
+    if source == 'redis':
+        return RedisStreamReader(os.getenv('REDIS_URL'), os.getenv('CEP_REDIS_STREAM', 'market-events'))
+    return FileTailReader(os.getenv('CEP_SOURCE_PATH', '/data/market-events.jsonl'))
 
-def process_event(event):
-    print(f"High volume event: {event}")
-    return event
+def process_match(match):
+    print(f"CEP pattern matched: {json.dumps(match)}")
+    return match
 
 def run():
     options = PipelineOptions()
+    options.view_as(StandardOptions).streaming = True
+    config = get_cep_config()
     with beam.Pipeline(options=options) as p:
         (p
-         | 'CreateEvents' >> beam.Create([create_event() for _ in range(20)])
-         | 'FilterHighVolume' >> beam.Filter(filter_high_volume)
-         | 'ProcessEvent' >> beam.Map(process_event)
+         | 'ReadEvents' >> ReadEvents(
+             get_event_reader(),
+             poll_interval=float(os.getenv('CEP_POLL_INTERVAL_SECONDS', '1')),
+             max_out_of_orderness=config.max_out_of_orderness)
+         | 'DetectPatterns' >> DetectDivergenceThenSpike(config)
+         | 'ProcessMatch' >> beam.Map(process_match)
         )
 
 if __name__ == '__main__':
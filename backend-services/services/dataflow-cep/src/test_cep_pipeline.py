@@ -0,0 +1,180 @@
+import json
+
+# Add src to path to import the pipeline
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import apache_beam as beam
+from apache_beam.io.restriction_trackers import OffsetRange, OffsetRestrictionTracker
+from apache_beam.io.watermark_estimators import ManualWatermarkEstimator
+from apache_beam.options.pipeline_options import PipelineOptions, StandardOptions
+from apache_beam.runners.sdf_utils import RestrictionTrackerView, ThreadsafeRestrictionTracker
+from apache_beam.testing.test_pipeline import TestPipeline
+from apache_beam.testing.test_stream import TestStream
+from apache_beam.testing.util import assert_that, equal_to
+from apache_beam.transforms.window import TimestampedValue
+from apache_beam.utils.timestamp import Duration, Timestamp
+
+from cep_pipeline import (
+    END_OF_SOURCE, CEPConfig, DetectDivergenceThenSpike, FileTailReader, ReadEvents,
+    _read_events, position_to_stream_id, stream_id_to_position
+)
+
+CONFIG = CEPConfig(
+    window_size=30, window_period=10, allowed_lateness=60,
+    divergence_bps=50, volume_spike_multiple=3, match_within=25
+)
+
+
+def event(t, **fields):
+    fields.setdefault('symbol', 'ETH')
+    return TimestampedValue(dict(fields, timestamp=int(t * 1000)), t)
+
+
+def baseline_trades(until=130):
+    # 10 units traded on uniswap in every 10s period
+    return [event(t, venue='uniswap', price=2500.0, volume=10.0) for t in range(1, until, 10)]
+
+
+def divergence():
+    # Sushiswap quotes 80bps over uniswap at t=42-43
+    return [event(42, venue='uniswap', price=2500.0), event(43, venue='sushiswap', price=2520.0)]
+
+
+def spike(t=71):
+    return [event(t, venue='uniswap', price=2500.0, volume=100.0)]
+
+
+def summary(match):
+    return match['symbol'], round(match['divergence_at']), round(match['spike_at']), match['late']
+
+
+def check(stream, expected, project=summary):
+    options = PipelineOptions()
+    options.view_as(StandardOptions).streaming = True
+    with TestPipeline(options=options) as p:
+        matches = p | stream | DetectDivergenceThenSpike(CONFIG)
+        assert_that(matches | beam.Map(project), equal_to(expected))
+
+
+def test_divergence_followed_by_spike_matches_once():
+    # The divergence shows in windows ending 50, 60 and 70; the spike in the one ending 80
+    stream = (TestStream()
+              .add_elements(baseline_trades() + divergence() + spike())
+              .advance_watermark_to_infinity())
+    check(stream, [('ETH', 60, 80, False)])
+
+
+def test_spike_outside_the_match_window_is_ignored():
+    stream = (TestStream()
+              .add_elements(baseline_trades() + divergence() + spike(t=111))
+              .advance_watermark_to_infinity())
+    check(stream, [])
+
+
+def test_symbols_are_matched_independently():
+    btc = [event(t, symbol='BTC', venue='curve', price=60000.0, volume=1.0) for t in range(1, 130, 10)]
+    btc += [event(74, symbol='BTC', venue='curve', price=60000.0, volume=10.0)]  # Spike without divergence
+    stream = (TestStream()
+              .add_elements(baseline_trades() + btc)
+              .add_elements(divergence() + spike())
+              .advance_watermark_to_infinity())
+    check(stream, [('ETH', 60, 80, False)])
+
+
+def test_out_of_order_events_within_the_watermark_still_match():
+    # Spike first, then the earlier divergence, then the rest of the baseline
+    trades = baseline_trades()
+    stream = (TestStream()
+              .add_elements(spike() + trades[8:])
+              .advance_watermark_to(40)
+              .add_elements(list(reversed(divergence())) + trades[:8])
+              .advance_watermark_to_infinity())
+    check(stream, [('ETH', 60, 80, False)])
+
+
+def test_late_divergence_within_allowed_lateness_matches_in_a_late_pane():
+    stream = (TestStream()
+              .add_elements(baseline_trades() + spike())
+              .advance_watermark_to(100)  # Windows up to [70, 100) have fired; the spike leg is buffered
+              .add_elements(divergence())  # Late for windows ending 50-70, but within 60s lateness
+              .advance_watermark_to_infinity())
+    # Late panes arrive in any order, so whichever divergence window lands first is matched
+    check(stream, [('ETH', True, 80, True)],
+          project=lambda m: (m['symbol'], 50 <= round(m['divergence_at']) <= 70, round(m['spike_at']), m['late']))
+
+
+def test_events_past_allowed_lateness_are_dropped():
+    stream = (TestStream()
+              .add_elements(baseline_trades(until=300) + spike())
+              .advance_watermark_to(200)  # Windows ending 50-70 are gone, the spike leg has expired
+              .add_elements(divergence())
+              .advance_watermark_to_infinity())
+    check(stream, [])
+
+
+def test_file_tail_reader_stamps_event_time_and_skips_bad_lines(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    lines = [json.dumps({'symbol': 'ETH', 'price': 2500.0, 'timestamp': 1000 * t}) for t in (3, 1, 2)]
+    path.write_text('\n'.join(lines[:2]) + '\nnot json\n{"symbol": "ETH"}\n' + lines[2] + '\n' + lines[0][:10])
+
+    reader = FileTailReader(str(path))
+    records = reader.read(0, 100)
+    assert len(records) == 5  # The unterminated last line is not read yet
+    assert reader.read(records[1][0] + 1, 100) == records[2:]
+
+    with TestPipeline() as p:
+        stamped = (p
+                   | ReadEvents(reader, follow=False)
+                   | beam.Map(lambda e, ts=beam.DoFn.TimestampParam: (e['timestamp'], float(ts))))
+        assert_that(stamped, equal_to([(1000, 1.0), (2000, 2.0), (3000, 3.0)]))
+
+
+def tail_once(reader, start, watermark=None, batch_size=2):
+    """One _TailEventsFn invocation: read from `start` until caught up, then defer"""
+    tracker = ThreadsafeRestrictionTracker(OffsetRestrictionTracker(OffsetRange(start, END_OF_SOURCE)))
+    estimator = ManualWatermarkEstimator(watermark)
+    events = list(_read_events(reader, RestrictionTrackerView(tracker), estimator, True, 0.5, batch_size, 5.0))
+    tracker.check_done()  # Everything claimed was processed; the rest is in the residual
+    residual, delay = tracker.deferred_status()
+    assert Duration(0) < delay <= Duration(0.5)  # poll_interval, less the time since the deferral
+    assert residual.stop == END_OF_SOURCE
+    return [(e.value['price'], e.timestamp) for e in events], residual.start, estimator.current_watermark()
+
+
+def test_tailing_defers_at_the_end_and_resumes_after_a_partial_line(tmp_path):
+    path = tmp_path / 'events.jsonl'
+
+    def line(t, price):
+        return json.dumps({'symbol': 'ETH', 'price': price, 'timestamp': 1000 * t}) + '\n'
+
+    complete = line(10, 1.0) + line(11, 2.0) + line(12, 3.0)
+    partial = line(13, 4.0)
+    path.write_text(complete + partial[:15])
+    reader = FileTailReader(str(path))
+
+    # Three records over two batches, then a deferral at the start of the partial line
+    events, resume_at, watermark = tail_once(reader, 0)
+    assert events == [(1.0, Timestamp(10)), (2.0, Timestamp(11)), (3.0, Timestamp(12))]
+    assert resume_at == len(complete)
+    assert watermark == Timestamp(12) - Duration(5.0)
+
+    # Nothing new yet: no output, and the same position is deferred again
+    assert tail_once(reader, resume_at, watermark) == ([], resume_at, watermark)
+
+    # The writer finishes the line and appends an out-of-order event
+    with open(path, 'a') as f:
+        f.write(partial[15:] + line(11, 5.0))
+    events, resume_at, watermark = tail_once(reader, resume_at, watermark)
+    assert events == [(4.0, Timestamp(13)), (5.0, Timestamp(11))]
+    assert resume_at == path.stat().st_size
+    assert watermark == Timestamp(13) - Duration(5.0)  # Never moves backwards
+
+
+def test_redis_stream_ids_round_trip_through_positions():
+    ids = ['0-1', '1700000000000-0', '1700000000000-5', '1700000000001-0']
+    positions = [stream_id_to_position(i) for i in ids]
+    assert positions == sorted(positions)
+    assert [position_to_stream_id(p) for p in positions] == ids
+    assert stream_id_to_position(b'1700000000000-5') == positions[2]
@@ -0,0 +1,239 @@
+"""
+Unit Tests for the Financial Reconciliation service
+Runs against a local JSON-RPC stub replaying a recorded Multicall3 response and a fake database connection
+"""
+
+import pytest
+import pytest_asyncio
+import sys
+import os
+from decimal import Decimal
+from aiohttp import web
+from eth_abi import decode, encode
+from prometheus_client import REGISTRY
+from web3 import Web3
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from chain_state import ChainSnapshot
+from main import FinancialReconciliation, MULTICALL3_ADDRESS, DEFAULT_ASSETS
+
+CONTRACT = '0x00000000000000000000000000000000000000AA'
+SECOND_CONTRACT = '0x00000000000000000000000000000000000000bB'
+BLOCK = 19_000_000
+
+# aggregate3 return data for the five mainnet assets of CONTRACT: 1.5 ETH, 2 WETH,
+# 5000 USDC, a failed USDT call (success=false, empty returnData) and 0 DAI
+RECORDED_AGGREGATE3 = '0x' + ''.join([
+    '0000000000000000000000000000000000000000000000000000000000000020',
+    '0000000000000000000000000000000000000000000000000000000000000005',
+    '00000000000000000000000000000000000000000000000000000000000000a0',
+    '0000000000000000000000000000000000000000000000000000000000000120',
+    '00000000000000000000000000000000000000000000000000000000000001a0',
+    '0000000000000000000000000000000000000000000000000000000000000220',
+    '0000000000000000000000000000000000000000000000000000000000000280',
+    '0000000000000000000000000000000000000000000000000000000000000001',
+    '0000000000000000000000000000000000000000000000000000000000000040',
+    '0000000000000000000000000000000000000000000000000000000000000020',
+    '00000000000000000000000000000000000000000000000014d1120d7b160000',
+    '0000000000000000000000000000000000000000000000000000000000000001',
+    '0000000000000000000000000000000000000000000000000000000000000040',
+    '0000000000000000000000000000000000000000000000000000000000000020',
+    '0000000000000000000000000000000000000000000000001bc16d674ec80000',
+    '0000000000000000000000000000000000000000000000000000000000000001',
+    '0000000000000000000000000000000000000000000000000000000000000040',
+    '0000000000000000000000000000000000000000000000000000000000000020',
+    '000000000000000000000000000000000000000000000000000000012a05f200',
+    '0000000000000000000000000000000000000000000000000000000000000000',
+    '0000000000000000000000000000000000000000000000000000000000000040',
+    '0000000000000000000000000000000000000000000000000000000000000000',
+    '0000000000000000000000000000000000000000000000000000000000000001',
+    '0000000000000000000000000000000000000000000000000000000000000040',
+    '0000000000000000000000000000000000000000000000000000000000000020',
+    '0000000000000000000000000000000000000000000000000000000000000000',
+])
+
+
+class RpcStub:
+    """JSON-RPC node that answers eth_call with the recorded aggregate3 response, or reverts"""
+
+    def __init__(self):
+        self.calls = []
+        self.revert = False
+        self.result = RECORDED_AGGREGATE3
+
+    async def handle(self, request):
+        body = await request.json()
+        self.calls.append(body)
+        if self.revert:
+            return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'error': {'code': 3, 'message': 'execution reverted'}})
+        return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': self.result})
+
+
+class FakeConnection:
+    """Stands in for engine.connect(); execute() returns the rows the query would yield"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.queries.append((str(query), params))
+        return iter(self.rows)
+
+
+@pytest_asyncio.fixture
+async def rpc_stub():
+    stub = RpcStub()
+    app = web.Application()
+    app.router.add_post('/', stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    stub.url = f'http://127.0.0.1:{port}/'
+    yield stub
+    await runner.cleanup()
+
+
+@pytest_asyncio.fixture
+async def recon(rpc_stub, monkeypatch):
+    monkeypatch.setenv('ETHEREUM_RPC_URL', rpc_stub.url)
+    monkeypatch.setenv('FLASH_LOAN_ARBITRAGE_MAINNET', CONTRACT)
+    monkeypatch.setenv('DATABASE_URL', 'sqlite://')  # Replaced by a FakeConnection where a test reads it
+    recon = FinancialReconciliation()
+    yield recon
+    await recon.chain_state.close()
+    for metric in (recon.balance_discrepancy, recon.reconciliation_checks, recon.significant_discrepancies,
+                   recon.incomplete_balances):
+        REGISTRY.unregister(metric)
+
+
+def snapshot():
+    return ChainSnapshot(chain='mainnet', block_number=BLOCK)
+
+
+class TestMulticallBalances:
+
+    @pytest.mark.asyncio
+    async def test_aggregate3_calldata_has_one_subcall_per_asset(self, recon, rpc_stub):
+        await recon.get_onchain_balances(snapshot())
+
+        assert len(rpc_stub.calls) == 1
+        call = rpc_stub.calls[0]
+        assert call['method'] == 'eth_call'
+        tx, block_tag = call['params']
+        assert tx['to'] == MULTICALL3_ADDRESS
+        assert block_tag == hex(BLOCK)
+
+        data = Web3.to_bytes(hexstr=tx['data'])
+        assert data[:4].hex() == '82ad56cb'  # aggregate3((address,bool,bytes)[])
+        (subcalls,) = decode(['(address,bool,bytes)[]'], data[4:])
+
+        holder = bytes(12) + Web3.to_bytes(hexstr=CONTRACT)
+        tokens = [config['token'] for config in DEFAULT_ASSETS['mainnet'].values()]
+        assert [Web3.to_checksum_address(target) for target, _, _ in subcalls] == [
+            MULTICALL3_ADDRESS if token is None else token for token in tokens
+        ]
+        assert all(allow_failure for _, allow_failure, _ in subcalls)
+        assert [payload for _, _, payload in subcalls] == [
+            bytes.fromhex('4d2301cc') + holder if token is None else bytes.fromhex('70a08231') + holder
+            for token in tokens
+        ]
+
+    @pytest.mark.asyncio
+    async def test_recorded_response_is_decoded_and_failed_subcalls_skipped(self, recon):
+        balances = await recon.get_onchain_balances(snapshot())
+
+        # USDT reported success=false and is left out rather than read as zero
+        assert balances == {'ETH': 1.5, 'WETH': 2.0, 'USDC': 5000.0, 'DAI': 0.0}
+
+    @pytest.mark.asyncio
+    async def test_asset_with_a_failed_call_for_any_holder_is_skipped(self, recon, rpc_stub):
+        recon.contracts['Treasury'] = {'mainnet': SECOND_CONTRACT}
+        # Per holder: ETH, WETH, USDC, USDT, DAI; USDC fails for the second holder only
+        ok = lambda value: (True, value.to_bytes(32, 'big'))
+        rpc_stub.result = Web3.to_hex(encode(['(bool,bytes)[]'], [[
+            ok(10 ** 18), ok(2 * 10 ** 18), ok(5 * 10 ** 9), ok(7 * 10 ** 6), ok(0),
+            ok(10 ** 18), ok(0), (False, b''), ok(3 * 10 ** 6), ok(10 ** 18),
+        ]]))
+
+        balances = await recon.get_onchain_balances(snapshot())
+
+        assert balances == {'ETH': 2.0, 'WETH': 2.0, 'USDT': 10.0, 'DAI': 1.0}
+        assert REGISTRY.get_sample_value(
+            'financial_incomplete_balances_total', {'asset': 'USDC', 'chain': 'mainnet'}
+        ) == 1
+
+    @pytest.mark.asyncio
+    async def test_short_multicall_result_raises(self, recon, rpc_stub):
+        recon.contracts['Treasury'] = {'mainnet': SECOND_CONTRACT}
+        # Five results for ten calls
+        with pytest.raises(RuntimeError, match='returned 5 results for 10 calls'):
+            await recon.get_onchain_balances(snapshot())
+
+    @pytest.mark.asyncio
+    async def test_reverted_aggregate_raises_instead_of_reporting_zero(self, recon, rpc_stub):
+        # A sub-call sent with allowFailure=false reverts the whole aggregate3
+        rpc_stub.revert = True
+        with pytest.raises(RuntimeError, match='Multicall failed on mainnet'):
+            await recon.get_onchain_balances(snapshot())
+
+    @pytest.mark.asyncio
+    async def test_no_contracts_means_no_rpc(self, recon, rpc_stub):
+        recon.contracts['FlashLoanArbitrage']['mainnet'] = '0x0000000000000000000000000000000000000000'
+        assert await recon.get_onchain_balances(snapshot()) == {}
+        assert rpc_stub.calls == []
+
+
+class TestReconciliation:
+
+    @pytest.mark.asyncio
+    async def test_db_loader_reads_latest_row_per_asset_in_one_query(self, recon):
+        recon.engine = FakeConnection([('ETH', Decimal('1.0')), ('USDC', Decimal('3000.25'))])
+
+        assert recon.get_db_balances('mainnet') == {'ETH': 1.0, 'USDC': 3000.25}
+        assert len(recon.engine.queries) == 1
+        query, params = recon.engine.queries[0]
+        assert 'DISTINCT ON (asset, chain)' in query
+        assert 'ORDER BY asset, chain, timestamp DESC' in query
+        assert params == {'chain': 'mainnet'}
+
+    @pytest.mark.asyncio
+    async def test_discrepancies_are_diffed_and_graded(self, recon):
+        recon.engine = FakeConnection([
+            ('ETH', Decimal('1.0')), ('WETH', Decimal('2.0')), ('USDC', Decimal('3000')), ('DAI', Decimal('50')),
+        ])
+        await recon.reconcile_chain(snapshot())
+
+        results = {r['asset']: r for r in recon.latest_results['mainnet']}
+        assert set(results) == {'ETH', 'WETH', 'USDC', 'DAI'}  # The failed USDT call is not reconciled
+        assert all(r['block'] == BLOCK for r in results.values())
+
+        assert results['ETH']['discrepancy'] == pytest.approx(0.5)
+        assert results['ETH']['discrepancy_usd'] == pytest.approx(1000.0)
+        assert results['ETH']['severity'] == 'medium'  # Not above the $1000 threshold
+        assert results['WETH']['discrepancy'] == 0 and results['WETH']['severity'] is None
+        assert results['USDC']['discrepancy_usd'] == pytest.approx(2000.0)
+        assert results['USDC']['severity'] == 'high'
+        assert results['DAI']['discrepancy_usd'] == pytest.approx(50.0)
+        assert results['DAI']['severity'] is None
+
+        assert REGISTRY.get_sample_value('financial_balance_discrepancy_usd', {'asset': 'USDC', 'chain': 'mainnet'}) == 2000.0
+        assert REGISTRY.get_sample_value(
+            'financial_significant_discrepancies_total', {'asset': 'USDC', 'chain': 'mainnet', 'severity': 'high'}
+        ) == 1
+        assert REGISTRY.get_sample_value(
+            'financial_reconciliation_checks_total', {'asset': 'DAI', 'chain': 'mainnet'}
+        ) == 1
@@ -12,7 +12,9 @@ from web3 import Web3
 from prometheus_client import Counter, Gauge, Histogram, start_http_server
 import logging
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from chain_state import ChainSnapshot, ChainStateHub, ChainStateService
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(level)s - %(message)s')
@@ -20,9 +22,11 @@ logger = logging.getLogger(__name__)
 
 class SmartContractMonitor:
     def __init__(self):
-        # Web3 connections
-        self.w3_mainnet = Web3(Web3.HTTPProvider(os.getenv('ETHEREUM_RPC_URL', 'https://mainnet.infura.io/v3/YOUR_PROJECT_ID')))
-        self.w3_arbitrum = Web3(Web3.HTTPProvider(os.getenv('ARBITRUM_RPC_URL', 'https://arb1.arbitrum.io/rpc')))
+        # RPC endpoints
+        self.rpc_endpoints = {
+            'mainnet': os.getenv('ETHEREUM_RPC_URL', 'https://mainnet.infura.io/v3/YOUR_PROJECT_ID'),
+            'arbitrum': os.getenv('ARBITRUM_RPC_URL', 'https://arb1.arbitrum.io/rpc'),
+        }
 
         # Contract addresses to monitor
         self.contracts = {
@@ -63,91 +67,196 @@ class SmartContractMonitor:
             ['chain']
         )
 
-    async def get_contract_balance(self, w3: Web3, address: str, chain: str, contract_name: str):
-        """Get contract balance"""
-        try:
-            balance_wei = w3.eth.get_balance(address)
-            balance_eth = w3.from_wei(balance_wei, 'ether')
-            self.contract_balance.labels(contract=contract_name, chain=chain).set(float(balance_eth))
-            logger.info(f"{contract_name} on {chain} balance: {balance_eth} ETH")
-        except Exception as e:
-            logger.error(f"Error getting balance for {contract_name} on {chain}: {e}")
+        # Shared head tracker: balances for every configured contract arrive in one batch per block
+        self.chain_state = ChainStateHub(poll_interval=float(os.getenv('CHAIN_STATE_POLL_INTERVAL', '2')))
+        for chain, rpc_url in self.rpc_endpoints.items():
+            service = self.chain_state.add_chain(chain, rpc_url)
+            for addresses in self.contracts.values():
+                if addresses.get(chain, '0x0000000000000000000000000000000000000000') != '0x0000000000000000000000000000000000000000':
+                    service.watch_balance(addresses[chain])
+
+        # Event decoders dispatched by topic0; one eth_getLogs sweep covers every topic and contract
+        self.event_handlers = {
+            Web3.to_hex(Web3.keccak(text="OwnershipTransferred(address,address)")): self.handle_ownership_transferred,
+            Web3.to_hex(Web3.keccak(text="Paused(address)")): self.handle_paused,
+        }
+        self.max_log_range = int(os.getenv('MAX_LOG_BLOCK_RANGE', '2000'))
+        # 'matching': only transactions that emitted one of the dispatched events (few RPC calls)
+        # 'block': gas of every transaction touching a contract, from the receipts of each swept block
+        self.gas_receipts_mode = os.getenv('GAS_RECEIPTS_MODE', 'matching')
+        self.receipt_batch_size = int(os.getenv('RECEIPT_BATCH_SIZE', '20'))
+        self.last_checked_block: Dict[str, int] = {}
+
+    def contracts_on_chain(self, chain: str) -> Dict[str, str]:
+        """Map lowercase address -> contract name for every configured contract on a chain"""
+        return {
+            addresses[chain].lower(): contract_name
+            for contract_name, addresses in self.contracts.items()
+            if addresses.get(chain, '0x0000000000000000000000000000000000000000') != '0x0000000000000000000000000000000000000000'
+        }
+
+    @staticmethod
+    def topic_to_address(topic: str) -> str:
+        return Web3.to_checksum_address('0x' + topic[-40:])
+
+    async def get_contract_balance(self, snapshot: ChainSnapshot, address: str, chain: str, contract_name: str):
+        """Get contract balance from the current chain snapshot"""
+        balance_wei = snapshot.balance_of(address)
+        if balance_wei is None:
+            logger.error(f"No balance for {contract_name} on {chain} at block {snapshot.block_number}")
+            return
+        balance_eth = Web3.from_wei(balance_wei, 'ether')
+        self.contract_balance.labels(contract=contract_name, chain=chain).set(float(balance_eth))
+        logger.info(f"{contract_name} on {chain} balance: {balance_eth} ETH")
+
+    def handle_ownership_transferred(self, contract_name: str, chain: str, log: dict):
+        previous_owner = self.topic_to_address(log['topics'][1])
+        new_owner = self.topic_to_address(log['topics'][2])
+        self.contract_events.labels(contract=contract_name, chain=chain, event_type='ownership_transferred').inc()
+        self.unusual_activity.labels(contract=contract_name, chain=chain, activity_type='ownership_change').inc()
+        logger.warning(f"Ownership transferred for {contract_name} on {chain}: {previous_owner} -> {new_owner} (tx {log['transactionHash']})")
+
+    def handle_paused(self, contract_name: str, chain: str, log: dict):
+        account = self.topic_to_address(log['data'])
+        self.contract_events.labels(contract=contract_name, chain=chain, event_type='paused').inc()
+        self.unusual_activity.labels(contract=contract_name, chain=chain, activity_type='contract_paused').inc()
+        logger.warning(f"Contract paused for {contract_name} on {chain} by {account} (tx {log['transactionHash']})")
+
+    async def fetch_logs(self, service: ChainStateService, addresses: List[str], from_block: int, to_block: int) -> List[dict]:
+        """One eth_getLogs per block range for all addresses and an OR-list of topics"""
+        logs = []
+        topics = [list(self.event_handlers)]
+        for start in range(from_block, to_block + 1, self.max_log_range):
+            end = min(start + self.max_log_range - 1, to_block)
+            result = await service.rpc_call('eth_getLogs', [{
+                'fromBlock': hex(start),
+                'toBlock': hex(end),
+                'address': addresses,
+                'topics': topics,
+            }])
+            if result is None:
+                raise RuntimeError(f"eth_getLogs failed for blocks {start}-{end}")
+            logs.extend(result)
+        return logs
+
+    @staticmethod
+    def receipt_contract(receipt: dict, contracts: Dict[str, str]) -> Optional[str]:
+        """Name of the monitored contract a transaction touched: called, sent from, created or emitting a log"""
+        for key in ('to', 'from', 'contractAddress'):
+            contract_name = contracts.get((receipt.get(key) or '').lower())
+            if contract_name:
+                return contract_name
+        for log in receipt.get('logs') or []:
+            contract_name = contracts.get((log.get('address') or '').lower())
+            if contract_name:
+                return contract_name
+        return None
+
+    async def fetch_block_receipts(self, service: ChainStateService, contracts: Dict[str, str],
+                                   from_block: int, to_block: int) -> List[dict]:
+        """Receipts of every swept block, batched; nodes without eth_getBlockReceipts fall back to block bodies"""
+        receipts = []
+        blocks = list(range(from_block, to_block + 1))
+        for start in range(0, len(blocks), self.receipt_batch_size):
+            chunk = blocks[start:start + self.receipt_batch_size]
+            results = await service.rpc_batch([('eth_getBlockReceipts', [hex(block)]) for block in chunk])
+            missing = []
+            for block, block_receipts in zip(chunk, results):
+                if block_receipts is None:
+                    missing.append(block)
+                else:
+                    receipts.extend(block_receipts)
+            if missing:
+                receipts.extend(await self.fetch_receipts_from_bodies(service, contracts, missing))
+        return receipts
+
+    async def fetch_receipts_from_bodies(self, service: ChainStateService, contracts: Dict[str, str],
+                                         blocks: List[int]) -> List[dict]:
+        """Receipts of transactions sent to or from a contract, found through the blocks' transaction lists"""
+        bodies = await service.rpc_batch([('eth_getBlockByNumber', [hex(block), True]) for block in blocks])
+        tx_hashes = []
+        for block, body in zip(blocks, bodies):
+            if body is None:
+                raise RuntimeError(f"No receipts or body for block {block}")
+            tx_hashes.extend(
+                tx['hash'] for tx in body.get('transactions', [])
+                if (tx.get('to') or '').lower() in contracts or (tx.get('from') or '').lower() in contracts
+            )
+        return await self.fetch_transaction_receipts(service, tx_hashes)
+
+    async def fetch_transaction_receipts(self, service: ChainStateService, tx_hashes: List[str]) -> List[dict]:
+        if not tx_hashes:
+            return []
+        receipts = await service.rpc_batch([('eth_getTransactionReceipt', [tx_hash]) for tx_hash in tx_hashes])
+        return [receipt for receipt in receipts if receipt]
+
+    async def monitor_events(self, snapshot: ChainSnapshot):
+        """Sweep every monitored contract on a chain for events since the last checked block"""
+        chain = snapshot.chain
+        contracts = self.contracts_on_chain(chain)
+        if not contracts:
+            return
+
+        latest_block = snapshot.block_number
+        # Resume right after the last sweep however far behind it is; fetch_logs
+        # splits the range into MAX_LOG_BLOCK_RANGE chunks
+        from_block = self.last_checked_block.get(chain, latest_block - 100) + 1
+        if from_block > latest_block:
+            return
 
-    async def monitor_events(self, w3: Web3, address: str, chain: str, contract_name: str):
-        """Monitor contract events"""
         try:
-            # Get latest block
-            latest_block = w3.eth.block_number
-            last_checked = int(self.last_block_checked.labels(chain=chain)._value or (latest_block - 100))
-
-            # Check for events in recent blocks
-            from_block = max(last_checked, latest_block - 100)
-
-            # Monitor OwnershipTransferred events
-            ownership_filter = w3.eth.filter({
-                'address': address,
-                'fromBlock': from_block,
-                'topics': [w3.keccak(text="OwnershipTransferred(address,address)").hex()]
-            })
-
-            ownership_events = ownership_filter.get_all_entries()
-            if ownership_events:
-                self.contract_events.labels(contract=contract_name, chain=chain, event_type='ownership_transferred').inc(len(ownership_events))
-                self.unusual_activity.labels(contract=contract_name, chain=chain, activity_type='ownership_change').inc(len(ownership_events))
-                logger.warning(f"Ownership transferred for {contract_name} on {chain}: {len(ownership_events)} events")
-
-            # Monitor Paused events
-            paused_filter = w3.eth.filter({
-                'address': address,
-                'fromBlock': from_block,
-                'topics': [w3.keccak(text="Paused(address)").hex()]
-            })
-
-            paused_events = paused_filter.get_all_entries()
-            if paused_events:
-                self.contract_events.labels(contract=contract_name, chain=chain, event_type='paused').inc(len(paused_events))
-                self.unusual_activity.labels(contract=contract_name, chain=chain, activity_type='contract_paused').inc(len(paused_events))
-                logger.warning(f"Contract paused for {contract_name} on {chain}: {len(paused_events)} events")
-
-            # Monitor large balance changes (by checking transactions to/from contract)
-            # This is simplified - in production, you'd want more sophisticated monitoring
-            block = w3.eth.get_block(latest_block, full_transactions=True)
-            for tx in block.transactions:
-                if tx['to'] == address or tx['from'] == address:
-                    gas_used = tx['gas']
-                    self.gas_usage.labels(contract=contract_name, chain=chain, method='unknown').observe(gas_used)
+            service = self.chain_state.get(chain)
+            logs = await self.fetch_logs(service, list(contracts), from_block, latest_block)
 
-            self.last_block_checked.labels(chain=chain).set(latest_block)
+            matched = []
+            tx_hashes = []
+            for log in logs:
+                contract_name = contracts.get(log['address'].lower())
+                handler = self.event_handlers.get(log['topics'][0]) if log.get('topics') else None
+                if contract_name is None or handler is None:
+                    continue
+                matched.append((handler, contract_name, log))
+                if log['transactionHash'] not in tx_hashes:
+                    tx_hashes.append(log['transactionHash'])
 
-        except Exception as e:
-            logger.error(f"Error monitoring events for {contract_name} on {chain}: {e}")
+            # Fetch receipts before counting anything, so a failed sweep is retried without double counting
+            if self.gas_receipts_mode == 'block':
+                receipts = await self.fetch_block_receipts(service, contracts, from_block, latest_block)
+            else:
+                receipts = await self.fetch_transaction_receipts(service, tx_hashes)
 
-    async def monitor_contract(self, w3: Web3, chain: str, contract_name: str):
-        """Monitor a specific contract"""
-        address = self.contracts[contract_name][chain]
-        if address == '0x0000000000000000000000000000000000000000':
-            return  # Skip if no address configured
+            for handler, contract_name, log in matched:
+                handler(contract_name, chain, log)
 
-        await self.get_contract_balance(w3, address, chain, contract_name)
-        await self.monitor_events(w3, address, chain, contract_name)
+            for receipt in receipts:
+                contract_name = self.receipt_contract(receipt, contracts)
+                if contract_name:
+                    self.gas_usage.labels(contract=contract_name, chain=chain, method='unknown').observe(int(receipt['gasUsed'], 16))
 
-    async def run_monitoring_loop(self):
-        """Main monitoring loop"""
-        logger.info("Starting smart contract monitoring...")
+            self.last_checked_block[chain] = latest_block
+            self.last_block_checked.labels(chain=chain).set(latest_block)
 
-        while True:
-            tasks = []
+        except Exception as e:
+            logger.error(f"Error monitoring events on {chain}: {e}")
 
-            # Monitor mainnet contracts
-            for contract_name in self.contracts:
-                tasks.append(self.monitor_contract(self.w3_mainnet, 'mainnet', contract_name))
+    async def handle_snapshot(self, snapshot: ChainSnapshot):
+        """Update every contract's balance on the snapshot's chain, then sweep their events once"""
+        for address, contract_name in self.contracts_on_chain(snapshot.chain).items():
+            await self.get_contract_balance(snapshot, address, snapshot.chain, contract_name)
+        await self.monitor_events(snapshot)
 
-            # Monitor arbitrum contracts
-            for contract_name in self.contracts:
-                tasks.append(self.monitor_contract(self.w3_arbitrum, 'arbitrum', contract_name))
+    async def run_monitoring_loop(self):
+        """Main monitoring loop, driven by new heads from the shared chain state"""
+        logger.info("Starting smart contract monitoring...")
 
-            await asyncio.gather(*tasks, return_exceptions=True)
-            await asyncio.sleep(60)  # Monitor every minute
+        self.chain_state.subscribe(
+            self.handle_snapshot,
+            min_interval=float(os.getenv('CONTRACT_MONITOR_INTERVAL', '60')),
+        )
+        try:
+            await self.chain_state.run()
+        finally:
+            await self.chain_state.close()
 
 async def main():
     monitor = SmartContractMonitor()
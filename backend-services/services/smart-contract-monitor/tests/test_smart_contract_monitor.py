@@ -0,0 +1,209 @@
+"""
+Unit Tests for the Smart Contract Monitor event sweep
+Runs against a local JSON-RPC stub to check log filtering, topic dispatch and gas accounting
+"""
+
+import pytest
+import pytest_asyncio
+import sys
+import os
+from aiohttp import web
+from prometheus_client import REGISTRY
+from web3 import Web3
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from chain_state import ChainSnapshot
+from main import SmartContractMonitor
+
+CONTRACT = '0x00000000000000000000000000000000000000aa'
+OTHER = '0x00000000000000000000000000000000000000bb'
+ROUTER = '0x00000000000000000000000000000000000000cc'
+OWNERSHIP = Web3.to_hex(Web3.keccak(text="OwnershipTransferred(address,address)"))
+PAUSED = Web3.to_hex(Web3.keccak(text="Paused(address)"))
+TRANSFER = Web3.to_hex(Web3.keccak(text="Transfer(address,address,uint256)"))
+OWNER_A = '0x' + '00' * 12 + '11' * 20
+OWNER_B = '0x' + '00' * 12 + '22' * 20
+
+
+def receipt(tx_hash, sender, to, gas_used, log_addresses=()):
+    return {
+        'transactionHash': tx_hash, 'from': sender, 'to': to, 'contractAddress': None,
+        'gasUsed': hex(gas_used), 'logs': [{'address': address} for address in log_addresses],
+    }
+
+
+class RpcStub:
+    """JSON-RPC node with a handful of transactions per block"""
+
+    def __init__(self):
+        self.requests = []
+        self.block_receipts = True
+        self.logs = [
+            {'address': CONTRACT, 'topics': [OWNERSHIP, OWNER_A, OWNER_B], 'data': '0x', 'transactionHash': '0x150a'},
+            {'address': OTHER, 'topics': [PAUSED], 'data': OWNER_A, 'transactionHash': '0x150b'},
+            {'address': CONTRACT, 'topics': [TRANSFER], 'data': '0x', 'transactionHash': '0x150c'},
+        ]
+
+    def receipts(self, block):
+        return [
+            receipt(f'{hex(block)}a', OWNER_A, CONTRACT, 21000 + block),   # Called the contract
+            receipt(f'{hex(block)}b', OWNER_A, OTHER, 50000),              # Unrelated
+            receipt(f'{hex(block)}c', OWNER_A, ROUTER, 90000, [CONTRACT]),  # Reached it through a router
+        ]
+
+    def answer(self, method, params):
+        if method == 'eth_getLogs':
+            start, end = int(params[0]['fromBlock'], 16), int(params[0]['toBlock'], 16)
+            return [log for log in self.logs if start <= int(log['transactionHash'][:-1], 16) <= end]
+        if method == 'eth_getBlockReceipts':
+            if not self.block_receipts:
+                raise KeyError(method)
+            return self.receipts(int(params[0], 16))
+        if method == 'eth_getBlockByNumber':
+            block = int(params[0], 16)
+            return {'transactions': [
+                {'hash': r['transactionHash'], 'from': r['from'], 'to': r['to']} for r in self.receipts(block)
+            ]}
+        if method == 'eth_getTransactionReceipt':
+            tx_hash = params[0]
+            block = int(tx_hash[:-1], 16)
+            return next(r for r in self.receipts(block) if r['transactionHash'] == tx_hash)
+        raise KeyError(method)
+
+    def reply(self, call):
+        try:
+            return {'jsonrpc': '2.0', 'id': call['id'], 'result': self.answer(call['method'], call['params'])}
+        except KeyError:
+            return {'jsonrpc': '2.0', 'id': call['id'], 'error': {'code': -32601, 'message': 'method not found'}}
+
+    async def handle(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        if isinstance(body, list):
+            return web.json_response([self.reply(call) for call in body])
+        return web.json_response(self.reply(body))
+
+    def calls(self, method):
+        calls = []
+        for body in self.requests:
+            calls.extend(call for call in (body if isinstance(body, list) else [body]) if call['method'] == method)
+        return calls
+
+
+@pytest_asyncio.fixture
+async def rpc_stub():
+    stub = RpcStub()
+    app = web.Application()
+    app.router.add_post('/', stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    stub.url = f'http://127.0.0.1:{port}/'
+    yield stub
+    await runner.cleanup()
+
+
+@pytest_asyncio.fixture
+async def monitor(rpc_stub, monkeypatch):
+    monkeypatch.setenv('ETHEREUM_RPC_URL', rpc_stub.url)
+    monkeypatch.setenv('FLASH_LOAN_ARBITRAGE_MAINNET', Web3.to_checksum_address(CONTRACT))
+    monkeypatch.setenv('MAX_LOG_BLOCK_RANGE', '40')
+    monkeypatch.setenv('RECEIPT_BATCH_SIZE', '25')
+    monitor = SmartContractMonitor()
+    yield monitor
+    await monitor.chain_state.close()
+    for metric in (monitor.contract_balance, monitor.contract_events, monitor.gas_usage,
+                   monitor.unusual_activity, monitor.last_block_checked):
+        REGISTRY.unregister(metric)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, dict(labels)) or 0
+
+
+async def sweep(monitor, block_number=0x150):
+    await monitor.monitor_events(ChainSnapshot(chain='mainnet', block_number=block_number))
+
+
+class TestSmartContractMonitor:
+
+    @pytest.mark.asyncio
+    async def test_get_logs_covers_the_range_with_one_filter(self, monitor, rpc_stub):
+        await sweep(monitor)
+
+        requests = rpc_stub.calls('eth_getLogs')
+        # Blocks 0xed-0x150 are 100 blocks, split into ranges of 40
+        assert [(r['params'][0]['fromBlock'], r['params'][0]['toBlock']) for r in requests] == [
+            (hex(0xed), hex(0x114)), (hex(0x115), hex(0x13c)), (hex(0x13d), hex(0x150)),
+        ]
+        for r in requests:
+            assert r['params'][0]['address'] == [CONTRACT]
+            assert r['params'][0]['topics'] == [[OWNERSHIP, PAUSED]]
+        assert monitor.last_checked_block['mainnet'] == 0x150
+        assert sample('smart_contract_last_block_checked', chain='mainnet') == 0x150
+
+        # The next sweep starts after the last checked block
+        rpc_stub.requests.clear()
+        await sweep(monitor, 0x152)
+        assert [(r['params'][0]['fromBlock'], r['params'][0]['toBlock']) for r in rpc_stub.calls('eth_getLogs')] == [
+            (hex(0x151), hex(0x152)),
+        ]
+
+        # However far behind it fell, in ranges of 40
+        rpc_stub.requests.clear()
+        await sweep(monitor, 0x200)
+        assert [(r['params'][0]['fromBlock'], r['params'][0]['toBlock']) for r in rpc_stub.calls('eth_getLogs')] == [
+            (hex(start), hex(min(start + 39, 0x200))) for start in range(0x153, 0x201, 40)
+        ]
+        assert monitor.last_checked_block['mainnet'] == 0x200
+
+    @pytest.mark.asyncio
+    async def test_logs_are_dispatched_by_topic0(self, monitor):
+        await sweep(monitor)
+
+        labels = {'contract': 'FlashLoanArbitrage', 'chain': 'mainnet'}
+        assert sample('smart_contract_events_total', event_type='ownership_transferred', **labels) == 1
+        assert sample('smart_contract_unusual_activity_total', activity_type='ownership_change', **labels) == 1
+        # Paused came from an unmonitored address and Transfer has no handler
+        assert sample('smart_contract_events_total', event_type='paused', **labels) == 0
+
+    @pytest.mark.asyncio
+    async def test_block_mode_observes_every_transaction_in_the_range(self, monitor, rpc_stub):
+        monitor.gas_receipts_mode = 'block'
+        await sweep(monitor)
+
+        # One receipts call per swept block, batched 25 at a time
+        calls = rpc_stub.calls('eth_getBlockReceipts')
+        assert sorted(int(c['params'][0], 16) for c in calls) == list(range(0xed, 0x151))
+        assert sum(isinstance(r, list) and r[0]['method'] == 'eth_getBlockReceipts' for r in rpc_stub.requests) == 4
+
+        # The direct call and the routed call in each of the 100 blocks
+        labels = {'contract': 'FlashLoanArbitrage', 'chain': 'mainnet', 'method': 'unknown'}
+        assert sample('smart_contract_gas_usage_count', **labels) == 2 * 100
+        expected = sum(21000 + block + 90000 for block in range(0xed, 0x151))
+        assert sample('smart_contract_gas_usage_sum', **labels) == expected
+
+    @pytest.mark.asyncio
+    async def test_block_mode_falls_back_to_block_bodies(self, monitor, rpc_stub):
+        monitor.gas_receipts_mode = 'block'
+        rpc_stub.block_receipts = False
+        await sweep(monitor, 0xf0)
+
+        assert rpc_stub.calls('eth_getBlockByNumber')
+        # Bodies only show top-level calls, so the routed transaction is missed
+        labels = {'contract': 'FlashLoanArbitrage', 'chain': 'mainnet', 'method': 'unknown'}
+        assert sample('smart_contract_gas_usage_count', **labels) == 100
+
+    @pytest.mark.asyncio
+    async def test_matching_mode_only_fetches_event_transactions(self, monitor, rpc_stub):
+        assert monitor.gas_receipts_mode == 'matching'  # The default
+        await sweep(monitor)
+
+        assert not rpc_stub.calls('eth_getBlockReceipts')
+        assert [c['params'][0] for c in rpc_stub.calls('eth_getTransactionReceipt')] == ['0x150a']
+        labels = {'contract': 'FlashLoanArbitrage', 'chain': 'mainnet', 'method': 'unknown'}
+        assert sample('smart_contract_gas_usage_sum', **labels) == 21000 + 0x150
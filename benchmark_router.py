@@ -0,0 +1,156 @@
+"""
+Alpha-Orion Multi-DEX Router Benchmark
+
+Serves the four quote venues from a local HTTP stub with lognormal latency,
+slow tails, errors and occasional hangs, then compares the quote latency
+distribution of the old sequential blocking fan-out with the concurrent,
+hedged MultiDexRouter.
+
+Usage:
+    python benchmark_router.py
+    python benchmark_router.py --requests 200 --tail-prob 0.1 --hang-prob 0.02
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+
+import requests
+from aiohttp import web
+
+from router import MultiDexRouter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+
+VENUES = {
+    # dex: (median latency s, output, response body shape)
+    'uniswap': (0.040, 2500.0, lambda out: {'quote': out}),
+    'curve': (0.060, 2501.0, lambda out: {'outputAmount': out}),
+    'balancer': (0.050, 2499.0, lambda out: {'quotedAmount': out}),
+    'paraswap': (0.080, 2502.0, lambda out: {'priceRoute': {'destAmount': out}}),
+}
+
+
+def start_stub(args):
+    """Run the stub venues on a background event loop; returns the base URL"""
+    rng = random.Random(args.seed)
+
+    async def handle(request):
+        median, out, body = VENUES[request.match_info['dex']]
+        delay = rng.lognormvariate(0, 0.3) * median
+        if rng.random() < args.tail_prob:
+            delay *= 10
+        if rng.random() < args.hang_prob:
+            delay = 3.0
+        await asyncio.sleep(delay)
+        if rng.random() < args.error_prob:
+            return web.json_response({'error': 'stub failure'}, status=502)
+        return web.json_response(body(out))
+
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    address = {}
+
+    async def serve():
+        app = web.Application()
+        app.router.add_route('*', '/{dex}/{tail:.*}', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        address['port'] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{address['port']}"
+
+
+def legacy_best_price(base, token_in, token_out, amount):
+    """The previous get_best_price: one blocking request per venue, in turn, 2s timeout each"""
+    quotes = []
+    calls = [
+        ('uniswap', lambda: requests.get(f'{base}/uniswap/quote', params={'tokenIn': token_in, 'tokenOut': token_out, 'amount': amount}, timeout=2), lambda d: d.get('quote', 0)),
+        ('curve', lambda: requests.get(f'{base}/curve/v1/markets/swap', params={'from': token_in, 'to': token_out, 'amount': amount}, timeout=2), lambda d: d.get('outputAmount', 0)),
+        ('balancer', lambda: requests.post(f'{base}/balancer/v1/swap', json={'tokenIn': token_in, 'tokenOut': token_out, 'amount': amount}, timeout=2), lambda d: d.get('quotedAmount', 0)),
+        ('paraswap', lambda: requests.get(f'{base}/paraswap/prices', params={'srcToken': token_in, 'destToken': token_out, 'amount': amount}, timeout=2), lambda d: d.get('priceRoute', {}).get('destAmount', 0)),
+    ]
+    for dex, call, parse in calls:
+        try:
+            resp = call()
+            if resp.status_code == 200:
+                quotes.append({'dex': dex, 'output_amount': parse(resp.json())})
+        except Exception:
+            pass
+    return max(quotes, key=lambda q: float(q['output_amount'])) if quotes else None
+
+
+async def run_router(base, count, args):
+    latencies, answered = [], 0
+    urls = {dex: f'{base}/{dex}/' for dex in VENUES}
+    async with MultiDexRouter(urls=urls, deadline=args.deadline, quorum=args.quorum) as router:
+        for i in range(count):
+            start = time.perf_counter()
+            result = await router.get_best_price('WETH', 'USDC', i)
+            latencies.append(time.perf_counter() - start)
+            answered += result is not None
+        return latencies, answered, router.stats
+
+
+def report(name, latencies, answered):
+    ms = sorted(x * 1000 for x in latencies)
+    pct = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))]
+    logging.info(
+        f"{name:>10}: {len(ms)} quotes, {answered} answered | p50 {pct(0.5):7.1f}ms p95 {pct(0.95):7.1f}ms "
+        f"p99 {pct(0.99):7.1f}ms max {ms[-1]:7.1f}ms mean {statistics.mean(ms):7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-DEX quote latency benchmark")
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--tail-prob', type=float, default=0.05, help="Chance a response is 10x slower")
+    parser.add_argument('--hang-prob', type=float, default=0.01, help="Chance a response takes 3s")
+    parser.add_argument('--error-prob', type=float, default=0.03)
+    parser.add_argument('--deadline', type=float, default=0.5)
+    parser.add_argument('--quorum', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    base = start_stub(args)
+    # Venue errors are expected here; keep the per-request warnings out of the report
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    legacy, answered = [], 0
+    for i in range(args.requests):
+        start = time.perf_counter()
+        answered += legacy_best_price(base, 'WETH', 'USDC', i) is not None
+        legacy.append(time.perf_counter() - start)
+    latencies, router_answered, stats = asyncio.run(run_router(base, args.requests, args))
+
+    logging.getLogger().setLevel(logging.INFO)
+    report('sequential', legacy, answered)
+    report('hedged', latencies, router_answered)
+    logging.info(f"router stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
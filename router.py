@@ -1,60 +1,341 @@
-import requests
+import asyncio
+import aiohttp
+import bisect
 import logging
+import math
 import os
+import time
+from collections import OrderedDict, deque
 # API Keys from environment variables
 PARASWAP_API_KEY = os.getenv("PARASWAP_API_KEY", "")
 UNISWAP_API_KEY = os.getenv("UNISWAP_API_KEY", "")
 CURVE_API_KEY = os.getenv("CURVE_API_KEY", "")
 BALANCER_API_KEY = os.getenv("BALANCER_API_KEY", "")
 
+BLOCK_TIME = 12.0  # seconds; quote cache lifetime when no block number is given
+QUOTE_CACHE_SIZE = 4096  # Most quotes kept; least recently used are evicted first
+LADDER_FRACTIONS = (0.125, 0.25, 0.5, 0.75, 1.0)  # Order-size fractions sampled for split routing
+AGGREGATORS = frozenset({'paraswap'})  # Already route over the other venues; kept out of split routing
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+
+class VenueLatency:
+    """
+    Rolling window of successful response times for one venue.
+    Its p95 is when a hedged duplicate request gets sent.
+    """
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        if not self.samples: return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def hedge_delay(self):
+        """p95 latency once enough samples are in, else None (no hedging while warming up)"""
+        if len(self.samples) < self.min_samples: return None
+        return self.percentile(0.95)
+
+
+class PriceCurve:
+    """
+    Output of one venue as a function of input size, for split routing.
+    Subclasses supply output(); marginal() and amount_at_price() fall back to a
+    numeric derivative and bisection, which holds for any concave curve.
+    """
+    capacity = math.inf  # Largest input the venue can absorb
+    scale = 1.0  # Typical input size, for step sizes and search brackets
+
+    def output(self, amount_in):
+        raise NotImplementedError
+
+    def marginal(self, amount_in):
+        h = max(amount_in, self.scale) * 1e-7
+        lo, hi = max(amount_in - h, 0.0), min(amount_in + h, self.capacity)
+        return (self.output(hi) - self.output(lo)) / (hi - lo)
+
+    def amount_at_price(self, price):
+        """Largest input whose marginal price is still >= price"""
+        if self.marginal(0.0) < price: return 0.0
+        hi = self.scale
+        while hi < self.capacity and self.marginal(hi) >= price:
+            hi *= 2
+        hi = min(hi, self.capacity)
+        if self.marginal(hi) >= price: return hi
+        lo = 0.0
+        for _ in range(60):
+            mid = (lo + hi) / 2
+            if self.marginal(mid) >= price: lo = mid
+            else: hi = mid
+        return lo
+
+
+class ConstantProductCurve(PriceCurve):
+    """Uniswap V2-style x*y=k pool, fee taken on the input"""
+    def __init__(self, reserve_in, reserve_out, fee=0.003):
+        self.reserve_in = float(reserve_in)
+        self.reserve_out = float(reserve_out)
+        self.gamma = 1.0 - fee
+        self.scale = self.reserve_in
+
+    def output(self, amount_in):
+        x = self.gamma * amount_in
+        return self.reserve_out * x / (self.reserve_in + x)
+
+    def marginal(self, amount_in):
+        return self.gamma * self.reserve_in * self.reserve_out / (self.reserve_in + self.gamma * amount_in) ** 2
+
+    def amount_at_price(self, price):
+        if price <= 0: return math.inf
+        x = (math.sqrt(self.gamma * self.reserve_in * self.reserve_out / price) - self.reserve_in) / self.gamma
+        return max(x, 0.0)
+
+
+class StableSwapCurve(PriceCurve):
+    """
+    Curve StableSwap pool (balances already in common precision), swapping
+    coin i for coin j. amp is the pool's A; the fee is taken on the output.
+    """
+    def __init__(self, balances, amp, i=0, j=1, fee=0.0004):
+        self.balances = [float(b) for b in balances]
+        self.amp = float(amp)
+        self.i, self.j = i, j
+        self.fee = fee
+        self.scale = self.balances[i]
+        self.D = self._get_D(self.balances)
+
+    def _get_D(self, xp):
+        n = len(xp)
+        S = sum(xp)
+        D, Ann = S, self.amp * n
+        for _ in range(255):
+            D_P = D
+            for x in xp:
+                D_P = D_P * D / (x * n)
+            D_prev = D
+            D = (Ann * S + D_P * n) * D / ((Ann - 1) * D + (n + 1) * D_P)
+            if abs(D - D_prev) <= 1e-13 * D: break
+        return D
+
+    def _get_y(self, x_i):
+        n, D = len(self.balances), self.D
+        Ann = self.amp * n
+        c, S_ = D, 0.0
+        for k, balance in enumerate(self.balances):
+            if k == self.j: continue
+            _x = x_i if k == self.i else balance
+            S_ += _x
+            c = c * D / (_x * n)
+        c = c * D / (Ann * n)
+        b = S_ + D / Ann
+        y = D
+        for _ in range(255):
+            y_prev = y
+            y = (y * y + c) / (2 * y + b - D)
+            if abs(y - y_prev) <= 1e-13 * y: break
+        return y
+
+    def output(self, amount_in):
+        if amount_in <= 0: return 0.0
+        dy = self.balances[self.j] - self._get_y(self.balances[self.i] + amount_in)
+        return max(dy, 0.0) * (1 - self.fee)
+
+
+class QuoteLadderCurve(PriceCurve):
+    """
+    Piecewise-linear curve through sampled (amount_in, amount_out) quotes.
+    Uses the upper concave hull so marginal prices never increase with size;
+    inputs beyond the largest sample are not routed to the venue.
+    """
+    def __init__(self, points):
+        hull = []
+        for x, y in sorted([(0.0, 0.0)] + [(float(x), float(y)) for x, y in points if x > 0]):
+            if hull and x == hull[-1][0]:
+                if y <= hull[-1][1]: continue
+                hull.pop()
+            while len(hull) >= 2 and (hull[-1][1] - hull[-2][1]) * (x - hull[-2][0]) <= (y - hull[-2][1]) * (hull[-1][0] - hull[-2][0]):
+                hull.pop()
+            hull.append((x, y))
+        self.points = hull
+        self.slopes = [(y1 - y0) / (x1 - x0) for (x0, y0), (x1, y1) in zip(hull, hull[1:])]
+        self.capacity = hull[-1][0]
+        self.scale = self.capacity or 1.0
+
+    def output(self, amount_in):
+        amount_in = min(max(amount_in, 0.0), self.capacity)
+        k = max(bisect.bisect_right([x for x, _ in self.points], amount_in) - 1, 0)
+        if k >= len(self.slopes): return self.points[-1][1]
+        return self.points[k][1] + self.slopes[k] * (amount_in - self.points[k][0])
+
+    def marginal(self, amount_in):
+        k = bisect.bisect_right([x for x, _ in self.points], amount_in) - 1
+        return self.slopes[k] if 0 <= k < len(self.slopes) else 0.0
+
+    def amount_at_price(self, price):
+        amount = 0.0
+        for (x, _), slope in zip(self.points[1:], self.slopes):
+            if slope < price: break
+            amount = x
+        return amount
+
+
+def optimize_split(curves, amount_in):
+    """
+    Split amount_in across venues to maximise total output by marginal-price
+    water-filling: bisect for the price level at which the venues' marginal
+    prices are equal and their allocations add up to the order size.
+    curves: {dex: PriceCurve}. Returns a route plan dict, or None if no venue pays.
+    """
+    curves = {dex: c for dex, c in curves.items() if c.capacity > 0 and c.marginal(0.0) > 0}
+    if not curves or amount_in <= 0: return None
+
+    if sum(c.capacity for c in curves.values()) <= amount_in:
+        alloc = {dex: c.capacity for dex, c in curves.items()}
+    else:
+        lo, hi = 0.0, max(c.marginal(0.0) for c in curves.values())
+        while hi - lo > 1e-12 * hi:
+            mid = (lo + hi) / 2
+            if sum(c.amount_at_price(mid) for c in curves.values()) >= amount_in: lo = mid
+            else: hi = mid
+        # Fill up to the upper level, then share the remainder among venues flat in between
+        alloc = {dex: c.amount_at_price(hi) for dex, c in curves.items()}
+        extra = {dex: c.amount_at_price(lo) - alloc[dex] for dex, c in curves.items()} if lo > 0 else {}
+        short, room = amount_in - sum(alloc.values()), sum(extra.values())
+        if short > 0 and room > 0:
+            for dex in alloc:
+                alloc[dex] += short * extra[dex] / room
+
+    legs = []
+    for dex, x in alloc.items():
+        if x <= 0: continue
+        curve = curves[dex]
+        out = curve.output(x)
+        legs.append({
+            'dex': dex,
+            'amount_in': x,
+            'expected_out': out,
+            'price': out / x,
+            'marginal_price': curve.marginal(x),
+            'slippage': 1 - out / x / curve.marginal(0.0)
+        })
+    legs.sort(key=lambda leg: leg['amount_in'], reverse=True)
+
+    filled = sum(leg['amount_in'] for leg in legs)
+    total_out = sum(leg['expected_out'] for leg in legs)
+    single = {dex: c.output(min(amount_in, c.capacity)) for dex, c in curves.items()}
+    best_single = max(single, key=single.get)
+    return {
+        'amount_in': filled,
+        'expected_out': total_out,
+        'unfilled': max(amount_in - filled, 0.0),
+        'legs': legs,
+        'slippage': 1 - total_out / filled / max(c.marginal(0.0) for c in curves.values()),
+        'single_venue': {'dex': best_single, 'expected_out': single[best_single]},
+        'improvement': total_out - single[best_single]
+    }
+
+
 class MultiDexRouter:
     """
     Multi-DEX Router to find the best price across Uniswap, Curve, Balancer, and ParaSwap.
     Ported from enterprise templates.
+
+    Venues are queried concurrently on one shared aiohttp session. Stragglers are
+    cancelled at the deadline, or shortly after a quorum of venues has answered.
+    A request still running past its venue's p95 latency gets a hedged duplicate
+    and the first response wins. Quotes are cached per venue for one block; entries
+    from earlier blocks are dropped once a newer block is quoted.
     """
-    def __init__(self):
+    def __init__(self, urls=None, deadline=1.5, quorum=3, quorum_grace=0.05, hedge=True,
+                 request_timeout=2.0, block_time=BLOCK_TIME, cache_size=QUOTE_CACHE_SIZE):
         self.dexes = {
             'uniswap': {'url': 'https://api.uniswap.org/v2/', 'method': 'uniswapV4'},
             'curve': {'url': 'https://api.curve.fi/', 'method': 'curveStable'},
             'balancer': {'url': 'https://api.balancer.fi/', 'method': 'balancerWeighted'},
             'paraswap': {'url': 'https://apiv5.paraswap.io/', 'method': 'paraswap'},
         }
+        for dex, url in (urls or {}).items():
+            self.dexes[dex]['url'] = url
+        self.deadline = deadline  # seconds for the whole fan-out
+        self.quorum = quorum  # answered venues after which stragglers only get quorum_grace
+        self.quorum_grace = quorum_grace
+        self.hedge = hedge
+        self.request_timeout = request_timeout
+        self.block_time = block_time
+        self.cache_size = cache_size
+        self.latency = {dex: VenueLatency() for dex in self.dexes}
+        self.stats = {'requests': 0, 'hedges': 0, 'hedge_wins': 0, 'cancelled': 0, 'cache_hits': 0}
+        self._cache = OrderedDict()  # (dex, token_in, token_out, amount) -> (block_number, fetched_at, quote)
+        self._cache_block = None  # Newest block number quoted
+        self._session = None
 
-    def get_best_price(self, token_in: str, token_out: str, amount: int):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=64, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get_best_price(self, token_in: str, token_out: str, amount: int, block_number: int = None):
         """
         Aggregates quotes from multiple sources and returns the best execution path.
         """
         quotes = []
-        
-        # 1. Uniswap
-        try:
-            q = self.get_uniswap_quote(token_in, token_out, amount)
-            if q: quotes.append(q)
-        except Exception as e:
-            logging.warning(f"Uniswap quote error: {e}")
+        tasks = {}
+        for dex, fetch in self._quoters().items():
+            cached = self._cached_quote(dex, token_in, token_out, amount, block_number)
+            if cached is not None:
+                quotes.append(cached)
+                continue
+            tasks[asyncio.ensure_future(fetch(token_in, token_out, amount))] = dex
 
-        # 2. Curve
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+        quorum_at = loop.time() if len(quotes) >= self.quorum else None
+        pending = set(tasks)
         try:
-            q = self.get_curve_quote(token_in, token_out, amount)
-            if q: quotes.append(q)
-        except Exception as e:
-            logging.warning(f"Curve quote error: {e}")
-
-        # 3. Balancer
-        try:
-            q = self.get_balancer_quote(token_in, token_out, amount)
-            if q: quotes.append(q)
-        except Exception as e:
-            logging.warning(f"Balancer quote error: {e}")
-
-        # 4. ParaSwap (Aggregator)
-        try:
-            q = self.get_paraswap_quote(token_in, token_out, amount)
-            if q: quotes.append(q)
-        except Exception as e:
-            logging.warning(f"ParaSwap quote error: {e}")
+            while pending:
+                cutoff = deadline_at if quorum_at is None else min(deadline_at, quorum_at + self.quorum_grace)
+                timeout = cutoff - loop.time()
+                if timeout <= 0: break
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    dex = tasks[task]
+                    try:
+                        q = task.result()
+                    except Exception as e:
+                        logging.warning(f"{dex} quote error: {e!r}")
+                        continue
+                    if q:
+                        quotes.append(q)
+                        self._store_quote(dex, token_in, token_out, amount, block_number, q)
+                if quorum_at is None and len(quotes) >= self.quorum:
+                    quorum_at = loop.time()
+        finally:
+            # Stragglers: cancel and let them unwind before the session is reused
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.stats['cancelled'] += len(pending)
+                await asyncio.gather(*pending, return_exceptions=True)
 
         if not quotes:
             logging.error("No valid quotes received.")
@@ -72,49 +353,168 @@ class MultiDexRouter:
             'savings': self.calculate_slippage_savings(quotes)
         }
 
-    def get_uniswap_quote(self, token_in, token_out, amount):
-        url = 'https://api.uniswap.org/v2/quote'
-        params = {'tokenIn': token_in, 'tokenOut': token_out, 'amount': amount, 'slippageTolerance': '0.5'}
-        try:
-            resp = requests.get(url, params=params, timeout=2)
-            if resp.status_code == 200:
-                data = resp.json()
-                return {'dex': 'uniswap', 'output_amount': data.get('quote', 0)}
-        except Exception: pass
-        return None
-
-    def get_curve_quote(self, token_in, token_out, amount):
-        url = 'https://api.curve.fi/v1/markets/swap'
-        params = {'from': token_in, 'to': token_out, 'amount': amount}
+    async def get_split_route(self, token_in: str, token_out: str, amount, curves=None,
+                              ladder=LADDER_FRACTIONS, block_number: int = None):
+        """
+        Splits the order across venues to maximise total output.
+        curves: optional {dex: PriceCurve} built from on-chain state (reserves,
+        StableSwap balances); otherwise each venue's curve is a ladder of quotes
+        sampled at fractions of the order size. Aggregators are not sampled.
+        """
+        if curves is None:
+            curves = await self.sample_quote_ladders(token_in, token_out, amount, ladder, block_number)
+        plan = optimize_split(curves, float(amount))
+        if plan is None:
+            logging.error("No venue can fill the order.")
+            return None
+
+        plan.update(token_in=token_in, token_out=token_out)
+        logging.info(
+            f"Split route: {len(plan['legs'])} legs -> {plan['expected_out']} "
+            f"(+{plan['improvement']} vs {plan['single_venue']['dex']} alone)"
+        )
+        return plan
+
+    async def sample_quote_ladders(self, token_in, token_out, amount, ladder=LADDER_FRACTIONS, block_number=None):
+        """Quotes every non-aggregator venue at each ladder fraction concurrently; returns {dex: QuoteLadderCurve}"""
+        tasks = {}
+        points = {}
+        for dex, fetch in self._quoters(aggregators=False).items():
+            for fraction in ladder:
+                size = int(amount * fraction) if isinstance(amount, int) else amount * fraction
+                if size <= 0: continue
+                cached = self._cached_quote(dex, token_in, token_out, size, block_number)
+                if cached is not None:
+                    points.setdefault(dex, []).append((size, float(cached['output_amount'])))
+                else:
+                    tasks[asyncio.ensure_future(fetch(token_in, token_out, size))] = (dex, size)
+
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline) if tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.stats['cancelled'] += len(pending)
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for task in done:
+            dex, size = tasks[task]
+            if task.exception() is not None:
+                logging.warning(f"{dex} ladder quote error: {task.exception()!r}")
+                continue
+            q = task.result()
+            if q:
+                self._store_quote(dex, token_in, token_out, size, block_number, q)
+                points.setdefault(dex, []).append((size, float(q['output_amount'])))
+        return {dex: QuoteLadderCurve(pts) for dex, pts in points.items()}
+
+    def _quoters(self, aggregators=True):
+        quoters = {
+            'uniswap': self.get_uniswap_quote,
+            'curve': self.get_curve_quote,
+            'balancer': self.get_balancer_quote,
+            'paraswap': self.get_paraswap_quote,  # Aggregator
+        }
+        if not aggregators:
+            # An aggregator quote already draws on the other venues' pools, so splitting
+            # across it and them would count the same liquidity twice
+            quoters = {dex: fetch for dex, fetch in quoters.items() if dex not in AGGREGATORS}
+        return quoters
+
+    def _cached_quote(self, dex, token_in, token_out, amount, block_number):
+        key = (dex, token_in, token_out, amount)
+        entry = self._cache.get(key)
+        if entry is None: return None
+        cached_block, fetched_at, quote = entry
+        if block_number is not None:
+            fresh = cached_block == block_number
+        else:
+            fresh = cached_block is None and time.monotonic() - fetched_at < self.block_time
+        if not fresh: return None
+        self._cache.move_to_end(key)
+        self.stats['cache_hits'] += 1
+        return quote
+
+    def _store_quote(self, dex, token_in, token_out, amount, block_number, quote):
+        if block_number is not None and (self._cache_block is None or block_number > self._cache_block):
+            # A newer block: quotes from earlier blocks and expired untagged quotes can no longer hit
+            self._cache_block = block_number
+            now = time.monotonic()
+            self._cache = OrderedDict(
+                (key, entry) for key, entry in self._cache.items()
+                if (entry[0] is None and now - entry[1] < self.block_time)
+                or (entry[0] is not None and entry[0] >= block_number)
+            )
+        key = (dex, token_in, token_out, amount)
+        self._cache[key] = (block_number, time.monotonic(), quote)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, dex, method, path, **kwargs):
+        """
+        One venue request, hedged: if no response by the venue's p95 latency a
+        duplicate is sent and whichever succeeds first is used.
+        Returns parsed JSON, or None on a non-200 response.
+        """
+        url = self.dexes[dex]['url'] + path
+        first = asyncio.ensure_future(self._request(dex, method, url, **kwargs))
+        attempts = [first]
         try:
-            resp = requests.get(url, params=params, timeout=2)
-            if resp.status_code == 200:
-                data = resp.json()
-                return {'dex': 'curve', 'output_amount': data.get('outputAmount', 0)}
-        except Exception: pass
-        return None
-
-    def get_balancer_quote(self, token_in, token_out, amount):
-        url = 'https://api.balancer.fi/v1/swap'
+            delay = self.latency[dex].hedge_delay() if self.hedge else None
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done:
+                    self.stats['hedges'] += 1
+                    attempts.append(asyncio.ensure_future(self._request(dex, method, url, **kwargs)))
+            pending, error = set(attempts), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    elif task.result() is not None:
+                        if task is not first: self.stats['hedge_wins'] += 1
+                        return task.result()
+            if error is not None: raise error
+            return None
+        finally:
+            for task in attempts:
+                task.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    async def _request(self, dex, method, url, **kwargs):
+        session = await self._get_session()
+        self.stats['requests'] += 1
+        start = time.monotonic()
+        async with session.request(method, url, **kwargs) as resp:
+            if resp.status != 200: return None
+            data = await resp.json(content_type=None)
+        self.latency[dex].observe(time.monotonic() - start)
+        return data
+
+    async def get_uniswap_quote(self, token_in, token_out, amount):
+        params = {'tokenIn': token_in, 'tokenOut': token_out, 'amount': str(amount), 'slippageTolerance': '0.5'}
+        data = await self._fetch('uniswap', 'GET', 'quote', params=params)
+        if data is None: return None
+        return {'dex': 'uniswap', 'output_amount': data.get('quote', 0)}
+
+    async def get_curve_quote(self, token_in, token_out, amount):
+        params = {'from': token_in, 'to': token_out, 'amount': str(amount)}
+        data = await self._fetch('curve', 'GET', 'v1/markets/swap', params=params)
+        if data is None: return None
+        return {'dex': 'curve', 'output_amount': data.get('outputAmount', 0)}
+
+    async def get_balancer_quote(self, token_in, token_out, amount):
         payload = {'tokenIn': token_in, 'tokenOut': token_out, 'amount': amount}
-        try:
-            resp = requests.post(url, json=payload, timeout=2)
-            if resp.status_code == 200:
-                data = resp.json()
-                return {'dex': 'balancer', 'output_amount': data.get('quotedAmount', 0)}
-        except Exception: pass
-        return None
-
-    def get_paraswap_quote(self, token_in, token_out, amount):
-        url = 'https://apiv5.paraswap.io/prices'
-        params = {'srcToken': token_in, 'destToken': token_out, 'amount': amount, 'side': 'SELL', 'network': 1}
-        try:
-            resp = requests.get(url, params=params, timeout=2)
-            if resp.status_code == 200:
-                data = resp.json()
-                return {'dex': 'paraswap', 'output_amount': data.get('priceRoute', {}).get('destAmount', 0)}
-        except Exception: pass
-        return None
+        data = await self._fetch('balancer', 'POST', 'v1/swap', json=payload)
+        if data is None: return None
+        return {'dex': 'balancer', 'output_amount': data.get('quotedAmount', 0)}
+
+    async def get_paraswap_quote(self, token_in, token_out, amount):
+        params = {'srcToken': token_in, 'destToken': token_out, 'amount': str(amount), 'side': 'SELL', 'network': '1'}
+        data = await self._fetch('paraswap', 'GET', 'prices', params=params)
+        if data is None: return None
+        return {'dex': 'paraswap', 'output_amount': data.get('priceRoute', {}).get('destAmount', 0)}
 
     def calculate_slippage_savings(self, quotes):
         if len(quotes) < 2: return 0
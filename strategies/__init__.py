@@ -26,7 +26,11 @@ from .orchestrator import (
     PathOptimizationArbitrage,
     CrossAssetArbitrage,
     StrategyOrchestrator,
-    StrategyAPI
+    StrategyAPI,
+    ScanRuntime,
+    ScanReport,
+    CircuitBreaker,
+    LatencyHistogram
 )
 
 # Advanced strategy imports from brain-ai-optimization-orchestrator
@@ -224,6 +228,10 @@ __all__ = [
     'CrossAssetArbitrage',
     'StrategyOrchestrator',
     'StrategyAPI',
+    'ScanRuntime',
+    'ScanReport',
+    'CircuitBreaker',
+    'LatencyHistogram',
     'STRATEGY_REGISTRY',
     'BASIC_STRATEGIES',
     'ENTERPRISE_STRATEGIES',
@@ -0,0 +1,139 @@
+"""
+Alpha-Orion Strategy Scan Benchmark
+
+Runs scan cycles over the 10 production strategies with some replaced by
+artificial slow, hanging and failing scanners, and compares the sequential
+scan the orchestrator used before with the deadline-bounded concurrent
+runtime. Reports cycle time, timeouts and circuit breaker demotions.
+
+Usage:
+    python benchmark_scan.py
+    python benchmark_scan.py --cycles 20 --deadline-ms 200 --slow-ms 150
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+
+from orchestrator import BaseStrategy, ScanRuntime, StrategyOrchestrator
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+logging.getLogger('orchestrator').setLevel(logging.CRITICAL)
+
+
+class ArtificialStrategy(BaseStrategy):
+    """Scanner that sleeps for a random latency and optionally fails"""
+
+    def __init__(self, name: str, latency_ms: float, jitter_ms: float = 0.0, fail: bool = False):
+        super().__init__({}, name)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail = fail
+
+    async def scan_opportunities(self):
+        await asyncio.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000)
+        if self.fail:
+            raise ConnectionError(f"{self.name} upstream unavailable")
+        return [{"strategy": self.name, "profit": 0.004, "slippage": 0.0005}]
+
+    async def execute(self, opportunity):
+        return {"status": "success", "profit": opportunity["profit"]}
+
+
+def build_orchestrator(args) -> StrategyOrchestrator:
+    orchestrator = StrategyOrchestrator()
+    names = list(orchestrator.strategies)
+    for i, name in enumerate(names):
+        orchestrator.strategies[name] = ArtificialStrategy(name, args.fast_ms, jitter_ms=args.fast_ms)
+    orchestrator.strategies[names[0]] = ArtificialStrategy(names[0], args.slow_ms, jitter_ms=args.slow_ms)
+    orchestrator.strategies[names[1]] = ArtificialStrategy(names[1], args.hang_ms)
+    orchestrator.strategies[names[2]] = ArtificialStrategy(names[2], args.fast_ms, fail=True)
+    orchestrator.scan_runtime = ScanRuntime(args.deadline_ms, failure_threshold=3, cooldown=args.cooldown)
+    return orchestrator
+
+
+async def run_sequential(orchestrator, cycles):
+    times = []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        for strategy in orchestrator.strategies.values():
+            try:
+                await strategy.scan_opportunities()
+            except Exception:
+                pass
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+async def run_concurrent(orchestrator, cycles, interval_ms):
+    times, reports = [], []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        await orchestrator.scan_all_opportunities()
+        times.append((time.perf_counter() - start) * 1000)
+        reports.append(orchestrator.last_scan)
+        await asyncio.sleep(interval_ms / 1000)
+    return times, reports
+
+
+def summarize(name, times):
+    logging.info(
+        f"{name:>10}: cycle mean {statistics.mean(times):8.1f}ms "
+        f"p50 {statistics.median(times):8.1f}ms max {max(times):8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strategy scan cycle benchmark")
+    parser.add_argument('--cycles', type=int, default=12)
+    parser.add_argument('--deadline-ms', type=float, default=250)
+    parser.add_argument('--fast-ms', type=float, default=20, help="Typical strategy latency")
+    parser.add_argument('--slow-ms', type=float, default=200, help="Slow strategy base latency (plus jitter)")
+    parser.add_argument('--hang-ms', type=float, default=2000, help="Strategy that never meets the deadline")
+    parser.add_argument('--interval-ms', type=float, default=100, help="Pause between concurrent cycles")
+    parser.add_argument('--cooldown', type=float, default=0.5, help="Breaker cooldown in seconds")
+    parser.add_argument('--sequential-cycles', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    orchestrator = build_orchestrator(args)
+    logging.info(f"Deadline {args.deadline_ms:.0f}ms over {len(orchestrator.strategies)} strategies")
+
+    if args.sequential_cycles:
+        summarize('sequential', asyncio.run(run_sequential(orchestrator, args.sequential_cycles)))
+
+    times, reports = asyncio.run(run_concurrent(orchestrator, args.cycles, args.interval_ms))
+    summarize('concurrent', times)
+
+    for cycle, report in enumerate(reports):
+        logging.info(
+            f"cycle {cycle:>2}: {report.cycle_ms:6.1f}ms completed {len(report.completed):>2} "
+            f"timed out {report.timed_out or '-'} failed {list(report.failed) or '-'} "
+            f"skipped {report.skipped or '-'}"
+        )
+
+    for name, stats in orchestrator.scan_runtime.stats.items():
+        snapshot = stats.snapshot()
+        logging.info(
+            f"{name:>28}: {snapshot['breaker']:>9} trips {snapshot['trips']} "
+            f"scans {snapshot['latency']['count']:>2} p50 <={snapshot['latency']['p50_ms']:g}ms "
+            f"p99 <={snapshot['latency']['p99_ms']:g}ms timeouts {snapshot['timeouts']['count']} "
+            f"errors {snapshot['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
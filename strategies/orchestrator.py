@@ -5,8 +5,12 @@ Manages all 10 arbitrage strategies for production deployment
 
 import os
 import yaml
+import time
+import bisect
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 from abc import ABC, abstractmethod
 
@@ -28,6 +32,7 @@ class BaseStrategy(ABC):
         self.min_profit_threshold = config.get('min_profit_threshold', 0.001)
         self.max_slippage = config.get('max_slippage', 0.001)
         self.execution_timeout = config.get('execution_timeout', 5000)
+        self.scan_timeout = config.get('scan_timeout')  # ms; None uses the orchestrator's scan deadline
         self.logger = logging.getLogger(f"{__name__}.{name}")
     
     @abstractmethod
@@ -225,6 +230,222 @@ class CrossAssetArbitrage(BaseStrategy):
         return {"status": "success", "profit": 0}
 
 
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds (Prometheus-style cumulative buckets)"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total_ms = 0.0
+    
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+    
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= q * self.count:
+                return bound
+        return float('inf')
+    
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, seen = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            cumulative[str(bound)] = seen
+        cumulative['+Inf'] = self.count
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": cumulative
+        }
+
+
+class CircuitBreaker:
+    """
+    Demotes a strategy after consecutive failed or timed-out scans.
+    
+    An open breaker skips the strategy until its cooldown passes, then lets
+    one trial scan through (half-open). A success closes it again; another
+    failure reopens it with a doubled cooldown.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0, max_cooldown: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at: Optional[float] = None
+    
+    def allow(self) -> bool:
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+    
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+        elif self.failures < self.failure_threshold:
+            return
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+        self.trips += 1
+    
+    def reset(self):
+        self.record_success()
+        self.opened_at = None
+
+
+@dataclass
+class StrategyScanStats:
+    """Per-strategy scan metrics kept across cycles"""
+    latency: LatencyHistogram
+    timeouts: LatencyHistogram  # Elapsed time when late scans were cancelled
+    breaker: CircuitBreaker
+    errors: int = 0
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "trips": self.breaker.trips,
+            "errors": self.errors,
+            "latency": self.latency.snapshot(),
+            "timeouts": self.timeouts.snapshot()
+        }
+
+
+@dataclass
+class ScanReport:
+    """Outcome of one scan cycle; results holds [] for strategies without a result"""
+    results: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    completed: List[str] = field(default_factory=list)
+    timed_out: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    cycle_ms: float = 0.0
+
+
+class ScanRuntime:
+    """
+    Fans strategy scans out concurrently on the event loop under a deadline.
+    
+    Each strategy gets a budget (its scan_timeout, capped by the cycle
+    deadline). Scans still running when their budget expires are cancelled
+    and the cycle returns whatever finished. Timeouts and errors feed each
+    strategy's circuit breaker, and demoted strategies are skipped until
+    their cooldown passes. A scan that blocks the loop cannot be preempted,
+    so CPU-bound work belongs in asyncio.to_thread.
+    """
+    
+    def __init__(self, deadline_ms: float = 500, failure_threshold: int = 3, cooldown: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.deadline = deadline_ms / 1000
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.stats: Dict[str, StrategyScanStats] = {}
+    
+    def get_stats(self, name: str) -> StrategyScanStats:
+        if name not in self.stats:
+            self.stats[name] = StrategyScanStats(
+                latency=LatencyHistogram(),
+                timeouts=LatencyHistogram(),
+                breaker=CircuitBreaker(self.failure_threshold, self.cooldown, clock=self.clock)
+            )
+        return self.stats[name]
+    
+    async def scan(self, strategies: Dict[str, BaseStrategy]) -> ScanReport:
+        """Run one scan cycle over `strategies`"""
+        loop = asyncio.get_running_loop()
+        start = self.clock()
+        report = ScanReport()
+        budgets: Dict[asyncio.Task, Tuple[str, float]] = {}
+        finished_at: Dict[asyncio.Task, float] = {}
+        
+        def on_done(task: asyncio.Task):
+            finished_at[task] = self.clock()
+            if not task.cancelled():
+                task.exception()  # Late failures after cancellation are not "never retrieved"
+        
+        for name, strategy in strategies.items():
+            if not self.get_stats(name).breaker.allow():
+                report.skipped.append(name)
+                report.results[name] = []
+                continue
+            budget = self.deadline
+            if strategy.scan_timeout:
+                budget = min(strategy.scan_timeout / 1000, budget)
+            task = loop.create_task(strategy.scan_opportunities(), name=f"scan:{name}")
+            task.add_done_callback(on_done)
+            budgets[task] = (name, budget)
+        
+        pending = set(budgets)
+        while pending:
+            elapsed = self.clock() - start
+            for task in [t for t in pending if budgets[t][1] <= elapsed]:
+                pending.discard(task)
+                task.cancel()
+                name, budget = budgets[task]
+                stats = self.get_stats(name)
+                stats.timeouts.observe(elapsed * 1000)
+                stats.breaker.record_failure()
+                report.timed_out.append(name)
+                report.results[name] = []
+            if not pending:
+                break
+            
+            timeout = min(budgets[t][1] for t in pending) - elapsed
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name, _ = budgets[task]
+                stats = self.get_stats(name)
+                latency = (finished_at.get(task, self.clock()) - start) * 1000
+                stats.latency.observe(latency)
+                report.latency_ms[name] = latency
+                error = task.exception()
+                if error is None:
+                    stats.breaker.record_success()
+                    report.completed.append(name)
+                    report.results[name] = task.result()
+                else:
+                    stats.errors += 1
+                    stats.breaker.record_failure()
+                    report.failed[name] = str(error) or type(error).__name__
+                    report.results[name] = []
+        
+        report.cycle_ms = (self.clock() - start) * 1000
+        return report
+
+
 class StrategyOrchestrator:
     """Main orchestrator for managing all Alpha-Orion arbitrage strategies"""
     
@@ -248,6 +469,14 @@ class StrategyOrchestrator:
         if config_path:
             self.load_config(config_path)
         
+        scan_config = self.config.get('execution', {}).get('scan', {})
+        self.scan_runtime = ScanRuntime(
+            deadline_ms=scan_config.get('deadline_ms', 500),
+            failure_threshold=scan_config.get('failure_threshold', 3),
+            cooldown=scan_config.get('cooldown', 30)
+        )
+        self.last_scan: Optional[ScanReport] = None
+        
         self._initialize_strategies()
     
     def load_config(self, config_path: str):
@@ -266,20 +495,21 @@ class StrategyOrchestrator:
         logger.info(f"Initialized {len(self.strategies)} strategies")
     
     async def scan_all_opportunities(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Scan for opportunities across all strategies"""
-        results = {}
+        """Scan all enabled strategies concurrently; late, failing and demoted ones return []"""
+        enabled = {name: strategy for name, strategy in self.strategies.items() if strategy.enabled}
+        report = await self.scan_runtime.scan(enabled)
+        self.last_scan = report
         
-        for name, strategy in self.strategies.items():
-            if strategy.enabled:
-                try:
-                    opportunities = await strategy.scan_opportunities()
-                    results[name] = opportunities
-                    logger.info(f"Found {len(opportunities)} opportunities for {name}")
-                except Exception as e:
-                    logger.error(f"Error scanning {name}: {e}")
-                    results[name] = []
+        for name in report.completed:
+            logger.info(f"Found {len(report.results[name])} opportunities for {name}")
+        for name, error in report.failed.items():
+            logger.error(f"Error scanning {name}: {error}")
+        if report.timed_out:
+            logger.warning(f"Scan deadline cancelled: {', '.join(report.timed_out)}")
+        if report.skipped:
+            logger.warning(f"Circuit open, skipped: {', '.join(report.skipped)}")
         
-        return results
+        return report.results
     
     async def execute_opportunity(self, strategy_name: str, opportunity: Dict[str, Any]) -> Dict[str, Any]:
         """Execute an opportunity for a specific strategy"""
@@ -304,7 +534,8 @@ class StrategyOrchestrator:
             status[name] = {
                 "enabled": strategy.enabled,
                 "min_profit_threshold": strategy.min_profit_threshold,
-                "max_slippage": strategy.max_slippage
+                "max_slippage": strategy.max_slippage,
+                "scan": self.scan_runtime.get_stats(name).snapshot()
             }
         return status
     
@@ -312,6 +543,7 @@ class StrategyOrchestrator:
         """Enable a specific strategy"""
         if strategy_name in self.strategies:
             self.strategies[strategy_name].enabled = True
+            self.scan_runtime.get_stats(strategy_name).breaker.reset()  # Operator override of a demotion
             logger.info(f"Enabled strategy: {strategy_name}")
     
     def disable_strategy(self, strategy_name: str):
@@ -0,0 +1,203 @@
+"""
+Unit Tests for the strategy scan runtime
+Drives ScanRuntime and CircuitBreaker with a fake clock so deadlines and cooldowns are deterministic
+"""
+
+import pytest
+import sys
+import os
+import asyncio
+
+# Add strategies directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from orchestrator import BaseStrategy, CircuitBreaker, LatencyHistogram, ScanRuntime, StrategyOrchestrator
+
+
+class FakeClock:
+    """Monotonic clock that only moves when a test or a scripted scan advances it"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class ScriptedStrategy(BaseStrategy):
+    """
+    Scan that takes `duration` seconds of fake time.
+    A finishing scan advances the clock in its first step; a hanging one yields
+    first, so finished scans are timestamped before it moves the clock, then
+    never returns.
+    """
+
+    def __init__(self, clock, name, duration=0.0, result=None, error=None, hang=False, scan_timeout=None):
+        super().__init__({'scan_timeout': scan_timeout}, name)
+        self.clock = clock
+        self.duration = duration
+        self.result = result if result is not None else [{'profit': 0.01}]
+        self.error = error
+        self.hang = hang
+        self.scans = 0
+        self.cancelled = False
+
+    async def scan_opportunities(self):
+        self.scans += 1
+        if self.hang:
+            await asyncio.sleep(0)
+            self.clock.advance(self.duration)
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+        self.clock.advance(self.duration)
+        if self.error:
+            raise self.error
+        return self.result
+
+    async def execute(self, opportunity):
+        return {"status": "success", "profit": 0}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestScanRuntime:
+
+    @pytest.mark.asyncio
+    async def test_deadline_cancels_late_scan_and_returns_partial_results(self, clock):
+        runtime = ScanRuntime(deadline_ms=500, clock=clock)
+        fast = ScriptedStrategy(clock, 'fast', duration=0.1)
+        late = ScriptedStrategy(clock, 'late', duration=1.0, hang=True)
+
+        report = await runtime.scan({'fast': fast, 'late': late})
+
+        assert report.completed == ['fast'] and report.timed_out == ['late']
+        assert report.results == {'fast': [{'profit': 0.01}], 'late': []}
+        assert report.latency_ms == {'fast': pytest.approx(100)}
+        assert report.cycle_ms == pytest.approx(1100)
+        await asyncio.sleep(0)
+        assert late.cancelled
+
+        late_stats = runtime.get_stats('late')
+        assert late_stats.timeouts.count == 1 and late_stats.latency.count == 0
+        assert late_stats.breaker.failures == 1
+        assert runtime.get_stats('fast').latency.count == 1
+
+    @pytest.mark.asyncio
+    async def test_scan_timeout_caps_the_budget(self, clock):
+        runtime = ScanRuntime(deadline_ms=500, clock=clock)
+        capped = ScriptedStrategy(clock, 'capped', hang=True, scan_timeout=100)
+        slower = ScriptedStrategy(clock, 'slower', duration=0.3)
+
+        report = await runtime.scan({'capped': capped, 'slower': slower})
+
+        # 300ms is inside the cycle deadline but past capped's own 100ms budget
+        assert report.completed == ['slower']
+        assert report.timed_out == ['capped']
+
+    @pytest.mark.asyncio
+    async def test_scan_timeout_never_extends_the_deadline(self, clock):
+        runtime = ScanRuntime(deadline_ms=200, clock=clock)
+        strategy = ScriptedStrategy(clock, 'generous', duration=0.3, hang=True, scan_timeout=5000)
+
+        report = await runtime.scan({'generous': strategy})
+
+        assert report.timed_out == ['generous']
+
+    @pytest.mark.asyncio
+    async def test_errors_open_the_breaker_and_demoted_strategies_are_skipped(self, clock):
+        runtime = ScanRuntime(deadline_ms=500, failure_threshold=2, cooldown=10, clock=clock)
+        broken = ScriptedStrategy(clock, 'broken', error=RuntimeError('rpc down'))
+        healthy = ScriptedStrategy(clock, 'healthy')
+
+        for _ in range(2):
+            report = await runtime.scan({'broken': broken, 'healthy': healthy})
+            assert report.failed == {'broken': 'rpc down'}
+        assert runtime.get_stats('broken').breaker.state == CircuitBreaker.OPEN
+
+        report = await runtime.scan({'broken': broken, 'healthy': healthy})
+        assert report.skipped == ['broken'] and report.results['broken'] == []
+        assert report.completed == ['healthy']
+        assert broken.scans == 2
+
+        # After the cooldown one trial scan goes through
+        clock.advance(10)
+        broken.error = None
+        report = await runtime.scan({'broken': broken})
+        assert report.completed == ['broken']
+        assert runtime.get_stats('broken').breaker.state == CircuitBreaker.CLOSED
+        assert runtime.get_stats('broken').errors == 2
+
+
+class TestCircuitBreaker:
+
+    def test_closed_open_half_open_closed(self, clock):
+        breaker = CircuitBreaker(failure_threshold=3, cooldown=10, clock=clock)
+
+        for _ in range(2):
+            breaker.record_failure()
+            assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 1
+
+        clock.advance(9.9)
+        assert not breaker.allow()
+        clock.advance(0.1)
+        assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+    def test_half_open_failure_doubles_the_cooldown(self, clock):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=10, max_cooldown=35, clock=clock)
+        breaker.record_failure()
+
+        for expected in (20, 35, 35):
+            clock.advance(breaker.cooldown)
+            assert breaker.allow()
+            breaker.record_failure()  # The trial scan failed
+            assert breaker.state == CircuitBreaker.OPEN and breaker.cooldown == expected
+            clock.advance(expected - 0.1)
+            assert not breaker.allow()
+            clock.advance(0.1)
+
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.cooldown == 10 and breaker.trips == 4
+
+    def test_enable_strategy_resets_the_breaker(self, clock):
+        orchestrator = StrategyOrchestrator()
+        orchestrator.scan_runtime = ScanRuntime(failure_threshold=1, cooldown=30, clock=clock)
+        breaker = orchestrator.scan_runtime.get_stats('gamma_scalping').breaker
+        breaker.record_failure()
+        orchestrator.disable_strategy('gamma_scalping')
+        assert not breaker.allow()
+
+        orchestrator.enable_strategy('gamma_scalping')
+
+        assert orchestrator.strategies['gamma_scalping'].enabled
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+        assert breaker.failures == 0 and breaker.opened_at is None
+        assert orchestrator.get_strategy_status()['gamma_scalping']['scan']['breaker'] == CircuitBreaker.CLOSED
+
+
+class TestLatencyHistogram:
+
+    def test_quantiles_and_cumulative_buckets(self):
+        histogram = LatencyHistogram(buckets=(10, 100))
+        for value in (1, 5, 10, 50, 5000):
+            histogram.observe(value)
+
+        assert histogram.quantile(0.5) == 10
+        assert histogram.quantile(0.8) == 100
+        assert histogram.quantile(1.0) == float('inf')
+        assert histogram.snapshot()['buckets'] == {'10': 3, '100': 4, '+Inf': 5}
+        assert histogram.snapshot()['mean_ms'] == pytest.approx(5066 / 5)
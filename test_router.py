@@ -0,0 +1,260 @@
+import asyncio
+import math
+import time
+from collections import Counter, defaultdict, deque
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from router import (ConstantProductCurve, MultiDexRouter, QuoteLadderCurve, StableSwapCurve,
+                    optimize_split)
+
+OUTPUTS = {'uniswap': 2500.0, 'curve': 2501.0, 'balancer': 2499.0, 'paraswap': 2502.0}
+
+
+class StubVenues:
+    """Local HTTP stand-ins for the four venues; each request pops a scripted (delay, status) or uses the default"""
+
+    def __init__(self, delay=0.01):
+        self.default = {dex: (delay, 200) for dex in OUTPUTS}
+        self.script = defaultdict(deque)
+        self.calls = Counter()
+        self.server = None
+
+    async def handle(self, request):
+        dex = request.match_info['dex']
+        self.calls[dex] += 1
+        delay, status = self.script[dex].popleft() if self.script[dex] else self.default[dex]
+        await asyncio.sleep(delay)
+        if status != 200:
+            return web.json_response({'error': 'stub failure'}, status=status)
+        out = OUTPUTS[dex]
+        body = {
+            'uniswap': {'quote': out},
+            'curve': {'outputAmount': out},
+            'balancer': {'quotedAmount': out},
+            'paraswap': {'priceRoute': {'destAmount': out}},
+        }[dex]
+        return web.json_response(body)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_route('*', '/{dex}/{tail:.*}', self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.server.close()
+
+    def router(self, **kwargs):
+        urls = {dex: str(self.server.make_url(f'/{dex}/')) for dex in OUTPUTS}
+        return MultiDexRouter(urls=urls, **kwargs)
+
+
+async def timed(router, amount=1, **kwargs):
+    start = time.monotonic()
+    result = await router.get_best_price('WETH', 'USDC', amount, **kwargs)
+    return result, time.monotonic() - start
+
+
+@pytest.mark.asyncio
+async def test_venues_are_queried_concurrently():
+    async with StubVenues(delay=0.2) as stubs:
+        async with stubs.router(quorum=4) as router:
+            result, elapsed = await timed(router)
+    assert result['best_quote'] == {'dex': 'paraswap', 'output_amount': 2502.0}
+    assert len(result['alternatives']) == 3
+    assert result['savings'] == pytest.approx(3.0)
+    # Sequential calls would take ~0.8s
+    assert elapsed < 0.5
+    assert stubs.calls == Counter({dex: 1 for dex in OUTPUTS})
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_hanging_venue():
+    async with StubVenues() as stubs:
+        stubs.default['paraswap'] = (5.0, 200)
+        async with stubs.router(deadline=0.3, quorum=4) as router:
+            result, elapsed = await timed(router)
+    assert 0.3 <= elapsed < 1.0
+    assert result['best_quote']['dex'] == 'curve'
+    assert router.stats['cancelled'] == 1
+
+
+@pytest.mark.asyncio
+async def test_quorum_gives_stragglers_a_short_grace():
+    async with StubVenues() as stubs:
+        stubs.default['balancer'] = (1.0, 200)
+        async with stubs.router(deadline=2.0, quorum=3, quorum_grace=0.05) as router:
+            result, elapsed = await timed(router)
+    assert elapsed < 0.5
+    assert {q['dex'] for q in [result['best_quote']] + result['alternatives']} == {'uniswap', 'curve', 'paraswap'}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_dropped_and_all_failing_returns_none():
+    async with StubVenues() as stubs:
+        stubs.default['paraswap'] = (0.01, 500)
+        stubs.default['curve'] = (0.01, 503)
+        async with stubs.router(quorum=4) as router:
+            result, _ = await timed(router)
+            assert result['best_quote']['dex'] == 'uniswap'
+            assert len(result['alternatives']) == 1
+
+            for dex in OUTPUTS:
+                stubs.default[dex] = (0.01, 500)
+            assert await router.get_best_price('WETH', 'USDC', 2) is None
+
+    # Unreachable venues raise inside the fan-out and are logged, not propagated
+    router = MultiDexRouter(urls={dex: 'http://127.0.0.1:9/' for dex in OUTPUTS}, deadline=1.0)
+    async with router:
+        assert await router.get_best_price('WETH', 'USDC', 1) is None
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_after_p95_wins():
+    async with StubVenues(delay=0.02) as stubs:
+        async with stubs.router(quorum=4, deadline=2.0, hedge=False) as router:
+            # Warm up the latency windows with distinct amounts so nothing is cached
+            for amount in range(25):
+                await router.get_best_price('WETH', 'USDC', amount)
+            p95 = router.latency['uniswap'].hedge_delay()
+            assert p95 is not None and p95 < 0.2
+            router.hedge = True
+
+            stubs.script['uniswap'].append((1.0, 200))  # Next uniswap response stalls; its hedge does not
+            result, elapsed = await timed(router, amount=100)
+    assert router.stats['hedges'] >= 1 and router.stats['hedge_wins'] >= 1
+    assert elapsed < 0.5
+    assert 'uniswap' in {q['dex'] for q in [result['best_quote']] + result['alternatives']}
+    assert stubs.calls['uniswap'] == 27
+
+
+@pytest.mark.asyncio
+async def test_quotes_are_cached_per_block():
+    async with StubVenues() as stubs:
+        async with stubs.router(quorum=4) as router:
+            first = await router.get_best_price('WETH', 'USDC', 1, block_number=100)
+            again = await router.get_best_price('WETH', 'USDC', 1, block_number=100)
+            assert again == first
+            assert sum(stubs.calls.values()) == 4 and router.stats['cache_hits'] == 4
+
+            await router.get_best_price('WETH', 'USDC', 1, block_number=101)
+            assert sum(stubs.calls.values()) == 8
+
+            # Without a block number, quotes live for one block time
+            await router.get_best_price('WETH', 'USDC', 5)
+            await router.get_best_price('WETH', 'USDC', 5)
+            assert sum(stubs.calls.values()) == 12
+            router.block_time = 0
+            await router.get_best_price('WETH', 'USDC', 5)
+            assert sum(stubs.calls.values()) == 16
+
+
+@pytest.mark.asyncio
+async def test_quote_cache_drops_old_blocks_and_stays_bounded():
+    async with StubVenues() as stubs:
+        async with stubs.router(quorum=4, cache_size=6) as router:
+            await router.get_best_price('WETH', 'USDC', 1, block_number=100)
+            await router.get_best_price('WETH', 'USDC', 2, block_number=101)
+            assert {entry[0] for entry in router._cache.values()} == {101}
+
+            # Least recently used quotes are evicted past cache_size
+            await router.get_best_price('WETH', 'USDC', 2, block_number=101)  # Refreshes amount 2
+            await router.get_best_price('WETH', 'USDC', 3, block_number=101)
+            assert len(router._cache) == 6
+            assert {key[3] for key in router._cache} == {2, 3}
+            assert sum(stubs.calls.values()) == 12
+
+
+def brute_force_split(a, b, amount, steps=20000):
+    """Best two-venue split on a grid of the order size"""
+    return max((a.output(amount * k / steps) + b.output(amount * (steps - k) / steps), k / steps) for k in range(steps + 1))
+
+
+def test_split_matches_closed_form_for_two_constant_product_pools():
+    pools = {
+        'uniswap': ConstantProductCurve(1_000, 2_500_000, fee=0.003),
+        'sushiswap': ConstantProductCurve(400, 1_004_000, fee=0.0025),
+    }
+    amount = 150.0
+    plan = optimize_split(pools, amount)
+
+    # Equal marginal prices p: x_i = sqrt(a_i b_i / (g_i p)) - a_i / g_i, with sum x_i = amount
+    g = {dex: c.gamma for dex, c in pools.items()}
+    inv_root_p = (amount + sum(c.reserve_in / g[dex] for dex, c in pools.items())) / sum(
+        math.sqrt(c.reserve_in * c.reserve_out / g[dex]) for dex, c in pools.items())
+    expected = {dex: math.sqrt(c.reserve_in * c.reserve_out / g[dex]) * inv_root_p - c.reserve_in / g[dex]
+                for dex, c in pools.items()}
+
+    legs = {leg['dex']: leg for leg in plan['legs']}
+    for dex, x in expected.items():
+        assert legs[dex]['amount_in'] == pytest.approx(x, rel=1e-9)
+    assert plan['amount_in'] == pytest.approx(amount) and plan['unfilled'] == 0
+    assert legs['uniswap']['marginal_price'] == pytest.approx(legs['sushiswap']['marginal_price'], rel=1e-9)
+    assert plan['expected_out'] == pytest.approx(sum(pools[dex].output(x) for dex, x in expected.items()))
+    assert plan['single_venue']['dex'] == 'uniswap'
+    assert plan['improvement'] > 0
+    for leg in plan['legs']:
+        assert 0 < leg['slippage'] < 0.1
+
+
+def test_identical_pools_split_proportionally_to_depth():
+    pools = {'deep': ConstantProductCurve(3_000, 6_000), 'shallow': ConstantProductCurve(1_000, 2_000)}
+    plan = optimize_split(pools, 40.0)
+    legs = {leg['dex']: leg['amount_in'] for leg in plan['legs']}
+    assert legs['deep'] == pytest.approx(30.0) and legs['shallow'] == pytest.approx(10.0)
+
+
+def test_small_order_stays_on_the_better_pool():
+    # Spot 2.5 vs 2.4: until the better pool's marginal falls to 2.4, splitting loses
+    pools = {'better': ConstantProductCurve(1_000, 2_500, fee=0), 'worse': ConstantProductCurve(1_000, 2_400, fee=0)}
+    corner = math.sqrt(1_000 * 2_500 / 2.4) - 1_000
+    plan = optimize_split(pools, corner * 0.9)
+    assert [leg['dex'] for leg in plan['legs']] == ['better']
+    assert plan['improvement'] == pytest.approx(0)
+
+    plan = optimize_split(pools, corner * 3)
+    assert {leg['dex'] for leg in plan['legs']} == {'better', 'worse'}
+
+
+def test_stableswap_and_ladder_curves_match_brute_force():
+    stable = StableSwapCurve([1_000_000, 1_000_000], amp=100, fee=0.0004)
+    assert stable.output(1_000) == pytest.approx(1_000 * 0.9996, rel=1e-3)
+    assert stable.marginal(500_000) < stable.marginal(0)
+
+    cp = ConstantProductCurve(2_000_000, 2_001_000)
+    amount = 400_000.0
+    plan = optimize_split({'curve': stable, 'uniswap': cp}, amount)
+    best, _ = brute_force_split(stable, cp, amount)
+    assert plan['expected_out'] >= best - 1e-6 * best
+
+    # Sampled ladders: concave hull drops the dominated sample, capacity is the largest sample
+    ladder = QuoteLadderCurve([(100, 240), (50, 110), (200, 400), (150, 300)])
+    assert ladder.points == [(0.0, 0.0), (100.0, 240.0), (200.0, 400.0)]
+    assert ladder.capacity == 200 and ladder.output(500) == 400
+    other = QuoteLadderCurve([(100, 230), (200, 440), (300, 600)])
+    plan = optimize_split({'a': ladder, 'b': other}, 350.0)
+    best, _ = brute_force_split(ladder, other, 350.0, steps=3500)
+    assert plan['expected_out'] == pytest.approx(best, rel=1e-9)
+    assert plan['expected_out'] >= plan['single_venue']['expected_out']
+
+    # Beyond every venue's capacity the remainder is reported unfilled
+    plan = optimize_split({'a': ladder, 'b': other}, 1_000.0)
+    assert plan['amount_in'] == 500 and plan['unfilled'] == 500
+
+
+@pytest.mark.asyncio
+async def test_split_route_samples_quote_ladders():
+    async with StubVenues() as stubs:
+        async with stubs.router(deadline=1.0) as router:
+            plan = await router.get_split_route('WETH', 'USDC', 1_000, ladder=(0.5, 1.0))
+    # Stub quotes ignore size, so the best two venues each take the half-size rung
+    assert stubs.calls['paraswap'] == 0  # The aggregator is never sampled
+    assert sum(stubs.calls.values()) == 6
+    assert plan['token_in'] == 'WETH' and plan['amount_in'] == pytest.approx(1_000)
+    assert plan['expected_out'] == pytest.approx(2501.0 + 2500.0)
+    assert {leg['dex'] for leg in plan['legs']} == {'curve', 'uniswap'}
+    assert plan['single_venue']['dex'] == 'curve'